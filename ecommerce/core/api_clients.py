@@ -0,0 +1,178 @@
+"""
+Process-wide registry of the HTTP sessions and API clients used to call other services.
+
+Each EdxRestApiClient builds its own requests Session, so a client built for every request opens new
+TCP and TLS connections to the service it calls. The registry instead keeps a single client per site
+and service, whose session keeps its connections alive across requests and threads. The JWT of a
+client is replaced whenever the access token of its site rotates.
+
+The number of clients created, tokens refreshed and connections opened by each session is available
+from APIClientRegistry.get_metrics, and accumulated in custom metrics.
+"""
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from edx_django_utils import monitoring as monitoring_utils
+from edx_rest_api_client.client import EdxRestApiClient
+from requests.adapters import HTTPAdapter
+
+from analytics import Client as SegmentClient
+
+logger = logging.getLogger(__name__)
+
+CLIENTS_CREATED_METRIC = 'api_clients_created'
+TOKENS_REFRESHED_METRIC = 'api_client_tokens_refreshed'
+
+
+def create_session(pool_size=None):
+    """
+    Returns a requests Session keeping up to pool_size connections alive to each host it calls.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=pool_size or settings.API_CLIENT_CONNECTION_POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_pool_metrics(session):
+    """
+    Returns the state of the connection pools of a session, one per host it has called.
+    """
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    metrics = []
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            metrics.append({
+                'host': pool.host,
+                'port': pool.port,
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+                # The queue of a pool is filled with None placeholders for the connections it has not opened.
+                'idle_connections': len([conn for conn in list(pool.pool.queue) if conn]) if pool.pool else 0,
+            })
+    return metrics
+
+
+class APIClientRegistry(object):
+    """
+    HTTP sessions by service, and API clients by site and service, shared by all the threads of a process.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._clients = {}
+        self._segment_clients = {}
+        self._lock = threading.Lock()
+        self.clients_created = 0
+        self.tokens_refreshed = 0
+
+    def get_session(self, service, pool_size=None):
+        """
+        Returns the session used to call a service, for calls that do not go through an API client.
+
+        Args:
+            service (str): Name of the service.
+            pool_size (int): Maximum number of connections kept alive to each host of the service.
+        Returns:
+            requests.Session
+        """
+        session = self._sessions.get(service)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(service)
+                if session is None:
+                    session = create_session(pool_size)
+                    self._sessions[service] = session
+        return session
+
+    def get_client(self, site_configuration, service, url, **kwargs):
+        """
+        Returns the API client used to call a service on behalf of a site, authenticated with the site's JWT.
+
+        A new client is created if the URL of the service has changed since the client was created.
+
+        Args:
+            site_configuration (SiteConfiguration): Site calling the service.
+            service (str): Name of the service.
+            url (str): Root URL of the service API.
+            **kwargs: Additional arguments of the EdxRestApiClient, e.g. append_slash.
+        Returns:
+            EdxRestApiClient
+        """
+        key = (site_configuration.site_id, service)
+        jwt = site_configuration.access_token
+
+        entry = self._clients.get(key)
+        if entry is None or entry[0] != url:
+            with self._lock:
+                entry = self._clients.get(key)
+                if entry is None or entry[0] != url:
+                    session = create_session()
+                    entry = (url, session, EdxRestApiClient(url, jwt=jwt, session=session, **kwargs))
+                    self._clients[key] = entry
+                    self.clients_created += 1
+                    monitoring_utils.accumulate(CLIENTS_CREATED_METRIC, 1)
+
+        __, session, client = entry
+        if session.auth.token != jwt:
+            # The auth is shared by the threads using the client, which only ever read the token.
+            session.auth.token = jwt
+            self.tokens_refreshed += 1
+            monitoring_utils.accumulate(TOKENS_REFRESHED_METRIC, 1)
+            logger.debug('Refreshed the JWT of the [%s] API client of site [%s].', service, key[0])
+
+        return client
+
+    def get_segment_client(self, write_key):
+        """
+        Returns the Segment client sending events with a write key.
+
+        Each Segment client sends its events from its own thread, so clients are never created per request.
+        """
+        client = self._segment_clients.get(write_key)
+        if client is None:
+            with self._lock:
+                client = self._segment_clients.get(write_key)
+                if client is None:
+                    client = SegmentClient(write_key, debug=settings.DEBUG, send=settings.SEND_SEGMENT_EVENTS)
+                    self._segment_clients[write_key] = client
+        return client
+
+    def get_metrics(self):
+        """
+        Returns the number of clients created and tokens refreshed, and the state of each connection pool.
+        """
+        sessions = {service: get_pool_metrics(session) for service, session in self._sessions.items()}
+        for (site_id, service), (__, session, __) in self._clients.items():
+            sessions['{}:{}'.format(site_id, service)] = get_pool_metrics(session)
+
+        return {
+            'clients_created': self.clients_created,
+            'tokens_refreshed': self.tokens_refreshed,
+            'sessions': sessions,
+        }
+
+    def clear(self):
+        """
+        Closes and discards every session and client.
+
+        Events queued on the discarded Segment clients are still sent by their threads.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values()) + [session for __, session, __ in self._clients.values()]
+            self._sessions = {}
+            self._clients = {}
+            self._segment_clients = {}
+
+        for session in sessions:
+            session.close()
+
+
+api_client_registry = APIClientRegistry()
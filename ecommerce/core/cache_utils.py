@@ -0,0 +1,204 @@
+"""
+Batched and stale-while-revalidate access to the TieredCache.
+
+TieredCache reads and writes a single key at a time, which costs a Django cache round trip for every
+key missing from the request cache. get_many and set_many read and write many keys at once, with a
+single Django cache call, and keep the request cache tier in sync the way TieredCache does.
+
+get_or_fetch caches the responses of remote APIs. It keeps serving a response for a while after it
+is due for a refresh, and lets a single process refresh it, so that an expiring key does not send
+every process to the remote API at once.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import connection
+from edx_django_utils import monitoring as monitoring_utils
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
+
+from ecommerce.core.instrumentation import get_current_recorder
+
+logger = logging.getLogger(__name__)
+
+CACHE_HITS_METRIC = 'tiered_cache_get_many_hits'
+CACHE_MISSES_METRIC = 'tiered_cache_get_many_misses'
+# Interval at which a process waits for another one to fetch a value missing from the cache.
+REFRESH_POLL_INTERVAL = 0.1  # Value is in seconds.
+
+
+def get_many(keys):
+    """
+    Retrieves the values cached for the given keys.
+
+    Keys missing from the request cache are retrieved from the Django cache with a single call, and
+    the values found there are added to the request cache. The number of keys found and missed is
+    accumulated in the tiered_cache_get_many_hits and tiered_cache_get_many_misses custom metrics.
+
+    Args:
+        keys (iterable of str): Cache keys, as returned by ecommerce.core.utils.get_cache_key.
+
+    Returns:
+        dict: The cached value for each key that was found.
+    """
+    keys = list(keys)
+    values = {}
+    missing_keys = []
+    for key in keys:
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+        if cached_response.is_found:
+            values[key] = cached_response.value
+        else:
+            missing_keys.append(key)
+
+    # pylint: disable=protected-access
+    if missing_keys and not TieredCache._should_force_django_cache_miss():
+        django_values = django_cache.get_many(missing_keys)
+        for key, value in django_values.items():
+            DEFAULT_REQUEST_CACHE.set(key, value)
+        values.update(django_values)
+
+    monitoring_utils.accumulate(CACHE_HITS_METRIC, len(values))
+    monitoring_utils.accumulate(CACHE_MISSES_METRIC, len(keys) - len(values))
+    _record_cache_lookups(hits=len(values), misses=len(keys) - len(values))
+    return values
+
+
+def _record_cache_lookups(hits=0, misses=0):
+    recorder = get_current_recorder()
+    if recorder:
+        recorder.record_cache_lookups(hits=hits, misses=misses)
+
+
+def set_many(values, django_cache_timeout):
+    """
+    Caches the given values in both the request cache and the Django cache.
+
+    Args:
+        values (dict): Value to cache for each cache key.
+        django_cache_timeout (int): Timeout of the values in the Django cache, in seconds.
+    """
+    if not values:
+        return
+
+    for key, value in values.items():
+        DEFAULT_REQUEST_CACHE.set(key, value)
+    django_cache.set_many(values, django_cache_timeout)
+
+
+def _get_fresh_key(key):
+    return '{}.fresh'.format(key)
+
+
+def _get_lock_key(key):
+    return '{}.lock'.format(key)
+
+
+def _acquire_refresh_lock(key):
+    return django_cache.add(_get_lock_key(key), True, settings.API_CACHE_REFRESH_LOCK_TIMEOUT)
+
+
+def _refresh(key, fetch, timeout):
+    """
+    Fetches and caches a value.
+
+    The refresh lock is released once the value is cached. If the fetch fails, the lock is left to
+    expire, so that other processes do not retry the fetch until then.
+    """
+    value = fetch()
+    TieredCache.set_all_tiers(key, value, timeout + settings.API_CACHE_STALE_TIMEOUT)
+    django_cache.set(_get_fresh_key(key), True, timeout)
+    django_cache.delete(_get_lock_key(key))
+    return value
+
+
+def _refresh_in_background(key, fetch, timeout):
+    try:
+        _refresh(key, fetch, timeout)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Failed to refresh the stale value cached for [%s] in the background.', key)
+    finally:
+        # The thread has its own database connection, if the fetch used the database at all.
+        connection.close()
+
+
+def _wait_for_refresh(key):
+    """
+    Waits for the process holding the refresh lock of a key to cache its value.
+
+    Returns:
+        CachedResponse
+    """
+    deadline = time.time() + settings.API_CACHE_REFRESH_WAIT_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(REFRESH_POLL_INTERVAL)
+        cached_response = TieredCache.get_cached_response(key)
+        if cached_response.is_found:
+            return cached_response
+    return TieredCache.get_cached_response(key)
+
+
+def get_or_fetch(key, fetch, timeout, background_refresh=False):
+    """
+    Returns the value cached for a key, fetching and caching it when needed.
+
+    Values are considered fresh for timeout seconds, and are kept in the cache for another
+    API_CACHE_STALE_TIMEOUT seconds after that. The first process to find a stale value takes a lock
+    through the Django cache and refreshes it, while every other process keeps getting the stale
+    value. If the refresh fails, the stale value is returned and the lock is left to expire before
+    the refresh is retried. The refresh happens in a background thread if background_refresh is set.
+
+    When no value is cached at all, the processes that do not get the lock wait up to
+    API_CACHE_REFRESH_WAIT_TIMEOUT seconds for the one that did, before fetching the value themselves.
+
+    Args:
+        key (str): Cache key.
+        fetch (callable): Called without arguments to retrieve the value. Exceptions are propagated
+            if no stale value is available.
+        timeout (int): Number of seconds after which the value should be refreshed.
+        background_refresh (bool): Whether stale values should be refreshed in a background thread.
+
+    Returns:
+        The cached or fetched value.
+    """
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+    if cached_response.is_found:
+        _record_cache_lookups(hits=1)
+        return cached_response.value
+
+    fresh_key = _get_fresh_key(key)
+    # pylint: disable=protected-access
+    values = {} if TieredCache._should_force_django_cache_miss() else django_cache.get_many([key, fresh_key])
+
+    _record_cache_lookups(hits=int(key in values), misses=int(key not in values))
+    if key in values:
+        value = values[key]
+        DEFAULT_REQUEST_CACHE.set(key, value)
+        if fresh_key in values or not _acquire_refresh_lock(key):
+            return value
+
+        if background_refresh:
+            thread = threading.Thread(target=_refresh_in_background, args=(key, fetch, timeout))
+            thread.daemon = True
+            thread.start()
+            return value
+
+        try:
+            return _refresh(key, fetch, timeout)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Failed to refresh the value cached for [%s]. Returning the stale value.', key)
+            return value
+
+    if not _acquire_refresh_lock(key):
+        cached_response = _wait_for_refresh(key)
+        if cached_response.is_found:
+            return cached_response.value
+
+    try:
+        return _refresh(key, fetch, timeout)
+    except Exception:
+        # There is no stale value to fall back to, so let the next process try again right away.
+        django_cache.delete(_get_lock_key(key))
+        raise
@@ -8,6 +8,9 @@ class CoreAppConfig(AppConfig):
     def ready(self):
         super(CoreAppConfig, self).ready()
 
+        from ecommerce.core import instrumentation
+        instrumentation.install()
+
         # Ensures that the initialized Celery app is loaded when Django starts.
         # Allows Celery tasks to bind themselves to an initialized instance of the Celery library.
         # noinspection PyUnresolvedReferences
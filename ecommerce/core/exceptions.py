@@ -6,3 +6,8 @@ class MissingRequestError(Exception):
 class SiteConfigurationError(Exception):
     """ Raised when SiteConfiguration is invalid. """
     pass
+
+
+class RequestBudgetExceeded(Exception):
+    """ Raised when a request makes more queries, or HTTP calls, than the budget of its view allows. """
+    pass
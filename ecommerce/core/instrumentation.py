@@ -0,0 +1,176 @@
+"""
+Per-request record of the database queries, HTTP calls and cache lookups made by a view.
+
+A RequestRecorder is started by the RequestInstrumentationMiddleware for each request, and collects
+what the thread handling the request does until it is stopped:
+
+* database queries, through CursorWrapper.execute and executemany;
+* HTTP calls made with requests, through requests.Session.send;
+* TieredCache lookups, through TieredCache.get_cached_response, and the lookups of
+  ecommerce.core.cache_utils.
+
+These are wrapped once, by install, when the core app is ready. The wrappers only count, so recording
+is cheap enough for every request: the SQL of each query, with its parameters still separate, is counted,
+and only fingerprinted when the summary is computed. The recorder of a request whose exception escapes
+the middleware, and whose response is therefore never processed, is stopped when the exception is
+signaled. Queries that differ only by their parameters share a fingerprint, so that queries repeated for
+each object of a list, i.e. N+1 query patterns, show up as duplicate queries.
+"""
+import logging
+import re
+import threading
+from collections import Counter
+from functools import wraps
+
+import requests
+from django.core.signals import got_request_exception
+from django.db.backends.utils import CursorWrapper
+from edx_django_utils.cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETER = re.compile(r'%s')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_local = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+
+
+def get_sql_fingerprint(sql):
+    """
+    Returns the SQL statement with its literal values and parameters replaced by placeholders.
+
+    Lists of values, e.g. the values of an IN clause, are replaced by a single placeholder, so that
+    the fingerprint does not depend on the number of values either.
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PARAMETER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def get_current_recorder():
+    """
+    Returns the recorder started by the current thread, if any.
+    """
+    return getattr(_local, 'recorder', None)
+
+
+class RequestRecorder(object):
+    """
+    Records the database queries, HTTP calls and cache lookups made by the current thread.
+    """
+
+    def __init__(self):
+        self.http_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Number of executions, by SQL statement.
+        self.queries = Counter()
+
+    def start(self):
+        _local.recorder = self
+        return self
+
+    def stop(self):
+        if get_current_recorder() is self:
+            _local.recorder = None
+
+    def record_query(self, sql):
+        self.queries[sql] += 1
+
+    def record_http_call(self):
+        self.http_calls += 1
+
+    def record_cache_lookups(self, hits=0, misses=0):
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+    def get_summary(self):
+        """
+        Returns the numbers of queries, duplicate queries, HTTP calls, cache hits and cache misses.
+
+        Duplicate queries are the queries whose fingerprint was already seen. The most duplicated
+        fingerprint, if any, is returned with the number of times it was executed.
+        """
+        fingerprints = Counter()
+        for sql, count in self.queries.items():
+            fingerprints[get_sql_fingerprint(sql)] += count
+        duplicates = sum(count - 1 for count in fingerprints.values())
+        most_duplicated = None
+        if duplicates:
+            fingerprint, count = fingerprints.most_common(1)[0]
+            most_duplicated = {'sql': fingerprint, 'count': count}
+
+        return {
+            'queries': sum(self.queries.values()),
+            'duplicate_queries': duplicates,
+            'most_duplicated_query': most_duplicated,
+            'http_calls': self.http_calls,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def _record_queries(execute):
+    @wraps(execute)
+    def wrapper(self, sql, *args, **kwargs):
+        recorder = get_current_recorder()
+        if recorder:
+            recorder.record_query(sql)
+        return execute(self, sql, *args, **kwargs)
+    return wrapper
+
+
+def _record_http_calls(send):
+    @wraps(send)
+    def wrapper(*args, **kwargs):
+        recorder = get_current_recorder()
+        if recorder:
+            recorder.record_http_call()
+        return send(*args, **kwargs)
+    return wrapper
+
+
+def _record_cache_lookups(get_cached_response):
+    @wraps(get_cached_response)
+    def wrapper(*args, **kwargs):
+        cached_response = get_cached_response(*args, **kwargs)
+        recorder = get_current_recorder()
+        if recorder:
+            is_found = cached_response.is_found
+            recorder.record_cache_lookups(hits=int(is_found), misses=int(not is_found))
+        return cached_response
+    return wrapper
+
+
+def stop_current_recorder(**kwargs):  # pylint: disable=unused-argument
+    """
+    Stops the recorder started by the current thread, if any.
+    """
+    recorder = get_current_recorder()
+    if recorder:
+        recorder.stop()
+
+
+def install():
+    """
+    Wraps CursorWrapper.execute and executemany, requests.Session.send and TieredCache.get_cached_response,
+    so that they are recorded, and stops the recorder of requests raising an exception.
+    """
+    global _installed  # pylint: disable=global-statement
+
+    with _install_lock:
+        if _installed:
+            return
+        CursorWrapper.execute = _record_queries(CursorWrapper.execute)
+        CursorWrapper.executemany = _record_queries(CursorWrapper.executemany)
+        requests.Session.send = _record_http_calls(requests.Session.send)
+        TieredCache.get_cached_response = staticmethod(_record_cache_lookups(TieredCache.get_cached_response))
+        got_request_exception.connect(stop_current_recorder, dispatch_uid='stop_current_recorder')
+        _installed = True
@@ -2,7 +2,10 @@
 Tests for Django management command to verify ecommerce transactions.
 """
 import datetime
+import json
+import tempfile
 
+import mock
 import pytz
 from django.core.management import call_command
 from django.core.management.base import CommandError
@@ -12,7 +15,11 @@ from oscar.test.factories import OrderFactory, OrderLineFactory, ProductFactory
 
 from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.management.commands.tests.factories import PaymentEventFactory
-from ecommerce.core.management.commands.verify_transactions import DEFAULT_END_DELTA_TIME, DEFAULT_START_DELTA_TIME
+from ecommerce.core.management.commands.verify_transactions import (
+    DEFAULT_END_DELTA_TIME,
+    DEFAULT_START_DELTA_TIME,
+    Command
+)
 
 PaymentEventType = get_model('order', 'PaymentEventType')
 PaymentEventTypeName = get_class('order.constants', 'PaymentEventTypeName')
@@ -189,3 +196,79 @@ class VerifyTransactionsTest(TestCase):
         self.assertIn(str(refund.id), exception.message)
         self.assertIn("Amount: 90.00", exception.message)
         self.assertIn("Amount: 100.00", exception.message)
+
+    def test_report(self):
+        """Verify the errors are written to a JSON report."""
+        payment = PaymentEventFactory(order=self.order,
+                                      amount=100,
+                                      event_type_id=self.payevent.id,
+                                      date_created=self.timestamp)
+        with tempfile.NamedTemporaryFile() as report_file:
+            with self.assertRaises(CommandError):
+                call_command('verify_transactions', report=report_file.name)
+            report = json.load(report_file)
+
+        self.assertEqual(report['orders_verified'], 1)
+        self.assertEqual(report['errors']['orders_no_pay'], [])
+        self.assertEqual(report['errors']['totals_mismatch'], [{
+            'order_id': self.order.id,
+            'order_number': self.order.number,
+            'amount': '90.00',
+            'payments': [{'id': payment.id, 'processor': payment.processor_name, 'amount': '100.00',
+                          'type': PaymentEventTypeName.PAID}],
+        }])
+
+    def test_date_range(self):
+        """Verify explicit dates override the default time window."""
+        old_timestamp = datetime.datetime(2017, 1, 1, 12, tzinfo=pytz.utc)
+        self.order.date_placed = old_timestamp
+        self.order.save()
+
+        call_command('verify_transactions')
+
+        with self.assertRaises(CommandError) as cm:
+            call_command('verify_transactions', start_date='2017-01-01', end_date='2017-01-02T00:00:00Z')
+        self.assertIn(str(self.order.id), cm.exception.message)
+
+        with self.assertRaises(CommandError):
+            call_command('verify_transactions', start_date='not a date')
+
+    def create_paid_order(self):
+        order = OrderFactory(total_incl_tax=90)
+        order.date_placed = self.timestamp
+        order.save()
+        OrderLineFactory(order=order, product=self.product)
+        PaymentEventFactory(order=order, amount=90, event_type_id=self.payevent.id, date_created=self.timestamp)
+        return order
+
+    def test_chunked_query_count(self):
+        """Verify the number of queries depends on the number of chunks, not the number of orders."""
+        for __ in range(5):
+            self.create_paid_order()
+        PaymentEventFactory(order=self.order, amount=90, event_type_id=self.payevent.id, date_created=self.timestamp)
+
+        # Two event type lookups, the order count and ID bounds, and one aggregate query for each of the two chunks.
+        with self.assertNumQueries(5):
+            call_command('verify_transactions', chunk_size=3)
+
+    def test_get_shards(self):
+        """Verify order ID ranges are split into contiguous shards."""
+        self.assertEqual(Command.get_shards(1, 10, 3), [(1, 4), (5, 8), (9, 10)])
+        self.assertEqual(Command.get_shards(5, 6, 4), [(5, 5), (6, 6)])
+        self.assertEqual(Command.get_shards(5, 5, 1), [(5, 5)])
+
+    def test_shards(self):
+        """Verify each shard is verified, and its errors merged."""
+        other_order = self.create_paid_order()
+        other_order.payment_events.all().delete()
+
+        # Worker threads cannot share the in-memory test database, so shards are verified in this thread.
+        module = 'ecommerce.core.management.commands.verify_transactions'
+        with mock.patch(module + '.ThreadPool') as mock_pool, mock.patch(module + '.connections'):
+            mock_pool.return_value.map.side_effect = map
+            with self.assertRaises(CommandError) as cm:
+                call_command('verify_transactions', shards=2)
+
+        mock_pool.assert_called_once_with(2)
+        self.assertIn('Id: {}'.format(self.order.id), cm.exception.message)
+        self.assertIn('Id: {}'.format(other_order.id), cm.exception.message)
@@ -12,6 +12,13 @@ PaymentEvent amount is different from the order amount, then the order
 id and relevant payment information is logged in a list associated with
 each of these scenarios.
 
+Orders are verified in chunks of consecutive order IDs. For each chunk, a single
+grouped query computes the number of payments, the paid total and the refunded
+total of every order, and only returns the orders that fail verification. The
+window can instead be given as explicit dates, to verify historical ranges, and
+split into shards of order IDs that are verified in parallel. The errors can
+also be written to a JSON report.
+
 After considering each order in the time window the errors are input into the
 exit_errors dictionary. If any errors exist at the end of the script a
 CommandError is raised and the dictionary is printed as a string log.
@@ -28,17 +35,22 @@ Example output:
 """
 
 import datetime
+import json
 import logging
+from multiprocessing.pool import ThreadPool
 
 import pytz
+from dateutil import parser as date_parser
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Sum
+from django.db import connections
+from django.db.models import Case, Count, DecimalField, F, Max, Min, Q, Sum, When
 from oscar.core.loading import get_class, get_model
 
 from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.utils import use_read_replica_if_available
 
 logger = logging.getLogger(__name__)
+Line = get_model('order', 'Line')
 Order = get_model('order', 'Order')
 PaymentEvent = get_model('order', 'PaymentEvent')
 PaymentEventType = get_model('order', 'PaymentEventType')
@@ -46,8 +58,14 @@ PaymentEventTypeName = get_class('order.constants', 'PaymentEventTypeName')
 
 DEFAULT_START_DELTA_TIME = 240
 DEFAULT_END_DELTA_TIME = 60
+DEFAULT_CHUNK_SIZE = 10000
 VALID_PRODUCT_CLASS_NAMES = [SEAT_PRODUCT_CLASS_NAME, COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME]
 
+ORDERS_WITHOUT_PAYMENTS = 'orders_no_pay'
+MULTI_PAYMENT_ON_ORDER = 'multi_pay_on_order'
+ORDER_PAYMENT_TOTALS_MISMATCH = 'totals_mismatch'
+REFUND_AMOUNT_EXCEEDED = 'refund_amount_exceeded'
+
 
 class Command(BaseCommand):
     ORDERS_WITHOUT_PAYMENTS = None
@@ -76,6 +94,43 @@ class Command(BaseCommand):
             default=DEFAULT_END_DELTA_TIME,
             help='Minutes before now to end looking at orders.'
         )
+        parser.add_argument(
+            '--start-date',
+            action='store',
+            dest='start_date',
+            default=None,
+            help='ISO 8601 date/time at which to start looking at orders. Overrides --start-delta.'
+        )
+        parser.add_argument(
+            '--end-date',
+            action='store',
+            dest='end_date',
+            default=None,
+            help='ISO 8601 date/time at which to end looking at orders. Overrides --end-delta.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            action='store',
+            dest='chunk_size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of consecutive order IDs verified per query.'
+        )
+        parser.add_argument(
+            '--shards',
+            action='store',
+            dest='shards',
+            type=int,
+            default=1,
+            help='Number of order ID ranges to verify in parallel.'
+        )
+        parser.add_argument(
+            '--report',
+            action='store',
+            dest='report',
+            default=None,
+            help='Path of a file to which the errors are written as JSON.'
+        )
 
     def handle(self, *args, **options):
         self.ORDERS_WITHOUT_PAYMENTS = []
@@ -85,63 +140,173 @@ class Command(BaseCommand):
         self.PAID_EVENT_TYPE = PaymentEventType.objects.get(name=PaymentEventTypeName.PAID)
         self.REFUNDED_EVENT_TYPE = PaymentEventType.objects.get(name=PaymentEventTypeName.REFUNDED)
 
-        start_delta = options['start_delta']
-        end_delta = options['end_delta']
-
-        start = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=start_delta)
-        end = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=end_delta)
-
+        start, end = self.get_window(options)
         orders = use_read_replica_if_available(
-            Order.objects.all()
-            .filter(date_placed__gte=start, date_placed__lt=end)
-            .prefetch_related('payment_events__event_type')
+            Order.objects.filter(date_placed__gte=start, date_placed__lt=end)
         )
 
-        logger.info("Number of orders to verify: %s", orders.count())
-
-        for order in orders:
-            all_payment_events = order.payment_events
-            refunds = all_payment_events.filter(event_type=self.REFUNDED_EVENT_TYPE)
-            payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
+        bounds = orders.aggregate(count=Count('id'), min_id=Min('id'), max_id=Max('id'))
+        logger.info("Number of orders to verify: %s", bounds['count'])
+
+        if bounds['count']:
+            shards = self.get_shards(bounds['min_id'], bounds['max_id'], options['shards'])
+            args = [(orders, lower, upper, options['chunk_size']) for lower, upper in shards]
+            if len(args) == 1:
+                results = [self.verify_shard(*args[0])]
+            else:
+                pool = ThreadPool(len(args))
+                try:
+                    results = pool.map(self._verify_shard_in_thread, args)
+                finally:
+                    pool.close()
+                    pool.join()
+
+            for errors in results:
+                self.ORDERS_WITHOUT_PAYMENTS.extend(errors[ORDERS_WITHOUT_PAYMENTS])
+                self.MULTI_PAYMENT_ON_ORDER.extend(errors[MULTI_PAYMENT_ON_ORDER])
+                self.ORDER_PAYMENT_TOTALS_MISMATCH.extend(errors[ORDER_PAYMENT_TOTALS_MISMATCH])
+                self.REFUND_AMOUNT_EXCEEDED.extend(errors[REFUND_AMOUNT_EXCEEDED])
+
+        if options['report']:
+            self.write_report(options['report'], start, end, bounds['count'])
 
-            self.validate_order_payments(order, payments)
-            self.validate_order_refunds(order, refunds, payments)
-
-        self.clean_orders()
         exit_errors = self.compile_errors()
 
         if exit_errors:
             raise CommandError("Errors in transactions: {errors}".format(errors=exit_errors))
 
-    def validate_order_payments(self, order, payments):
-        # If a coupon is used to purchase a product for the full price, there will be no PaymentEvent
-        # so we must also verify that order had a price > 0.
-        if payments.count() == 0:
-            if order.total_incl_tax > 0:
-                self.ORDERS_WITHOUT_PAYMENTS.append(
-                    (order, None)
-                )
-            return
-
-        # We do not support multi-payment today, so flag this for review.
-        if payments.count() > 1:
-            self.MULTI_PAYMENT_ON_ORDER.append(
-                (order, payments)
+    def get_window(self, options):
+        now = datetime.datetime.now(pytz.utc)
+        start = now - datetime.timedelta(minutes=options['start_delta'])
+        end = now - datetime.timedelta(minutes=options['end_delta'])
+
+        try:
+            if options['start_date']:
+                start = self._parse_date(options['start_date'])
+            if options['end_date']:
+                end = self._parse_date(options['end_date'])
+        except ValueError as exc:
+            raise CommandError('Invalid date: {}'.format(exc))
+
+        return start, end
+
+    @staticmethod
+    def _parse_date(value):
+        date = date_parser.parse(value)
+        return date if date.tzinfo else pytz.utc.localize(date)
+
+    @staticmethod
+    def get_shards(min_id, max_id, shard_count):
+        """Split the inclusive range of order IDs into at most `shard_count` contiguous ranges."""
+        shard_count = max(1, min(shard_count, max_id - min_id + 1))
+        size = (max_id - min_id) // shard_count + 1
+        return [(lower, min(lower + size - 1, max_id)) for lower in range(min_id, max_id + 1, size)]
+
+    def _verify_shard_in_thread(self, args):
+        try:
+            return self.verify_shard(*args)
+        finally:
+            # Each worker thread has its own database connections.
+            connections.close_all()
+
+    def get_unverified_orders(self, orders):
+        """
+        Annotate the orders with their payment count, paid total and refunded total, keeping only those
+        that fail verification.
+        """
+        paid = Q(payment_events__event_type=self.PAID_EVENT_TYPE)
+        refunded = Q(payment_events__event_type=self.REFUNDED_EVENT_TYPE)
+        amount_field = DecimalField(max_digits=12, decimal_places=2)
+
+        return orders.annotate(
+            payment_count=Count(Case(When(paid, then='payment_events__id'))),
+            paid_total=Sum(Case(When(paid, then='payment_events__amount'), output_field=amount_field)),
+            refunded_total=Sum(Case(When(refunded, then='payment_events__amount'), output_field=amount_field)),
+        ).filter(
+            # If a coupon is used to purchase a product for the full price, there will be no PaymentEvent
+            # so we must also verify that order had a price > 0.
+            Q(payment_count=0, total_incl_tax__gt=0) |
+            # We do not support multi-payment today, so flag this for review.
+            Q(payment_count__gt=1) |
+            # If the payment total and the order total do not match, flag for review.
+            Q(payment_count__gt=0, paid_total__lt=F('total_incl_tax')) |
+            Q(payment_count__gt=0, paid_total__gt=F('total_incl_tax')) |
+            Q(refunded_total__gt=F('paid_total')) |
+            Q(refunded_total__isnull=False, paid_total__isnull=True)
+        ).only('id', 'number', 'total_incl_tax')
+
+    def verify_shard(self, orders, lower, upper, chunk_size):
+        """
+        Verify the orders with IDs in the inclusive range [lower, upper], one chunk of IDs at a time.
+
+        Returns:
+            dict: (order, events) tuples of the orders that failed verification, by error type.
+        """
+        errors = {
+            ORDERS_WITHOUT_PAYMENTS: [],
+            MULTI_PAYMENT_ON_ORDER: [],
+            ORDER_PAYMENT_TOTALS_MISMATCH: [],
+            REFUND_AMOUNT_EXCEEDED: [],
+        }
+
+        for chunk_start in range(lower, upper + 1, chunk_size):
+            chunk_end = min(chunk_start + chunk_size - 1, upper)
+            unverified = list(
+                self.get_unverified_orders(orders.filter(id__gte=chunk_start, id__lte=chunk_end)).iterator()
             )
+            if unverified:
+                self.classify_orders(orders, unverified, errors)
+
+            logger.info('Verified orders [%d] through [%d]. [%d] failed verification.',
+                        chunk_start, chunk_end, len(unverified))
+
+        return errors
+
+    def classify_orders(self, orders, unverified, errors):
+        order_ids = [order.id for order in unverified]
+        events = PaymentEvent.objects.using(orders.db).filter(
+            order_id__in=order_ids
+        ).select_related('event_type').order_by('id')
+        payments_by_order = {order_id: [] for order_id in order_ids}
+        refunds_by_order = {order_id: [] for order_id in order_ids}
+        for event in events:
+            if event.event_type_id == self.PAID_EVENT_TYPE.id:
+                payments_by_order[event.order_id].append(event)
+            elif event.event_type_id == self.REFUNDED_EVENT_TYPE.id:
+                refunds_by_order[event.order_id].append(event)
 
-        # If the payment total and the order total do not match, flag for review.
-        if payments.aggregate(total=Sum('amount')).get('total') != order.total_incl_tax:
-            self.ORDER_PAYMENT_TOTALS_MISMATCH.append(
-                (order, payments)
-            )
+        # We only expect immediate payments for Seats and Entitlements.
+        verifiable_order_ids = self.get_verifiable_order_ids(
+            orders, [order.id for order in unverified if order.payment_count == 0]
+        )
 
-    def validate_order_refunds(self, order, refunds, payments):
-        refund_total = refunds.aggregate(total=Sum('amount')).get('total')
-        payment_total = payments.aggregate(total=Sum('amount')).get('total')
-        if refund_total > payment_total:
-            self.REFUND_AMOUNT_EXCEEDED.append(
-                (order, refunds)
-            )
+        for order in unverified:
+            payments = payments_by_order[order.id]
+            if order.payment_count == 0:
+                if order.total_incl_tax > 0 and order.id in verifiable_order_ids:
+                    errors[ORDERS_WITHOUT_PAYMENTS].append((order, None))
+            else:
+                if order.payment_count > 1:
+                    errors[MULTI_PAYMENT_ON_ORDER].append((order, payments))
+                if order.paid_total != order.total_incl_tax:
+                    errors[ORDER_PAYMENT_TOTALS_MISMATCH].append((order, payments))
+
+            if order.refunded_total is not None and (order.paid_total is None or
+                                                     order.refunded_total > order.paid_total):
+                errors[REFUND_AMOUNT_EXCEEDED].append((order, refunds_by_order[order.id]))
+
+    @staticmethod
+    def get_verifiable_order_ids(orders, order_ids):
+        """Return the IDs of the given orders that contain a seat or entitlement."""
+        if not order_ids:
+            return set()
+
+        product_class_filter = (Q(product__product_class__name__in=VALID_PRODUCT_CLASS_NAMES) |
+                                Q(product__parent__product_class__name__in=VALID_PRODUCT_CLASS_NAMES))
+        return set(
+            Line.objects.using(orders.db).filter(product_class_filter, order_id__in=order_ids)
+            .values_list('order_id', flat=True)
+        )
 
     def compile_errors(self):
         exit_errors = {}
@@ -160,6 +325,39 @@ class Command(BaseCommand):
                                                     + self.error_msg(self.REFUND_AMOUNT_EXCEEDED)
         return exit_errors
 
+    def write_report(self, path, start, end, order_count):
+        """Write the errors to a JSON file, with one entry per order and its relevant payment events."""
+        def serialize(errors):
+            return [
+                {
+                    'order_id': order.id,
+                    'order_number': order.number,
+                    'amount': unicode(order.total_incl_tax),
+                    'payments': [
+                        {
+                            'id': payment.id,
+                            'processor': payment.processor_name,
+                            'amount': unicode(payment.amount),
+                            'type': payment.event_type.name,
+                        } for payment in payments or []
+                    ],
+                } for order, payments in errors
+            ]
+
+        report = {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'orders_verified': order_count,
+            'errors': {
+                ORDER_PAYMENT_TOTALS_MISMATCH: serialize(self.ORDER_PAYMENT_TOTALS_MISMATCH),
+                ORDERS_WITHOUT_PAYMENTS: serialize(self.ORDERS_WITHOUT_PAYMENTS),
+                MULTI_PAYMENT_ON_ORDER: serialize(self.MULTI_PAYMENT_ON_ORDER),
+                REFUND_AMOUNT_EXCEEDED: serialize(self.REFUND_AMOUNT_EXCEEDED),
+            },
+        }
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=2, sort_keys=True)
+
     def error_msg(self, errors):
         msg = ""
         for order, payments in errors:
@@ -183,22 +381,3 @@ class Command(BaseCommand):
             msg += order_str
             msg += payment_str
         return msg
-
-    def clean_orders(self):
-        # We only expect immediate payments for Seats and Entitlements.
-        # Filter out orders that were flagged as being without payment for other product types
-        cleaned_orders_without_payments = [
-            (o, p) for o, p in self.ORDERS_WITHOUT_PAYMENTS if self.valid_order_without_payment(o)
-        ]
-        self.ORDERS_WITHOUT_PAYMENTS = cleaned_orders_without_payments
-
-    def valid_order_without_payment(self, order):
-        valid = False
-        for line in order.lines.all():
-            if self.verifiable_product(line.product):
-                valid = True
-
-        return valid
-
-    def verifiable_product(self, product):
-        return product.get_product_class().name in VALID_PRODUCT_CLASS_NAMES
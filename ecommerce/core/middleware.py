@@ -0,0 +1,87 @@
+"""
+Middleware reporting the database queries, HTTP calls and cache lookups made by each request.
+"""
+import logging
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from edx_django_utils import monitoring as monitoring_utils
+
+from ecommerce.core.exceptions import RequestBudgetExceeded
+from ecommerce.core.instrumentation import RequestRecorder
+
+logger = logging.getLogger(__name__)
+
+# Custom metrics set for each request, by summary field.
+SUMMARY_METRICS = {
+    'queries': 'request_query_count',
+    'duplicate_queries': 'request_duplicate_query_count',
+    'http_calls': 'request_http_call_count',
+    'cache_hits': 'request_cache_hits',
+    'cache_misses': 'request_cache_misses',
+}
+
+
+class RequestInstrumentationMiddleware(MiddlewareMixin):
+    """
+    Records the database queries, HTTP calls and cache lookups made by each request.
+
+    The summary of each request is reported in custom metrics, alongside the metrics of the
+    RequestMetricsMiddleware, and set as the instrumentation attribute of the response. The most
+    duplicated query, a likely N+1 query pattern, is reported in the request_most_duplicated_query metric.
+
+    REQUEST_BUDGETS limits the number of queries, duplicate queries and HTTP calls of a view, by URL name.
+    Requests exceeding their budget are logged, and fail with RequestBudgetExceeded if REQUEST_BUDGETS_ENFORCED
+    is set. Tests assert the budget of a view with RequestBudgetMixin.assertRequestWithinBudget instead.
+
+    This middleware should appear as early as possible, so that the queries made by the other
+    middleware are recorded.
+    """
+
+    def process_request(self, request):
+        if settings.REQUEST_INSTRUMENTATION_ENABLED:
+            request.instrumentation_recorder = RequestRecorder().start()
+
+    def process_response(self, request, response):
+        recorder = getattr(request, 'instrumentation_recorder', None)
+        if recorder is None:
+            return response
+
+        recorder.stop()
+        request.instrumentation_recorder = None
+        summary = recorder.get_summary()
+        url_name = request.resolver_match.view_name if getattr(request, 'resolver_match', None) else None
+
+        for field, metric in SUMMARY_METRICS.items():
+            monitoring_utils.set_custom_metric(metric, summary[field])
+        if summary['most_duplicated_query']:
+            monitoring_utils.set_custom_metric(
+                'request_most_duplicated_query',
+                '{count} x {sql}'.format(**summary['most_duplicated_query'])[:settings.REQUEST_METRIC_MAX_LENGTH]
+            )
+
+        response.instrumentation = dict(summary, url_name=url_name)
+        self.check_budget(url_name, summary)
+        return response
+
+    def check_budget(self, url_name, summary):
+        budget = settings.REQUEST_BUDGETS.get(url_name)
+        if not budget:
+            return
+
+        exceeded = {
+            field: summary[field] for field, limit in budget.items() if summary[field] > limit
+        }
+        if not exceeded:
+            return
+
+        message = 'Request to [{url_name}] exceeded its budget {budget}: {exceeded}'.format(
+            url_name=url_name, budget=budget, exceeded=exceeded
+        )
+        if summary['most_duplicated_query']:
+            message += '. Most duplicated query: {count} x {sql}'.format(**summary['most_duplicated_query'])
+
+        monitoring_utils.set_custom_metric('request_budget_exceeded', ','.join(sorted(exceeded)))
+        if settings.REQUEST_BUDGETS_ENFORCED:
+            raise RequestBudgetExceeded(message)
+        logger.warning(message)
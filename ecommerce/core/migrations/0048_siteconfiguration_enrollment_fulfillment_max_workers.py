@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 06:51
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_businessclient_enterprise_customer_uuid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteconfiguration',
+            name='enrollment_fulfillment_max_workers',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Maximum number of concurrent Enrollment API requests made when fulfilling an order. A value of 1 fulfills the seats of an order one at a time.', verbose_name='Enrollment fulfillment concurrency'),
+        ),
+    ]
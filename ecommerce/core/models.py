@@ -9,7 +9,6 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.sites.models import Site
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import TieredCache
@@ -18,7 +17,7 @@ from jsonfield.fields import JSONField
 from requests.exceptions import ConnectionError, Timeout
 from slumber.exceptions import HttpNotFoundError, SlumberBaseException
 
-from analytics import Client as SegmentClient
+from ecommerce.core.api_clients import api_client_registry
 from ecommerce.core.url_utils import get_lms_url
 from ecommerce.core.utils import log_message_and_raise_validation_error
 from ecommerce.extensions.payment.exceptions import ProcessorNotFoundError
@@ -194,6 +193,12 @@ class SiteConfiguration(models.Model):
         blank=True,
         default=False
     )
+    enrollment_fulfillment_max_workers = models.PositiveSmallIntegerField(
+        verbose_name=_('Enrollment fulfillment concurrency'),
+        help_text=_('Maximum number of concurrent Enrollment API requests made when fulfilling an order. '
+                    'A value of 1 fulfills the seats of an order one at a time.'),
+        default=1
+    )
 
     @property
     def payment_processors_set(self):
@@ -293,9 +298,9 @@ class SiteConfiguration(models.Model):
         """
         return self.from_email or settings.OSCAR_FROM_EMAIL
 
-    @cached_property
+    @property
     def segment_client(self):
-        return SegmentClient(self.segment_key, debug=settings.DEBUG, send=settings.SEND_SEGMENT_EVENTS)
+        return api_client_registry.get_segment_client(self.segment_key)
 
     def save(self, *args, **kwargs):
         # Clear Site cache upon SiteConfiguration changed
@@ -388,7 +393,7 @@ class SiteConfiguration(models.Model):
         TieredCache.set_all_tiers(key, access_token, expires)
         return access_token
 
-    @cached_property
+    @property
     def discovery_api_client(self):
         """
         Returns an API client to access the Discovery service.
@@ -397,10 +402,10 @@ class SiteConfiguration(models.Model):
             EdxRestApiClient: The client to access the Discovery service.
         """
 
-        return EdxRestApiClient(self.discovery_api_url, jwt=self.access_token)
+        return api_client_registry.get_client(self, 'discovery', self.discovery_api_url)
 
     # TODO: journals dependency
-    @cached_property
+    @property
     def journal_discovery_api_client(self):
         """
         Returns an Journal API client to access the Discovery service.
@@ -417,14 +422,14 @@ class SiteConfiguration(models.Model):
             split_url.fragment
         ])
 
-        return EdxRestApiClient(journal_discovery_url, jwt=self.access_token)
+        return api_client_registry.get_client(self, 'journal_discovery', journal_discovery_url)
 
-    @cached_property
+    @property
     def embargo_api_client(self):
         """ Returns the URL for the embargo API """
-        return EdxRestApiClient(self.build_lms_url('/api/embargo/v1'), jwt=self.access_token)
+        return api_client_registry.get_client(self, 'embargo', self.build_lms_url('/api/embargo/v1'))
 
-    @cached_property
+    @property
     def enterprise_api_client(self):
         """
         Constructs a Slumber-based REST API client for the provided site.
@@ -436,13 +441,15 @@ class SiteConfiguration(models.Model):
             EdxRestApiClient: The client to access the Enterprise service.
 
         """
-        return EdxRestApiClient(self.enterprise_api_url, jwt=self.access_token)
+        return api_client_registry.get_client(self, 'enterprise', self.enterprise_api_url)
 
-    @cached_property
+    @property
     def consent_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/consent/api/v1/'), jwt=self.access_token, append_slash=False)
+        return api_client_registry.get_client(
+            self, 'consent', self.build_lms_url('/consent/api/v1/'), append_slash=False
+        )
 
-    @cached_property
+    @property
     def user_api_client(self):
         """
         Returns the API client to access the user API endpoint on LMS.
@@ -450,23 +457,25 @@ class SiteConfiguration(models.Model):
         Returns:
             EdxRestApiClient: The client to access the LMS user API service.
         """
-        return EdxRestApiClient(self.build_lms_url('/api/user/v1/'), jwt=self.access_token)
+        return api_client_registry.get_client(self, 'user', self.build_lms_url('/api/user/v1/'))
 
-    @cached_property
+    @property
     def commerce_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/commerce/v1/'), jwt=self.access_token)
+        return api_client_registry.get_client(self, 'commerce', self.build_lms_url('/api/commerce/v1/'))
 
-    @cached_property
+    @property
     def credit_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/credit/v1/'), jwt=self.access_token)
+        return api_client_registry.get_client(self, 'credit', self.build_lms_url('/api/credit/v1/'))
 
-    @cached_property
+    @property
     def enrollment_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/enrollment/v1/'), jwt=self.access_token, append_slash=False)
+        return api_client_registry.get_client(
+            self, 'enrollment', self.build_lms_url('/api/enrollment/v1/'), append_slash=False
+        )
 
-    @cached_property
+    @property
     def entitlement_api_client(self):
-        return EdxRestApiClient(self.build_lms_url('/api/entitlements/v1/'), jwt=self.access_token)
+        return api_client_registry.get_client(self, 'entitlement', self.build_lms_url('/api/entitlements/v1/'))
 
 
 class User(AbstractUser):
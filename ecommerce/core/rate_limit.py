@@ -0,0 +1,81 @@
+"""Rate limiting of calls to other services, and backing off when they throttle the calls."""
+from __future__ import unicode_literals
+
+import threading
+import time
+
+
+def get_retry_after(response):
+    """
+    Returns the number of seconds a response asks the client to wait before retrying, if any.
+
+    Only the delay-seconds form of the Retry-After header is supported.
+
+    Returns:
+        int: seconds to wait, or None if the response does not give them
+    """
+    retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+    return int(retry_after) if retry_after.isdigit() else None
+
+
+def get_retry_delay(attempt, backoff, response=None):
+    """
+    Returns the number of seconds to wait before retrying a failed call.
+
+    The delay is the Retry-After of the response, if it gives one; otherwise, it is exponential: `backoff`
+    seconds before the first retry, doubling with each following retry.
+
+    Arguments:
+        attempt (int): Number of retries already made, starting at 0.
+        backoff (float): Seconds to wait before the first retry.
+        response (Response): Response of the failed call, if any.
+    """
+    retry_after = get_retry_after(response)
+    return backoff * 2 ** attempt if retry_after is None else retry_after
+
+
+class RateLimiter(object):
+    """
+    Spaces out calls made by several threads, so that no more than `rate` calls start per second.
+
+    When the called service throttles a call, e.g. with HTTP 429, calls are spaced out by a delay
+    instead, if it is longer. The delay starts at `backoff` seconds, doubles with each throttled call
+    up to `max_backoff`, and is at least the Retry-After given by the service. It is halved whenever a
+    call succeeds, so that the calls speed up again once the service stops throttling them.
+    """
+
+    def __init__(self, rate=None, backoff=0, max_backoff=0):
+        self.interval = 1.0 / rate if rate else 0
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.delay = 0
+        self._lock = threading.Lock()
+        self._next_call = 0
+
+    def wait(self):
+        """Blocks until the next call is allowed to start."""
+        with self._lock:
+            interval = max(self.interval, self.delay)
+            now = time.time()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def throttled(self, retry_after=None):
+        """
+        Increases the delay between calls after a throttled call, and holds back the next call by it.
+
+        Returns:
+            float: the new delay, in seconds
+        """
+        with self._lock:
+            self.delay = max(min(max(self.delay * 2, self.backoff), self.max_backoff), retry_after or 0)
+            self._next_call = max(self._next_call, time.time() + self.delay)
+            return self.delay
+
+    def succeeded(self):
+        """Decreases the delay between calls after a call that was not throttled."""
+        with self._lock:
+            self.delay = self.delay / 2.0 if self.delay >= 1 else 0
@@ -0,0 +1,113 @@
+import httpretty
+import mock
+from django.test import override_settings
+
+from ecommerce.core.api_clients import APIClientRegistry
+from ecommerce.core.models import SiteConfiguration
+from ecommerce.tests.factories import SiteConfigurationFactory
+from ecommerce.tests.testcases import TestCase
+
+API_URL = 'http://api.example.com/api/v1/'
+
+
+class APIClientRegistryTests(TestCase):
+    def setUp(self):
+        super(APIClientRegistryTests, self).setUp()
+        self.registry = APIClientRegistry()
+        self.addCleanup(self.registry.clear)
+
+    def mock_access_token(self, token='token'):
+        patcher = mock.patch.object(SiteConfiguration, 'access_token', new_callable=mock.PropertyMock,
+                                    return_value=token)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_get_client(self):
+        """ Verify a single client is created per site and service. """
+        self.mock_access_token()
+        client = self.registry.get_client(self.site_configuration, 'test', API_URL, append_slash=False)
+        client_store = client._store  # pylint: disable=protected-access
+
+        self.assertEqual(client_store['base_url'], API_URL)
+        self.assertFalse(client_store['append_slash'])
+        self.assertEqual(client_store['session'].auth.token, 'token')
+        self.assertIs(self.registry.get_client(self.site_configuration, 'test', API_URL), client)
+
+        other_site_configuration = SiteConfigurationFactory(partner__short_code='other')
+        self.assertIsNot(self.registry.get_client(other_site_configuration, 'test', API_URL), client)
+        self.assertIsNot(self.registry.get_client(self.site_configuration, 'other', API_URL), client)
+        self.assertEqual(self.registry.clients_created, 3)
+
+    def test_get_client_url_changed(self):
+        """ Verify a new client is created if the URL of the service changes. """
+        self.mock_access_token()
+        client = self.registry.get_client(self.site_configuration, 'test', API_URL)
+        new_url = 'http://new-api.example.com/api/v1/'
+        new_client = self.registry.get_client(self.site_configuration, 'test', new_url)
+
+        self.assertIsNot(new_client, client)
+        self.assertEqual(new_client._store['base_url'], new_url)  # pylint: disable=protected-access
+
+    def test_get_client_token_rotated(self):
+        """ Verify the JWT of a client is replaced when the access token of its site rotates. """
+        access_token = self.mock_access_token()
+        client = self.registry.get_client(self.site_configuration, 'test', API_URL)
+
+        access_token.return_value = 'new-token'
+        self.assertIs(self.registry.get_client(self.site_configuration, 'test', API_URL), client)
+        self.assertEqual(client._store['session'].auth.token, 'new-token')  # pylint: disable=protected-access
+        self.assertEqual(self.registry.tokens_refreshed, 1)
+
+    @override_settings(API_CLIENT_CONNECTION_POOL_SIZE=3)
+    def test_get_session(self):
+        """ Verify a single session is created per service, with the requested pool size. """
+        session = self.registry.get_session('test')
+        self.assertIs(self.registry.get_session('test'), session)
+        self.assertEqual(session.get_adapter(API_URL)._pool_maxsize, 3)  # pylint: disable=protected-access
+
+        other_session = self.registry.get_session('other', pool_size=5)
+        self.assertIsNot(other_session, session)
+        self.assertEqual(other_session.get_adapter(API_URL)._pool_maxsize, 5)  # pylint: disable=protected-access
+
+    @httpretty.activate
+    def test_get_metrics(self):
+        """ Verify the metrics report the clients created, tokens refreshed and connection pools. """
+        access_token = self.mock_access_token()
+        httpretty.register_uri(httpretty.GET, API_URL + 'resource/', body='{}', content_type='application/json')
+
+        for token in ('token', 'new-token'):
+            access_token.return_value = token
+            self.registry.get_client(self.site_configuration, 'test', API_URL).resource.get()
+        self.registry.get_session('other')
+
+        self.assertEqual(self.registry.get_metrics(), {
+            'clients_created': 1,
+            'tokens_refreshed': 1,
+            'sessions': {
+                'other': [],
+                '{}:test'.format(self.site_configuration.site_id): [{
+                    'host': 'api.example.com',
+                    'port': 80,
+                    'connections_created': 1,
+                    'requests': 2,
+                    'idle_connections': 1,
+                }],
+            },
+        })
+
+    def test_get_segment_client(self):
+        """ Verify a single Segment client is created per write key. """
+        client = self.registry.get_segment_client('key')
+        self.assertEqual(client.write_key, 'key')
+        self.assertIs(self.registry.get_segment_client('key'), client)
+        self.assertIsNot(self.registry.get_segment_client('other-key'), client)
+
+    def test_clear(self):
+        """ Verify clearing the registry discards its sessions and clients. """
+        self.mock_access_token()
+        client = self.registry.get_client(self.site_configuration, 'test', API_URL)
+        session = self.registry.get_session('test')
+        self.registry.clear()
+
+        self.assertIsNot(self.registry.get_client(self.site_configuration, 'test', API_URL), client)
+        self.assertIsNot(self.registry.get_session('test'), session)
@@ -0,0 +1,134 @@
+import mock
+from django.core.cache import cache as django_cache
+from django.test import override_settings
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, RequestCache, TieredCache
+
+from ecommerce.core import cache_utils
+from ecommerce.tests.testcases import TestCase
+
+
+class CacheUtilsTests(TestCase):
+    def test_get_many(self):
+        """ Verify values are read from both cache tiers, and Django cache hits are added to the request cache. """
+        DEFAULT_REQUEST_CACHE.set('request', 1)
+        django_cache.set('django', 2)
+
+        with mock.patch.object(django_cache, 'get_many', wraps=django_cache.get_many) as mock_get_many:
+            self.assertEqual(cache_utils.get_many(['request', 'django', 'missing']), {'request': 1, 'django': 2})
+            mock_get_many.assert_called_once_with(['django', 'missing'])
+
+        self.assertEqual(DEFAULT_REQUEST_CACHE.get_cached_response('django').value, 2)
+        self.assertFalse(DEFAULT_REQUEST_CACHE.get_cached_response('missing').is_found)
+
+    def test_get_many_request_cache_hits(self):
+        """ Verify the Django cache is not called when every key is found in the request cache. """
+        DEFAULT_REQUEST_CACHE.set('request', 1)
+
+        with mock.patch.object(django_cache, 'get_many') as mock_get_many:
+            self.assertEqual(cache_utils.get_many(['request']), {'request': 1})
+            mock_get_many.assert_not_called()
+
+    @mock.patch('ecommerce.core.cache_utils.monitoring_utils')
+    def test_get_many_metrics(self, mock_monitoring_utils):
+        """ Verify the numbers of hits and misses are accumulated in custom metrics. """
+        django_cache.set('django', 2)
+
+        cache_utils.get_many(['django', 'missing', 'other'])
+        mock_monitoring_utils.accumulate.assert_has_calls([
+            mock.call(cache_utils.CACHE_HITS_METRIC, 1),
+            mock.call(cache_utils.CACHE_MISSES_METRIC, 2),
+        ])
+
+    def test_set_many(self):
+        """ Verify values are written to both cache tiers, and can be read back with TieredCache. """
+        cache_utils.set_many({'first': 1, 'second': 0}, 60)
+
+        self.assertEqual(DEFAULT_REQUEST_CACHE.get_cached_response('first').value, 1)
+        self.assertEqual(django_cache.get('second'), 0)
+        self.assertEqual(TieredCache.get_cached_response('second').value, 0)
+
+
+@override_settings(API_CACHE_STALE_TIMEOUT=60, API_CACHE_REFRESH_LOCK_TIMEOUT=30, API_CACHE_REFRESH_WAIT_TIMEOUT=0)
+class GetOrFetchTests(TestCase):
+    key = 'test-key'
+
+    def cache_stale_value(self, value):
+        """ Caches a value that is due for a refresh, in the Django cache only. """
+        django_cache.set(self.key, value, 60)
+
+    def test_miss(self):
+        """ Verify missing values are fetched and cached in both tiers. """
+        fetch = mock.Mock(return_value='fetched')
+
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'fetched')
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'fetched')
+        fetch.assert_called_once_with()
+
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'fetched')
+        fetch.assert_called_once_with()
+        self.assertEqual(TieredCache.get_cached_response(self.key).value, 'fetched')
+
+    def test_miss_error(self):
+        """ Verify fetch errors are raised when no stale value is cached, and do not hold the lock. """
+        fetch = mock.Mock(side_effect=ValueError)
+
+        with self.assertRaises(ValueError):
+            cache_utils.get_or_fetch(self.key, fetch, 10)
+
+        fetch.side_effect = None
+        fetch.return_value = 'fetched'
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'fetched')
+
+    def test_miss_locked(self):
+        """ Verify a process that does not get the lock fetches the value itself if it is not cached in time. """
+        django_cache.add('{}.lock'.format(self.key), True)
+        fetch = mock.Mock(return_value='fetched')
+
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'fetched')
+        fetch.assert_called_once_with()
+
+    def test_stale(self):
+        """ Verify stale values are refreshed. """
+        self.cache_stale_value('stale')
+        fetch = mock.Mock(return_value='fetched')
+
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'fetched')
+        self.assertEqual(django_cache.get('{}.fresh'.format(self.key)), True)
+        self.assertIsNone(django_cache.get('{}.lock'.format(self.key)))
+
+    def test_stale_locked(self):
+        """ Verify stale values are returned without fetching while another process refreshes them. """
+        self.cache_stale_value('stale')
+        django_cache.add('{}.lock'.format(self.key), True)
+        fetch = mock.Mock(return_value='fetched')
+
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'stale')
+        fetch.assert_not_called()
+
+    def test_stale_error(self):
+        """ Verify stale values are returned if they cannot be refreshed, and the refresh is not retried right away. """
+        self.cache_stale_value('stale')
+        fetch = mock.Mock(side_effect=ValueError)
+
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'stale')
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10), 'stale')
+        fetch.assert_called_once_with()
+
+    def test_stale_background_refresh(self):
+        """ Verify stale values are returned right away, and refreshed in a background thread, if requested. """
+        self.cache_stale_value('stale')
+        fetch = mock.Mock(return_value='fetched')
+
+        with mock.patch('ecommerce.core.cache_utils.threading.Thread') as mock_thread:
+            self.assertEqual(cache_utils.get_or_fetch(self.key, fetch, 10, background_refresh=True), 'stale')
+            fetch.assert_not_called()
+
+            __, kwargs = mock_thread.call_args
+            with mock.patch('ecommerce.core.cache_utils.connection') as mock_connection:
+                kwargs['target'](*kwargs['args'])
+                mock_connection.close.assert_called_once_with()
+
+        fetch.assert_called_once_with()
+        self.assertEqual(django_cache.get(self.key), 'fetched')
@@ -0,0 +1,124 @@
+import httpretty
+import requests
+from django.contrib.auth.models import Group
+from django.core.signals import got_request_exception
+from django.db import connection
+from edx_django_utils.cache import TieredCache
+
+from ecommerce.core import cache_utils
+from ecommerce.core.instrumentation import RequestRecorder, get_current_recorder, get_sql_fingerprint
+from ecommerce.tests.testcases import TestCase
+
+
+class GetSqlFingerprintTests(TestCase):
+    def test_literals(self):
+        """ Verify string and number literals are replaced by placeholders. """
+        self.assertEqual(
+            get_sql_fingerprint("SELECT * FROM  t WHERE id = 12 AND name = 'O''Brien' AND price > 1.5"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND price > ?'
+        )
+
+    def test_value_lists(self):
+        """ Verify lists of values share a fingerprint, whatever their length. """
+        self.assertEqual(
+            get_sql_fingerprint('SELECT * FROM t WHERE id IN (1, 2, 3)'),
+            get_sql_fingerprint('SELECT * FROM t WHERE id IN (4)')
+        )
+
+    def test_parameters(self):
+        """ Verify query parameters are replaced by placeholders, and lists of parameters share a fingerprint. """
+        self.assertEqual(
+            get_sql_fingerprint('SELECT * FROM t WHERE id IN (%s, %s) AND name = %s'),
+            'SELECT * FROM t WHERE id IN (...) AND name = ?'
+        )
+
+    def test_identifiers(self):
+        """ Verify numbers within identifiers are kept. """
+        self.assertEqual(get_sql_fingerprint('SELECT t1.id FROM t1'), 'SELECT t1.id FROM t1')
+
+
+class RequestRecorderTests(TestCase):
+    def test_queries(self):
+        """ Verify the queries made while the recorder is started are recorded, and repeated queries counted. """
+        Group.objects.count()
+
+        recorder = RequestRecorder().start()
+        for pk in range(3):
+            list(Group.objects.filter(pk=pk))
+        Group.objects.count()
+        recorder.stop()
+        Group.objects.count()
+
+        summary = recorder.get_summary()
+        self.assertEqual(summary['queries'], 4)
+        self.assertEqual(summary['duplicate_queries'], 2)
+        self.assertEqual(summary['most_duplicated_query']['count'], 3)
+        self.assertIn('WHERE "auth_group"."id" = ?', summary['most_duplicated_query']['sql'])
+
+    def test_no_duplicate_queries(self):
+        """ Verify no query is reported as the most duplicated when every query is different. """
+        recorder = RequestRecorder().start()
+        Group.objects.count()
+        recorder.stop()
+
+        summary = recorder.get_summary()
+        self.assertEqual(summary['duplicate_queries'], 0)
+        self.assertIsNone(summary['most_duplicated_query'])
+
+    def test_current_recorder(self):
+        """ Verify the recorder is the current recorder of the thread until it is stopped. """
+        recorder = RequestRecorder().start()
+        self.assertIs(get_current_recorder(), recorder)
+        recorder.stop()
+        self.assertIsNone(get_current_recorder())
+
+    def test_queries_without_debug_cursor(self):
+        """ Verify queries are recorded without forcing the debug cursor, and bulk queries counted once. """
+        recorder = RequestRecorder().start()
+        Group.objects.count()
+        with connection.cursor() as cursor:
+            cursor.executemany('UPDATE auth_group SET name = %s WHERE id = %s', [('a', 0), ('b', 0)])
+        recorder.stop()
+
+        self.assertFalse(connection.force_debug_cursor)
+        self.assertEqual(recorder.get_summary()['queries'], 2)
+
+    def test_stopped_on_request_exception(self):
+        """ Verify the recorder is stopped when a request raises an exception. """
+        recorder = RequestRecorder().start()
+        Group.objects.count()
+        got_request_exception.send(sender=None, request=None)
+        Group.objects.count()
+
+        self.assertIsNone(get_current_recorder())
+
+        # Stopping the recorder again, e.g. when the error response is processed, has no effect.
+        recorder.stop()
+        self.assertEqual(recorder.get_summary()['queries'], 1)
+
+    @httpretty.activate
+    def test_http_calls(self):
+        """ Verify the HTTP calls made with requests are counted. """
+        httpretty.register_uri(httpretty.GET, 'http://example.com/', body='{}')
+
+        recorder = RequestRecorder().start()
+        requests.get('http://example.com/')
+        requests.Session().get('http://example.com/')
+        recorder.stop()
+        requests.get('http://example.com/')
+
+        self.assertEqual(recorder.get_summary()['http_calls'], 2)
+
+    def test_cache_lookups(self):
+        """ Verify the TieredCache lookups, and those of cache_utils, are counted. """
+        TieredCache.set_all_tiers('hit', 1, 60)
+
+        recorder = RequestRecorder().start()
+        TieredCache.get_cached_response('hit')
+        TieredCache.get_cached_response('miss')
+        cache_utils.get_many(['hit', 'miss', 'other'])
+        recorder.stop()
+
+        summary = recorder.get_summary()
+        self.assertEqual(summary['cache_hits'], 2)
+        self.assertEqual(summary['cache_misses'], 3)
@@ -0,0 +1,61 @@
+import mock
+from django.contrib.auth.models import Group
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from ecommerce.core.exceptions import RequestBudgetExceeded
+from ecommerce.core.middleware import RequestInstrumentationMiddleware
+from ecommerce.tests.testcases import TestCase
+
+BUDGETS = {'test:view': {'queries': 2, 'duplicate_queries': 0, 'http_calls': 0}}
+
+
+class RequestInstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        super(RequestInstrumentationMiddlewareTests, self).setUp()
+        self.middleware = RequestInstrumentationMiddleware()
+
+    def process(self, query_count):
+        """ Runs a request making query_count identical queries through the middleware. """
+        request = RequestFactory().get('/')
+        request.resolver_match = mock.Mock(view_name='test:view')
+        self.middleware.process_request(request)
+        for __ in range(query_count):
+            Group.objects.filter(name='test').exists()
+        return self.middleware.process_response(request, HttpResponse())
+
+    @mock.patch('ecommerce.core.middleware.monitoring_utils')
+    def test_metrics(self, mock_monitoring_utils):
+        """ Verify the summary of the request is set on the response, and reported in custom metrics. """
+        response = self.process(2)
+
+        self.assertEqual(response.instrumentation['url_name'], 'test:view')
+        self.assertEqual(response.instrumentation['queries'], 2)
+        self.assertEqual(response.instrumentation['duplicate_queries'], 1)
+        mock_monitoring_utils.set_custom_metric.assert_any_call('request_query_count', 2)
+        mock_monitoring_utils.set_custom_metric.assert_any_call('request_duplicate_query_count', 1)
+        mock_monitoring_utils.set_custom_metric.assert_any_call('request_http_call_count', 0)
+        mock_monitoring_utils.set_custom_metric.assert_any_call(
+            'request_most_duplicated_query', mock.ANY
+        )
+
+    @override_settings(REQUEST_INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        """ Verify nothing is recorded when instrumentation is disabled. """
+        self.assertFalse(hasattr(self.process(1), 'instrumentation'))
+
+    @override_settings(REQUEST_BUDGETS=BUDGETS, REQUEST_BUDGETS_ENFORCED=True)
+    def test_budget_enforced(self):
+        """ Verify requests exceeding their budget fail when budgets are enforced. """
+        self.process(1)
+        with self.assertRaisesRegexp(RequestBudgetExceeded, 'duplicate_queries'):
+            self.process(2)
+
+    @override_settings(REQUEST_BUDGETS=BUDGETS, REQUEST_BUDGETS_ENFORCED=False)
+    def test_budget_logged(self):
+        """ Verify requests exceeding their budget are logged when budgets are not enforced. """
+        with mock.patch('ecommerce.core.middleware.logger') as mock_logger:
+            response = self.process(3)
+            self.assertEqual(response.instrumentation['queries'], 3)
+            mock_logger.warning.assert_called_once_with(mock.ANY)
+            self.assertIn('test:view', mock_logger.warning.call_args[0][0])
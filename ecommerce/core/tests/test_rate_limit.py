@@ -0,0 +1,67 @@
+import mock
+
+from ecommerce.core.rate_limit import RateLimiter, get_retry_after, get_retry_delay
+from ecommerce.tests.testcases import TestCase
+
+
+class RateLimitTests(TestCase):
+    def test_get_retry_after(self):
+        """ Verify the Retry-After of a response is only used when it is a number of seconds. """
+        self.assertEqual(get_retry_after(mock.Mock(headers={'Retry-After': '30'})), 30)
+        self.assertIsNone(get_retry_after(mock.Mock(headers={'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'})))
+        self.assertIsNone(get_retry_after(mock.Mock(headers={})))
+        self.assertIsNone(get_retry_after(None))
+
+    def test_get_retry_delay(self):
+        """ Verify the retry delay doubles with each attempt, unless the response gives a Retry-After. """
+        self.assertEqual([get_retry_delay(attempt, 3) for attempt in range(3)], [3, 6, 12])
+        self.assertEqual(get_retry_delay(2, 3, mock.Mock(headers={'Retry-After': '5'})), 5)
+
+
+class RateLimiterTests(TestCase):
+    def test_wait(self):
+        """ Verify calls are spaced out according to the rate. """
+        rate_limiter = RateLimiter(2)
+        with mock.patch('ecommerce.core.rate_limit.time') as mock_time:
+            mock_time.time.return_value = 100
+            rate_limiter.wait()
+            self.assertFalse(mock_time.sleep.called)
+            rate_limiter.wait()
+            rate_limiter.wait()
+
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(0.5), mock.call(1.0)])
+
+    def test_no_rate(self):
+        """ Verify calls are not limited without a rate. """
+        rate_limiter = RateLimiter(None)
+        with mock.patch('ecommerce.core.rate_limit.time') as mock_time:
+            mock_time.time.return_value = 100
+            rate_limiter.wait()
+            rate_limiter.wait()
+        self.assertFalse(mock_time.sleep.called)
+
+    def test_throttled(self):
+        """ Verify the delay between calls grows when they are throttled, and shrinks as calls succeed. """
+        rate_limiter = RateLimiter(backoff=5, max_backoff=12)
+        self.assertEqual(rate_limiter.throttled(), 5)
+        self.assertEqual(rate_limiter.throttled(), 10)
+        self.assertEqual(rate_limiter.throttled(), 12)
+        self.assertEqual(rate_limiter.throttled(retry_after=30), 30)
+
+        rate_limiter.delay = 2
+        rate_limiter.succeeded()
+        self.assertEqual(rate_limiter.delay, 1)
+        rate_limiter.succeeded()
+        rate_limiter.succeeded()
+        self.assertEqual(rate_limiter.delay, 0)
+
+    def test_wait_throttled(self):
+        """ Verify the next call waits for the delay after a throttled call, and calls are spaced out by it. """
+        rate_limiter = RateLimiter(10, backoff=5, max_backoff=60)
+        with mock.patch('ecommerce.core.rate_limit.time') as mock_time:
+            mock_time.time.return_value = 100
+            rate_limiter.throttled()
+            rate_limiter.wait()
+            rate_limiter.wait()
+
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(5), mock.call(10)])
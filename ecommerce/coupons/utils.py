@@ -7,6 +7,7 @@ from edx_django_utils.cache import TieredCache
 from oscar.core.loading import get_model
 from slumber.exceptions import HttpNotFoundError
 
+from ecommerce.core import cache_utils
 from ecommerce.core.utils import get_cache_key
 
 Product = get_model('catalogue', 'Product')
@@ -66,21 +67,17 @@ def get_catalog_course_runs(site, query, limit=None, offset=None):
     )
     cache_key = hashlib.md5(cache_key).hexdigest()
 
-    cached_response = TieredCache.get_cached_response(cache_key)
-    if cached_response.is_found:
-        return cached_response.value
-
-    api = site.siteconfiguration.discovery_api_client
-    endpoint = getattr(api, api_resource_name)
-
-    response = endpoint().get(
-        partner=partner_code,
-        q=query,
-        limit=limit,
-        offset=offset
-    )
-    TieredCache.set_all_tiers(cache_key, response, settings.COURSES_API_CACHE_TIMEOUT)
-    return response
+    def fetch():
+        api = site.siteconfiguration.discovery_api_client
+        endpoint = getattr(api, api_resource_name)
+        return endpoint().get(
+            partner=partner_code,
+            q=query,
+            limit=limit,
+            offset=offset
+        )
+
+    return cache_utils.get_or_fetch(cache_key, fetch, settings.COURSES_API_CACHE_TIMEOUT)
 
 
 def prepare_course_seat_types(course_seat_types):
@@ -0,0 +1,84 @@
+""" This command publishes many courses to LMS concurrently, and can be resumed if interrupted."""
+from __future__ import unicode_literals
+
+import logging
+import os
+
+from django.core.management import BaseCommand, CommandError
+
+from ecommerce.courses.publishers import BulkLMSPublisher
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Publish many courses to LMS concurrently."""
+
+    help = 'Publish the courses to LMS concurrently, skipping courses unchanged since their last publication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course_ids_file',
+                            action='store',
+                            dest='course_ids_file',
+                            default=None,
+                            help='Path to file to read courses from.')
+        parser.add_argument('--workers',
+                            action='store',
+                            dest='workers',
+                            default=4,
+                            type=int,
+                            help='Number of courses published at the same time.')
+        parser.add_argument('--max_retries',
+                            action='store',
+                            dest='max_retries',
+                            default=3,
+                            type=int,
+                            help='Number of times a publication rate limited, or failed by a server error, is retried.')
+        parser.add_argument('--retry_backoff',
+                            action='store',
+                            dest='retry_backoff',
+                            default=1,
+                            type=int,
+                            help='Seconds to wait before the first retry. The wait doubles with each retry.')
+        parser.add_argument('--checkpoint_file',
+                            action='store',
+                            dest='checkpoint_file',
+                            default=None,
+                            help='Path to file recording the completed courses, to resume an interrupted run.')
+        parser.add_argument('--force',
+                            action='store_true',
+                            dest='force',
+                            default=False,
+                            help='Publish the courses even if they have not changed since their last publication.')
+
+    def handle(self, *args, **options):
+        course_ids_file = options['course_ids_file']
+        if not course_ids_file or not os.path.exists(course_ids_file):
+            raise CommandError("Pass the correct absolute path to course ids file as --course_ids_file argument.")
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        with open(course_ids_file, 'r') as file_handler:
+            course_ids = [course_id.strip() for course_id in file_handler if course_id.strip()]
+
+        publisher = BulkLMSPublisher(
+            workers=options['workers'],
+            max_retries=options['max_retries'],
+            retry_backoff=options['retry_backoff'],
+            checkpoint_file=options['checkpoint_file'],
+            force=options['force'],
+        )
+        results = publisher.publish(course_ids)
+
+        counts = {status: 0 for status in (publisher.PUBLISHED, publisher.SKIPPED, publisher.FAILED)}
+        for course_id, (status, error) in results.items():
+            counts[status] += 1
+            if status == publisher.FAILED:
+                logger.error('Failed to publish %s: %s', course_id, error)
+
+        logger.info(
+            'Completed publishing courses. %d published, %d skipped, %d failed.',
+            counts[publisher.PUBLISHED], counts[publisher.SKIPPED], counts[publisher.FAILED]
+        )
+        if counts[publisher.FAILED]:
+            raise CommandError('{} of {} courses failed to publish.'.format(counts[publisher.FAILED], len(results)))
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 09:17
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_migrate_partner_data_to_courses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoursePublication',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='publication', serialize=False, to='courses.Course')),
+                ('payload_hash', models.CharField(max_length=64)),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
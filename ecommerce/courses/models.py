@@ -159,29 +159,20 @@ class Course(models.Model):
         course_id = unicode(self.id)
 
         if certificate_type == self.certificate_type_for_mode('audit'):
-            # Yields a match if attribute names do not include 'certificate_type'.
-            certificate_type_query = ~Q(attributes__name='certificate_type')
+            # Yields a match if the seat has no 'certificate_type' attribute.
+            certificate_type_query = Q(attribute_index__certificate_type__isnull=True)
         else:
-            # Yields a match if attribute with name 'certificate_type' matches provided value.
-            certificate_type_query = Q(
-                attributes__name='certificate_type',
-                attribute_values__value_text=certificate_type
-            )
+            # Yields a match if the 'certificate_type' attribute matches provided value.
+            certificate_type_query = Q(attribute_index__certificate_type=certificate_type)
 
-        id_verification_required_query = Q(
-            attributes__name='id_verification_required',
-            attribute_values__value_boolean=id_verification_required
-        )
+        id_verification_required_query = Q(attribute_index__id_verification_required=id_verification_required)
 
         if credit_provider is None:
-            # Yields a match if attribute names do not include 'credit_provider'.
-            credit_provider_query = ~Q(attributes__name='credit_provider')
+            # Yields a match if the seat has no 'credit_provider' attribute.
+            credit_provider_query = Q(attribute_index__credit_provider__isnull=True)
         else:
-            # Yields a match if attribute with name 'credit_provider' matches provided value.
-            credit_provider_query = Q(
-                attributes__name='credit_provider',
-                attribute_values__value_text=credit_provider
-            )
+            # Yields a match if the 'credit_provider' attribute matches provided value.
+            credit_provider_query = Q(attribute_index__credit_provider=credit_provider)
 
         seats = self.seat_products.filter(certificate_type_query)
         try:
@@ -254,8 +245,7 @@ class Course(models.Model):
 
         if remove_stale_modes and self.certificate_type_for_mode(certificate_type) == 'professional':
             id_verification_required_query = Q(
-                attributes__name='id_verification_required',
-                attribute_values__value_boolean=not id_verification_required
+                attribute_index__id_verification_required=not id_verification_required
             )
 
             # Delete seats with a different verification requirement, assuming the seats
@@ -341,11 +331,19 @@ class Course(models.Model):
         enrollment_code = self.get_enrollment_code()
         if enrollment_code:
             if is_active:
-                seat = self.seat_products.get(
-                    attributes__name='certificate_type',
-                    attribute_values__value_text=enrollment_code.attr.seat_type
-                )
+                seat = self.seat_products.get(attribute_index__certificate_type=enrollment_code.attr.seat_type)
                 enrollment_code.expires = seat.expires if seat.expires else now() + timedelta(days=365)
             else:
                 enrollment_code.expires = now() - timedelta(days=365)
             enrollment_code.save()
+
+
+class CoursePublication(models.Model):
+    """
+    Hash of the commerce data of a course last published to LMS.
+
+    Used by BulkLMSPublisher to skip the courses whose data has not changed since their last publication.
+    """
+    course = models.OneToOneField(Course, primary_key=True, related_name='publication', on_delete=models.CASCADE)
+    payload_hash = models.CharField(max_length=64)
+    modified = models.DateTimeField(auto_now=True)
@@ -1,13 +1,21 @@
 from __future__ import unicode_literals
 
+import hashlib
 import json
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
+from django.db import connections
 from django.utils.translation import ugettext_lazy as _
 from edx_rest_api_client.exceptions import SlumberHttpBaseException
 from oscar.core.loading import get_model
 
 from ecommerce.core.constants import ENROLLMENT_CODE_SEAT_TYPES
+from ecommerce.core.rate_limit import get_retry_delay
 from ecommerce.courses.utils import mode_for_product
 
 logger = logging.getLogger(__name__)
@@ -16,6 +24,16 @@ StockRecord = get_model('partner', 'StockRecord')
 
 
 class LMSPublisher(object):
+    def __init__(self, max_retries=0, retry_backoff=1):
+        """
+        Arguments:
+            max_retries (int): Number of times a publication rate limited, or failed by a server error, is retried.
+            retry_backoff (int): Seconds to wait before the first retry. The wait doubles with each retry,
+                unless the LMS specifies it with the Retry-After header.
+        """
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
     def get_seat_expiration(self, seat):
         if not seat.expires or 'professional' in getattr(seat.attr, 'certificate_type', ''):
             return None
@@ -44,14 +62,53 @@ class LMSPublisher(object):
             'expires': self.get_seat_expiration(seat),
         }
 
-    def publish(self, course):
+    def serialize_course(self, course):
+        """ Serializes a course and its seats to the dict published to the Commerce API. """
+        return {
+            'id': course.id,
+            'name': course.name,
+            'verification_deadline': self.get_course_verification_deadline(course),
+            'modes': [self.serialize_seat_for_commerce_api(seat) for seat in course.seat_products],
+        }
+
+    @staticmethod
+    def get_payload_hash(data):
+        """ Returns a hash of the data published for a course, to detect changes between publications. """
+        return hashlib.sha256(json.dumps(data, sort_keys=True)).hexdigest()
+
+    def _is_retryable(self, exception):
+        return exception.response is not None and (
+            exception.response.status_code == 429 or exception.response.status_code >= 500
+        )
+
+    def _put(self, resource, data):
+        """ PUTs data to an API resource, retrying rate limited and server errors up to max_retries times. """
+        attempt = 0
+        while True:
+            try:
+                return resource.put(data=data)
+            except SlumberHttpBaseException as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+
+                delay = get_retry_delay(attempt, self.retry_backoff, e.response)
+                attempt += 1
+                logger.warning(
+                    'Publication to LMS returned status [%d]. Retrying in [%s] seconds, attempt [%d] of [%d].',
+                    e.response.status_code, delay, attempt, self.max_retries
+                )
+                time.sleep(delay)
+
+    def publish(self, course, data=None):
         """ Publish course commerce data to LMS.
 
         Uses the Commerce API to publish course modes, prices, and SKUs to LMS. Uses
         CreditCourse API endpoints to publish CreditCourse data to LMS when necessary.
+        The hash of the published data is recorded, see BulkLMSPublisher.
 
         Arguments:
             course (Course): Course to be published.
+            data (dict): Course data, as serialized by serialize_course. Serialized from the course if not provided.
 
         Returns:
             None, if publish operation succeeded; otherwise, error message.
@@ -60,19 +117,17 @@ class LMSPublisher(object):
         course_id = course.id
         error_message = _('Failed to publish commerce data for {course_id} to LMS.').format(course_id=course_id)
 
-        name = course.name
-        verification_deadline = self.get_course_verification_deadline(course)
-        modes = [self.serialize_seat_for_commerce_api(seat) for seat in course.seat_products]
+        data = data or self.serialize_course(course)
 
-        has_credit = 'credit' in [mode['name'] for mode in modes]
+        has_credit = 'credit' in [mode['name'] for mode in data['modes']]
         if has_credit:
             try:
-                data = {
+                credit_data = {
                     'course_key': course_id,
                     'enabled': True
                 }
                 credit_api_client = site.siteconfiguration.credit_api_client
-                credit_api_client.courses(course_id).put(data)
+                self._put(credit_api_client.courses(course_id), credit_data)
                 logger.info('Successfully published CreditCourse for [%s] to LMS.', course_id)
             except SlumberHttpBaseException as e:
                 # Note that %r is used to log the repr() of the response content, which may sometimes
@@ -90,15 +145,8 @@ class LMSPublisher(object):
                 return error_message
 
         try:
-            data = {
-                'id': course_id,
-                'name': name,
-                'verification_deadline': verification_deadline,
-                'modes': modes,
-            }
-
             commerce_api_client = site.siteconfiguration.commerce_api_client
-            commerce_api_client.courses(course_id).put(data=data)
+            self._put(commerce_api_client.courses(course_id), data)
             logger.info('Successfully published commerce data for [%s].', course_id)
         except SlumberHttpBaseException as e:  # pylint: disable=bare-except
             logger.exception(
@@ -112,6 +160,11 @@ class LMSPublisher(object):
             logger.exception('Failed to publish commerce data for [%s] to LMS.', course_id)
             return error_message
 
+        CoursePublication = get_model('courses', 'CoursePublication')
+        CoursePublication.objects.update_or_create(
+            course_id=course_id, defaults={'payload_hash': self.get_payload_hash(data)}
+        )
+
     def _parse_error(self, response, default_error_message):
         """When validation errors occur during publication, the LMS is expected
          to return an error message.
@@ -142,3 +195,106 @@ class LMSPublisher(object):
             return ' '.join([default_error_message, message])
         else:
             return default_error_message
+
+
+class BulkLMSPublisher(object):
+    """
+    Publishes many courses to LMS concurrently.
+
+    Courses whose commerce data has not changed since it was last published are skipped, unless forced.
+    When a checkpoint file is given, the IDs of the courses published or skipped are written to it as they
+    complete, and the courses it lists are skipped, so that an interrupted run can be resumed.
+    """
+    PUBLISHED, SKIPPED, FAILED = 'published', 'skipped', 'failed'
+
+    def __init__(self, workers=1, max_retries=3, retry_backoff=1, checkpoint_file=None, force=False):
+        self.publisher = LMSPublisher(max_retries=max_retries, retry_backoff=retry_backoff)
+        self.workers = workers
+        self.checkpoint_file = checkpoint_file
+        self.force = force
+        self.completed = set()
+        self._lock = threading.Lock()
+
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            with open(checkpoint_file) as f:
+                self.completed = set(json.load(f))
+
+    def _checkpoint(self, course_id):
+        with self._lock:
+            self.completed.add(course_id)
+            if not self.checkpoint_file:
+                return
+
+            # Replace the checkpoint file at once, so that it is never left incomplete.
+            temp_file = '{}.tmp'.format(self.checkpoint_file)
+            with open(temp_file, 'w') as f:
+                json.dump(sorted(self.completed), f)
+            os.rename(temp_file, self.checkpoint_file)
+
+    def publish_course(self, course_id):
+        """
+        Publishes a course, unless its commerce data has not changed since it was last published.
+
+        Returns:
+            tuple: The status of the publication, and an error message if it failed.
+        """
+        Course = get_model('courses', 'Course')
+        CoursePublication = get_model('courses', 'CoursePublication')
+
+        try:
+            course = Course.objects.get(id=course_id)
+        except Course.DoesNotExist:
+            return self.FAILED, _('Course does not exist.')
+
+        data = self.publisher.serialize_course(course)
+        unchanged = CoursePublication.objects.filter(
+            course_id=course_id, payload_hash=self.publisher.get_payload_hash(data)
+        ).exists()
+        if unchanged and not self.force:
+            status, error = self.SKIPPED, None
+        else:
+            error = self.publisher.publish(course, data)
+            status = self.FAILED if error else self.PUBLISHED
+
+        if status != self.FAILED:
+            self._checkpoint(course_id)
+        return status, error
+
+    def _publish_course_in_thread(self, course_id):
+        try:
+            return self.publish_course(course_id)
+        finally:
+            # Each worker thread has its own database connections.
+            connections.close_all()
+
+    def publish(self, course_ids):
+        """
+        Publishes courses, with up to the configured number of courses published at the same time.
+
+        Arguments:
+            course_ids (list): IDs of the courses to publish.
+
+        Returns:
+            OrderedDict: The status of the publication of each course, and an error message if it failed, by course ID.
+        """
+        results = OrderedDict(
+            (course_id, (self.SKIPPED, None)) for course_id in course_ids if course_id in self.completed
+        )
+        course_ids = [course_id for course_id in OrderedDict.fromkeys(course_ids) if course_id not in self.completed]
+        logger.info(
+            'Publishing [%d] courses to LMS with [%d] workers. [%d] courses were completed by a previous run.',
+            len(course_ids), self.workers, len(results)
+        )
+
+        if self.workers > 1 and len(course_ids) > 1:
+            pool = ThreadPool(min(self.workers, len(course_ids)))
+            try:
+                statuses = pool.map(self._publish_course_in_thread, course_ids)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            statuses = [self.publish_course(course_id) for course_id in course_ids]
+
+        results.update(zip(course_ids, statuses))
+        return results
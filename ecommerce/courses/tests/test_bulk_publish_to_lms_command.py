@@ -0,0 +1,53 @@
+"""Contains the tests for the bulk publish to LMS command."""
+from __future__ import unicode_literals
+
+import os
+import tempfile
+
+import mock
+from django.core.management import CommandError, call_command
+
+from ecommerce.courses.publishers import BulkLMSPublisher
+from ecommerce.tests.testcases import TestCase
+
+
+class BulkPublishCoursesToLMSTests(TestCase):
+    """Tests the bulk course publish command."""
+
+    def setUp(self):
+        super(BulkPublishCoursesToLMSTests, self).setUp()
+        handle, self.course_ids_file = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, self.course_ids_file)
+        with open(self.course_ids_file, 'w') as f:
+            f.write('course-v1:a+b+c\n\ncourse-v1:d+e+f\n')
+
+    def test_invalid_file_path(self):
+        """ Verify command raises the CommandError for invalid file path. """
+        with self.assertRaises(CommandError):
+            call_command('bulk_publish_to_lms', course_ids_file='fake/path')
+
+    @mock.patch.object(BulkLMSPublisher, 'publish')
+    def test_publish(self, mock_publish):
+        """ Verify the courses of the file are published with the given options. """
+        mock_publish.return_value = {
+            'course-v1:a+b+c': (BulkLMSPublisher.PUBLISHED, None),
+            'course-v1:d+e+f': (BulkLMSPublisher.SKIPPED, None),
+        }
+        with mock.patch.object(BulkLMSPublisher, '__init__', return_value=None) as mock_init:
+            call_command('bulk_publish_to_lms', course_ids_file=self.course_ids_file, workers=2, force=True)
+
+        mock_init.assert_called_once_with(
+            workers=2, max_retries=3, retry_backoff=1, checkpoint_file=None, force=True
+        )
+        mock_publish.assert_called_once_with(['course-v1:a+b+c', 'course-v1:d+e+f'])
+
+    @mock.patch.object(BulkLMSPublisher, 'publish')
+    def test_publish_failed(self, mock_publish):
+        """ Verify the command fails if any course failed to publish. """
+        mock_publish.return_value = {
+            'course-v1:a+b+c': (BulkLMSPublisher.FAILED, 'Failed.'),
+            'course-v1:d+e+f': (BulkLMSPublisher.PUBLISHED, None),
+        }
+        with self.assertRaisesRegexp(CommandError, '1 of 2 courses failed to publish.'):
+            call_command('bulk_publish_to_lms', course_ids_file=self.course_ids_file)
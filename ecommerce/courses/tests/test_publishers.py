@@ -2,6 +2,8 @@ from __future__ import unicode_literals
 
 import datetime
 import json
+import os
+import tempfile
 
 import ddt
 import httpretty
@@ -13,7 +15,8 @@ from testfixtures import LogCapture
 
 from ecommerce.core.constants import ENROLLMENT_CODE_PRODUCT_CLASS_NAME
 from ecommerce.core.url_utils import get_lms_url
-from ecommerce.courses.publishers import LMSPublisher
+from ecommerce.courses.models import CoursePublication
+from ecommerce.courses.publishers import BulkLMSPublisher, LMSPublisher
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
 from ecommerce.tests.testcases import TestCase
@@ -120,6 +123,41 @@ class LMSPublisherTests(DiscoveryTestMixin, TestCase):
         }
         self.assertDictEqual(actual, expected)
 
+    def test_api_success_records_publication(self):
+        """ Verify the hash of the published data is recorded. """
+        self._mock_commerce_api()
+        self.assertIsNone(self.publisher.publish(self.course))
+
+        expected = self.publisher.get_payload_hash(self.publisher.serialize_course(self.course))
+        self.assertEqual(CoursePublication.objects.get(course=self.course).payload_hash, expected)
+
+    @ddt.data(429, 503)
+    @mock.patch('ecommerce.courses.publishers.time.sleep')
+    def test_api_retry(self, status, mock_sleep):
+        """ Verify rate limited and server errors are retried, with an exponential backoff. """
+        url = self.site_configuration.build_lms_url('/api/commerce/v1/courses/{}/'.format(self.course.id))
+        httpretty.register_uri(httpretty.PUT, url, responses=[
+            httpretty.Response(body='{}', status=status, content_type=JSON),
+            httpretty.Response(body='{}', status=status, content_type=JSON),
+            httpretty.Response(body='{}', status=200, content_type=JSON),
+        ])
+
+        self.assertIsNone(LMSPublisher(max_retries=2, retry_backoff=3).publish(self.course))
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(3), mock.call(6)])
+
+    @mock.patch('ecommerce.courses.publishers.time.sleep')
+    def test_api_retries_exhausted(self, mock_sleep):
+        """ Verify the publication fails once the retries are exhausted, and client errors are not retried. """
+        self._mock_commerce_api(503)
+        self.assertEqual(LMSPublisher(max_retries=1).publish(self.course), self.error_message)
+        self.assertEqual(mock_sleep.call_count, 1)
+
+        mock_sleep.reset_mock()
+        self._mock_commerce_api(400)
+        self.assertEqual(LMSPublisher(max_retries=1).publish(self.course), self.error_message)
+        mock_sleep.assert_not_called()
+        self.assertFalse(CoursePublication.objects.exists())
+
     def test_serialize_seat_for_commerce_api(self):
         """ The method should convert a seat to a JSON-serializable dict consumable by the Commerce API. """
         # Grab the verified seat
@@ -233,3 +271,78 @@ class LMSPublisherTests(DiscoveryTestMixin, TestCase):
         actual = self.attempt_credit_publication(500)
         expected = 'Failed to publish commerce data for {} to LMS.'.format(self.course.id)
         self.assertEqual(actual, expected)
+
+
+class BulkLMSPublisherTests(DiscoveryTestMixin, TestCase):
+    def setUp(self):
+        super(BulkLMSPublisherTests, self).setUp()
+        self.course = CourseFactory(partner=self.partner)
+        self.course.create_or_update_seat('verified', True, 50)
+        self.other_course = CourseFactory(partner=self.partner)
+        self.course_ids = [self.course.id, self.other_course.id]
+
+        self.checkpoint_file = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+        self.addCleanup(lambda: os.path.exists(self.checkpoint_file) and os.remove(self.checkpoint_file))
+
+    def publish(self, course_ids=None, error=None, **kwargs):
+        """ Publishes the courses with a mocked LMSPublisher.publish, which records the publication. """
+        def publish(course, data):
+            if not error:
+                CoursePublication.objects.update_or_create(
+                    course=course, defaults={'payload_hash': LMSPublisher.get_payload_hash(data)}
+                )
+            return error
+
+        with mock.patch.object(LMSPublisher, 'publish', side_effect=publish) as mock_publish:
+            results = BulkLMSPublisher(**kwargs).publish(course_ids or self.course_ids)
+        return results, [call[0][0].id for call in mock_publish.call_args_list]
+
+    def test_publish(self):
+        """ Verify courses are published, and skipped once published unless their data changes or they are forced. """
+        results, published = self.publish()
+        self.assertEqual(published, self.course_ids)
+        self.assertEqual(list(results.items()), [
+            (self.course.id, (BulkLMSPublisher.PUBLISHED, None)),
+            (self.other_course.id, (BulkLMSPublisher.PUBLISHED, None)),
+        ])
+
+        self.course.name = 'New name'
+        self.course.save()
+        results, published = self.publish()
+        self.assertEqual(published, [self.course.id])
+        self.assertEqual(results[self.other_course.id], (BulkLMSPublisher.SKIPPED, None))
+
+        __, published = self.publish(force=True)
+        self.assertEqual(published, self.course_ids)
+
+    def test_publish_failure(self):
+        """ Verify failed and missing courses are reported, and are not recorded as published. """
+        results, __ = self.publish(course_ids=[self.course.id, 'missing'], error='Failed.')
+        self.assertEqual(results[self.course.id], (BulkLMSPublisher.FAILED, 'Failed.'))
+        self.assertEqual(results['missing'], (BulkLMSPublisher.FAILED, 'Course does not exist.'))
+        self.assertFalse(CoursePublication.objects.exists())
+
+    def test_checkpoint(self):
+        """ Verify the completed courses are checkpointed, and skipped when the run is resumed. """
+        results, __ = self.publish(course_ids=[self.course.id], checkpoint_file=self.checkpoint_file)
+        with open(self.checkpoint_file) as f:
+            self.assertEqual(json.load(f), [self.course.id])
+
+        results, published = self.publish(checkpoint_file=self.checkpoint_file, force=True)
+        self.assertEqual(published, [self.other_course.id])
+        self.assertEqual(results[self.course.id], (BulkLMSPublisher.SKIPPED, None))
+        with open(self.checkpoint_file) as f:
+            self.assertEqual(json.load(f), sorted(self.course_ids))
+
+    @mock.patch('ecommerce.courses.publishers.ThreadPool')
+    def test_workers(self, mock_thread_pool):
+        """ Verify courses are published by a pool of worker threads. """
+        mock_thread_pool.return_value.map.side_effect = map
+
+        with mock.patch('ecommerce.courses.publishers.connections') as mock_connections:
+            results, published = self.publish(workers=4)
+
+        mock_thread_pool.assert_called_once_with(2)
+        self.assertEqual(mock_connections.close_all.call_count, 2)
+        self.assertEqual(published, self.course_ids)
+        self.assertEqual(list(results.keys()), self.course_ids)
@@ -2,7 +2,9 @@ import hashlib
 
 import ddt
 import httpretty
-from edx_django_utils.cache import TieredCache
+from django.core.cache import cache as django_cache
+from django.test import override_settings
+from edx_django_utils.cache import RequestCache, TieredCache
 from mock import patch
 from opaque_keys.edx.keys import CourseKey
 from requests.exceptions import ConnectionError
@@ -10,6 +12,7 @@ from requests.exceptions import ConnectionError
 from ecommerce.coupons.tests.mixins import DiscoveryMockMixin
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.courses.utils import (
+    cache_course_info_from_catalog,
     get_certificate_type_display_value,
     get_course_catalogs,
     get_course_info_from_catalog,
@@ -100,6 +103,64 @@ class UtilsTests(DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
             _ = get_course_info_from_catalog(self.request.site, product)
             self.assertEqual(mocked_set_all_tiers.call_count, 2)
 
+    def test_cache_course_info_from_catalog(self):
+        """
+        Verify that cache_course_info_from_catalog loads the cached course information of several
+        products with a single Django cache call.
+        """
+        self.mock_access_token_response()
+        products = []
+        for course_id in ('edX/DemoX/Demo_Course', 'edX/OtherX/Other_Course'):
+            course = CourseFactory(id=course_id, partner=self.partner)
+            products.append(course.create_or_update_seat('verified', True, 10))
+            self.mock_course_run_detail_endpoint(course, discovery_api_url=self.site_configuration.discovery_api_url)
+            get_course_info_from_catalog(self.request.site, products[-1])
+        RequestCache.clear_all_namespaces()
+
+        with patch.object(django_cache, 'get_many', wraps=django_cache.get_many) as mocked_get_many:
+            cache_course_info_from_catalog(self.request.site, products)
+            self.assertEqual(mocked_get_many.call_count, 1)
+
+        with patch.object(django_cache, 'get') as mocked_get:
+            for product in products:
+                self.assertEqual(get_course_info_from_catalog(self.request.site, product)['key'], product.course_id)
+            mocked_get.assert_not_called()
+
+    @override_settings(COURSES_API_MAX_WORKERS=2)
+    @patch('ecommerce.courses.utils.connection')
+    def test_cache_course_info_from_catalog_fetches_missing(self, mock_connection):
+        """
+        Verify that cache_course_info_from_catalog fetches the course information missing from the cache
+        concurrently, and adds it to the request cache.
+        """
+        self.mock_access_token_response()
+        products = []
+        for course_id in ('edX/DemoX/Demo_Course', 'edX/OtherX/Other_Course'):
+            course = CourseFactory(id=course_id, partner=self.partner)
+            products.append(course.create_or_update_seat('verified', True, 10))
+            self.mock_course_run_detail_endpoint(course, discovery_api_url=self.site_configuration.discovery_api_url)
+
+        cache_course_info_from_catalog(self.request.site, products)
+        self.assertEqual(mock_connection.close.call_count, 2)
+
+        httpretty.disable()
+        with patch.object(django_cache, 'get') as mocked_get:
+            for product in products:
+                self.assertEqual(get_course_info_from_catalog(self.request.site, product)['key'], product.course_id)
+            mocked_get.assert_not_called()
+
+    def test_cache_course_info_from_catalog_failure(self):
+        """
+        Verify that cache_course_info_from_catalog leaves errors for get_course_info_from_catalog to raise.
+        """
+        self.mock_access_token_response()
+        product = CourseFactory(partner=self.partner).create_or_update_seat('verified', True, 10)
+
+        with patch('ecommerce.courses.utils.cache_utils.get_or_fetch', side_effect=ConnectionError):
+            cache_course_info_from_catalog(self.request.site, [product])
+            with self.assertRaises(ConnectionError):
+                get_course_info_from_catalog(self.request.site, product)
+
     @ddt.data(
         ('honor', 'Honor'),
         ('verified', 'Verified'),
@@ -1,12 +1,19 @@
 import hashlib
+import logging
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
+from django.db import connection
 from django.utils.translation import ugettext_lazy as _
-from edx_django_utils.cache import TieredCache
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
 from opaque_keys.edx.keys import CourseKey
 
+from ecommerce.core import cache_utils
 from ecommerce.core.utils import deprecated_traverse_pagination
 
+logger = logging.getLogger(__name__)
+
 
 def mode_for_product(product):
     """
@@ -23,29 +30,92 @@ def mode_for_product(product):
     return mode
 
 
-def get_course_info_from_catalog(site, product):
-    """ Get course or course_run information from Discovery Service and cache """
+def _get_course_info_key(product):
     if product.is_course_entitlement_product:
-        key = product.attr.UUID
-    else:
-        key = CourseKey.from_string(product.attr.course_key)
+        return product.attr.UUID
+    return CourseKey.from_string(product.attr.course_key)
 
-    api = site.siteconfiguration.discovery_api_client
-    partner_short_code = site.siteconfiguration.partner.short_code
 
+def _get_course_info_cache_key(key, partner_short_code):
     cache_key = 'courses_api_detail_{}{}'.format(key, partner_short_code)
-    cache_key = hashlib.md5(cache_key).hexdigest()
-    course_cached_response = TieredCache.get_cached_response(cache_key)
-    if course_cached_response.is_found:
-        return course_cached_response.value
+    return hashlib.md5(cache_key).hexdigest()
 
-    if product.is_course_entitlement_product:
-        course = api.courses(key).get()
+
+def cache_course_info_from_catalog(site, products):
+    """
+    Loads the course or course_run information of several products into the request cache.
+
+    The cached information is read with a single cache call, so that get_course_info_from_catalog does
+    not have to go to the Django cache separately for each of the products. The information that is
+    not cached yet is retrieved from the Discovery Service concurrently, by up to
+    COURSES_API_MAX_WORKERS threads. Errors are left for get_course_info_from_catalog to raise when
+    it is called for the product.
+    """
+    partner_short_code = site.siteconfiguration.partner.short_code
+    keys = OrderedDict()
+    for product in products:
+        key = _get_course_info_key(product)
+        keys[_get_course_info_cache_key(key, partner_short_code)] = (key, product.is_course_entitlement_product)
+
+    cached_values = cache_utils.get_many(keys.keys())
+    missing = [(cache_key,) + keys[cache_key] for cache_key in keys if cache_key not in cached_values]
+    if not missing:
+        return
+
+    api = site.siteconfiguration.discovery_api_client
+
+    def fetch(args):
+        cache_key, key, is_course_entitlement_product = args
+        try:
+            return cache_key, _get_course_info(
+                site, partner_short_code, cache_key, key, is_course_entitlement_product, api=api
+            )
+        except Exception:  # pylint: disable=broad-except
+            logger.info('Failed to prefetch course information for [%s].', key)
+            return cache_key, None
+
+    def fetch_in_thread(args):
+        try:
+            return fetch(args)
+        finally:
+            # Worker threads open their own database connection.
+            connection.close()
+
+    max_workers = settings.COURSES_API_MAX_WORKERS
+    if max_workers <= 1 or len(missing) <= 1:
+        results = [fetch(args) for args in missing]
     else:
-        course = api.course_runs(key).get(partner=partner_short_code)
+        pool = ThreadPool(min(max_workers, len(missing)))
+        try:
+            results = pool.map(fetch_in_thread, missing)
+        finally:
+            pool.terminate()
+
+    # The request cache is local to each thread, so the values fetched by the workers are added to it here.
+    for cache_key, value in results:
+        if value is not None:
+            DEFAULT_REQUEST_CACHE.set(cache_key, value)
+
+
+def _get_course_info(site, partner_short_code, cache_key, key, is_course_entitlement_product, api=None):
+    def fetch():
+        # The API client is only needed on cache misses, and getting it reads the site's access token.
+        client = api or site.siteconfiguration.discovery_api_client
+        if is_course_entitlement_product:
+            return client.courses(key).get()
+        return client.course_runs(key).get(partner=partner_short_code)
+
+    return cache_utils.get_or_fetch(cache_key, fetch, settings.COURSES_API_CACHE_TIMEOUT)
+
+
+def get_course_info_from_catalog(site, product):
+    """ Get course or course_run information from Discovery Service and cache """
+    key = _get_course_info_key(product)
+
+    partner_short_code = site.siteconfiguration.partner.short_code
 
-    TieredCache.set_all_tiers(cache_key, course, settings.COURSES_API_CACHE_TIMEOUT)
-    return course
+    cache_key = _get_course_info_cache_key(key, partner_short_code)
+    return _get_course_info(site, partner_short_code, cache_key, key, product.is_course_entitlement_product)
 
 
 def get_course_catalogs(site, resource_id=None):
@@ -9,6 +9,7 @@ from edx_django_utils.cache import TieredCache
 from requests.exceptions import ConnectionError, Timeout
 from slumber.exceptions import SlumberHttpBaseException
 
+from ecommerce.core import cache_utils
 from ecommerce.core.utils import get_cache_key
 
 logger = logging.getLogger(__name__)
@@ -155,17 +156,13 @@ def fetch_enterprise_learner_data(site, user):
         username=user.username
     )
 
-    cached_response = TieredCache.get_cached_response(cache_key)
-    if cached_response.is_found:
-        return cached_response.value
+    def fetch():
+        api = site.siteconfiguration.enterprise_api_client
+        endpoint = getattr(api, api_resource_name)
+        querystring = {'username': user.username}
+        return endpoint().get(**querystring)
 
-    api = site.siteconfiguration.enterprise_api_client
-    endpoint = getattr(api, api_resource_name)
-    querystring = {'username': user.username}
-    response = endpoint().get(**querystring)
-
-    TieredCache.set_all_tiers(cache_key, response, settings.ENTERPRISE_API_CACHE_TIMEOUT)
-    return response
+    return cache_utils.get_or_fetch(cache_key, fetch, settings.ENTERPRISE_API_CACHE_TIMEOUT)
 
 
 def catalog_contains_course_runs(site, course_run_ids, enterprise_customer_uuid, enterprise_customer_catalog_uuid=None):
@@ -0,0 +1,122 @@
+"""
+In-process queue of the analytics events waiting to be sent to Segment.
+
+Building and sending an event happens in a background thread, so that tracking an event does not add
+latency to the request tracking it. The queue is bounded: when it is full, e.g. because Segment is slow
+to accept events, new events are dropped and counted rather than blocking the request.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from six.moves import queue
+
+logger = logging.getLogger(__name__)
+
+
+class EventDispatcher(object):
+    """
+    Sends queued events from a background thread, in batches.
+
+    The thread is started when the first event is queued. It waits for an event, then takes up to
+    batch_size events from the queue, and calls send with the arguments each event was queued with.
+    """
+
+    def __init__(self, send, max_queue_size, batch_size):
+        self.send = send
+        self.batch_size = batch_size
+        self.queue = queue.Queue(max_queue_size)
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is None:
+                    # Send the events still queued when the process exits.
+                    atexit.register(self.flush)
+                self._thread = threading.Thread(target=self._run, name='analytics-event-dispatcher')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def enqueue(self, *args):
+        """
+        Queues an event, to be sent by calling send(*args).
+
+        Returns:
+            bool: False if the queue is full, and the event was dropped.
+        """
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(args)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning('Analytics event queue is full. [%d] events have been dropped.', self.dropped)
+            return False
+
+        self.queued += 1
+        return True
+
+    def _get_batch(self, timeout=None):
+        """
+        Returns up to batch_size queued events, waiting up to timeout seconds for the first one.
+        """
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=timeout) if timeout else self.queue.get_nowait())
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _send_batch(self, batch):
+        for args in batch:
+            try:
+                self.send(*args)
+                self.sent += 1
+            except Exception:  # pylint: disable=broad-except
+                self.failed += 1
+                logger.exception('Failed to send analytics event.')
+            finally:
+                self.queue.task_done()
+
+    def _run(self):
+        while True:
+            # Queue.get without a timeout cannot be interrupted in Python 2, e.g. at interpreter exit.
+            batch = self._get_batch(timeout=60)
+            if batch:
+                self._send_batch(batch)
+
+    def flush(self, timeout=5):
+        """
+        Sends the queued events, waiting up to timeout seconds for the events being sent to complete.
+        """
+        batch = self._get_batch()
+        while batch:
+            self._send_batch(batch)
+            batch = self._get_batch()
+
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+    def get_metrics(self):
+        """
+        Returns the number of events queued, sent, failed and dropped, and the current queue size.
+        """
+        return {
+            'queued': self.queued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'queue_size': self.queue.qsize(),
+        }
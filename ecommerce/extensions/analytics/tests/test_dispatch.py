@@ -0,0 +1,66 @@
+import mock
+from django.test import SimpleTestCase
+
+from ecommerce.extensions.analytics.dispatch import EventDispatcher
+
+
+class EventDispatcherTests(SimpleTestCase):
+    def create_dispatcher(self, send, max_queue_size=10, batch_size=2):
+        dispatcher = EventDispatcher(send, max_queue_size, batch_size)
+        # Events are sent by calling flush, instead of from the background thread.
+        patcher = mock.patch.object(dispatcher, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return dispatcher
+
+    def test_send(self):
+        """ Verify queued events are sent in order, in batches. """
+        send = mock.Mock()
+        dispatcher = self.create_dispatcher(send)
+        for number in range(5):
+            self.assertTrue(dispatcher.enqueue('event', number))
+
+        self.assertFalse(send.called)
+        self.assertEqual(len(dispatcher._get_batch()), 2)  # pylint: disable=protected-access
+        dispatcher.queue.task_done()
+        dispatcher.queue.task_done()
+
+        dispatcher.flush()
+        self.assertEqual(send.call_args_list, [mock.call('event', number) for number in range(2, 5)])
+        self.assertEqual(dispatcher.get_metrics(), {'queued': 5, 'sent': 3, 'failed': 0, 'dropped': 0,
+                                                    'queue_size': 0})
+
+    def test_queue_full(self):
+        """ Verify events are dropped when the queue is full. """
+        send = mock.Mock()
+        dispatcher = self.create_dispatcher(send, max_queue_size=2)
+        results = [dispatcher.enqueue(number) for number in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+        dispatcher.flush()
+        self.assertEqual(send.call_args_list, [mock.call(0), mock.call(1)])
+        self.assertEqual(dispatcher.get_metrics()['dropped'], 1)
+
+    def test_send_failure(self):
+        """ Verify a failure to send an event does not prevent the next events from being sent. """
+        send = mock.Mock(side_effect=[Exception, None])
+        dispatcher = self.create_dispatcher(send)
+        dispatcher.enqueue(0)
+        dispatcher.enqueue(1)
+
+        dispatcher.flush()
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(dispatcher.get_metrics(), {'queued': 2, 'sent': 1, 'failed': 1, 'dropped': 0,
+                                                    'queue_size': 0})
+
+    def test_background_thread(self):
+        """ Verify the background thread sends the queued events. """
+        send = mock.Mock()
+        dispatcher = EventDispatcher(send, 10, 2)
+        with mock.patch('ecommerce.extensions.analytics.dispatch.atexit.register') as mock_register:
+            dispatcher.enqueue(0)
+            dispatcher.enqueue(1)
+        mock_register.assert_called_once_with(dispatcher.flush)
+
+        dispatcher.queue.join()
+        self.assertEqual(send.call_args_list, [mock.call(0), mock.call(1)])
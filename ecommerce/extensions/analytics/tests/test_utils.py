@@ -3,6 +3,7 @@ import json
 import ddt
 import mock
 from django.contrib.auth.models import AnonymousUser
+from django.test import override_settings
 from django.test.client import RequestFactory
 from oscar.test import factories
 
@@ -13,6 +14,7 @@ from ecommerce.extensions.analytics.utils import (
     get_google_analytics_client_id,
     parse_tracking_context,
     prepare_analytics_data,
+    segment_event_dispatcher,
     track_segment_event,
     translate_basket_line_for_segment
 )
@@ -96,6 +98,33 @@ class UtilsTest(DiscoveryTestMixin, BasketMixin, TransactionTestCase):
             track_segment_event(self.site, user, event, properties)
             mock_track.assert_called_once_with(user_tracking_id, event, properties, context=context)
 
+    @override_settings(SEGMENT_EVENTS_ASYNC=True)
+    def test_track_segment_event_async(self):
+        """ The function should queue the event, and parse its tracking context when it is sent. """
+        self.site_configuration.segment_key = 'fake-key'
+        self.site_configuration.save()
+        user, event, properties = self._get_generic_segment_event_parameters()
+        user_tracking_id, __, __ = parse_tracking_context(user)
+
+        with mock.patch.object(segment_event_dispatcher, 'enqueue', return_value=True) as mock_enqueue:
+            self.assertEqual(track_segment_event(self.site, user, event, properties),
+                             (True, 'Event [{}] was queued.'.format(event)))
+            mock_enqueue.assert_called_once_with(self.site, user, event, properties)
+
+            mock_enqueue.return_value = False
+            self.assertEqual(track_segment_event(self.site, user, event, properties),
+                             (False, 'Event [{}] was dropped because the event queue is full.'.format(event)))
+
+        with mock.patch.object(Client, 'track') as mock_track:
+            with mock.patch('ecommerce.extensions.analytics.utils.parse_tracking_context',
+                            wraps=parse_tracking_context) as mock_parse:
+                track_segment_event(self.site, user, event, properties)
+                self.assertFalse(mock_parse.called)
+                segment_event_dispatcher.flush()
+
+            mock_parse.assert_called_once_with(user)
+            self.assertEqual(mock_track.call_args[0], (user_tracking_id, event, properties))
+
     def test_translate_basket_line_for_segment(self):
         """ The method should return a dict formatted for Segment. """
         basket = create_basket(empty=True)
@@ -3,11 +3,16 @@ import logging
 from functools import wraps
 from urlparse import urlunsplit
 
+from django.conf import settings
+from edx_django_utils import monitoring as monitoring_utils
+
 from ecommerce.courses.utils import mode_for_product
+from ecommerce.extensions.analytics.dispatch import EventDispatcher
 
 logger = logging.getLogger(__name__)
 
 ECOM_TRACKING_ID_FMT = 'ecommerce-{}'
+SEGMENT_EVENTS_DROPPED_METRIC = 'segment_events_dropped'
 
 
 def parse_tracking_context(user):
@@ -121,8 +126,8 @@ def prepare_analytics_data(user, segment_key):
     return json.dumps(data)
 
 
-def track_segment_event(site, user, event, properties):
-    """ Fire a tracking event via Segment.
+def send_segment_event(site, user, event, properties):
+    """ Send a tracking event to the Segment client of a site.
 
     Args:
         site (Site): Site whose Segment client should be used.
@@ -131,19 +136,8 @@ def track_segment_event(site, user, event, properties):
         properties (dict): Event properties.
 
     Returns:
-        (success, msg): Tuple indicating the success of enqueuing the event on the message queue.
-            This can be safely ignored unless needed for debugging purposes.
+        (success, msg): Tuple indicating the success of enqueuing the event on the Segment client's queue.
     """
-    if not user:
-        return False, 'Event is not fired for anonymous user.'
-
-    site_configuration = site.siteconfiguration
-    if not site_configuration.segment_key:
-        msg = 'Event [{event}] was NOT fired because no Segment key is set for site configuration [{site_id}]'
-        msg = msg.format(event=event, site_id=site_configuration.pk)
-        logger.debug(msg)
-        return False, msg
-
     user_tracking_id, ga_client_id, lms_ip = parse_tracking_context(user)
     # construct a URL, so that hostname can be sent to GA.
     # For now, send a dummy value for path.  Segment parses the URL and sends
@@ -168,6 +162,47 @@ def track_segment_event(site, user, event, properties):
     return site.siteconfiguration.segment_client.track(user_tracking_id, event, properties, context=context)
 
 
+segment_event_dispatcher = EventDispatcher(
+    send_segment_event, settings.SEGMENT_EVENT_QUEUE_SIZE, settings.SEGMENT_EVENT_BATCH_SIZE
+)
+
+
+def track_segment_event(site, user, event, properties):
+    """ Fire a tracking event via Segment.
+
+    If SEGMENT_EVENTS_ASYNC is enabled, the event is queued, and its tracking context is parsed and the event
+    sent from a background thread. Events are dropped if the queue is full.
+
+    Args:
+        site (Site): Site whose Segment client should be used.
+        user (User): User to which the event should be associated.
+        event (str): Event name.
+        properties (dict): Event properties.
+
+    Returns:
+        (success, msg): Tuple indicating the success of enqueuing the event on the message queue.
+            This can be safely ignored unless needed for debugging purposes.
+    """
+    if not user:
+        return False, 'Event is not fired for anonymous user.'
+
+    site_configuration = site.siteconfiguration
+    if not site_configuration.segment_key:
+        msg = 'Event [{event}] was NOT fired because no Segment key is set for site configuration [{site_id}]'
+        msg = msg.format(event=event, site_id=site_configuration.pk)
+        logger.debug(msg)
+        return False, msg
+
+    if not settings.SEGMENT_EVENTS_ASYNC:
+        return send_segment_event(site, user, event, properties)
+
+    if not segment_event_dispatcher.enqueue(site, user, event, properties):
+        monitoring_utils.accumulate(SEGMENT_EVENTS_DROPPED_METRIC, 1)
+        return False, 'Event [{event}] was dropped because the event queue is full.'.format(event=event)
+
+    return True, 'Event [{event}] was queued.'.format(event=event)
+
+
 def translate_basket_line_for_segment(line):
     """ Translates a BasketLine to Segment's expected format for cart events.
 
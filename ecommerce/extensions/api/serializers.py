@@ -7,8 +7,7 @@ from decimal import Decimal
 import waffle
 from dateutil.parser import parse
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from django.db.models import Q
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from oscar.core.loading import get_class, get_model
@@ -23,8 +22,11 @@ from ecommerce.core.constants import (
 )
 from ecommerce.core.url_utils import get_ecommerce_url
 from ecommerce.courses.models import Course
+from ecommerce.enterprise.constants import ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH
 from ecommerce.entitlements.utils import create_or_update_course_entitlement
 from ecommerce.extensions.offer.constants import OFFER_ASSIGNMENT_REVOKED, OFFER_MAX_USES_DEFAULT
+from ecommerce.extensions.payment.constants import SUCCESSFUL_PAYMENT_DECISIONS
+from ecommerce.extensions.voucher.utils import OFFER_ASSIGNMENT_BATCH_SIZE, get_slots_available_for_assignment
 from ecommerce.invoice.models import Invoice
 
 logger = logging.getLogger(__name__)
@@ -35,6 +37,7 @@ Benefit = get_model('offer', 'Benefit')
 BillingAddress = get_model('order', 'BillingAddress')
 Catalog = get_model('catalogue', 'Catalog')
 Category = get_model('catalogue', 'Category')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
 Line = get_model('order', 'Line')
 OfferAssignment = get_model('offer', 'OfferAssignment')
 Order = get_model('order', 'Order')
@@ -86,16 +89,22 @@ def retrieve_end_date(obj):
 
 def retrieve_offer(obj):
     """Helper method to retrieve the offer from coupon. """
+    if hasattr(obj, 'coupon_best_offer'):
+        return obj.coupon_best_offer
     return retrieve_voucher(obj).best_offer
 
 
 def retrieve_original_offer(obj):
     """Helper method to retrieve the offer from coupon. """
+    if hasattr(obj, 'coupon_original_offer'):
+        return obj.coupon_original_offer
     return retrieve_voucher(obj).original_offer
 
 
 def retrieve_enterprise_offer(obj):
     """Helper method to retrieve the offer from coupon. """
+    if hasattr(obj, 'coupon_enterprise_offer'):
+        return obj.coupon_enterprise_offer
     return retrieve_voucher(obj).enterprise_offer
 
 
@@ -106,6 +115,8 @@ def retrieve_range(obj):
 
 def retrieve_quantity(obj):
     """Helper method to retrieve number of vouchers. """
+    if hasattr(obj, 'coupon_quantity'):
+        return obj.coupon_quantity or 0
     return obj.attr.coupon_vouchers.vouchers.count()
 
 
@@ -116,6 +127,8 @@ def retrieve_start_date(obj):
 
 def retrieve_voucher(obj):
     """Helper method to retrieve the first voucher from coupon. """
+    if hasattr(obj, 'coupon_voucher'):
+        return obj.coupon_voucher
     return obj.attr.coupon_vouchers.vouchers.first()
 
 
@@ -129,6 +142,90 @@ def retrieve_voucher_usage(obj):
     return retrieve_voucher(obj).usage
 
 
+def retrieve_category(obj):
+    """Helper method to retrieve the category of a coupon. """
+    if hasattr(obj, 'coupon_category_id'):
+        return Category(id=obj.coupon_category_id, name=obj.coupon_category_name)
+    return ProductCategory.objects.filter(product=obj).first().category
+
+
+def retrieve_client_name(obj):
+    """Helper method to retrieve the name of the business client who paid for a coupon. """
+    if hasattr(obj, 'coupon_client_name'):
+        return obj.coupon_client_name
+    return Invoice.objects.get(order__lines__product=obj).business_client.name
+
+
+def prefetch_coupon_vouchers(coupons):
+    """
+    Loads the first voucher of each coupon, along with its offers, with two queries.
+
+    The coupons must have been annotated by annotate_coupons. The retrieve_* helpers then read the
+    voucher and its original, enterprise and best offers from the coupon, instead of querying them.
+    """
+    vouchers = Voucher.objects.filter(
+        id__in=[coupon.coupon_voucher_id for coupon in coupons if coupon.coupon_voucher_id]
+    ).prefetch_related(
+        models.Prefetch('offers', queryset=ConditionalOffer.objects.select_related('benefit', 'condition__range'))
+    ).in_bulk()
+    is_enterprise_offers_switch_active = waffle.switch_is_active(ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH)
+
+    for coupon in coupons:
+        voucher = vouchers.get(coupon.coupon_voucher_id)
+        offers = list(voucher.offers.all()) if voucher else []
+        # These mirror Voucher.original_offer, Voucher.enterprise_offer and Voucher.best_offer.
+        original_offers = [offer for offer in offers if offer.condition.range_id is not None] or sorted(
+            offers, key=lambda offer: offer.date_created
+        )
+        enterprise_offers = [offer for offer in offers if offer.condition.enterprise_customer_uuid is not None]
+
+        coupon.coupon_voucher = voucher
+        coupon.coupon_original_offer = original_offers[0] if original_offers else None
+        coupon.coupon_enterprise_offer = enterprise_offers[0] if enterprise_offers else None
+        coupon.coupon_best_offer = coupon.coupon_original_offer
+        if is_enterprise_offers_switch_active and coupon.coupon_enterprise_offer:
+            coupon.coupon_best_offer = coupon.coupon_enterprise_offer
+
+
+def annotate_coupons(queryset):
+    """
+    Annotates coupons with the data read by the coupon list serializers, so that a page of coupons
+    is serialized with a fixed number of queries.
+
+    Each coupon is annotated with the ID of its first voucher, its number of vouchers, its category,
+    and the name of its client. The first vouchers are loaded by prefetch_coupon_vouchers, when the
+    page of coupons is serialized.
+    """
+    coupon_vouchers = Voucher.objects.filter(coupon_vouchers__coupon=models.OuterRef('pk'))
+    categories = ProductCategory.objects.filter(product=models.OuterRef('pk')).order_by('category')
+    return queryset.annotate(
+        coupon_voucher_id=models.Subquery(coupon_vouchers.order_by('pk').values('pk')[:1]),
+        coupon_quantity=models.Subquery(
+            coupon_vouchers.order_by().values('coupon_vouchers__coupon').annotate(
+                count=models.Count('pk')
+            ).values('count'),
+            output_field=models.IntegerField()
+        ),
+        coupon_category_id=models.Subquery(categories.values('category_id')[:1]),
+        coupon_category_name=models.Subquery(categories.values('category__name')[:1]),
+        coupon_client_name=models.Subquery(
+            Invoice.objects.filter(order__lines__product=models.OuterRef('pk')).values('business_client__name')[:1]
+        ),
+    )
+
+
+class AnnotatedCouponListSerializer(serializers.ListSerializer):
+    """
+    Loads the first voucher of each coupon of an annotated list of coupons, before serializing them.
+    """
+
+    def to_representation(self, data):
+        coupons = list(data.all() if isinstance(data, models.Manager) else data)
+        if coupons and hasattr(coupons[0], 'coupon_voucher_id'):
+            prefetch_coupon_vouchers(coupons)
+        return super(AnnotatedCouponListSerializer, self).to_representation(coupons)
+
+
 def _flatten(attrs):
     """Transform a list of attribute names and values into a dictionary keyed on the names."""
     return {attr['name']: attr['value'] for attr in attrs}
@@ -320,7 +417,7 @@ class BasketSerializer(serializers.ModelSerializer):
 
     def get_payment_status(self, obj):
         successful_payment_notifications = obj.paymentprocessorresponse_set.filter(
-            Q(response__contains='ACCEPT') | Q(response__contains='approved')
+            decision__in=SUCCESSFUL_PAYMENT_DECISIONS
         )
         if successful_payment_notifications:
             return "Accepted"
@@ -707,17 +804,17 @@ class CouponListSerializer(serializers.ModelSerializer):
     code = serializers.SerializerMethodField()
 
     def get_category(self, obj):
-        category = ProductCategory.objects.filter(product=obj).first().category
-        return CategorySerializer(category).data
+        return CategorySerializer(retrieve_category(obj)).data
 
     def get_client(self, obj):
-        return Invoice.objects.get(order__lines__product=obj).business_client.name
+        return retrieve_client_name(obj)
 
     def get_code(self, obj):
         if is_custom_code(obj):
             return retrieve_voucher(obj).code
 
     class Meta(object):
+        list_serializer_class = AnnotatedCouponListSerializer
         model = Product
         fields = ('category', 'client', 'code', 'id', 'title', 'date_created')
 
@@ -768,6 +865,7 @@ class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
         return retrieve_end_date(obj)
 
     class Meta(object):
+        list_serializer_class = AnnotatedCouponListSerializer
         model = Product
         fields = (
             'end_date', 'has_error', 'id', 'max_uses', 'num_codes', 'num_unassigned',
@@ -782,7 +880,7 @@ class EnterpriseCouponListSerializer(serializers.ModelSerializer):
     code_status = serializers.SerializerMethodField()
 
     def get_client(self, obj):
-        return Invoice.objects.get(order__lines__product=obj).business_client.name
+        return retrieve_client_name(obj)
 
     def get_enterprise_customer(self, obj):
         """ Get the Enterprise Customer UUID attached to a coupon. """
@@ -802,6 +900,7 @@ class EnterpriseCouponListSerializer(serializers.ModelSerializer):
         return _('ACTIVE') if in_time_interval else _('INACTIVE')
 
     class Meta(object):
+        list_serializer_class = AnnotatedCouponListSerializer
         model = Product
         fields = (
             'client',
@@ -857,8 +956,7 @@ class CouponSerializer(ProductPaymentInfoMixin, serializers.ModelSerializer):
         return offer_range.course_catalog if offer_range else None
 
     def get_category(self, obj):
-        category = ProductCategory.objects.filter(product=obj).first().category
-        return CategorySerializer(category).data
+        return CategorySerializer(retrieve_category(obj)).data
 
     def get_coupon_type(self, obj):
         if is_enrollment_code(obj):
@@ -866,7 +964,7 @@ class CouponSerializer(ProductPaymentInfoMixin, serializers.ModelSerializer):
         return _('Discount code')
 
     def get_client(self, obj):
-        return Invoice.objects.get(order__lines__product=obj).business_client.name
+        return retrieve_client_name(obj)
 
     def get_code(self, obj):
         if retrieve_quantity(obj) == 1:
@@ -1030,26 +1128,36 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
         child=OfferAssignmentSerializer(), read_only=True
     )
 
+    @transaction.atomic
     def create(self, validated_data):
-        """Create OfferAssignment objects for each email and the available_assignments determined from validation."""
+        """
+        Create OfferAssignment objects for each email and the available_assignments determined from validation.
+
+        The assignments are inserted with one query per OFFER_ASSIGNMENT_BATCH_SIZE assignments.
+        """
         emails = validated_data.get('emails')
         voucher_usage_type = validated_data.pop('voucher_usage_type')
         available_assignments = validated_data.pop('available_assignments')
         email_iterator = iter(emails)
         offer_assignments = []
 
-        for code in available_assignments:
-            offer = available_assignments[code]['offer']
+        for code, assignment in available_assignments.items():
             email = next(email_iterator) if voucher_usage_type == Voucher.MULTI_USE_PER_CUSTOMER else None
-            for _ in range(available_assignments[code]['num_slots']):
+            for _ in range(assignment['num_slots']):
                 offer_assignments.append(
-                    OfferAssignment.objects.create(
-                        offer=offer,
+                    OfferAssignment(
+                        offer=assignment['offer'],
                         code=code,
                         user_email=email or next(email_iterator),
                     )
                 )
 
+        OfferAssignment.objects.bulk_create(offer_assignments, batch_size=OFFER_ASSIGNMENT_BATCH_SIZE)
+        logger.info(
+            'Created [%d] offer assignments for [%d] codes of coupon [%s].',
+            len(offer_assignments), len(available_assignments), self.context['coupon'].id
+        )
+
         validated_data['offer_assignments'] = offer_assignments
         return validated_data
 
@@ -1072,18 +1180,18 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
         # been assigned to or redeemed by the requested emails.
         voucher_usage_type = vouchers.first().usage
         if voucher_usage_type == Voucher.ONCE_PER_CUSTOMER:
-            existing_assignments_for_users = OfferAssignment.objects.filter(user_email__in=emails).exclude(
-                status__in=OFFER_ASSIGNMENT_REVOKED
-            )
-            existing_applications_for_users = VoucherApplication.objects.filter(user__email__in=emails)
-            codes_to_exclude = (
-                [assignment.code for assignment in existing_assignments_for_users] +
-                [application.voucher.code for application in existing_applications_for_users]
+            existing_assignments_for_users = list(
+                OfferAssignment.objects.filter(user_email__in=emails).exclude(
+                    status__in=OFFER_ASSIGNMENT_REVOKED
+                ).values_list('code', 'user_email')
             )
-            emails_requiring_exclusions = (
-                [assignment.user_email for assignment in existing_assignments_for_users] +
-                [application.user.email for application in existing_applications_for_users]
+            existing_applications_for_users = list(
+                VoucherApplication.objects.filter(user__email__in=emails).values_list('voucher__code', 'user__email')
             )
+            codes_to_exclude = [code for code, __ in existing_assignments_for_users + existing_applications_for_users]
+            emails_requiring_exclusions = [
+                email for __, email in existing_assignments_for_users + existing_applications_for_users
+            ]
             logger.info(
                 'Excluding the following codes because they have been assigned to or redeemed by '
                 'at least one user in the given list of emails to assign to this coupon. '
@@ -1092,8 +1200,10 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
             vouchers = vouchers.exclude(code__in=codes_to_exclude)
 
         total_slots = 0
-        for voucher in vouchers.all():
-            available_slots = voucher.slots_available_for_assignment
+        vouchers = list(vouchers.all())
+        slots_available_for_assignment = get_slots_available_for_assignment(vouchers)
+        for voucher in vouchers:
+            enterprise_offer, available_slots = slots_available_for_assignment.get(voucher.id, (None, None))
             # If there are no available slots for this voucher, skip it.
             if available_slots < 1:
                 continue
@@ -1106,7 +1216,7 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
             if total_slots < len(emails):
                 # Keep track of which codes can be assigned how many times
                 # along with its corresponding ConditionalOffer.
-                available_assignments[voucher.code] = {'offer': voucher.enterprise_offer, 'num_slots': available_slots}
+                available_assignments[voucher.code] = {'offer': enterprise_offer, 'num_slots': available_slots}
 
                 # For Multi use per customer vouchers, all of the slots must go to one user email,
                 # so for accounting purposes we only count one slot here towards the total.
@@ -13,12 +13,16 @@ import mock
 from django.contrib.auth import get_user_model
 from django.test import override_settings
 from django.urls import reverse
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
+from oscar.apps.offer.applicator import Applicator as CoreApplicator
 from oscar.core.loading import get_model
 from oscar.test import factories
 from oscar.test.factories import BasketFactory
 from rest_framework.throttling import UserRateThrottle
+from threadlocals.threadlocals import set_thread_variable
 
 from ecommerce.courses.models import Course
+from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.api import exceptions as api_exceptions
 from ecommerce.extensions.api.tests.test_authentication import AccessTokenMixin
 from ecommerce.extensions.api.v2.tests.views import JSON_CONTENT_TYPE, OrderDetailViewTestMixin
@@ -35,7 +39,7 @@ from ecommerce.extensions.test.factories import (
 )
 from ecommerce.programs.tests.mixins import ProgramTestMixin
 from ecommerce.tests.factories import ProductFactory
-from ecommerce.tests.mixins import BasketCreationMixin, ThrottlingMixin
+from ecommerce.tests.mixins import BasketCreationMixin, RequestBudgetMixin, ThrottlingMixin
 from ecommerce.tests.testcases import TestCase, TransactionTestCase
 
 Basket = get_model('basket', 'Basket')
@@ -52,6 +56,27 @@ Voucher = get_model('voucher', 'Voucher')
 LOGGER_NAME = 'ecommerce.extensions.api.v2.views.baskets'
 
 
+class WorkerThreadPool(object):
+    """
+    Thread pool running its tasks in the calling thread, as new worker threads would, i.e. without the
+    thread locals and request cache of the calling thread. The test database cannot be shared with other threads.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+
+    def map(self, func, iterable):
+        results = []
+        for args in iterable:
+            set_thread_variable('request', None)
+            DEFAULT_REQUEST_CACHE.clear()
+            results.append(func(args))
+        return results
+
+    def terminate(self):
+        pass
+
+
 @ddt.ddt
 @override_settings(
     FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule']
@@ -279,7 +304,7 @@ class BasketCreateViewTests(BasketCreationMixin, ThrottlingMixin, TransactionTes
         self.assertDictEqual(actual, expected)
 
 
-class BasketViewSetTests(AccessTokenMixin, ThrottlingMixin, TestCase):
+class BasketViewSetTests(RequestBudgetMixin, AccessTokenMixin, ThrottlingMixin, TestCase):
 
     def setUp(self):
         super(BasketViewSetTests, self).setUp()
@@ -287,6 +312,14 @@ class BasketViewSetTests(AccessTokenMixin, ThrottlingMixin, TestCase):
         self.user = self.create_user(is_staff=True)
         self.token = self.generate_jwt_token_header(self.user)
 
+    def test_request_budget(self):
+        """ Verify listing baskets stays within the view's query budget. """
+        BasketFactory(site=self.site)
+        BasketFactory(site=self.site)
+        response = self.client.get(self.path, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertRequestWithinBudget(response, 'api:v2:basket-list', queries=23, duplicate_queries=2, http_calls=1)
+
     def test_is_user_authenticated(self):
         """ If the user is not authenticated, the view should return HTTP status 403. """
         response = self.client.get(self.path)
@@ -390,7 +423,7 @@ class BasketDestroyViewTests(TestCase):
         self.assertFalse(Basket.objects.filter(id=self.basket.id).exists())
 
 
-class BasketCalculateViewTests(ProgramTestMixin, TestCase):
+class BasketCalculateViewTests(RequestBudgetMixin, ProgramTestMixin, TestCase):
     def setUp(self):
         super(BasketCalculateViewTests, self).setUp()
         self.products = ProductFactory.create_batch(3, stockrecords__partner=self.partner, categories=[])
@@ -400,6 +433,14 @@ class BasketCalculateViewTests(ProgramTestMixin, TestCase):
         self.user = self._login_as_user(is_staff=True)
         self.url = self._generate_sku_url(self.products, username=self.user.username)
 
+    def test_request_budget(self):
+        """ Verify calculating a basket stays within the view's query budget. """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertRequestWithinBudget(
+            response, 'api:v2:baskets:calculate', queries=34, duplicate_queries=14, http_calls=2
+        )
+
     def test_no_sku(self):
         """ Verify bad response when not providing sku(s) """
         response = self.client.get(self.path)
@@ -652,7 +693,7 @@ class BasketCalculateViewTests(ProgramTestMixin, TestCase):
             self.assertEqual(response.status_code, 200)
             mock_track.assert_not_called()
 
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_basket_calculate_anonymous_caching(self, mock_calculate_basket):
         """Verify a request made with the is_anonymous parameter is cached"""
         url_with_one_sku = self._generate_sku_url(self.products[0:1], username=None)
@@ -712,7 +753,31 @@ class BasketCalculateViewTests(ProgramTestMixin, TestCase):
         self.assertFalse(mock_calculate_basket.called, msg='The cache should be hit.')
         self.assertEqual(response.data, expected)
 
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
+    def test_basket_calculate_anonymous_caching_with_code(self, mock_calculate_basket):
+        """Verify anonymous responses are cached separately for each voucher code"""
+        url = self._generate_sku_url(self.products[0:1], username=None)
+        mock_calculate_basket.return_value = {'Test Succeeded': True}
+
+        for code in ('', 'FIRST', 'SECOND', 'FIRST'):
+            self.client.get(url + '&code={code}'.format(code=code))
+
+        self.assertEqual(mock_calculate_basket.call_count, 3)
+
+    @httpretty.activate
+    def test_basket_calculate_no_database_writes(self):
+        """Verify the basket is calculated in memory, without creating a basket"""
+        voucher, __ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        self.mock_user_data(self.user.username)
+
+        response = self.client.get(self.url + '&code={code}'.format(code=voucher.code))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_incl_tax'], self.product_total - 5)
+        self.assertFalse(Basket.objects.exists())
+        self.assertFalse(Basket.vouchers.through.objects.exists())
+
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_basket_calculate_no_query_parameters(self, mock_calculate_basket_atomic):
         """Verify a request made without query parameters uses the request user"""
         expected = {'Test Succeeded': True}
@@ -749,7 +814,7 @@ class BasketCalculateViewTests(ProgramTestMixin, TestCase):
         self.assertTrue(mock_logger.called)
 
     @httpretty.activate
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_conflicting_user_anonymous_params(self, mock_calculate_basket):
         """
         Verify that when the request contains both a username and an is_anonymous parameter, a Bad Request response
@@ -765,7 +830,7 @@ class BasketCalculateViewTests(ProgramTestMixin, TestCase):
         self.assertFalse(mock_calculate_basket.called)
 
     @httpretty.activate
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_basket_calculate_with_anonymous_caching_disabled(self, mock_calculate_basket_atomic):
         """Verify a request made by a staff user is not cached"""
         expected = {'Test Succeeded': True}
@@ -839,7 +904,7 @@ class BasketCalculateViewTests(ProgramTestMixin, TestCase):
         response = self.client.get(self.url + '&username={username}'.format(username=differentuser.username))
         self.assertEqual(response.status_code, 403)
 
-    @mock.patch('ecommerce.extensions.basket.models.Basket.add_product', mock.Mock(side_effect=Exception))
+    @mock.patch('ecommerce.extensions.basket.models.InMemoryBasket.add_product', mock.Mock(side_effect=Exception))
     @mock.patch('ecommerce.extensions.api.v2.views.baskets.logger.exception')
     def test_exception_log(self, mock_logger):
         """A log entry is filed when an exception happens."""
@@ -956,3 +1021,158 @@ class BasketCalculateViewTests(ProgramTestMixin, TestCase):
         self.client.logout()
         self.client.login(username=user.username, password=self.password)
         return user
+
+
+@ddt.ddt
+@override_settings(BASKET_CALCULATE_BULK_MAX_WORKERS=1)
+class BasketCalculateBulkViewTests(TestCase):
+    def setUp(self):
+        super(BasketCalculateBulkViewTests, self).setUp()
+        self.products = ProductFactory.create_batch(3, stockrecords__partner=self.partner, categories=[])
+        self.skus = [product.stockrecords.first().partner_sku for product in self.products]
+        self.path = reverse('api:v2:baskets:calculate_bulk')
+        self.range = factories.RangeFactory(includes_all_products=True)
+        self.user = self.create_user(is_staff=True)
+        self.client.login(username=self.user.username, password=self.password)
+
+    def post_baskets(self, baskets):
+        return self.client.post(self.path, json.dumps({'baskets': baskets}), JSON_CONTENT_TYPE)
+
+    def get_totals(self, products, discount=0):
+        total = sum(product.stockrecords.first().price_excl_tax for product in products)
+        return {
+            'total_incl_tax_excl_discounts': total,
+            'total_incl_tax': total - discount,
+            'currency': 'GBP'
+        }
+
+    def test_no_authentication(self):
+        """ Verify that un-authenticated users are rejected """
+        self.client.logout()
+        response = self.post_baskets([{'skus': self.skus, 'is_anonymous': True}])
+        self.assertEqual(response.status_code, 401)
+
+    @ddt.data(
+        [],
+        [{'skus': []}],
+        [{'skus': 'unit0', 'is_anonymous': True}],
+        [{'skus': ['unit0']}],
+        [{'skus': ['unit0'], 'is_anonymous': 'false'}],
+        [{'skus': ['unit0'], 'username': 'user', 'is_anonymous': True}],
+    )
+    def test_invalid_baskets(self, baskets):
+        """ Verify bad response when the baskets are missing or invalid """
+        response = self.post_baskets(baskets)
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BASKET_CALCULATE_BULK_MAX_BASKETS=1)
+    def test_too_many_baskets(self):
+        """ Verify bad response when too many baskets are requested """
+        response = self.post_baskets([{'skus': self.skus, 'is_anonymous': True}] * 2)
+        self.assertEqual(response.status_code, 400)
+
+    def test_nonstaff_user_other_username(self):
+        """ Verify a non-staff user passing a different username is forbidden """
+        user = self.create_user(is_staff=False)
+        self.client.login(username=user.username, password=self.password)
+
+        response = self.post_baskets([
+            {'skus': self.skus, 'username': user.username},
+            {'skus': self.skus, 'username': self.user.username},
+        ])
+        self.assertEqual(response.status_code, 403)
+
+    @httpretty.activate
+    def test_calculate(self):
+        """ Verify the totals of every basket are returned, in the order of the requested baskets """
+        voucher, __ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+
+        with mock.patch.object(CoreApplicator, 'get_site_offers', return_value=[]) as mock_offers:
+            response = self.post_baskets([
+                {'skus': self.skus, 'is_anonymous': 'true'},
+                {'skus': self.skus[:1], 'username': self.user.username, 'code': voucher.code.lower()},
+                {'skus': ['does-not-exist'], 'is_anonymous': True},
+                {'skus': self.skus[1:], 'username': self.user.username, 'code': 'does-not-exist'},
+            ])
+            self.assertEqual(mock_offers.call_count, 1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            self.get_totals(self.products),
+            self.get_totals(self.products[:1], discount=5),
+            {'error': 'Products with SKU(s) [does-not-exist] do not exist.'},
+            self.get_totals(self.products[1:]),
+        ])
+        self.assertFalse(Basket.objects.exists())
+
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
+    def test_anonymous_caching(self, mock_calculate_basket):
+        """ Verify anonymous baskets are cached, and shared with the basket calculate API """
+        expected = {'Test Succeeded': True}
+        mock_calculate_basket.return_value = expected
+        baskets = [
+            {'skus': self.skus, 'is_anonymous': True},
+            {'skus': list(reversed(self.skus)), 'is_anonymous': True, 'code': 'CODE'},
+            {'skus': self.skus, 'username': self.user.username},
+        ]
+
+        response = self.post_baskets(baskets)
+        self.assertEqual(response.data['results'], [expected] * 3)
+        self.assertEqual(mock_calculate_basket.call_count, 3)
+
+        mock_calculate_basket.reset_mock()
+        response = self.post_baskets(baskets)
+        self.assertEqual(response.data['results'], [expected] * 3)
+        self.assertEqual(mock_calculate_basket.call_count, 1)
+
+        url = '{path}?{qs}&is_anonymous=true'.format(
+            path=reverse('api:v2:baskets:calculate'), qs=urllib.urlencode({'sku': self.skus}, True)
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.data, expected)
+        self.assertEqual(mock_calculate_basket.call_count, 1)
+
+    @override_settings(BASKET_CALCULATE_BULK_MAX_WORKERS=2)
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.connection')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateBulkView._calculate_basket')
+    def test_calculate_in_threads(self, mock_calculate_basket, mock_connection):
+        """ Verify baskets are calculated concurrently, and the worker threads close their database connection """
+        mock_calculate_basket.side_effect = lambda request, basket, site_offers: basket['skus']
+
+        response = self.post_baskets([{'skus': [sku], 'username': self.user.username} for sku in self.skus])
+
+        self.assertEqual(response.data['results'], [[sku] for sku in self.skus])
+        self.assertEqual(mock_connection.close.call_count, 3)
+
+    @override_settings(BASKET_CALCULATE_BULK_MAX_WORKERS=2)
+    @mock.patch('ecommerce.extensions.basket.models.track_segment_event')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.connection')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.ThreadPool', WorkerThreadPool)
+    def test_calculate_catalog_range_offer_in_threads(self, mock_connection, mock_track_segment_event):
+        """ Verify worker threads apply offers whose range is a course catalog, and calculate temporary baskets """
+        courses = [CourseFactory(partner=self.partner) for __ in range(2)]
+        seats = [course.create_or_update_seat('verified', True, 100) for course in courses]
+        _range = factories.RangeFactory(course_seat_types='verified', course_catalog=1)
+        for course in courses:
+            TieredCache.set_all_tiers(
+                _range._get_catalog_contains_cache_key(self.site, course.id),  # pylint: disable=protected-access
+                {'courses': {course.id: True}},
+                60
+            )
+        offer = factories.ConditionalOfferFactory(
+            benefit=factories.BenefitFactory(type=Benefit.PERCENTAGE, range=_range, value=10),
+            condition=factories.ConditionFactory(value=1, range=_range, type=Condition.COUNT),
+            offer_type=ConditionalOffer.SITE
+        )
+
+        with mock.patch.object(CoreApplicator, 'get_site_offers', return_value=[offer]):
+            response = self.post_baskets([
+                {'skus': [seat.stockrecords.first().partner_sku], 'username': self.user.username} for seat in seats
+            ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'total_incl_tax_excl_discounts': Decimal('100.00'), 'total_incl_tax': Decimal('90.00'), 'currency': 'USD'}
+        ] * 2)
+        self.assertEqual(mock_connection.close.call_count, 2)
+        self.assertFalse(mock_track_segment_event.called)
@@ -10,7 +10,9 @@ import ddt
 import httpretty
 import mock
 import pytz
+from django.db import connection
 from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
 from oscar.apps.catalogue.categories import create_from_breadcrumbs
@@ -367,6 +369,20 @@ class CouponViewSetFunctionalTest(CouponMixin, DiscoveryTestMixin, DiscoveryMock
         self.assertEqual(coupon_data['category']['name'], self.data['category']['name'])
         self.assertEqual(coupon_data['client'], self.data['client'])
 
+    def test_list_coupons_query_count(self):
+        """The list endpoint should make the same number of queries, whatever the number of coupons."""
+        self.client.get(COUPONS_LINK)
+        with CaptureQueriesContext(connection) as single_coupon_queries:
+            self.client.get(COUPONS_LINK)
+
+        for title in ('Tešt čoupon 2', 'Tešt čoupon 3'):
+            self.get_response('POST', COUPONS_LINK, dict(self.data, title=title))
+        with CaptureQueriesContext(connection) as multiple_coupon_queries:
+            response = self.client.get(COUPONS_LINK)
+
+        self.assertEqual(len(json.loads(response.content)['results']), 3)
+        self.assertEqual(len(multiple_coupon_queries), len(single_coupon_queries))
+
     def test_list_and_details_endpoint_return_custom_code(self):
         """Test that the list and details endpoints return the correct code."""
         self.data.update({
@@ -9,6 +9,8 @@ import ddt
 import httpretty
 import mock
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
 from oscar.core.loading import get_model
@@ -235,6 +237,31 @@ class EnterpriseCouponViewSetTest(CouponMixin, DiscoveryTestMixin, DiscoveryMock
         self.assertEqual(coupon_data[0]['enterprise_customer_catalog'], self.data['enterprise_customer_catalog'])
         self.assertEqual(coupon_data[0]['code_status'], 'ACTIVE')
 
+    def test_list_enterprise_coupons_query_count(self):
+        """ Verify the list and overview endpoints make the same number of queries, whatever the number of coupons. """
+        Switch.objects.update_or_create(name=ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH, defaults={'active': True})
+        overview_link = reverse(
+            'api:v2:enterprise-coupons-(?P<enterprise-id>.+)/overview-list',
+            kwargs={'enterprise_id': self.data['enterprise_customer']['id']}
+        )
+        self.get_response('POST', ENTERPRISE_COUPONS_LINK, self.data)
+
+        single_coupon_queries = {}
+        for link in (ENTERPRISE_COUPONS_LINK, overview_link):
+            self.client.get(link)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(link)
+            single_coupon_queries[link] = len(queries)
+
+        for title in ('coupon-2', 'coupon-3'):
+            self.get_response('POST', ENTERPRISE_COUPONS_LINK, dict(self.data, title=title))
+
+        for link in (ENTERPRISE_COUPONS_LINK, overview_link):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(link)
+            self.assertEqual(len(json.loads(response.content)['results']), 3)
+            self.assertEqual(len(queries), single_coupon_queries[link])
+
     def test_create_ent_offers_switch_off(self):
         Switch.objects.update_or_create(name=ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH, defaults={'active': False})
         response = self.get_response('POST', ENTERPRISE_COUPONS_LINK, self.data)
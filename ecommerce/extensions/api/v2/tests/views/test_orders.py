@@ -15,7 +15,7 @@ from ecommerce.extensions.fulfillment.signals import SHIPPING_EVENT_NAME
 from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.test.factories import create_order
 from ecommerce.tests.factories import SiteConfigurationFactory
-from ecommerce.tests.mixins import ThrottlingMixin
+from ecommerce.tests.mixins import RequestBudgetMixin, ThrottlingMixin
 from ecommerce.tests.testcases import TestCase
 
 Order = get_model('order', 'Order')
@@ -24,7 +24,7 @@ post_checkout = get_class('checkout.signals', 'post_checkout')
 
 
 @ddt.ddt
-class OrderListViewTests(AccessTokenMixin, ThrottlingMixin, TestCase):
+class OrderListViewTests(RequestBudgetMixin, AccessTokenMixin, ThrottlingMixin, TestCase):
     def setUp(self):
         super(OrderListViewTests, self).setUp()
         self.path = reverse('api:v2:order-list')
@@ -85,6 +85,17 @@ class OrderListViewTests(AccessTokenMixin, ThrottlingMixin, TestCase):
         self.assertEqual(content['results'][0]['number'], unicode(order_2.number))
         self.assertEqual(content['results'][1]['number'], unicode(order.number))
 
+    def test_request_budget(self):
+        """ Verify listing orders stays within the view's query budget. """
+        create_order(site=self.site, user=self.user)
+        create_order(site=self.site, user=self.user)
+        response = self.client.get(self.path, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 200)
+        # Known N+1: OrderSerializer reads the lines and their products, payment sources, discounts and basket
+        # vouchers of each order separately. This budget records today's counts, and should be lowered once those
+        # are prefetched.
+        self.assertRequestWithinBudget(response, 'api:v2:order-list', queries=36, duplicate_queries=14, http_calls=1)
+
     def test_with_other_users_orders(self):
         """ The view should only return orders for the authenticated users. """
         other_user = self.create_user()
@@ -337,7 +348,13 @@ class OrderFulfillViewTests(TestCase):
         post_checkout.send.assert_called_once_with(**send_arguments)
 
 
-class OrderDetailViewTests(OrderDetailViewTestMixin, TestCase):
+class OrderDetailViewTests(RequestBudgetMixin, OrderDetailViewTestMixin, TestCase):
     @property
     def url(self):
         return reverse('api:v2:order-detail', kwargs={'number': self.order.number})
+
+    def test_request_budget(self):
+        """ Verify retrieving an order stays within the view's query budget. """
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertRequestWithinBudget(response, 'api:v2:order-detail', queries=23, duplicate_queries=1, http_calls=0)
@@ -15,6 +15,7 @@ from ecommerce.extensions.api.serializers import ProductSerializer
 from ecommerce.extensions.api.v2.tests.views import JSON_CONTENT_TYPE, ProductSerializerMixin
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
 from ecommerce.tests.factories import PartnerFactory, ProductFactory
+from ecommerce.tests.mixins import RequestBudgetMixin
 from ecommerce.tests.testcases import TestCase
 
 Benefit = get_model('offer', 'Benefit')
@@ -38,7 +39,7 @@ class ProductViewSetBase(ProductSerializerMixin, DiscoveryTestMixin, TestCase):
         self.seat = self.course.create_or_update_seat('honor', False, 0, expires=expires)
 
 
-class ProductViewSetTests(ProductViewSetBase):
+class ProductViewSetTests(RequestBudgetMixin, ProductViewSetBase):
     def test_list(self):
         """The list endpoint should return only products with current site's partner."""
         ProductFactory.create_batch(3, stockrecords__partner=PartnerFactory())
@@ -57,6 +58,20 @@ class ProductViewSetTests(ProductViewSetBase):
         expected = {'count': 0, 'next': None, 'previous': None, 'results': []}
         self.assertDictEqual(json.loads(response.content), expected)
 
+    def test_request_budget(self):
+        """ Verify listing and retrieving products stays within their query budgets. """
+        response = self.client.get(PRODUCT_LIST_PATH)
+        self.assertEqual(response.status_code, 200)
+        # Known N+1: ProductSerializer reads the attribute values, product class, stock records and price of each
+        # product separately. These budgets record today's counts, and should be lowered once those are prefetched.
+        self.assertRequestWithinBudget(response, 'api:v2:product-list', queries=55, duplicate_queries=32, http_calls=0)
+
+        response = self.client.get(reverse('api:v2:product-detail', kwargs={'pk': self.seat.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertRequestWithinBudget(
+            response, 'api:v2:product-detail', queries=39, duplicate_queries=18, http_calls=0
+        )
+
     def test_retrieve(self):
         """ Verify a single product is returned. """
         path = reverse('api:v2:product-detail', kwargs={'pk': 999})
@@ -229,6 +229,77 @@ class RefundCreateViewTests(RefundTestMixin, AccessTokenMixin, JwtMixin, TestCas
         self.assertEqual(Refund.objects.count(), 0)
 
 
+@ddt.ddt
+class RefundBulkCreateViewTests(RefundTestMixin, TestCase):
+    path = reverse('api:v2:refunds:create_bulk')
+
+    def setUp(self):
+        super(RefundBulkCreateViewTests, self).setUp()
+        self.user = self.create_user(is_staff=True)
+        self.client.login(username=self.user.username, password=self.password)
+
+    def test_staff_only(self):
+        """ Non-staff users should not be permitted to create refunds in bulk. """
+        user = self.create_user()
+        self.client.login(username=user.username, password=self.password)
+        response = self.client.post(self.path, json.dumps({'course_id': self.course.id}), JSON_CONTENT_TYPE)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_create_for_course(self):
+        """ Refunds should be created for all orders of the course, in one batch, without issuing credit. """
+        orders = [self.create_order(user=self.create_user()) for __ in range(2)]
+
+        with mock.patch.object(Refund, 'approve') as mock_approve:
+            response = self.client.post(self.path, json.dumps({'course_id': self.course.id}), JSON_CONTENT_TYPE)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        refunds = [Refund.objects.get(order=order) for order in orders]
+        self.assertEqual(json.loads(response.content), {
+            'batch_id': str(refunds[0].batch_id),
+            'refund_ids': [refund.id for refund in refunds],
+        })
+        self.assertEqual(set(refund.batch_id for refund in refunds), {refunds[0].batch_id})
+        self.assertEqual(set(refund.status for refund in refunds), {REFUND.OPEN})
+        self.assertFalse(mock_approve.called)
+
+    @ddt.data('false', 'true', False)
+    def test_create_ignores_revoke_fulfillment(self, revoke_fulfillment):
+        """ Refunds should be left Open whatever revoke_fulfillment is posted, since it is chosen on approval. """
+        order = self.create_order(user=self.create_user())
+        data = {'course_id': self.course.id, 'revoke_fulfillment': revoke_fulfillment}
+
+        with mock.patch('ecommerce.extensions.refund.models.revoke_fulfillment_for_refund') as mock_revoke:
+            response = self.client.post(self.path, json.dumps(data), JSON_CONTENT_TYPE)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Refund.objects.get(order=order).status, REFUND.OPEN)
+        self.assertFalse(mock_revoke.called)
+
+    def test_create_for_enrollments(self):
+        """ Refunds should only be created for the given enrollments. """
+        order = self.create_order(user=self.create_user())
+        self.create_order(user=self.create_user())
+        data = {'enrollments': [{'username': order.user.username, 'course_id': self.course.id}]}
+
+        response = self.client.post(self.path, json.dumps(data), JSON_CONTENT_TYPE)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(json.loads(response.content)['refund_ids'], [Refund.objects.get().id])
+        self.assertEqual(Refund.objects.get().order, order)
+
+    def test_no_refunds(self):
+        """ HTTP 200 should be returned if there is nothing to refund. """
+        response = self.client.post(self.path, json.dumps({'course_id': self.course.id}), JSON_CONTENT_TYPE)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), {'batch_id': None, 'refund_ids': []})
+
+    @ddt.data({}, {'course_id': ''}, {'course_id': 123}, {'enrollments': [{'username': 'bob'}]}, {'enrollments': 'bob'})
+    def test_invalid_data(self, data):
+        """ HTTP 400 should be returned if neither a course nor valid enrollments are given. """
+        response = self.client.post(self.path, json.dumps(data), JSON_CONTENT_TYPE)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 @ddt.ddt
 class RefundProcessViewTests(ThrottlingMixin, TestCase):
     def setUp(self):
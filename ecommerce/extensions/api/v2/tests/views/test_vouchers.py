@@ -34,7 +34,7 @@ from ecommerce.extensions.test.factories import (
 )
 from ecommerce.extensions.voucher.models import CouponVouchers
 from ecommerce.tests.factories import PartnerFactory
-from ecommerce.tests.mixins import Catalog, LmsApiMockMixin
+from ecommerce.tests.mixins import Catalog, LmsApiMockMixin, RequestBudgetMixin
 from ecommerce.tests.testcases import TestCase
 
 Product = get_model('catalogue', 'Product')
@@ -44,7 +44,7 @@ Voucher = get_model('voucher', 'Voucher')
 
 
 @ddt.ddt
-class VoucherViewSetTests(DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockMixin, TestCase):
+class VoucherViewSetTests(RequestBudgetMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockMixin, TestCase):
     """ Tests for the VoucherViewSet view set. """
     path = reverse('api:v2:vouchers-list')
 
@@ -77,6 +77,15 @@ class VoucherViewSetTests(DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockMixi
         expected_codes = [voucher.code for voucher in vouchers]
         self.assertEqual(actual_codes, expected_codes)
 
+    def test_request_budget(self):
+        """ Verify listing vouchers stays within the view's query budget. """
+        self.create_vouchers(count=3)
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        # Known N+1: VoucherSerializer reads the offers, best offer benefit and usage by the user of each voucher
+        # separately. This budget records today's counts, and should be lowered once those are prefetched.
+        self.assertRequestWithinBudget(response, 'api:v2:vouchers-list', queries=21, duplicate_queries=7, http_calls=0)
+
     def test_list_with_code_filter(self):
         """ Verify the endpoint list all vouchers, filtered by the specified code. """
         voucher = self.create_vouchers()[0]
@@ -43,6 +43,7 @@ BASKET_URLS = [
         name='retrieve_order'
     ),
     url(r'^calculate/$', basket_views.BasketCalculateView.as_view(), name='calculate'),
+    url(r'^calculate/bulk/$', basket_views.BasketCalculateBulkView.as_view(), name='calculate_bulk'),
 ]
 
 PAYMENT_URLS = [
@@ -51,6 +52,7 @@ PAYMENT_URLS = [
 
 REFUND_URLS = [
     url(r'^$', refund_views.RefundCreateView.as_view(), name='create'),
+    url(r'^bulk/$', refund_views.RefundBulkCreateView.as_view(), name='create_bulk'),
     url(r'^(?P<pk>[\d]+)/process/$', refund_views.RefundProcessView.as_view(), name='process'),
 ]
 
@@ -3,10 +3,12 @@ from __future__ import unicode_literals
 
 import logging
 import warnings
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import connection, transaction
 from django.http import HttpResponseBadRequest, HttpResponseForbidden
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext as _
@@ -17,6 +19,7 @@ from rest_framework import generics, status, viewsets
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import DjangoModelPermissions, IsAuthenticated
 from rest_framework.response import Response
+from threadlocals.threadlocals import get_current_request, set_thread_variable
 
 from ecommerce.core.utils import get_cache_key
 from ecommerce.enterprise.entitlements import get_entitlement_voucher
@@ -35,6 +38,7 @@ from ecommerce.extensions.payment.helpers import get_default_processor_class, ge
 
 Applicator = get_class('offer.applicator', 'Applicator')
 Basket = get_model('basket', 'Basket')
+InMemoryBasket = get_model('basket', 'InMemoryBasket')
 logger = logging.getLogger(__name__)
 Order = get_model('order', 'Order')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
@@ -359,51 +363,101 @@ class BasketDestroyView(generics.DestroyAPIView):
 class BasketCalculateView(generics.GenericAPIView):
     permission_classes = (IsAuthenticated,)
     MARKETING_USER = 'marketing_site_worker'
+    ANONYMOUS_SEGMENT = 'anonymous'
 
-    def _calculate_temporary_basket_atomic(self, user, request, products, voucher, skus, code):
-        response = None
+    def _calculate_temporary_basket(self, user, request, products, voucher, skus, code, strategy=None,
+                                    site_offers=None):
         try:
-            # We wrap this in an atomic operation so we never commit this to the db.
-            # This is to avoid merging this temporary basket with a real user basket.
-            with transaction.atomic():
-                basket = Basket(owner=user, site=request.site)
-                basket.strategy = Selector().strategy(user=user, request=request)
+            # The basket, its lines and its vouchers are only kept in memory, so that nothing is
+            # written to the database, and the basket is never merged with a real user basket.
+            basket = InMemoryBasket(owner=user, site=request.site)
+            basket.strategy = strategy or Selector().strategy(user=user, request=request)
 
-                for product in products:
-                    basket.add_product(product, 1)
+            for product in products:
+                basket.add_product(product, 1)
 
-                if voucher:
-                    basket.vouchers.add(voucher)
+            if voucher:
+                basket.add_voucher(voucher)
 
-                # Calculate any discounts on the basket.
-                Applicator().apply(basket, user=user, request=request)
+            # Calculate any discounts on the basket.
+            Applicator(site_offers=site_offers).apply(basket, user=user, request=request)
 
-                discounts = []
-                if basket.offer_discounts:
-                    discounts = basket.offer_discounts
-                if basket.voucher_discounts:
-                    discounts.extend(basket.voucher_discounts)
-
-                response = {
-                    'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
-                    'total_incl_tax': basket.total_incl_tax,
-                    'currency': basket.currency
-                }
-                raise api_exceptions.TemporaryBasketException
-        except api_exceptions.TemporaryBasketException:
-            pass
+            return {
+                'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+                'total_incl_tax': basket.total_incl_tax,
+                'currency': basket.currency
+            }
         except:  # pylint: disable=bare-except
             logger.exception(
                 'Failed to calculate basket discount for SKUs [%s] and voucher [%s].',
                 skus, code
             )
             raise
-        return response
+
+    def _get_basket_owner(self, request, requested_username, is_anonymous):
+        """
+        Returns the user to calculate a basket for.
+
+        Returns:
+            tuple: (basket_owner, error_response). The basket owner is None if an anonymous basket
+                has to be calculated, and error_response is None unless the parameters are invalid.
+        """
+        basket_owner = request.user
+        use_default_basket = is_anonymous
+
+        # validate query parameters
+        if requested_username and is_anonymous:
+            return None, HttpResponseBadRequest(_('Provide username or is_anonymous query param, but not both'))
+        elif not requested_username and not is_anonymous:
+            logger.warning("Request to Basket Calculate must supply either username or is_anonymous query"
+                           " param. Requesting user=%s. Future versions of this API will treat this "
+                           "WARNING as an ERROR and raise an exception.", basket_owner.username)
+            requested_username = request.user.username
+
+        # If a username is passed in, validate that the user has staff access or is the same user.
+        if requested_username:
+            if basket_owner.username.lower() == requested_username.lower():
+                pass
+            elif basket_owner.is_staff:
+                try:
+                    basket_owner = User.objects.get(username=requested_username)
+                except User.DoesNotExist:
+                    # This case represents a user who is logged in to marketing, but
+                    # doesn't yet have an account in ecommerce. These users have
+                    # never purchased before.
+                    use_default_basket = True
+            else:
+                return None, HttpResponseForbidden('Unauthorized user credentials')
+
+        if basket_owner.username == self.MARKETING_USER and not use_default_basket:
+            # For legacy requests that predate is_anonymous parameter, we will calculate
+            # an anonymous basket if the calculated user is the marketing user.
+            # TODO: LEARNER-5057: Remove this special case for the marketing user
+            # once logs show no more requests with no parameters (see above).
+            use_default_basket = True
+
+        if use_default_basket:
+            basket_owner = None
+
+        return basket_owner, None
+
+    def _get_anonymous_cache_key(self, request, skus, code):
+        # For an anonymous user we can directly get the cached price, because
+        # there can't be any enrollments or entitlements. Prices calculated for
+        # a user depend on their enrollments, entitlements and enterprise data,
+        # so they are not shared between users.
+        return get_cache_key(
+            site_comain=request.site,
+            resource_name='calculate',
+            skus=skus,
+            code=code,
+            segment=self.ANONYMOUS_SEGMENT,
+        )
 
     def get(self, request):
         """ Calculate basket totals given a list of sku's
 
-        Create a temporary basket add the sku's and apply an optional voucher code.
+        Create a temporary in-memory basket add the sku's and apply an optional voucher code.
         Then calculate the total price less discounts. If a voucher code is not
         provided apply a voucher in the Enterprise entitlements available
         to the user.
@@ -442,63 +496,196 @@ class BasketCalculateView(generics.GenericAPIView):
         if not voucher and len(products) == 1:
             voucher = get_entitlement_voucher(request, products[0])
 
-        basket_owner = request.user
-
         requested_username = request.GET.get('username', default='')
         is_anonymous = request.GET.get('is_anonymous', 'false').lower() == 'true'
-
-        use_default_basket = is_anonymous
-
-        # validate query parameters
-        if requested_username and is_anonymous:
-            return HttpResponseBadRequest(_('Provide username or is_anonymous query param, but not both'))
-        elif not requested_username and not is_anonymous:
-            logger.warning("Request to Basket Calculate must supply either username or is_anonymous query"
-                           " param. Requesting user=%s. Future versions of this API will treat this "
-                           "WARNING as an ERROR and raise an exception.", basket_owner.username)
-            requested_username = request.user.username
-
-        # If a username is passed in, validate that the user has staff access or is the same user.
-        if requested_username:
-            if basket_owner.username.lower() == requested_username.lower():
-                pass
-            elif basket_owner.is_staff:
-                try:
-                    basket_owner = User.objects.get(username=requested_username)
-                except User.DoesNotExist:
-                    # This case represents a user who is logged in to marketing, but
-                    # doesn't yet have an account in ecommerce. These users have
-                    # never purchased before.
-                    use_default_basket = True
-            else:
-                return HttpResponseForbidden('Unauthorized user credentials')
-
-        if basket_owner.username == self.MARKETING_USER and not use_default_basket:
-            # For legacy requests that predate is_anonymous parameter, we will calculate
-            # an anonymous basket if the calculated user is the marketing user.
-            # TODO: LEARNER-5057: Remove this special case for the marketing user
-            # once logs show no more requests with no parameters (see above).
-            use_default_basket = True
-
-        if use_default_basket:
-            basket_owner = None
+        basket_owner, error_response = self._get_basket_owner(request, requested_username, is_anonymous)
+        if error_response:
+            return error_response
 
         cache_key = None
-        if use_default_basket:
-            # For an anonymous user we can directly get the cached price, because
-            # there can't be any enrollments or entitlements.
-            cache_key = get_cache_key(
-                site_comain=request.site,
-                resource_name='calculate',
-                skus=skus
-            )
+        if basket_owner is None:
+            cache_key = self._get_anonymous_cache_key(request, skus, code)
             cached_response = TieredCache.get_cached_response(cache_key)
             if cached_response.is_found:
                 return Response(cached_response.value)
 
-        response = self._calculate_temporary_basket_atomic(basket_owner, request, products, voucher, skus, code)
+        response = self._calculate_temporary_basket(basket_owner, request, products, voucher, skus, code)
 
-        if response and use_default_basket:
+        if basket_owner is None:
             TieredCache.set_all_tiers(cache_key, response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT)
 
         return Response(response)
+
+
+class BasketCalculateBulkView(BasketCalculateView):
+    """
+    Calculates the totals of several baskets in one request, e.g. for every course of a catalog page.
+
+    The products, vouchers, site offers and pricing strategies are loaded once for all baskets, and
+    the baskets are calculated concurrently by up to BASKET_CALCULATE_BULK_MAX_WORKERS threads.
+    """
+
+    def _calculate_in_thread(self, args):
+        current_request, task = args
+        # Worker threads have their own thread locals and request cache. Offers rely on the current request,
+        # e.g. to look up the catalog of a range, and baskets on the request cache to be saved as temporary.
+        set_thread_variable('request', current_request)
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+        try:
+            return self._calculate_basket(*task)
+        finally:
+            set_thread_variable('request', None)
+            DEFAULT_REQUEST_CACHE.clear()
+            # Worker threads open their own database connection.
+            connection.close()
+
+    def _calculate_basket(self, request, basket, site_offers):
+        products = basket['products']
+        voucher = basket['voucher']
+
+        # If there is only one product apply an Enterprise entitlement voucher
+        if not voucher and len(products) == 1:
+            voucher = get_entitlement_voucher(request, products[0])
+
+        return self._calculate_temporary_basket(
+            basket['owner'], request, products, voucher, basket['skus'], basket['code'],
+            strategy=basket['strategy'], site_offers=site_offers
+        )
+
+    def _get_products_by_sku(self, partner, skus):
+        products = Product.objects.filter(
+            stockrecords__partner=partner, stockrecords__partner_sku__in=skus
+        ).prefetch_related('stockrecords').distinct()
+
+        products_by_sku = {}
+        for product in products:
+            for stockrecord in product.stockrecords.all():
+                if stockrecord.partner_id == partner.id:
+                    products_by_sku[stockrecord.partner_sku] = product
+        return products_by_sku
+
+    def post(self, request):
+        """ Calculate the totals of several baskets.
+
+        Each basket is calculated the same way as by the basket calculate API. Every basket must
+        provide either a username or is_anonymous.
+
+        Body:
+            baskets (list): Baskets to calculate, each one a dict with
+                skus (list): SKUs of the products in the basket.
+                code (string): Optional voucher code to apply to the basket.
+                username (string): Optional username of a user for which to calculate the basket.
+                is_anonymous (bool): Optional, whether to calculate the basket for an anonymous user.
+
+        Returns:
+            JSON: {
+                    'results': [
+                        {
+                            'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+                            'total_incl_tax': basket.total_incl_tax,
+                            'currency': basket.currency
+                        },
+                        {
+                            'error': 'Products with SKU(s) [...] do not exist.'
+                        },
+                        ...
+                    ]
+                }
+
+            The results are in the same order as the requested baskets.
+        """
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+
+        requested_baskets = request.data.get('baskets') if isinstance(request.data, dict) else None
+        if not requested_baskets or not isinstance(requested_baskets, list):
+            return HttpResponseBadRequest(_('No baskets provided.'))
+        if len(requested_baskets) > settings.BASKET_CALCULATE_BULK_MAX_BASKETS:
+            return HttpResponseBadRequest(
+                _('No more than {count} baskets can be calculated at once.').format(
+                    count=settings.BASKET_CALCULATE_BULK_MAX_BASKETS
+                )
+            )
+
+        baskets = []
+        owners = {}
+        for requested_basket in requested_baskets:
+            skus = requested_basket.get('skus') if isinstance(requested_basket, dict) else None
+            if not skus or not isinstance(skus, list):
+                return HttpResponseBadRequest(_('No SKUs provided.'))
+
+            requested_username = requested_basket.get('username') or ''
+            is_anonymous = unicode(requested_basket.get('is_anonymous', 'false')).lower() == 'true'
+            if not requested_username and not is_anonymous:
+                return HttpResponseBadRequest(_('Provide username or is_anonymous for every basket.'))
+
+            owner_key = (requested_username.lower(), is_anonymous)
+            if owner_key not in owners:
+                owners[owner_key] = self._get_basket_owner(request, requested_username, is_anonymous)
+            basket_owner, error_response = owners[owner_key]
+            if error_response:
+                return error_response
+
+            baskets.append({
+                'skus': sorted(skus),
+                'code': requested_basket.get('code') or None,
+                'owner': basket_owner,
+            })
+
+        partner = get_partner_for_site(request)
+        products_by_sku = self._get_products_by_sku(partner, {sku for basket in baskets for sku in basket['skus']})
+        # Voucher codes are stored upper case, and looked up regardless of case, as the single calculate view does.
+        codes = {basket['code'].upper() for basket in baskets if basket['code']}
+        vouchers_by_code = {voucher.code.upper(): voucher for voucher in Voucher.objects.filter(code__in=codes)}
+        strategies = {}
+
+        results = [None] * len(baskets)
+        pending = []
+        for index, basket in enumerate(baskets):
+            skus = basket['skus']
+            basket['products'] = list(OrderedDict(
+                (products_by_sku[sku].id, products_by_sku[sku]) for sku in skus if sku in products_by_sku
+            ).values())
+            if not basket['products']:
+                results[index] = {
+                    'error': _('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus))
+                }
+                continue
+
+            if basket['owner'] is None:
+                basket['cache_key'] = self._get_anonymous_cache_key(request, skus, basket['code'])
+                cached_response = TieredCache.get_cached_response(basket['cache_key'])
+                if cached_response.is_found:
+                    results[index] = cached_response.value
+                    continue
+
+            owner = basket['owner']
+            owner_id = owner.id if owner else None
+            if owner_id not in strategies:
+                strategies[owner_id] = Selector().strategy(user=owner, request=request)
+            basket['strategy'] = strategies[owner_id]
+            basket['voucher'] = vouchers_by_code.get(basket['code'].upper()) if basket['code'] else None
+            pending.append(index)
+
+        if pending:
+            site_offers = list(Applicator().get_site_offers())
+            tasks = [(request, baskets[index], site_offers) for index in pending]
+            max_workers = settings.BASKET_CALCULATE_BULK_MAX_WORKERS
+
+            if max_workers <= 1 or len(tasks) <= 1:
+                responses = [self._calculate_basket(*task) for task in tasks]
+            else:
+                current_request = get_current_request() or request
+                pool = ThreadPool(min(max_workers, len(tasks)))
+                try:
+                    responses = pool.map(self._calculate_in_thread, [(current_request, task) for task in tasks])
+                finally:
+                    pool.terminate()
+
+            for index, response in zip(pending, responses):
+                results[index] = response
+                if baskets[index]['owner'] is None:
+                    TieredCache.set_all_tiers(
+                        baskets[index]['cache_key'], response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT
+                    )
+
+        return Response({'results': results})
@@ -21,7 +21,12 @@ from ecommerce.coupons.utils import prepare_course_seat_types
 from ecommerce.enterprise.constants import ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH
 from ecommerce.extensions.api import data as data_api
 from ecommerce.extensions.api.filters import ProductFilter
-from ecommerce.extensions.api.serializers import CategorySerializer, CouponListSerializer, CouponSerializer
+from ecommerce.extensions.api.serializers import (
+    CategorySerializer,
+    CouponListSerializer,
+    CouponSerializer,
+    annotate_coupons
+)
 from ecommerce.extensions.basket.utils import prepare_basket
 from ecommerce.extensions.catalogue.utils import create_coupon_product, get_or_create_catalog
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
@@ -65,10 +70,12 @@ class CouponViewSet(EdxOrderPlacementMixin, viewsets.ModelViewSet):
         # If we have switched to using enterprise offers, ensure that enterprise coupons do not show up
         # in the regular coupon list view
         if waffle.switch_is_active(ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH):
-            return product_filter.exclude(
+            product_filter = product_filter.exclude(
                 coupon_vouchers__vouchers__offers__condition__enterprise_customer_uuid__isnull=False,
             )
 
+        if self.action == 'list':
+            return annotate_coupons(product_filter)
         return product_filter
 
     def get_serializer_class(self):
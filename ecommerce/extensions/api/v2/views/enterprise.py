@@ -19,7 +19,8 @@ from ecommerce.extensions.api.serializers import (
     CouponSerializer,
     CouponVoucherSerializer,
     EnterpriseCouponListSerializer,
-    EnterpriseCouponOverviewListSerializer
+    EnterpriseCouponOverviewListSerializer,
+    annotate_coupons
 )
 from ecommerce.extensions.api.v2.utils import send_new_codes_notification_email
 from ecommerce.extensions.api.v2.views.coupons import CouponViewSet
@@ -61,15 +62,19 @@ class EnterpriseCouponViewSet(CouponViewSet):
             invoices = Invoice.objects.filter(business_client__enterprise_customer_uuid=enterprise_id)
         else:
             invoices = Invoice.objects.filter(business_client__enterprise_customer_uuid__isnull=False)
-        orders = Order.objects.filter(id__in=[invoice.order_id for invoice in invoices])
-        basket_lines = Line.objects.filter(basket_id__in=[order.basket_id for order in orders])
-        return Product.objects.filter(
+        orders = Order.objects.filter(id__in=invoices.values('order_id'))
+        basket_lines = Line.objects.filter(basket_id__in=orders.values('basket_id'))
+        coupons = Product.objects.filter(
             product_class__name=COUPON_PRODUCT_CLASS_NAME,
             stockrecords__partner=self.request.site.siteconfiguration.partner,
-            id__in=[line.product_id for line in basket_lines],
+            id__in=basket_lines.values('product_id'),
             coupon_vouchers__vouchers__offers__condition__enterprise_customer_uuid__isnull=False,
         ).distinct()
 
+        if self.action in ('list', 'overview'):
+            return annotate_coupons(coupons)
+        return coupons
+
     def get_serializer_class(self):
         if self.action == 'list':
             return EnterpriseCouponListSerializer
@@ -1,4 +1,6 @@
 """HTTP endpoints for interacting with refunds."""
+import uuid
+
 from django.contrib.auth import get_user_model
 from oscar.core.loading import get_model
 from rest_framework import generics, status
@@ -13,7 +15,9 @@ from ecommerce.extensions.payment.exceptions import UnSettledTransaction
 from ecommerce.extensions.refund.api import (
     create_refunds,
     create_refunds_for_entitlement,
-    find_orders_associated_with_course
+    create_refunds_in_bulk,
+    find_orders_associated_with_course,
+    find_refundable_lines
 )
 
 Order = get_model('order', 'Order')
@@ -107,6 +111,58 @@ class RefundCreateView(generics.CreateAPIView):
         return Response([], status=status.HTTP_200_OK)
 
 
+class RefundBulkCreateView(generics.CreateAPIView):
+    """Creates refunds for many enrollments at once.
+
+    Given a course ID, this view refunds every un-refunded line associated with the course in
+    COMPLETE orders, for all users. Given a list of enrollments instead, only the lines of those
+    users and courses are refunded. Refunds are created with bulk inserts, one per order, and left
+    Open, sharing a batch ID. Credit is not issued from the request: the refunds are approved with
+    the approve_refunds management command, given the returned batch ID:
+    approve_refunds --batch-id=<batch ID> --statuses=Open. Refunds whose approval is interrupted
+    while credit is being issued are left Payment Refund Pending, and must be resolved with
+    approve_refunds --resolve-pending.
+
+    Only staff users are permitted to use this view.
+
+    If refunds are created, the batch ID and a list of the refund IDs will be returned along with HTTP 201.
+    If no refunds are created, HTTP 200 will be returned.
+    """
+    permission_classes = (IsAuthenticated, IsAdminUser,)
+
+    def get_serializer(self):
+        pass
+
+    def create(self, request, *args, **kwargs):
+        """
+        Creates refunds, if eligible order lines exist.
+
+        Arguments:
+            course_id (string): The course for which to refund all users.
+            enrollments (list): Objects with a username and course_id, used if course_id is not given.
+
+        Returns:
+            batch_id (string): Batch ID of the refunds created, or None if no refunds were created
+            refund_ids (list): IDs of the refunds created
+        """
+        course_id = request.data.get('course_id')
+        enrollments = request.data.get('enrollments') or []
+
+        try:
+            enrollments = [(enrollment['username'], enrollment['course_id']) for enrollment in enrollments]
+            lines = find_refundable_lines(course_id=course_id, enrollments=enrollments)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise BadRequestException('A course_id or a list of enrollments with username and course_id is required.')
+
+        batch_id = uuid.uuid4()
+        refund_ids = create_refunds_in_bulk(lines, batch_id=batch_id)
+
+        if refund_ids:
+            return Response({'batch_id': str(batch_id), 'refund_ids': refund_ids}, status=status.HTTP_201_CREATED)
+
+        return Response({'batch_id': None, 'refund_ids': []}, status=status.HTTP_200_OK)
+
+
 class RefundProcessView(generics.UpdateAPIView):
     """Process--approve or deny--refunds.
 
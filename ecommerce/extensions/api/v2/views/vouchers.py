@@ -145,8 +145,7 @@ class VoucherViewSet(NonDestroyableModelViewSet):
         for seat_type in course_seat_types.split(','):
             products.extend(Product.objects.filter(
                 course_id__in=course_run_metadata.keys(),
-                attributes__name='certificate_type',
-                attribute_values__value_text=seat_type
+                attribute_index__certificate_type=seat_type
             ))
         stock_records = StockRecord.objects.filter(product__in=products)
         return products, stock_records, course_run_metadata
@@ -181,7 +180,9 @@ class VoucherViewSet(NonDestroyableModelViewSet):
                         continue
                 else:
                     continue
-                credit_seats = Product.objects.filter(parent=product.parent, attributes__name='credit_provider')
+                credit_seats = Product.objects.filter(
+                    parent=product.parent, attribute_index__credit_provider__isnull=False
+                )
 
                 if credit_seats.count() > 1:
                     multiple_credit_providers = True
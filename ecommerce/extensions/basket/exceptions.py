@@ -0,0 +1,3 @@
+class InMemoryBasketSaveError(Exception):
+    """ Raised when an in-memory basket, which must never be written to the database, is saved. """
+    pass
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 07:26
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basket', '0011_add_email_basket_attribute_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InMemoryBasket',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+            },
+            bases=('basket.basket',),
+        ),
+    ]
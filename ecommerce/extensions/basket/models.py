@@ -2,10 +2,12 @@ from django.db import models
 from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from oscar.apps.basket.abstract_models import AbstractBasket
-from oscar.core.loading import get_class
+from oscar.apps.offer import results
+from oscar.core.loading import get_class, get_model
 
 from ecommerce.extensions.analytics.utils import track_segment_event, translate_basket_line_for_segment
 from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
+from ecommerce.extensions.basket.exceptions import InMemoryBasketSaveError
 
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 Selector = get_class('partner.strategy', 'Selector')
@@ -98,6 +100,101 @@ class Basket(AbstractBasket):
             num_lines=self.num_lines)
 
 
+class InMemoryBasket(Basket):
+    """
+    Basket whose lines and vouchers are only kept in memory.
+
+    Used to price products, e.g. by the basket calculate API, without writing a basket, its lines
+    and its vouchers to the database only to roll them back. These baskets cannot be saved.
+    """
+
+    class Meta(object):
+        proxy = True
+
+    def __init__(self, *args, **kwargs):
+        super(InMemoryBasket, self).__init__(*args, **kwargs)
+        self._lines = []
+        self._voucher_ids = []
+
+    def save(self, *args, **kwargs):
+        raise InMemoryBasketSaveError('In-memory baskets cannot be saved.')
+
+    def all_lines(self):
+        return self._lines
+
+    def add_product(self, product, quantity=1, options=None):
+        """
+        Add the indicated product to the basket, without saving the line.
+
+        Mirrors AbstractBasket.add_product, which saves the basket and its lines. Options are not
+        supported, and no analytics events are fired.
+        """
+        if options:
+            raise ValueError('In-memory baskets do not support product options.')
+
+        price_currency = self.currency
+        stock_info = self.strategy.fetch_for_product(product)
+        if price_currency and stock_info.price.currency != price_currency:
+            raise ValueError((
+                'Basket lines must all have the same currency. Proposed line has currency {}, '
+                'while basket has currency {}').format(stock_info.price.currency, price_currency))
+
+        if stock_info.stockrecord is None:
+            raise ValueError(
+                'Basket lines must all have stock records. Strategy has not found any stock record for product {}'
+                .format(product))
+
+        line_reference = self._create_line_reference(product, stock_info.stockrecord, [])
+        for line in self._lines:
+            if line.line_reference == line_reference:
+                line.quantity = max(0, line.quantity + quantity)
+                self.reset_offer_applications()
+                return line, False
+
+        line = get_model('basket', 'Line')(
+            basket=self,
+            line_reference=line_reference,
+            product=product,
+            stockrecord=stock_info.stockrecord,
+            quantity=quantity,
+            price_excl_tax=stock_info.price.excl_tax,
+            price_currency=stock_info.price.currency,
+            price_incl_tax=stock_info.price.incl_tax if stock_info.price.is_tax_known else None,
+        )
+        self._lines.append(line)
+        self.reset_offer_applications()
+        return line, True
+
+    def reset_offer_applications(self):
+        """
+        Remove any discounts so they get recalculated.
+
+        AbstractBasket reloads the lines from the database instead, which would drop them here.
+        """
+        self.offer_applications = results.OfferApplications()
+        for line in self._lines:
+            line.clear_discount()
+
+    def add_voucher(self, voucher):
+        self._voucher_ids.append(voucher.id)
+
+    @property
+    def vouchers(self):
+        return get_model('voucher', 'Voucher').objects.filter(id__in=self._voucher_ids)
+
+    @property
+    def is_empty(self):
+        return not self._lines
+
+    @property
+    def num_lines(self):
+        return len(self._lines)
+
+    @property
+    def num_items(self):
+        return sum(line.quantity for line in self._lines)
+
+
 class BasketAttributeType(models.Model):
     """
     Used to keep attribute types for BasketAttribute
@@ -1,6 +1,8 @@
 import itertools
 
 import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from oscar.core.loading import get_class, get_model
 from oscar.test import factories
@@ -10,6 +12,7 @@ from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.analytics.utils import parse_tracking_context, translate_basket_line_for_segment
 from ecommerce.extensions.api.v2.tests.views.mixins import CatalogMixin
 from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
+from ecommerce.extensions.basket.exceptions import InMemoryBasketSaveError
 from ecommerce.extensions.basket.models import Basket
 from ecommerce.extensions.basket.tests.mixins import BasketMixin
 from ecommerce.extensions.test.factories import create_basket
@@ -17,7 +20,9 @@ from ecommerce.tests.factories import SiteConfigurationFactory
 from ecommerce.tests.testcases import TestCase
 
 Basket = get_model('basket', 'Basket')
+InMemoryBasket = get_model('basket', 'InMemoryBasket')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
+Selector = get_class('partner.strategy', 'Selector')
 
 
 class BasketTests(CatalogMixin, BasketMixin, TestCase):
@@ -198,3 +203,51 @@ class BasketTests(CatalogMixin, BasketMixin, TestCase):
         seat = course.create_or_update_seat('verified', True, 100)
         basket.add_product(seat)
         return basket
+
+
+class InMemoryBasketTests(TestCase):
+    def setUp(self):
+        super(InMemoryBasketTests, self).setUp()
+        self.basket = InMemoryBasket(owner=self.create_user(), site=self.site)
+        self.basket.strategy = Selector().strategy()
+        course = CourseFactory(partner=self.partner)
+        self.seat = course.create_or_update_seat('verified', True, 100)
+
+    def test_add_product(self):
+        """ Verify products are added to the basket lines without writing to the database. """
+        with mock.patch('ecommerce.extensions.basket.models.track_segment_event') as mock_track:
+            with CaptureQueriesContext(connection) as context:
+                line, created = self.basket.add_product(self.seat)
+                self.basket.add_product(self.seat)
+
+            mock_track.assert_not_called()
+
+        self.assertTrue(created)
+        self.assertEqual(self.basket.all_lines(), [line])
+        self.assertEqual(line.quantity, 2)
+        self.assertEqual(self.basket.num_lines, 1)
+        self.assertEqual(self.basket.num_items, 2)
+        self.assertFalse(self.basket.is_empty)
+        self.assertEqual(self.basket.total_incl_tax, 200)
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in context.captured_queries))
+        self.assertFalse(Basket.objects.exists())
+
+    def test_add_product_with_options(self):
+        """ Verify product options are not supported. """
+        with self.assertRaises(ValueError):
+            self.basket.add_product(self.seat, options=[{'option': 'option', 'value': 'value'}])
+
+    def test_add_voucher(self):
+        """ Verify vouchers are only linked to the basket in memory. """
+        voucher = factories.VoucherFactory()
+
+        self.assertFalse(self.basket.vouchers.exists())
+        self.basket.add_voucher(voucher)
+        self.assertEqual(list(self.basket.vouchers.all()), [voucher])
+        self.assertFalse(Basket.vouchers.through.objects.exists())
+
+    def test_save(self):
+        """ Verify the basket cannot be saved. """
+        self.assertTrue(self.basket.is_empty)
+        with self.assertRaises(InMemoryBasketSaveError):
+            self.basket.save()
@@ -23,6 +23,7 @@ from ecommerce.extensions.basket.utils import (
     apply_voucher_on_basket_and_check_discount,
     attribute_cookie_data,
     get_basket_switch_data,
+    prefetch_product_data,
     prepare_basket
 )
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
@@ -471,6 +472,24 @@ class BasketUtilsTests(DiscoveryTestMixin, BasketMixin, TestCase):
         __, partner_sku = get_basket_switch_data(entitlement)
         self.assertIsNone(partner_sku)
 
+    def test_prefetch_product_data(self):
+        """Verify the product classes and attributes of several products are loaded up front."""
+        course, seat, enrollment_code = self.prepare_course_seat_and_enrollment_code()
+        entitlement = create_or_update_course_entitlement(
+            'verified', 100, self.partner, 'foo-bar', 'Foo Bar Entitlement')
+        products = list(Product.objects.filter(id__in=[seat.id, enrollment_code.id, entitlement.id]).order_by('id'))
+
+        prefetch_product_data(products)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(products[0].is_seat_product)
+            self.assertEqual(products[0].attr.course_key, course.id)
+            self.assertEqual(products[0].attr.certificate_type, 'verified')
+            self.assertTrue(products[1].is_enrollment_code_product)
+            self.assertEqual(products[1].attr.seat_type, 'verified')
+            self.assertTrue(products[2].is_course_entitlement_product)
+            self.assertEqual(products[2].attr.UUID, 'foo-bar')
+
     def test_basket_switch_data_for_non_course_run_products(self):
         """
         Verify that no basket switch data is retrieved for product classes that
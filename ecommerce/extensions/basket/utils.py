@@ -9,6 +9,7 @@ import waffle
 from django.conf import settings
 from django.contrib import messages
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.utils.translation import ugettext_lazy as _
 from oscar.apps.basket.signals import voucher_addition
 from oscar.core.loading import get_class, get_model
@@ -152,6 +153,24 @@ def get_basket_switch_data(product):
     return switch_link_text, partner_sku
 
 
+def prefetch_product_data(products):
+    """
+    Loads the product classes and attribute values of several products with a handful of queries.
+
+    Product classes are otherwise loaded separately for each product, and its parent, and attribute
+    values are loaded separately the first time product.attr is used.
+
+    Arguments:
+        products (list): Products to load the data of.
+    """
+    prefetch_related_objects(products, 'product_class', 'parent__product_class', 'attribute_values__attribute')
+    for product in products:
+        # Mirrors ProductAttributesContainer.initiate_attributes, which ignores prefetched values.
+        for attribute_value in product.attribute_values.all():
+            setattr(product.attr, attribute_value.attribute.code, attribute_value.value)
+        product.attr.initialised = True
+
+
 @newrelic.agent.function_trace()
 def _find_seat_enrollment_toggle_sku(product, target_structure):
     """
@@ -167,10 +186,11 @@ def _find_seat_enrollment_toggle_sku(product, target_structure):
     """
 
     # Note: This query filter will not perform well with products that do not have a course_id
-    stock_records = StockRecord.objects.filter(
+    stock_records = list(StockRecord.objects.filter(
         product__course_id=product.course_id,
         product__structure=target_structure
-    )
+    ).select_related('product'))
+    prefetch_product_data([stock_record.product for stock_record in stock_records])
 
     # Determine the proper partner SKU to embed in the single/multiple basket switch link
     # The logic here is a little confusing.  "Seat" products have "certificate_type" attributes, and
@@ -21,7 +21,11 @@ from slumber.exceptions import SlumberBaseException
 
 from ecommerce.core.exceptions import SiteConfigurationError
 from ecommerce.core.url_utils import get_lms_course_about_url, get_lms_url
-from ecommerce.courses.utils import get_certificate_type_display_value, get_course_info_from_catalog
+from ecommerce.courses.utils import (
+    cache_course_info_from_catalog,
+    get_certificate_type_display_value,
+    get_course_info_from_catalog
+)
 from ecommerce.enterprise.entitlements import get_enterprise_code_redemption_redirect
 from ecommerce.enterprise.utils import CONSENT_FAILED_PARAM, get_enterprise_customer_from_voucher, has_enterprise_offer
 from ecommerce.extensions.analytics.utils import (
@@ -34,6 +38,7 @@ from ecommerce.extensions.basket.utils import (
     add_utm_params_to_url,
     apply_voucher_on_basket_and_check_discount,
     get_basket_switch_data,
+    prefetch_product_data,
     prepare_basket,
     validate_voucher
 )
@@ -239,6 +244,14 @@ class BasketSummaryView(BasketView):
         is_enrollment_code_purchase = False
         switch_link_text = partner_sku = order_details_msg = None
 
+        lines = list(lines)
+        prefetch_product_data([line.product for line in lines])
+        cache_course_info_from_catalog(self.request.site, [
+            line.product for line in lines
+            if line.product.is_seat_product or line.product.is_course_entitlement_product or
+            line.product.is_enrollment_code_product
+        ])
+
         for line in lines:
             if line.product.is_seat_product or line.product.is_course_entitlement_product:
                 line_data = self._get_course_data(line.product)
@@ -295,9 +308,6 @@ class BasketSummaryView(BasketView):
                     'product_description': line.product.description
                 }
 
-            # Get variables for the switch link that toggles from enrollment codes and seat.
-            switch_link_text, partner_sku = get_basket_switch_data(line.product)
-
             if line.has_discount:
                 benefit = self.request.basket.applied_offers().values()[0].benefit
                 benefit_value = format_benefit_value(benefit)
@@ -305,7 +315,7 @@ class BasketSummaryView(BasketView):
                 benefit_value = None
 
             line_data.update({
-                'sku': line.product.stockrecords.first().partner_sku,
+                'sku': line.stockrecord.partner_sku,
                 'benefit_value': benefit_value,
                 'enrollment_code': line.product.is_enrollment_code_product,
                 'line': line,
@@ -313,6 +323,11 @@ class BasketSummaryView(BasketView):
             })
             lines_data.append(line_data)
 
+        if lines:
+            # Get variables for the switch link that toggles from enrollment codes and seat.
+            # Only the switch link of the last line is displayed.
+            switch_link_text, partner_sku = get_basket_switch_data(lines[-1].product)
+
         context_updates = {
             'display_verification_message': display_verification_message,
             'order_details_msg': order_details_msg,
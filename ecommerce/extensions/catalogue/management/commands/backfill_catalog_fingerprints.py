@@ -0,0 +1,36 @@
+from __future__ import unicode_literals
+
+import logging
+
+from django.core.management import BaseCommand
+
+from ecommerce.extensions.catalogue.utils import update_catalog_fingerprints
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Rebuild the content fingerprints of catalogs."""
+
+    help = 'Recompute the fingerprints used to look up catalogs by partner and stock records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--catalog-ids',
+                            action='store',
+                            dest='catalog_ids',
+                            default=None,
+                            help='Comma-separated list of catalog IDs to update. Defaults to all catalogs.')
+        parser.add_argument('--batch-size',
+                            action='store',
+                            dest='batch_size',
+                            default=1000,
+                            type=int,
+                            help='Number of catalogs processed per batch.')
+
+    def handle(self, *args, **options):
+        catalog_ids = options['catalog_ids']
+        if catalog_ids:
+            catalog_ids = [int(catalog_id) for catalog_id in catalog_ids.split(',')]
+
+        updated = update_catalog_fingerprints(catalog_ids=catalog_ids, batch_size=options['batch_size'])
+        logger.info('Updated the fingerprints of [%d] catalogs.', updated)
@@ -0,0 +1,36 @@
+from __future__ import unicode_literals
+
+import logging
+
+from django.core.management import BaseCommand
+
+from ecommerce.extensions.catalogue.utils import rebuild_product_attribute_index
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Rebuild the denormalized product attribute index."""
+
+    help = 'Rebuild the ProductAttributeIndex rows from product attribute values.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product-ids',
+                            action='store',
+                            dest='product_ids',
+                            default=None,
+                            help='Comma-separated list of product IDs to rebuild. Defaults to all products.')
+        parser.add_argument('--batch-size',
+                            action='store',
+                            dest='batch_size',
+                            default=1000,
+                            type=int,
+                            help='Number of products processed per batch.')
+
+    def handle(self, *args, **options):
+        product_ids = options['product_ids']
+        if product_ids:
+            product_ids = [int(product_id) for product_id in product_ids.split(',')]
+
+        written = rebuild_product_attribute_index(product_ids=product_ids, batch_size=options['batch_size'])
+        logger.info('Rebuilt [%d] product attribute index rows.', written)
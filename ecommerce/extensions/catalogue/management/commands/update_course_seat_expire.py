@@ -1,17 +1,27 @@
 from __future__ import unicode_literals
 
 import logging
-import time
+from collections import defaultdict
+from functools import partial
+from multiprocessing.pool import ThreadPool
 
 from dateutil import parser
 from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
 from edx_rest_api_client.client import EdxRestApiClient
+from oscar.core.loading import get_model
 from slumber.exceptions import HttpClientError
 
+from ecommerce.core.api_clients import create_session
+from ecommerce.core.rate_limit import RateLimiter, get_retry_after
 from ecommerce.core.url_utils import get_lms_url
 from ecommerce.courses.models import Course
 
 logger = logging.getLogger(__name__)
+Product = get_model('catalogue', 'Product')
+
+# Maximum number of seats updated by a single UPDATE statement.
+UPDATE_BATCH_SIZE = 1000
 
 
 class Command(BaseCommand):
@@ -22,8 +32,9 @@ class Command(BaseCommand):
     ch = logging.StreamHandler()
     ch.setLevel(logging.DEBUG)
     logger.addHandler(ch)
-    enrollment_date_not_found = set()
+    seats_to_update = ['honor', 'audit', 'no-id-professional', 'professional']
     pause_time = 5
+    max_delay = 60
     max_tries = 5
 
     def add_arguments(self, par):
@@ -33,86 +44,165 @@ class Command(BaseCommand):
                          default=False,
                          help='Save the data to the database. If this is not set, '
                               'expires date will not be updated')
+        par.add_argument('--dry_run',
+                         action='store_true',
+                         dest='dry_run',
+                         default=False,
+                         help='Log the seats whose expires date would change, and the change, without updating them.')
+        par.add_argument('--page_size',
+                         action='store',
+                         dest='page_size',
+                         default=100,
+                         type=int,
+                         help='Number of courses retrieved from the LMS courses API per page.')
+        par.add_argument('--workers',
+                         action='store',
+                         dest='workers',
+                         default=4,
+                         type=int,
+                         help='Number of pages of the LMS courses API retrieved at the same time.')
 
     def handle(self, *args, **options):
-        seats_to_update = ['honor', 'audit', 'no-id-professional', 'professional']
-        save_to_db = options.get('commit', False)
-        courses_enrollment_info = self._get_courses_enrollment_info()
-
-        if not courses_enrollment_info:
+        if options['page_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--page_size and --workers must be at least 1.')
+
+        self.page_size = options['page_size']
+        self.workers = options['workers']
+        self.rate_limiter = RateLimiter(backoff=self.pause_time, max_backoff=self.max_delay)
+        save_to_db = options.get('commit', False) and not options['dry_run']
+
+        # Retrieve the seats to update up front, so that they can be matched with the courses as pages arrive.
+        course_ids = set(Course.objects.values_list('id', flat=True))
+        seats_by_course = defaultdict(list)
+        seats = Product.objects.filter(
+            course__isnull=False,
+            structure=Product.CHILD,
+            attribute_index__certificate_type__in=self.seats_to_update
+        ).order_by('id').values_list('id', 'course_id', 'expires')
+        for seat_id, course_id, expires in seats:
+            seats_by_course[course_id].append((seat_id, expires))
+
+        courses_by_enrollment_end = defaultdict(list)
+        courses_found = 0
+        for enrollment_info in self._iter_courses_enrollment_info():
+            for course_id, enrollment_end in enrollment_info.items():
+                courses_found += 1
+                if course_id in course_ids and enrollment_end:
+                    courses_by_enrollment_end[enrollment_end].append(course_id)
+
+        if not courses_found:
             msg = 'No course enrollment information found.'
             logger.error(msg)
             raise CommandError(msg)
 
-        courses = Course.objects.all().order_by('id')
-        logger.info('[%d] courses found for update.', courses.count())
-
-        for course in courses:
-            enrollment_end_date = courses_enrollment_info.get(course.id)
-
-            # Only proceed if course enrollment information is present
-            if not enrollment_end_date:
-                logger.error('Enrollment missing for course [%s]', course.id)
-                continue
+        logger.info('[%d] courses found for update.', len(course_ids))
+
+        # Courses without an enrollment end date, or missing from the API, are not updated.
+        for course_id in sorted(course_ids.difference(*courses_by_enrollment_end.values())):
+            logger.error('Enrollment missing for course [%s]', course_id)
+
+        if not (save_to_db or options['dry_run']):
+            return
+
+        seats_updated = 0
+        for enrollment_end, group_course_ids in sorted(courses_by_enrollment_end.items()):
+            expires = parser.parse(enrollment_end)
+            if timezone.is_naive(expires):
+                expires = timezone.make_aware(expires)
+            seat_ids = []
+            for course_id in sorted(group_course_ids):
+                changed = [seat for seat in seats_by_course[course_id] if seat[1] != expires]
+                seat_ids.extend(seat_id for seat_id, __ in changed)
+                if options['dry_run'] and changed:
+                    logger.info(
+                        'Would change expiration date of [%s] seats from [%s] to [%s].',
+                        course_id,
+                        ', '.join('{}: {}'.format(seat_id, seat_expires) for seat_id, seat_expires in changed),
+                        expires
+                    )
 
-            if save_to_db:
-                course_seats = course.seat_products.filter(
-                    attributes__name='certificate_type',
-                    attribute_values__value_text__in=seats_to_update
-                )
-                expires = parser.parse(enrollment_end_date)
-                course_seats.update(expires=expires)
+            if save_to_db and seat_ids:
+                for start in range(0, len(seat_ids), UPDATE_BATCH_SIZE):
+                    Product.objects.filter(id__in=seat_ids[start:start + UPDATE_BATCH_SIZE]).update(expires=expires)
                 logger.info(
-                    'Updated expiration date for [%s] seats: [%s]',
-                    course.id,
-                    ', '.join([str(seat.id) for seat in course_seats]),
+                    'Updated expiration date of [%d] seats of [%d] courses to [%s].',
+                    len(seat_ids), len(group_course_ids), expires
                 )
+            seats_updated += len(seat_ids)
 
-    def _get_courses_enrollment_info(self):
+        logger.info(
+            '%s expiration date of [%d] seats.', 'Updated' if save_to_db else 'Would update', seats_updated
+        )
+
+    def _fetch_page(self, api, page):
         """
-        Retrieve the enrollment information for all the courses.
+        Retrieves a page of the LMS courses API, retrying up to max_tries times when rate limited.
 
         Returns:
-            Dictionary representing the key-value pair (course_key, enrollment_end) of course.
+            Dictionary representing the key-value pair (course_key, enrollment_end) of the courses of the page,
+            and the pagination of the response.
         """
-        def _parse_response(api_response):
-            response_data = api_response.get('results', [])
+        throttling_attempts = 0
+        while True:
+            self.rate_limiter.wait()
+            try:
+                response = api.courses().get(page=page, page_size=self.page_size)
+            except HttpClientError as exc:
+                # this is a known limitation; If we get HTTP429, we need to pause execution for a few seconds
+                # before re-requesting the data. raise any other errors
+                if exc.response.status_code != 429 or throttling_attempts >= self.max_tries:
+                    raise
 
+                delay = self.rate_limiter.throttled(get_retry_after(exc.response))
+                throttling_attempts += 1
+                logger.warning(
+                    'API calls are being rate-limited. Retrying page [%d] in [%s] seconds, attempt [%d] of [%d].',
+                    page, delay, throttling_attempts, self.max_tries
+                )
+                continue
+
+            self.rate_limiter.succeeded()
             # Map course_id with enrollment end date.
             courses_enrollment = dict(
                 (course_info['course_id'], course_info['enrollment_end'])
-                for course_info in response_data
+                for course_info in response.get('results', [])
             )
-            return courses_enrollment, api_response['pagination'].get('next', None)
+            return courses_enrollment, response.get('pagination') or {}
 
-        querystring = {'page_size': 50}
-        api = EdxRestApiClient(get_lms_url('api/courses/v1/'))
-        course_enrollments = {}
+    def _iter_courses_enrollment_info(self):
+        """
+        Retrieve the enrollment information for all the courses, one page at a time.
 
-        page = 0
-        throttling_attempts = 0
-        next_page = True
-        while next_page:
-            page += 1
-            querystring['page'] = page
+        The pages after the first are retrieved concurrently when the API tells how many pages there are,
+        and are yielded in the order they are retrieved.
+
+        Yields:
+            Dictionary representing the key-value pair (course_key, enrollment_end) of the courses of a page.
+        """
+        api = EdxRestApiClient(get_lms_url('api/courses/v1/'), session=create_session(self.workers))
+        enrollment_info, pagination = self._fetch_page(api, 1)
+        yield enrollment_info
+
+        num_pages = pagination.get('num_pages')
+        if not num_pages:
+            # Without the number of pages, follow the next links.
+            page = 1
+            while pagination.get('next'):
+                page += 1
+                enrollment_info, pagination = self._fetch_page(api, page)
+                yield enrollment_info
+            return
+
+        pages = range(2, num_pages + 1)
+        if self.workers > 1 and len(pages) > 1:
+            pool = ThreadPool(min(self.workers, len(pages)))
             try:
-                response = api.courses().get(**querystring)
-                throttling_attempts = 0
-            except HttpClientError as exc:
-                # this is a known limitation; If we get HTTP429, we need to pause execution for a few seconds
-                # before re-requesting the data. raise any other errors
-                if exc.response.status_code == 429 and throttling_attempts < self.max_tries:
-                    logger.warning(
-                        'API calls are being rate-limited. Waiting for [%d] seconds before retrying...',
-                        self.pause_time
-                    )
-                    time.sleep(self.pause_time)
-                    page -= 1
-                    throttling_attempts += 1
-                    logger.info('Retrying [%d]...', throttling_attempts)
-                    continue
-                else:
-                    raise
-            enrollment_info, next_page = _parse_response(response)
-            course_enrollments.update(enrollment_info)
-        return course_enrollments
+                for enrollment_info, __ in pool.imap_unordered(partial(self._fetch_page, api), pages):
+                    yield enrollment_info
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for page in pages:
+                enrollment_info, __ = self._fetch_page(api, page)
+                yield enrollment_info
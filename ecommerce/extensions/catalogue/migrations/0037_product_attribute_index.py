@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 08:08
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0036_coupon_notify_email_attribute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAttributeIndex',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attribute_index', serialize=False, to='catalogue.Product')),
+                ('course_key', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('certificate_type', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('id_verification_required', models.NullBooleanField(db_index=True)),
+                ('credit_provider', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('seat_type', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# Maps each indexed attribute code to the ProductAttributeValue field holding its value.
+INDEXED_ATTRIBUTES = {
+    'certificate_type': 'value_text',
+    'course_key': 'value_text',
+    'credit_provider': 'value_text',
+    'id_verification_required': 'value_boolean',
+    'seat_type': 'value_text',
+}
+BATCH_SIZE = 1000
+
+
+def backfill_product_attribute_index(apps, schema_editor):
+    """Index the attributes of existing products."""
+    ProductAttributeIndex = apps.get_model('catalogue', 'ProductAttributeIndex')
+    ProductAttributeValue = apps.get_model('catalogue', 'ProductAttributeValue')
+
+    attribute_values = ProductAttributeValue.objects.filter(attribute__code__in=INDEXED_ATTRIBUTES.keys())
+    product_ids = list(attribute_values.order_by('product_id').values_list('product_id', flat=True).distinct())
+
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        batch = product_ids[start:start + BATCH_SIZE]
+        rows = {product_id: ProductAttributeIndex(product_id=product_id) for product_id in batch}
+        values = attribute_values.filter(product_id__in=batch).values_list(
+            'product_id', 'attribute__code', 'value_text', 'value_boolean'
+        )
+        for product_id, code, value_text, value_boolean in values:
+            value = value_boolean if INDEXED_ATTRIBUTES[code] == 'value_boolean' else value_text
+            setattr(rows[product_id], code, value)
+
+        ProductAttributeIndex.objects.filter(product_id__in=batch).delete()
+        ProductAttributeIndex.objects.bulk_create(rows.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0037_product_attribute_index')
+    ]
+    operations = [
+        migrations.RunPython(backfill_product_attribute_index, migrations.RunPython.noop)
+    ]
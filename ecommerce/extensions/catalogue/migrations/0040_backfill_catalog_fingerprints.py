@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+from collections import defaultdict
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def get_fingerprint(partner_id, stock_record_ids):
+    """Returns the fingerprint of a catalog of the given partner and stock records, as Catalog.get_fingerprint."""
+    content = '{}:{}'.format(partner_id, ','.join(str(pk) for pk in sorted(set(stock_record_ids))))
+    return hashlib.sha256(content).hexdigest()
+
+
+def backfill_catalog_fingerprints(apps, schema_editor):
+    """Fingerprint the content of existing catalogs."""
+    Catalog = apps.get_model('catalogue', 'Catalog')
+    CatalogStockRecords = Catalog.stock_records.through
+
+    catalogs = list(Catalog.objects.order_by('id').values_list('id', 'partner_id'))
+    for start in range(0, len(catalogs), BATCH_SIZE):
+        batch = catalogs[start:start + BATCH_SIZE]
+
+        stock_record_ids = defaultdict(list)
+        for catalog_id, stock_record_id in CatalogStockRecords.objects.filter(
+                catalog_id__in=[catalog_id for catalog_id, __ in batch]
+        ).values_list('catalog_id', 'stockrecord_id'):
+            stock_record_ids[catalog_id].append(stock_record_id)
+
+        for catalog_id, partner_id in batch:
+            Catalog.objects.filter(id=catalog_id).update(
+                fingerprint=get_fingerprint(partner_id, stock_record_ids[catalog_id])
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0039_catalog_fingerprint')
+    ]
+    operations = [
+        migrations.RunPython(backfill_catalog_fingerprints, migrations.RunPython.noop)
+    ]
@@ -1,3 +1,5 @@
+import hashlib
+
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.db import models
@@ -99,10 +101,62 @@ def update_enrollment_code(sender, **kwargs):  # pylint: disable=unused-argument
         instance.original_expires = instance.expires
 
 
+class ProductAttributeIndex(models.Model):
+    """
+    Denormalized copy of the product attributes used to look up products.
+
+    Oscar stores product attributes as rows of ProductAttributeValue, so filtering products by
+    course key or certificate type requires a join per attribute. This model keeps those
+    attributes in indexed columns, one row per product. Rows are kept in sync by the receivers
+    in ecommerce.extensions.catalogue.signals, and can be rebuilt with the
+    backfill_product_attribute_index management command.
+    """
+    # Maps each indexed attribute code to the ProductAttributeValue field holding its value.
+    # Column names match the attribute codes.
+    INDEXED_ATTRIBUTES = {
+        'certificate_type': 'value_text',
+        'course_key': 'value_text',
+        'credit_provider': 'value_text',
+        'id_verification_required': 'value_boolean',
+        'seat_type': 'value_text',
+    }
+
+    product = models.OneToOneField(
+        'catalogue.Product', primary_key=True, related_name='attribute_index', on_delete=models.CASCADE
+    )
+    course_key = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    certificate_type = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    id_verification_required = models.NullBooleanField(db_index=True)
+    credit_provider = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    seat_type = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+
+    def __unicode__(self):
+        return u'{product_id}: {course_key}-{certificate_type}'.format(
+            product_id=self.product_id,
+            course_key=self.course_key,
+            certificate_type=self.certificate_type
+        )
+
+
 class Catalog(models.Model):
     name = models.CharField(max_length=255)
     partner = models.ForeignKey('partner.Partner', related_name='catalogs', on_delete=models.CASCADE)
     stock_records = models.ManyToManyField('partner.StockRecord', blank=True, related_name='catalogs')
+    # Hash of the partner and stock records of the catalog, used to find the catalogs with the same content.
+    # Kept up to date by the receivers in ecommerce.extensions.catalogue.signals, and can be rebuilt with the
+    # backfill_catalog_fingerprints management command.
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
+    @staticmethod
+    def get_fingerprint(partner_id, stock_record_ids):
+        """Returns the fingerprint of a catalog of the given partner and stock records."""
+        content = '{}:{}'.format(partner_id, ','.join(str(pk) for pk in sorted(set(stock_record_ids))))
+        return hashlib.sha256(content).hexdigest()
+
+    def update_fingerprint(self):
+        """Stores the fingerprint of the catalog's current partner and stock records."""
+        self.fingerprint = self.get_fingerprint(self.partner_id, self.stock_records.values_list('id', flat=True))
+        Catalog.objects.filter(id=self.id).update(fingerprint=self.fingerprint)
 
     def __unicode__(self):
         return u'{id}: {partner_code}-{catalog_name}'.format(
@@ -0,0 +1,53 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+Catalog = get_model('catalogue', 'Catalog')
+ProductAttributeIndex = get_model('catalogue', 'ProductAttributeIndex')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
+
+
+@receiver(post_save, sender=ProductAttributeValue, dispatch_uid='attribute_index.value_post_save')
+def update_product_attribute_index(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Copies a saved attribute value to the product's ProductAttributeIndex row."""
+    code = instance.attribute.code
+    value_field = ProductAttributeIndex.INDEXED_ATTRIBUTES.get(code)
+    if value_field:
+        ProductAttributeIndex.objects.update_or_create(
+            product_id=instance.product_id,
+            defaults={code: getattr(instance, value_field)}
+        )
+
+
+@receiver(post_delete, sender=ProductAttributeValue, dispatch_uid='attribute_index.value_post_delete')
+def clear_product_attribute_index(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Clears a deleted attribute value from the product's ProductAttributeIndex row."""
+    code = instance.attribute.code
+    if code in ProductAttributeIndex.INDEXED_ATTRIBUTES:
+        ProductAttributeIndex.objects.filter(product_id=instance.product_id).update(**{code: None})
+
+
+@receiver(post_save, sender=Catalog, dispatch_uid='catalog.post_save')
+def update_catalog_fingerprint(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Stores the fingerprint of a saved catalog, whose partner may have changed."""
+    instance.update_fingerprint()
+
+
+@receiver(m2m_changed, sender=Catalog.stock_records.through, dispatch_uid='catalog.stock_records_changed')
+def update_catalog_fingerprints(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Stores the fingerprints of the catalogs whose stock records have changed."""
+    if reverse and action == 'pre_clear':
+        # The catalogs cleared from a stock record are no longer known once they have been cleared.
+        instance._cleared_catalogs = list(instance.catalogs.all())  # pylint: disable=protected-access
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        instance.update_fingerprint()
+        return
+
+    catalogs = Catalog.objects.filter(id__in=pk_set) if pk_set else getattr(instance, '_cleared_catalogs', [])
+    for catalog in catalogs:
+        catalog.update_fingerprint()
@@ -10,6 +10,8 @@ from ecommerce.extensions.voucher.models import CouponVouchers
 from ecommerce.tests.testcases import TestCase
 
 Product = get_model('catalogue', 'Product')
+ProductAttributeIndex = get_model('catalogue', 'ProductAttributeIndex')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
 ProductClass = get_model('catalogue', 'ProductClass')
 
 
@@ -109,3 +111,29 @@ class ProductTests(CouponMixin, DiscoveryTestMixin, TestCase):
 
         exception = ve.exception
         self.assertIn('Notification email must be a valid email address.', exception.message)
+
+
+class ProductAttributeIndexTests(DiscoveryTestMixin, TestCase):
+    def test_index_follows_attribute_values(self):
+        """Verify saving and deleting attribute values keeps the product's index row in sync."""
+        __, seat, enrollment_code = self.create_course_seat_and_enrollment_code(id_verification=True)
+
+        index = ProductAttributeIndex.objects.get(product=seat)
+        self.assertEqual(index.course_key, seat.attr.course_key)
+        self.assertEqual(index.certificate_type, 'verified')
+        self.assertTrue(index.id_verification_required)
+        self.assertIsNone(index.credit_provider)
+        self.assertEqual(ProductAttributeIndex.objects.get(product=enrollment_code).seat_type, 'verified')
+
+        seat.attr.credit_provider = 'MIT'
+        seat.save()
+        self.assertEqual(ProductAttributeIndex.objects.get(product=seat).credit_provider, 'MIT')
+
+        ProductAttributeValue.objects.filter(product=seat, attribute__code='credit_provider').delete()
+        self.assertIsNone(ProductAttributeIndex.objects.get(product=seat).credit_provider)
+
+    def test_index_deleted_with_product(self):
+        """Verify the index row is removed along with its product."""
+        __, seat, __ = self.create_course_seat_and_enrollment_code()
+        seat.delete()
+        self.assertFalse(ProductAttributeIndex.objects.filter(product_id=seat.id).exists())
@@ -16,11 +16,13 @@ from testfixtures import LogCapture
 from ecommerce.core.url_utils import get_lms_url
 from ecommerce.courses.models import Product
 from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.extensions.catalogue.management.commands.update_course_seat_expire import Command
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
 from ecommerce.tests.testcases import TestCase
 
 logger = logging.getLogger(__name__)
-LOGGER_NAME = 'ecommerce.extensions.catalogue.management.commands.update_course_seat_expire'
+COMMAND_MODULE = 'ecommerce.extensions.catalogue.management.commands.update_course_seat_expire'
+LOGGER_NAME = COMMAND_MODULE
 JSON = 'application/json'
 
 
@@ -84,10 +86,12 @@ class UpdateSeatExpireDateTests(DiscoveryTestMixin, TestCase):
             (
                 LOGGER_NAME,
                 'INFO',
-                'Updated expiration date for [{}] seats: [{}]'.format(
-                    self.course.id,
-                    ', '.join([str(seat.id) for seat in seats_expected_to_update])
-                )
+                'Updated expiration date of [2] seats of [1] courses to [{}].'.format(self.expire_date)
+            ),
+            (
+                LOGGER_NAME,
+                'INFO',
+                'Updated expiration date of [2] seats.'
             ),
         ]
 
@@ -105,6 +109,74 @@ class UpdateSeatExpireDateTests(DiscoveryTestMixin, TestCase):
         verified_seat = Product.objects.get(id=self.verified_seat.id)
         self.assertEqual(verified_seat.expires, self.verified_expire_date)
 
+    @httpretty.activate
+    def test_update_course_seats_up_to_date(self):
+        """ Verify seats already expiring at the course enrollment end date are not updated again. """
+        self.mock_courses_api(status=200, body=self.course_info)
+        call_command('update_course_seat_expire', commit=True)
+
+        with self.assertNumQueries(2):
+            with LogCapture(LOGGER_NAME) as lc:
+                call_command('update_course_seat_expire', commit=True)
+                lc.check(
+                    (LOGGER_NAME, 'INFO', '[1] courses found for update.'),
+                    (LOGGER_NAME, 'INFO', 'Updated expiration date of [0] seats.'),
+                )
+
+    @httpretty.activate
+    def test_update_course_with_dry_run(self):
+        """ Verify the seats whose expiration date would change are logged, but not updated, in dry run mode. """
+        self.mock_courses_api(status=200, body=self.course_info)
+        changes = ', '.join('{}: None'.format(seat.id) for seat in (self.honor_seat, self.professional_seat))
+
+        with LogCapture(LOGGER_NAME) as lc:
+            call_command('update_course_seat_expire', commit=True, dry_run=True)
+            lc.check(
+                (LOGGER_NAME, 'INFO', '[1] courses found for update.'),
+                (
+                    LOGGER_NAME,
+                    'INFO',
+                    'Would change expiration date of [{}] seats from [{}] to [{}].'.format(
+                        self.course.id, changes, self.expire_date
+                    )
+                ),
+                (LOGGER_NAME, 'INFO', 'Would update expiration date of [2] seats.'),
+            )
+
+        self.assertIsNone(Product.objects.get(id=self.honor_seat.id).expires)
+        self.assertIsNone(Product.objects.get(id=self.professional_seat.id).expires)
+
+    @httpretty.activate
+    @mock.patch(COMMAND_MODULE + '.ThreadPool')
+    def test_update_courses_from_concurrent_pages(self, mock_thread_pool):
+        """ Verify courses are updated from every page of the API when pages are retrieved concurrently. """
+        # httpretty is not thread safe, so the pages are retrieved in the test thread.
+        mock_thread_pool.return_value.imap_unordered.side_effect = map
+        other_course = CourseFactory(partner=self.partner)
+        other_seat = other_course.create_or_update_seat('honor', False, 0)
+        other_expire_date = self.expire_date - datetime.timedelta(days=1)
+        pages = {
+            '1': self.course_info['results'],
+            '2': [{'course_id': other_course.id, 'enrollment_end': unicode(other_expire_date)}],
+            '3': [{'course_id': 'course-v1:not+in+ecommerce', 'enrollment_end': unicode(other_expire_date)}],
+        }
+
+        def courses_api(request, uri, headers):  # pylint: disable=unused-argument
+            self.assertEqual(request.querystring['page_size'], ['2'])
+            body = {'pagination': {'num_pages': 3}, 'results': pages[request.querystring['page'][0]]}
+            return 200, headers, json.dumps(body)
+
+        httpretty.register_uri(
+            httpretty.GET, get_lms_url('/api/courses/v1/courses/'), body=courses_api, content_type=JSON
+        )
+
+        call_command('update_course_seat_expire', commit=True, page_size=2, workers=2)
+
+        mock_thread_pool.assert_called_once_with(2)
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 3)
+        self.assertEqual(Product.objects.get(id=self.honor_seat.id).expires, self.expire_date)
+        self.assertEqual(Product.objects.get(id=other_seat.id).expires, other_expire_date)
+
     @httpretty.activate
     def test_update_course_without_commit(self):
         """ Verify all course seats are not updated with commit option is not provided. """
@@ -155,12 +227,13 @@ class UpdateSeatExpireDateTests(DiscoveryTestMixin, TestCase):
                 lc.check(*expected)
 
     @httpretty.activate
-    def test_update_course_with_missing_enrolment(self):
+    @ddt.data(None, '')
+    def test_update_course_with_missing_enrolment(self, enrollment_end):
         """
         Verify that management command logs `enrollment missing` log for all courses
         which are missing `enrollment_end` date.
         """
-        self.course_info['results'][0]['enrollment_end'] = None
+        self.course_info['results'][0]['enrollment_end'] = enrollment_end
         self.mock_courses_api(status=200, body=self.course_info)
 
         expected = [
@@ -173,46 +246,38 @@ class UpdateSeatExpireDateTests(DiscoveryTestMixin, TestCase):
                 LOGGER_NAME,
                 'ERROR',
                 'Enrollment missing for course [{}]'.format(self.course.id)
+            ),
+            (
+                LOGGER_NAME,
+                'INFO',
+                'Updated expiration date of [0] seats.'
             )
         ]
 
         with LogCapture(LOGGER_NAME) as lc:
-            call_command('update_course_seat_expire')
+            call_command('update_course_seat_expire', commit=True)
             lc.check(*expected)
 
     @httpretty.activate
-    @mock.patch(
-        'ecommerce.extensions.catalogue.management.commands.update_course_seat_expire.Command.max_tries',
-        new_callable=mock.PropertyMock,
-        return_value=1
-    )
-    @mock.patch(
-        'ecommerce.extensions.catalogue.management.commands.update_course_seat_expire.Command.pause_time',
-        new_callable=mock.PropertyMock,
-        return_value=1
-    )
-    def test_update_course_with_exception(self, mock_max_tries, mock_pause_time):
+    @mock.patch.object(Command, 'max_tries', 1)
+    @mock.patch('ecommerce.core.rate_limit.time')
+    def test_update_course_with_exception(self, mock_time):
         """
         Verify that management command logs throttling errors when rate-limit to API
         exceeds.
         """
+        mock_time.time.return_value = 100
         self.mock_courses_api(status=429, body=self.course_info)
         expected = [
             (
                 LOGGER_NAME,
                 'WARNING',
-                'API calls are being rate-limited. Waiting for [1] seconds before retrying...'
-            ),
-            (
-                LOGGER_NAME,
-                'INFO',
-                'Retrying [1]'
+                'API calls are being rate-limited. Retrying page [1] in [5] seconds, attempt [1] of [1].'
             ),
         ]
-        with self.assertRaises(HttpClientError):
-            with LogCapture(LOGGER_NAME) as lc:
+        with LogCapture(LOGGER_NAME) as lc:
+            with self.assertRaises(HttpClientError):
                 call_command('update_course_seat_expire')
-                lc.check(*expected)
+            lc.check(*expected)
 
-        self.assertEqual(mock_max_tries.call_count, 2)
-        self.assertEqual(mock_pause_time.call_count, 2)
+        mock_time.sleep.assert_called_once_with(5)
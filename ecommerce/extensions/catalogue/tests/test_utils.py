@@ -10,13 +10,20 @@ from oscar.core.loading import get_model
 from ecommerce.coupons.tests.mixins import CouponMixin
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
-from ecommerce.extensions.catalogue.utils import create_coupon_product, generate_sku, get_or_create_catalog
+from ecommerce.extensions.catalogue.utils import (
+    create_coupon_product,
+    generate_sku,
+    get_or_create_catalog,
+    rebuild_product_attribute_index,
+    update_catalog_fingerprints
+)
 from ecommerce.tests.factories import ProductFactory
 from ecommerce.tests.testcases import TestCase
 
 Benefit = get_model('offer', 'Benefit')
 Catalog = get_model('catalogue', 'Catalog')
 Product = get_model('catalogue', 'Product')
+ProductAttributeIndex = get_model('catalogue', 'ProductAttributeIndex')
 StockRecord = get_model('partner', 'StockRecord')
 Voucher = get_model('voucher', 'Voucher')
 
@@ -86,6 +93,78 @@ class UtilsTests(DiscoveryTestMixin, TestCase):
         self.assertNotEqual(self.catalog, new_catalog)
         self.assertEqual(Catalog.objects.count(), 2)
 
+    def test_get_or_create_catalog_query_count(self):
+        """Verify catalogs are looked up with a fixed number of queries, whatever the number of catalogs."""
+        stock_record = self.seat.stockrecords.first()
+        self.catalog.stock_records.add(stock_record)
+        for __ in range(3):
+            Catalog.objects.create(name='Test', partner=self.partner).stock_records.add(stock_record)
+
+        with self.assertNumQueries(2):
+            catalog, created = get_or_create_catalog(
+                name='Test', partner=self.partner, stock_record_ids=[str(stock_record.id), stock_record.id]
+            )
+        self.assertFalse(created)
+        self.assertEqual(catalog, self.catalog)
+
+    def test_get_or_create_catalog_missing_stock_record(self):
+        """Verify an error is raised if a stock record does not exist."""
+        with self.assertRaises(StockRecord.DoesNotExist):
+            get_or_create_catalog(name='Test', partner=self.partner, stock_record_ids=[0])
+
+    def test_catalog_fingerprint(self):
+        """Verify the fingerprint follows the stock records of the catalog, whichever side they are changed from."""
+        stock_record = self.seat.stockrecords.first()
+        empty_fingerprint = Catalog.get_fingerprint(self.partner.id, [])
+        self.assertEqual(Catalog.objects.get(id=self.catalog.id).fingerprint, empty_fingerprint)
+
+        stock_record.catalogs.add(self.catalog)
+        expected = Catalog.get_fingerprint(self.partner.id, [stock_record.id])
+        self.assertEqual(Catalog.objects.get(id=self.catalog.id).fingerprint, expected)
+
+        stock_record.catalogs.clear()
+        self.assertEqual(Catalog.objects.get(id=self.catalog.id).fingerprint, empty_fingerprint)
+
+        self.catalog.stock_records.add(stock_record)
+        self.catalog.stock_records.remove(stock_record)
+        self.assertEqual(Catalog.objects.get(id=self.catalog.id).fingerprint, empty_fingerprint)
+
+    def test_update_catalog_fingerprints(self):
+        """Verify the fingerprints of existing catalogs are updated, in batches."""
+        stock_record = self.seat.stockrecords.first()
+        self.catalog.stock_records.add(stock_record)
+        other_catalog = Catalog.objects.create(name='Other', partner=self.partner)
+        Catalog.objects.update(fingerprint=None)
+
+        self.assertEqual(update_catalog_fingerprints(catalog_ids=[self.catalog.id]), 1)
+        self.assertIsNone(Catalog.objects.get(id=other_catalog.id).fingerprint)
+
+        self.assertEqual(update_catalog_fingerprints(batch_size=1), 1)
+        self.assertEqual(
+            Catalog.objects.get(id=self.catalog.id).fingerprint,
+            Catalog.get_fingerprint(self.partner.id, [stock_record.id])
+        )
+        self.assertEqual(
+            Catalog.objects.get(id=other_catalog.id).fingerprint, Catalog.get_fingerprint(self.partner.id, [])
+        )
+        self.assertEqual(update_catalog_fingerprints(), 0)
+
+    def test_rebuild_product_attribute_index(self):
+        """Verify the index is rebuilt from attribute values, in batches."""
+        course = CourseFactory(id='sku/test2/course', name='Test Course 2', partner=self.partner)
+        seat_2 = course.create_or_update_seat('professional', True, 0)
+        ProductAttributeIndex.objects.all().delete()
+
+        self.assertEqual(rebuild_product_attribute_index(product_ids=[seat_2.id]), 1)
+        self.assertEqual(list(ProductAttributeIndex.objects.values_list('product_id', flat=True)), [seat_2.id])
+
+        # Both seats and their parents are indexed, since parents carry the course key.
+        self.assertEqual(rebuild_product_attribute_index(batch_size=1), 4)
+        index = ProductAttributeIndex.objects.get(product=seat_2)
+        self.assertEqual(index.course_key, course.id)
+        self.assertEqual(index.certificate_type, 'professional')
+        self.assertTrue(index.id_verification_required)
+
 
 class CouponUtilsTests(CouponMixin, DiscoveryTestMixin, TestCase):
     def setUp(self):
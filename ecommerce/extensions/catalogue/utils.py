@@ -1,9 +1,11 @@
 from __future__ import unicode_literals
 
 import logging
+from collections import defaultdict
 from hashlib import md5
 
 from django.conf import settings
+from django.db import transaction
 from django.db.utils import IntegrityError
 from oscar.core.loading import get_model
 
@@ -14,6 +16,8 @@ from ecommerce.extensions.voucher.utils import create_vouchers
 Catalog = get_model('catalogue', 'Catalog')
 logger = logging.getLogger(__name__)
 Product = get_model('catalogue', 'Product')
+ProductAttributeIndex = get_model('catalogue', 'ProductAttributeIndex')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
 ProductCategory = get_model('catalogue', 'ProductCategory')
 ProductClass = get_model('catalogue', 'ProductClass')
 StockRecord = get_model('partner', 'StockRecord')
@@ -188,16 +192,99 @@ def get_or_create_catalog(name, partner, stock_record_ids):
     """
     Returns the catalog which has the same name, partner and stock records.
     If there isn't one with that data, creates and returns a new one.
+
+    Catalogs are looked up by their fingerprint, with a single indexed query.
     """
-    catalogs = Catalog.objects.all()
-    stock_records = [StockRecord.objects.get(id=id) for id in stock_record_ids]  # pylint: disable=redefined-builtin
+    stock_record_ids = sorted(set(int(pk) for pk in stock_record_ids))
+    if StockRecord.objects.filter(id__in=stock_record_ids).count() != len(stock_record_ids):
+        raise StockRecord.DoesNotExist('StockRecord matching query does not exist.')
 
-    for catalog in catalogs:
-        if catalog.name == name and catalog.partner == partner:
-            if set(catalog.stock_records.all()) == set(stock_records):
-                return catalog, False
+    fingerprint = Catalog.get_fingerprint(partner.id, stock_record_ids)
+    catalog = Catalog.objects.filter(name=name, partner=partner, fingerprint=fingerprint).order_by('id').first()
+    if catalog:
+        return catalog, False
 
     catalog = Catalog.objects.create(name=name, partner=partner)
-    for stock_record in stock_records:
-        catalog.stock_records.add(stock_record)
+    catalog.stock_records.add(*stock_record_ids)
     return catalog, True
+
+
+def update_catalog_fingerprints(catalog_ids=None, batch_size=1000):
+    """
+    Stores the fingerprints of the catalogs, computed from their partners and stock records.
+
+    Arguments:
+        catalog_ids (list): Limit the update to these catalogs. Defaults to all catalogs.
+        batch_size (int): Number of catalogs processed per batch.
+
+    Returns:
+        int: Number of catalogs whose fingerprint changed.
+    """
+    CatalogStockRecords = Catalog.stock_records.through
+    catalogs = Catalog.objects.order_by('id')
+    if catalog_ids is not None:
+        catalogs = catalogs.filter(id__in=catalog_ids)
+
+    updated = 0
+    last_id = 0
+    while True:
+        batch = list(catalogs.filter(id__gt=last_id).values_list('id', 'partner_id', 'fingerprint')[:batch_size])
+        if not batch:
+            return updated
+        last_id = batch[-1][0]
+
+        stock_record_ids = defaultdict(list)
+        for catalog_id, stock_record_id in CatalogStockRecords.objects.filter(
+                catalog_id__in=[catalog_id for catalog_id, __, __ in batch]
+        ).values_list('catalog_id', 'stockrecord_id'):
+            stock_record_ids[catalog_id].append(stock_record_id)
+
+        with transaction.atomic():
+            for catalog_id, partner_id, fingerprint in batch:
+                new_fingerprint = Catalog.get_fingerprint(partner_id, stock_record_ids[catalog_id])
+                if new_fingerprint != fingerprint:
+                    Catalog.objects.filter(id=catalog_id).update(fingerprint=new_fingerprint)
+                    updated += 1
+
+
+def rebuild_product_attribute_index(product_ids=None, batch_size=1000):
+    """
+    Rebuilds the ProductAttributeIndex rows from the products' attribute values.
+
+    Only products with at least one indexed attribute get a row. Existing rows for the
+    processed products are replaced, one batch per transaction.
+
+    Arguments:
+        product_ids (list): Limit the rebuild to these products. Defaults to all products.
+        batch_size (int): Number of products processed per batch.
+
+    Returns:
+        int: Number of index rows written.
+    """
+    attribute_values = ProductAttributeValue.objects.filter(
+        attribute__code__in=ProductAttributeIndex.INDEXED_ATTRIBUTES.keys()
+    )
+    if product_ids is not None:
+        attribute_values = attribute_values.filter(product_id__in=product_ids)
+
+    indexed_product_ids = list(
+        attribute_values.order_by('product_id').values_list('product_id', flat=True).distinct()
+    )
+
+    written = 0
+    for start in range(0, len(indexed_product_ids), batch_size):
+        batch = indexed_product_ids[start:start + batch_size]
+        rows = {product_id: ProductAttributeIndex(product_id=product_id) for product_id in batch}
+        values = attribute_values.filter(product_id__in=batch).values_list(
+            'product_id', 'attribute__code', 'value_text', 'value_boolean'
+        )
+        for product_id, code, value_text, value_boolean in values:
+            value_field = ProductAttributeIndex.INDEXED_ATTRIBUTES[code]
+            setattr(rows[product_id], code, value_boolean if value_field == 'value_boolean' else value_text)
+
+        with transaction.atomic():
+            ProductAttributeIndex.objects.filter(product_id__in=batch).delete()
+            ProductAttributeIndex.objects.bulk_create(rows.values())
+        written += len(rows)
+
+    return written
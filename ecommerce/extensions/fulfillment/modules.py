@@ -7,8 +7,8 @@ import abc
 import datetime
 import json
 import logging
+from multiprocessing.pool import ThreadPool
 
-import requests
 from django.conf import settings
 from django.urls import reverse
 from edx_rest_api_client.client import EdxRestApiClient
@@ -16,6 +16,7 @@ from oscar.core.loading import get_model
 from requests.exceptions import ConnectionError, Timeout  # pylint: disable=ungrouped-imports
 from rest_framework import status
 
+from ecommerce.core.api_clients import api_client_registry
 from ecommerce.core.constants import (
     DONATIONS_FROM_CHECKOUT_TESTS_PRODUCT_TYPE_NAME,
     ENROLLMENT_CODE_PRODUCT_CLASS_NAME
@@ -41,6 +42,17 @@ StockRecord = get_model('partner', 'StockRecord')
 logger = logging.getLogger(__name__)
 
 
+def get_enrollment_api_session():
+    """
+    Returns the requests Session shared by all Enrollment API calls in this process.
+
+    Reusing the session keeps connections to the LMS alive across requests and fulfillment threads.
+    """
+    return api_client_registry.get_session(
+        'enrollment_fulfillment', pool_size=settings.ENROLLMENT_FULFILLMENT_CONNECTION_POOL_SIZE
+    )
+
+
 class BaseFulfillmentModule(object):  # pragma: no cover
     """
     Base FulfillmentModule class for containing Product specific fulfillment logic.
@@ -171,8 +183,8 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
     Allows the enrollment of a student via purchase of a 'seat'.
     """
 
-    def _post_to_enrollment_api(self, data, user):
-        enrollment_api_url = get_lms_enrollment_api_url()
+    def _post_to_enrollment_api(self, data, user, enrollment_api_url=None):
+        enrollment_api_url = enrollment_api_url or get_lms_enrollment_api_url()
         timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
         headers = {
             'Content-Type': 'application/json',
@@ -187,7 +199,66 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
         if ip:
             headers['X-Forwarded-For'] = ip
 
-        return requests.post(enrollment_api_url, data=json.dumps(data), headers=headers, timeout=timeout)
+        return get_enrollment_api_session().post(
+            enrollment_api_url, data=json.dumps(data), headers=headers, timeout=timeout
+        )
+
+    def _post_enrollments(self, pending, user, max_workers):
+        """
+        Posts enrollment data to the Enrollment API, yielding the results as they arrive.
+
+        When more than one line is pending, up to max_workers requests are sent concurrently. The
+        threads only make the HTTP requests; the caller handles the results, and any database
+        access they require, in the calling thread. The threads do not have access to the current
+        request, so the Enrollment API URL is determined up front.
+
+        Arguments:
+            pending (list): (line, data) tuples, where data is the POST data for the line.
+            user (User): The user being enrolled.
+            max_workers (int): Maximum number of concurrent requests.
+
+        Yields:
+            (line, data, response, error) tuples. Either response or error is None.
+        """
+        if not pending:
+            return
+
+        enrollment_api_url = get_lms_enrollment_api_url()
+
+        def post(item):
+            line, data = item
+            try:
+                response = self._post_to_enrollment_api(data, user=user, enrollment_api_url=enrollment_api_url)
+                return line, data, response, None
+            except (ConnectionError, Timeout) as error:
+                return line, data, None, error
+
+        if max_workers <= 1 or len(pending) <= 1:
+            for item in pending:
+                yield post(item)
+            return
+
+        pool = ThreadPool(min(max_workers, len(pending)))
+        try:
+            for result in pool.imap_unordered(post, pending):
+                yield result
+        finally:
+            pool.terminate()
+
+    def _handle_enrollment_error(self, order, line, error):
+        """ Sets the status of a line whose Enrollment API request failed with a network error or time out. """
+        if isinstance(error, Timeout):
+            logger.error(
+                "Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number
+            )
+            order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
+            line.set_status(LINE.FULFILLMENT_TIMEOUT_ERROR)
+        else:
+            logger.error(
+                "Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number
+            )
+            order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
+            line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
 
     def _add_enterprise_data_to_enrollment_api_post(self, data, order):
         """ Augment enrollment api POST data with enterprise specific data.
@@ -272,6 +343,7 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
 
             return order, lines
 
+        pending = []
         for line in lines:
             try:
                 mode = mode_for_product(line.product)
@@ -311,49 +383,43 @@ class EnrollmentFulfillmentModule(BaseFulfillmentModule):
                 )
             try:
                 self._add_enterprise_data_to_enrollment_api_post(data, order)
+            except (ConnectionError, Timeout) as error:
+                self._handle_enrollment_error(order, line, error)
+                continue
 
-                # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment to
-                # the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
-                response = self._post_to_enrollment_api(data, user=order.user)
-
-                if response.status_code == status.HTTP_200_OK:
-                    line.set_status(LINE.COMPLETE)
-
-                    audit_log(
-                        'line_fulfilled',
-                        order_line_id=line.id,
-                        order_number=order.number,
-                        product_class=line.product.get_product_class().name,
-                        course_id=course_key,
-                        mode=mode,
-                        user_id=order.user.id,
-                        credit_provider=provider,
-                    )
-                else:
-                    try:
-                        data = response.json()
-                        reason = data.get('message')
-                    except Exception:  # pylint: disable=broad-except
-                        reason = '(No detail provided.)'
-
-                    logger.error(
-                        "Fulfillment of line [%d] on order [%s] failed with status code [%d]: %s",
-                        line.id, order.number, response.status_code, reason
-                    )
-                    order.notes.create(message=reason, note_type='Error')
-                    line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
-            except ConnectionError:
-                logger.error(
-                    "Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number
+            pending.append((line, data))
+
+        # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment to
+        # the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
+        max_workers = order.site.siteconfiguration.enrollment_fulfillment_max_workers if order.site else 1
+        for line, data, response, error in self._post_enrollments(pending, order.user, max_workers):
+            if error is not None:
+                self._handle_enrollment_error(order, line, error)
+            elif response.status_code == status.HTTP_200_OK:
+                line.set_status(LINE.COMPLETE)
+
+                audit_log(
+                    'line_fulfilled',
+                    order_line_id=line.id,
+                    order_number=order.number,
+                    product_class=line.product.get_product_class().name,
+                    course_id=data['course_details']['course_id'],
+                    mode=data['mode'],
+                    user_id=order.user.id,
+                    credit_provider=getattr(line.product.attr, 'credit_provider', None),
                 )
-                order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
-            except Timeout:
+            else:
+                try:
+                    reason = response.json().get('message')
+                except Exception:  # pylint: disable=broad-except
+                    reason = '(No detail provided.)'
+
                 logger.error(
-                    "Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number
+                    "Fulfillment of line [%d] on order [%s] failed with status code [%d]: %s",
+                    line.id, order.number, response.status_code, reason
                 )
-                order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_TIMEOUT_ERROR)
+                order.notes.create(message=reason, note_type='Error')
+                line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
         logger.info("Finished fulfilling 'Seat' product types for order [%s]", order.number)
         return order, lines
 
@@ -508,12 +574,9 @@ class EnrollmentCodeFulfillmentModule(BaseFulfillmentModule):
 
         for line in lines:
             name = 'Enrollment Code Range for {}'.format(line.product.attr.course_key)
-            seat = Product.objects.filter(
-                attributes__name='course_key',
-                attribute_values__value_text=line.product.attr.course_key
-            ).get(
-                attributes__name='certificate_type',
-                attribute_values__value_text=line.product.attr.seat_type
+            seat = Product.objects.get(
+                attribute_index__course_key=line.product.attr.course_key,
+                attribute_index__certificate_type=line.product.attr.seat_type
             )
             _range, created = Range.objects.get_or_create(name=name)
             if created:
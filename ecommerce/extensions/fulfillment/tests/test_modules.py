@@ -2,10 +2,12 @@
 import datetime
 import json
 import uuid
+from multiprocessing.pool import ThreadPool
 
 import ddt
 import httpretty
 import mock
+import requests
 from django.test import override_settings
 from oscar.core.loading import get_class, get_model
 from oscar.test import factories
@@ -212,18 +214,57 @@ class EnrollmentFulfillmentModuleTests(ProgramTestMixin, DiscoveryTestMixin, Ful
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_CONFIGURATION_ERROR, self.order.lines.all()[0].status)
 
-    @mock.patch('requests.post', mock.Mock(side_effect=ConnectionError))
+    @mock.patch.object(requests.Session, 'post', mock.Mock(side_effect=ConnectionError))
     def test_enrollment_module_network_error(self):
         """Test that lines receive a network error status if a fulfillment request experiences a network error."""
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_NETWORK_ERROR, self.order.lines.all()[0].status)
 
-    @mock.patch('requests.post', mock.Mock(side_effect=Timeout))
+    @mock.patch.object(requests.Session, 'post', mock.Mock(side_effect=Timeout))
     def test_enrollment_module_request_timeout(self):
         """Test that lines receive a timeout error status if a fulfillment request times out."""
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_TIMEOUT_ERROR, self.order.lines.all()[0].status)
 
+    def create_multi_seat_order(self, num_seats):
+        """ Create an order for seats in several courses, fulfilled with up to four concurrent requests. """
+        self.site_configuration.enrollment_fulfillment_max_workers = 4
+        self.site_configuration.save()
+
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        for __ in range(num_seats):
+            seat = CourseFactory(partner=self.partner).create_or_update_seat('verified', False, 100)
+            basket.add_product(seat, 1)
+        return create_order(number=3, basket=basket, user=self.user)
+
+    @httpretty.activate
+    def test_enrollment_module_fulfill_concurrently(self):
+        """Test that the seats of an order are enrolled concurrently when the site allows it."""
+        httpretty.register_uri(httpretty.POST, get_lms_enrollment_api_url(), status=200, body='{}', content_type=JSON)
+        order = self.create_multi_seat_order(3)
+
+        with mock.patch('ecommerce.extensions.fulfillment.modules.ThreadPool', wraps=ThreadPool) as mock_pool:
+            __, lines = EnrollmentFulfillmentModule().fulfill_product(order, list(order.lines.all()))
+            mock_pool.assert_called_once_with(3)
+
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 3)
+        for line in lines:
+            self.assertEqual(LINE.COMPLETE, line.status)
+        self.assertEqual(
+            sorted(json.loads(request.body)['course_details']['course_id']
+                   for request in httpretty.httpretty.latest_requests),
+            sorted(line.product.attr.course_key for line in lines)
+        )
+
+    @mock.patch.object(requests.Session, 'post', mock.Mock(side_effect=ConnectionError))
+    def test_enrollment_module_fulfill_concurrently_network_error(self):
+        """Test that every line of a concurrently fulfilled order receives a network error status."""
+        order = self.create_multi_seat_order(2)
+        __, lines = EnrollmentFulfillmentModule().fulfill_product(order, list(order.lines.all()))
+        for line in lines:
+            self.assertEqual(LINE.FULFILLMENT_NETWORK_ERROR, line.status)
+        self.assertEqual(order.notes.count(), 2)
+
     @httpretty.activate
     @ddt.data(None, '{"message": "Oops!"}')
     def test_enrollment_module_server_error(self, body):
@@ -1,11 +1,13 @@
 import logging
+from collections import OrderedDict
 from itertools import chain
 
 import waffle
-from oscar.apps.offer.applicator import Applicator
+from oscar.apps.offer.applicator import Applicator as CoreApplicator
 from oscar.core.loading import get_model
 
 from ecommerce.extensions.offer.constants import CUSTOM_APPLICATOR_LOG_FLAG
+from ecommerce.extensions.offer.index import get_offer_index
 
 logger = logging.getLogger(__name__)
 BasketAttribute = get_model('basket', 'BasketAttribute')
@@ -13,6 +15,176 @@ BasketAttributeType = get_model('basket', 'BasketAttributeType')
 BUNDLE = 'bundle_identifier'
 
 
+class CatalogMembershipResolver(object):
+    """
+    Resolves the catalog query membership of basket lines for every offer applied to a basket at once.
+
+    Benefits whose range is defined by a Discovery catalog query look up each line in the cache and
+    contact the Discovery Service for the misses, separately for every offer. Resolving all of the
+    (query, course) pairs up front, with a single Discovery call per distinct query, leaves the
+    benefits with nothing but cache hits. Ranges defined by a Discovery course catalog are resolved
+    the same way, with a single Discovery call per distinct catalog.
+    """
+
+    def __init__(self, basket):
+        self.basket = basket
+
+    def get_lines_by_query(self, offers):
+        """
+        Collects the basket lines that have to be checked against each distinct catalog query.
+
+        Args:
+            offers (list of Offer): The offers being applied to the basket.
+
+        Returns:
+            OrderedDict: Maps a catalog query to a (benefit, lines) tuple, where lines are the
+                paid course lines of the basket for any of the offers using that query.
+        """
+        lines = list(self.basket.all_lines())
+        lines_by_query = OrderedDict()
+
+        for offer in offers:
+            benefit = offer.benefit
+            applicable_range = benefit.range
+            if not (applicable_range and applicable_range.catalog_query is not None):
+                continue
+
+            __, query_lines = lines_by_query.setdefault(applicable_range.catalog_query, (benefit, OrderedDict()))
+            # pylint: disable=protected-access
+            for line in benefit._filter_for_paid_course_products(lines, applicable_range):
+                query_lines[line.line_reference] = line
+
+        return OrderedDict(
+            (query, (benefit, list(query_lines.values())))
+            for query, (benefit, query_lines) in lines_by_query.items()
+        )
+
+    def get_products_by_catalog(self, offers):
+        """
+        Collects the basket products that have to be checked against each distinct course catalog.
+
+        Args:
+            offers (list of Offer): The offers being applied to the basket.
+
+        Returns:
+            OrderedDict: Maps a course catalog ID to a (range, products) tuple, where products are the
+                seat products of the basket matching the course seat types of any range using that catalog.
+        """
+        products = [line.product for line in self.basket.all_lines() if line.product.is_seat_product]
+        products_by_catalog = OrderedDict()
+
+        for offer in offers:
+            for _range in (offer.condition.range, offer.benefit.range):
+                if not (_range and _range.course_catalog and _range.course_seat_types):
+                    continue
+
+                __, catalog_products = products_by_catalog.setdefault(_range.course_catalog, (_range, OrderedDict()))
+                for product in products:
+                    certificate_type = getattr(product.attr, 'certificate_type', '')
+                    if certificate_type.lower() in _range.course_seat_types:
+                        catalog_products[product.id] = product
+
+        return OrderedDict(
+            (catalog, (_range, list(catalog_products.values())))
+            for catalog, (_range, catalog_products) in products_by_catalog.items()
+        )
+
+    def resolve(self, offers):
+        """
+        Caches the catalog query and course catalog membership of the basket lines for all of the given offers.
+
+        Failures to reach the Discovery Service are logged and otherwise ignored, leaving each benefit
+        to look up its lines on its own.
+
+        Args:
+            offers (list of Offer): The offers being applied to the basket.
+        """
+        if self.basket.is_empty:
+            return
+
+        self.resolve_catalog_queries(offers)
+        self.resolve_course_catalogs(offers)
+
+    def resolve_catalog_queries(self, offers):
+        lines_by_query = self.get_lines_by_query(offers)
+        if not lines_by_query:
+            return
+
+        site = self.basket.site
+        partner_code = site.siteconfiguration.partner.short_code
+
+        # pylint: disable=protected-access
+        for query, (benefit, lines) in lines_by_query.items():
+            course_run_ids, course_uuids, __ = benefit._identify_uncached_product_identifiers(
+                lines, site.domain, partner_code, query
+            )
+            if not (course_run_ids or course_uuids):
+                continue
+
+            try:
+                benefit._fetch_catalog_query_membership(site, partner_code, query, course_run_ids, course_uuids)
+            except Exception:  # pylint: disable=broad-except
+                logger.warning(
+                    'Failed to resolve catalog query membership for Basket [%s] and query [%s].',
+                    self.basket.id, query,
+                )
+
+    def resolve_course_catalogs(self, offers):
+        for catalog, (_range, products) in self.get_products_by_catalog(offers).items():
+            if not products:
+                continue
+
+            try:
+                _range.cache_catalog_contains_products(self.basket.site, products)
+            except Exception:  # pylint: disable=broad-except
+                logger.warning(
+                    'Failed to resolve course catalog membership for Basket [%s] and catalog [%s].',
+                    self.basket.id, catalog,
+                )
+
+
+class Applicator(CoreApplicator):
+    """
+    Applicator that resolves the catalog membership of the basket lines for all offers before applying them.
+
+    Site offers can be loaded once and passed in, to be shared by all the baskets priced with the applicator.
+    """
+
+    def __init__(self, site_offers=None):
+        self.site_offers = site_offers
+
+    def get_site_offers(self):
+        if self.site_offers is None:
+            return super(Applicator, self).get_site_offers()
+        return self.site_offers
+
+    def apply_offers(self, basket, offers):
+        offers = list(offers)
+        CatalogMembershipResolver(basket).resolve(offers)
+        super(Applicator, self).apply_offers(basket, offers)
+
+    def get_basket_offers(self, basket, user):
+        """
+        Returns the offers of the basket vouchers.
+
+        Unlike the core applicator, this does not require the basket to be saved, so that the
+        offers of an InMemoryBasket are applied. Empty baskets, including unsaved baskets, have
+        no offers.
+        """
+        offers = []
+        if basket.is_empty or not user:
+            return offers
+
+        for voucher in basket.vouchers.all():
+            available_to_user, __ = voucher.is_available_to_user(user=user)
+            if voucher.is_active() and available_to_user:
+                basket_offers = voucher.offers.all()
+                for offer in basket_offers:
+                    offer.set_voucher(voucher)
+                offers = list(chain(offers, basket_offers))
+        return offers
+
+
 class CustomApplicator(Applicator):
     """
     Custom applicator for applying offers to program baskets and voucher baskets.
@@ -55,7 +227,7 @@ class CustomApplicator(Applicator):
                     basket, request, user,
                 )
             program_offers = []
-            site_offers = self.get_site_offers()
+            site_offers = self.get_site_offers(basket)
 
         basket_offers = self.get_basket_offers(basket, user)
 
@@ -72,13 +244,15 @@ class CustomApplicator(Applicator):
             )
         )
 
-    def get_site_offers(self):
+    def get_site_offers(self, basket=None):
         """
         Return site offers that are available to baskets without bundle ids.
+
+        Args:
+            basket (Basket): If given, only the offers that could apply to the
+                products in this basket are returned.
         """
-        ConditionalOffer = get_model('offer', 'ConditionalOffer')
-        qs = ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE, condition__program_uuid__isnull=True)
-        return qs.select_related('condition', 'benefit')
+        return get_offer_index().get_site_offers(basket)
 
     def get_program_offers(self, bundle_attribute):
         """
@@ -91,8 +265,4 @@ class CustomApplicator(Applicator):
         Returns:
             list of Offer: List of all the offers applicable to the program.
         """
-        bundle_id = bundle_attribute.value_text
-        ConditionalOffer = get_model('offer', 'ConditionalOffer')
-        offers = ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE, condition__program_uuid=bundle_id)
-
-        return offers.select_related('condition', 'benefit')
+        return get_offer_index().get_program_offers(bundle_attribute.value_text)
@@ -0,0 +1,204 @@
+"""
+In-process index of the site offers used by the CustomApplicator.
+
+Loading the active site offers is a database query on every basket request. The index keeps the
+offers in memory, keyed by program UUID and bucketed by the products their conditions can match,
+and is rebuilt whenever the offer generation stored in the shared cache changes. The generation is
+bumped by the signal handlers in ecommerce.extensions.offer.signals whenever an offer, condition,
+benefit or range is saved or deleted.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from uuid import UUID, uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+
+logger = logging.getLogger(__name__)
+
+OFFER_INDEX_GENERATION_CACHE_KEY = 'offer_index_generation'
+
+_offer_index = None
+_offer_index_lock = threading.Lock()
+
+
+def bump_offer_index_generation():
+    """
+    Invalidates the offer index of every process sharing the Django cache.
+    """
+    cache.set(OFFER_INDEX_GENERATION_CACHE_KEY, uuid4().hex, None)
+
+
+def get_offer_index_generation():
+    """
+    Returns the current offer generation, creating one if the shared cache does not have it.
+    """
+    generation = cache.get(OFFER_INDEX_GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(OFFER_INDEX_GENERATION_CACHE_KEY, uuid4().hex, None)
+        generation = cache.get(OFFER_INDEX_GENERATION_CACHE_KEY)
+    return generation
+
+
+def get_static_range_product_ids(_range):
+    """
+    Returns the IDs of the products explicitly included in a range.
+
+    Returns None if the range can contain products that are not explicitly included, e.g. ranges
+    defined by a catalog, a catalog query, an enterprise catalog, product classes or categories.
+    """
+    if _range is None:
+        return None
+
+    if any([
+            _range.proxy_class,
+            _range.includes_all_products,
+            _range.catalog_id,
+            _range.catalog_query,
+            _range.course_catalog,
+            _range.enterprise_customer,
+            _range.enterprise_customer_catalog,
+    ]):
+        return None
+
+    if _range.classes.all() or _range.included_categories.all():
+        return None
+
+    return {product.id for product in _range.included_products.all()}
+
+
+def get_offer_product_ids(offer):
+    """
+    Returns the IDs of the products a basket must contain for the offer condition to be satisfied.
+
+    Returns None if the offer has to be evaluated against every basket, e.g. when it uses a custom
+    condition or its condition range is not limited to explicitly included products.
+    """
+    condition = offer.condition
+    if condition.proxy_class:
+        return None
+    return get_static_range_product_ids(condition.range)
+
+
+def is_offer_active(offer, cutoff):
+    """
+    Mirrors the ConditionalOffer.active manager for an offer loaded into the index.
+    """
+    return (
+        (offer.start_datetime is None or offer.start_datetime <= cutoff) and
+        (offer.end_datetime is None or offer.end_datetime >= cutoff)
+    )
+
+
+class OfferIndex(object):
+    """
+    Site offers bucketed by program UUID and by the products their conditions can match.
+    """
+
+    def __init__(self, generation, offers):
+        self.generation = generation
+        self.created = time.time()
+        self.unbucketed_offers = []
+        self.offers_by_product = defaultdict(list)
+        self.offers_by_program = defaultdict(list)
+
+        for offer in offers:
+            program_uuid = offer.condition.program_uuid
+            if program_uuid:
+                self.offers_by_program[program_uuid].append(offer)
+                continue
+
+            product_ids = get_offer_product_ids(offer)
+            if product_ids is None:
+                self.unbucketed_offers.append(offer)
+            else:
+                for product_id in product_ids:
+                    self.offers_by_product[product_id].append(offer)
+
+    @classmethod
+    def build(cls, generation):
+        """
+        Loads every open site offer that has not expired yet into a new index.
+
+        Offers that have not started yet are included and filtered out at lookup time, so that
+        the index does not need to be rebuilt when they start.
+        """
+        ConditionalOffer = get_model('offer', 'ConditionalOffer')
+        offers = ConditionalOffer.objects.filter(
+            Q(end_datetime__gte=now()) | Q(end_datetime=None),
+            offer_type=ConditionalOffer.SITE,
+            status=ConditionalOffer.OPEN,
+        ).select_related(
+            'condition', 'benefit', 'condition__range', 'benefit__range'
+        ).prefetch_related(
+            'condition__range__included_products',
+            'condition__range__classes',
+            'condition__range__included_categories',
+        )
+        offers = list(offers)
+        logger.info('Built offer index [%s] with [%d] site offers.', generation, len(offers))
+        return cls(generation, offers)
+
+    def is_stale(self, generation):
+        return generation != self.generation or time.time() - self.created > settings.OFFER_INDEX_TIMEOUT
+
+    def _filter_active(self, offers):
+        cutoff = now()
+        return [offer for offer in offers if is_offer_active(offer, cutoff)]
+
+    def get_site_offers(self, basket=None):
+        """
+        Returns the active site offers not associated with a program.
+
+        If a basket is given, offers whose condition can only be satisfied by products that are
+        not in the basket are left out.
+        """
+        offers = list(self.unbucketed_offers)
+        if basket is None:
+            for product_offers in self.offers_by_product.values():
+                offers.extend(product_offers)
+        else:
+            product_ids = set()
+            for line in basket.all_lines():
+                product_ids.add(line.product_id)
+                if line.product.parent_id:
+                    product_ids.add(line.product.parent_id)
+            for product_id in product_ids:
+                offers.extend(self.offers_by_product.get(product_id, []))
+
+        # An offer can be bucketed under several of the basket products.
+        unique_offers = {offer.id: offer for offer in offers}
+        return self._filter_active(unique_offers.values())
+
+    def get_program_offers(self, program_uuid):
+        """
+        Returns the active site offers associated with the given program.
+        """
+        try:
+            program_uuid = UUID(str(program_uuid))
+        except ValueError:
+            return []
+        return self._filter_active(self.offers_by_program.get(program_uuid, []))
+
+
+def get_offer_index():
+    """
+    Returns the offer index of this process, rebuilding it if the offer generation has changed.
+    """
+    global _offer_index  # pylint: disable=global-statement
+
+    generation = get_offer_index_generation()
+    offer_index = _offer_index
+    if offer_index is None or offer_index.is_stale(generation):
+        with _offer_index_lock:
+            offer_index = _offer_index
+            if offer_index is None or offer_index.is_stale(generation):
+                offer_index = OfferIndex.build(generation)
+                _offer_index = offer_index
+
+    return offer_index
@@ -20,6 +20,7 @@ from requests.exceptions import ConnectionError, Timeout
 from slumber.exceptions import SlumberBaseException
 from threadlocals.threadlocals import get_current_request
 
+from ecommerce.core import cache_utils
 from ecommerce.core.utils import get_cache_key, log_message_and_raise_validation_error
 from ecommerce.enterprise.constants import ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH
 from ecommerce.extensions.offer.constants import (
@@ -76,8 +77,8 @@ class Benefit(AbstractBenefit):
         uncached_course_run_ids = []
         uncached_course_uuids = []
 
-        applicable_lines = lines
-        for line in applicable_lines:
+        line_cache_keys = []
+        for line in lines:
             if line.product.is_seat_product:
                 product_id = line.product.course.id
             else:  # All lines passed to this method should either have a seat or an entitlement product
@@ -90,18 +91,60 @@ class Benefit(AbstractBenefit):
                 course_id=product_id,
                 query=query
             )
-            in_catalog_range_cached_response = TieredCache.get_cached_response(cache_key)
+            line_cache_keys.append((line, product_id, cache_key))
 
-            if not in_catalog_range_cached_response.is_found:
+        in_catalog_range_cached_values = cache_utils.get_many(cache_key for __, __, cache_key in line_cache_keys)
+
+        applicable_lines = list(lines)
+        for line, product_id, cache_key in line_cache_keys:
+            if cache_key not in in_catalog_range_cached_values:
                 if line.product.is_seat_product:
                     uncached_course_run_ids.append({'id': product_id, 'cache_key': cache_key, 'line': line})
                 else:
                     uncached_course_uuids.append({'id': product_id, 'cache_key': cache_key, 'line': line})
-            elif not in_catalog_range_cached_response.value:
+            elif not in_catalog_range_cached_values[cache_key]:
                 applicable_lines.remove(line)
 
         return uncached_course_run_ids, uncached_course_uuids, applicable_lines
 
+    def _fetch_catalog_query_membership(self, site, partner_code, query, course_run_ids, course_uuids):
+        """
+        Hits the Discovery Service to determine if the given courses and runs are in the range specified by the
+        given query, and caches the range-state individually for each course or run identifier.
+
+        Returns:
+            list: Basket lines whose product is not in the catalog range.
+        """
+        try:
+            response = site.siteconfiguration.discovery_api_client.catalog.query_contains.get(
+                course_run_ids=','.join([metadata['id'] for metadata in course_run_ids]),
+                course_uuids=','.join([metadata['id'] for metadata in course_uuids]),
+                query=query,
+                partner=partner_code
+            )
+        except Exception as err:  # pylint: disable=bare-except
+            logger.warning(
+                '%s raised while attempting to contact Discovery Service for offer catalog_range data.', err
+            )
+            raise Exception('Failed to contact Discovery Service to retrieve offer catalog_range data.')
+
+        lines_not_in_range = []
+        in_range_values = {}
+        for metadata in course_run_ids + course_uuids:
+            in_range = response[str(metadata['id'])]
+
+            # Convert to int, because this is what memcached will return, and the request cache should return
+            # the same value.
+            # Note: once the TieredCache is fixed to handle this case, we could remove this line.
+            in_range = int(in_range)
+            in_range_values[metadata['cache_key']] = in_range
+
+            if not in_range:
+                lines_not_in_range.append(metadata['line'])
+
+        cache_utils.set_many(in_range_values, settings.COURSES_API_CACHE_TIMEOUT)
+        return lines_not_in_range
+
     def get_applicable_lines(self, offer, basket, range=None):  # pylint: disable=redefined-builtin
         """
         Returns the basket lines for which the benefit is applicable.
@@ -121,31 +164,10 @@ class Benefit(AbstractBenefit):
 
             if course_run_ids or course_uuids:
                 # Hit Discovery Service to determine if remaining courses and runs are in the range.
-                try:
-                    response = site.siteconfiguration.discovery_api_client.catalog.query_contains.get(
-                        course_run_ids=','.join([metadata['id'] for metadata in course_run_ids]),
-                        course_uuids=','.join([metadata['id'] for metadata in course_uuids]),
-                        query=query,
-                        partner=partner_code
-                    )
-                except Exception as err:  # pylint: disable=bare-except
-                    logger.warning(
-                        '%s raised while attempting to contact Discovery Service for offer catalog_range data.', err
-                    )
-                    raise Exception('Failed to contact Discovery Service to retrieve offer catalog_range data.')
-
-                # Cache range-state individually for each course or run identifier and remove lines not in the range.
-                for metadata in course_run_ids + course_uuids:
-                    in_range = response[str(metadata['id'])]
-
-                    # Convert to int, because this is what memcached will return, and the request cache should return
-                    # the same value.
-                    # Note: once the TieredCache is fixed to handle this case, we could remove this line.
-                    in_range = int(in_range)
-                    TieredCache.set_all_tiers(metadata['cache_key'], in_range, settings.COURSES_API_CACHE_TIMEOUT)
-
-                    if not in_range:
-                        applicable_lines.remove(metadata['line'])
+                lines_not_in_range = self._fetch_catalog_query_membership(
+                    site, partner_code, query, course_run_ids, course_uuids
+                )
+                applicable_lines = [line for line in applicable_lines if line not in lines_not_in_range]
 
             return [(line.product.stockrecords.first().price_excl_tax, line) for line in applicable_lines]
         else:
@@ -361,20 +383,61 @@ class Range(AbstractRange):
         if self.course_seat_types:
             validate_credit_seat_type(self.course_seat_types)
 
+    def _get_catalog_contains_cache_key(self, site, course_id):
+        return get_cache_key(
+            site_domain=site.domain,
+            partner_code=site.siteconfiguration.partner.short_code,
+            resource='catalogs.contains',
+            course_id=course_id,
+            catalog_id=self.course_catalog
+        )
+
+    def cache_catalog_contains_products(self, site, products):
+        """
+        Caches the results of the catalog contains endpoint for several products at once.
+
+        The products are looked up in the cache with a single call, and the course runs missing from
+        it are checked with a single request to the Discovery Service, leaving nothing but cache hits
+        for catalog_contains_product.
+        """
+        cache_keys = {
+            self._get_catalog_contains_cache_key(site, product.course_id): product.course_id
+            for product in products if product.course_id
+        }
+        cached_values = cache_utils.get_many(cache_keys)
+        uncached_course_ids = sorted(
+            course_id for cache_key, course_id in cache_keys.items() if cache_key not in cached_values
+        )
+        if not uncached_course_ids:
+            return
+
+        discovery_api_client = site.siteconfiguration.discovery_api_client
+        try:
+            # GET: /api/v1/catalogs/{catalog_id}/contains?course_run_id={course_run_ids}
+            response = discovery_api_client.catalogs(self.course_catalog).contains.get(
+                course_run_id=','.join(uncached_course_ids)
+            )
+        except (ConnectionError, SlumberBaseException, Timeout):
+            raise Exception('Unable to connect to Discovery Service for catalog contains endpoint.')
+
+        # Cache the same response catalog_contains_product would have received for each course run.
+        cache_utils.set_many(
+            {
+                self._get_catalog_contains_cache_key(site, course_id): {
+                    'courses': {course_id: response['courses'].get(course_id, False)}
+                }
+                for course_id in uncached_course_ids
+            },
+            settings.COURSES_API_CACHE_TIMEOUT
+        )
+
     def catalog_contains_product(self, product):
         """
         Retrieve the results from using the catalog contains endpoint for
         catalog service for the catalog id contained in field "course_catalog".
         """
         request = get_current_request()
-        partner_code = request.site.siteconfiguration.partner.short_code
-        cache_key = get_cache_key(
-            site_domain=request.site.domain,
-            partner_code=partner_code,
-            resource='catalogs.contains',
-            course_id=product.course_id,
-            catalog_id=self.course_catalog
-        )
+        cache_key = self._get_catalog_contains_cache_key(request.site, product.course_id)
         cached_response = TieredCache.get_cached_response(cache_key)
         if cached_response.is_found:
             return cached_response.value
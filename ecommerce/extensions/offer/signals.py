@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.offer.index import bump_offer_index_generation
+
+Benefit = get_model('offer', 'Benefit')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+Range = get_model('offer', 'Range')
+RangeProduct = get_model('offer', 'RangeProduct')
+
+
+@receiver(post_save, sender=Benefit, dispatch_uid='offer_index.benefit_post_save')
+@receiver(post_delete, sender=Benefit, dispatch_uid='offer_index.benefit_post_delete')
+@receiver(post_save, sender=Condition, dispatch_uid='offer_index.condition_post_save')
+@receiver(post_delete, sender=Condition, dispatch_uid='offer_index.condition_post_delete')
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='offer_index.offer_post_save')
+@receiver(post_delete, sender=ConditionalOffer, dispatch_uid='offer_index.offer_post_delete')
+@receiver(post_save, sender=Range, dispatch_uid='offer_index.range_post_save')
+@receiver(post_delete, sender=Range, dispatch_uid='offer_index.range_post_delete')
+@receiver(post_save, sender=RangeProduct, dispatch_uid='offer_index.range_product_post_save')
+@receiver(post_delete, sender=RangeProduct, dispatch_uid='offer_index.range_product_post_delete')
+@receiver(m2m_changed, sender=Range.classes.through, dispatch_uid='offer_index.range_classes_changed')
+@receiver(
+    m2m_changed, sender=Range.included_categories.through, dispatch_uid='offer_index.range_categories_changed'
+)
+def invalidate_offer_index(*_args, **_kwargs):
+    """
+    When offers, or anything that determines which baskets they apply to, change
+    the offer index of every process must be rebuilt.
+
+    The generation is bumped again once the transaction commits, since an index rebuilt by another
+    process before then would hold the offers as they were before the change. The immediate bump
+    lets the rest of the transaction see its own changes.
+    """
+    bump_offer_index_generation()
+    transaction.on_commit(bump_offer_index_generation)
@@ -1,10 +1,13 @@
+import httpretty
 import mock
 from oscar.core.loading import get_model
 from oscar.test import factories
 from testfixtures import LogCapture
 from waffle.testutils import override_flag
 
-from ecommerce.extensions.offer.applicator import CustomApplicator
+from ecommerce.coupons.tests.mixins import DiscoveryMockMixin
+from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
+from ecommerce.extensions.offer.applicator import Applicator, CatalogMembershipResolver, CustomApplicator
 from ecommerce.extensions.offer.constants import CUSTOM_APPLICATOR_LOG_FLAG
 from ecommerce.extensions.test.factories import ConditionalOfferFactory, ProgramOfferFactory
 from ecommerce.tests.testcases import TestCase
@@ -52,7 +55,7 @@ class CustomApplicatorTests(TestCase):
     def test_get_offers_without_bundle(self):
         """ Verify that all non bundle offers are returned if no bundle id is given. """
         ProgramOfferFactory()
-        site_offers = ConditionalOfferFactory.create_batch(3)
+        site_offers = ConditionalOfferFactory.create_batch(3, condition__range__includes_all_products=True)
 
         self.applicator.get_program_offers = mock.Mock()
 
@@ -81,7 +84,7 @@ class CustomApplicatorTests(TestCase):
     @override_flag(CUSTOM_APPLICATOR_LOG_FLAG, active=True)
     def test_log_is_fired_when_get_offers_without_bundle(self):
         """ Verify that logs are fired when no bundle id is given but offers are being applied"""
-        site_offers = ConditionalOfferFactory.create_batch(3)
+        site_offers = ConditionalOfferFactory.create_batch(3, condition__range__includes_all_products=True)
 
         self.applicator.get_program_offers = mock.Mock()
 
@@ -97,3 +100,88 @@ class CustomApplicatorTests(TestCase):
             )
 
         self.assertFalse(self.applicator.get_program_offers.called)  # Verify there was no attempt to match off a bundle
+
+
+@httpretty.activate
+class CatalogMembershipResolverTests(DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
+    """ Tests for the CatalogMembershipResolver. """
+
+    def setUp(self):
+        super(CatalogMembershipResolverTests, self).setUp()
+        self.basket = factories.BasketFactory(site=self.site, owner=factories.UserFactory())
+        self.course, seat = self.create_course_and_seat()
+        self.basket.add_product(seat)
+
+    def tearDown(self):
+        # Reset HTTPretty state (clean up registered urls and request history)
+        httpretty.reset()
+
+    def create_catalog_query_offer(self, query):
+        """ Helper to create an offer whose benefit range is defined by the given catalog query. """
+        _range = factories.RangeFactory(course_seat_types='verified', catalog_query=query)
+        return ConditionalOfferFactory(benefit=factories.BenefitFactory(range=_range))
+
+    def mock_query_contains(self, query):
+        """ Helper to mock the Discovery catalog query_contains endpoint for the basket course. """
+        self.mock_access_token_response()
+        self.mock_catalog_query_contains_endpoint(
+            course_run_ids=[self.course.id], course_uuids=[], absent_ids=[], query=query,
+            discovery_api_url=self.site_configuration.discovery_api_url
+        )
+
+    def assert_num_query_contains_requests(self, count):
+        """ Helper to verify the number of requests made to the query_contains endpoint. """
+        paths = [request.path for request in httpretty.httpretty.latest_requests]
+        self.assertEqual(len([path for path in paths if 'query_contains' in path]), count)
+
+    def test_resolve_one_request_per_query(self):
+        """ Verify the Discovery Service is contacted once per distinct catalog query. """
+        offers = [
+            self.create_catalog_query_offer('key:*'),
+            self.create_catalog_query_offer('key:*'),
+            self.create_catalog_query_offer('uuid:*'),
+        ]
+        self.mock_query_contains('key:*')
+        self.mock_query_contains('uuid:*')
+
+        CatalogMembershipResolver(self.basket).resolve(offers)
+        self.assert_num_query_contains_requests(2)
+
+        # Benefits should read the resolved membership from the cache.
+        for offer in offers:
+            self.assertEqual(len(offer.benefit.get_applicable_lines(offer, self.basket)), 1)
+        self.assert_num_query_contains_requests(2)
+
+    def test_resolve_without_catalog_query_offers(self):
+        """ Verify the Discovery Service is not contacted when no offer has a catalog query range. """
+        CatalogMembershipResolver(self.basket).resolve([ConditionalOfferFactory()])
+        self.assert_num_query_contains_requests(0)
+
+    def test_resolve_one_request_per_course_catalog(self):
+        """ Verify the Discovery Service is contacted once per distinct course catalog. """
+        _range = factories.RangeFactory(course_seat_types='verified', course_catalog=1)
+        offers = [ConditionalOfferFactory(condition__range=_range) for __ in range(2)]
+        self.mock_access_token_response()
+        self.mock_catalog_contains_endpoint(
+            discovery_api_url=self.site_configuration.discovery_api_url, catalog_id=1, course_run_ids=[self.course.id]
+        )
+
+        CatalogMembershipResolver(self.basket).resolve(offers)
+        paths = [request.path for request in httpretty.httpretty.latest_requests]
+        self.assertEqual(len([path for path in paths if '/contains/' in path]), 1)
+
+    def test_resolve_discovery_failure(self):
+        """ Verify failures to reach the Discovery Service are logged and not raised. """
+        offer = self.create_catalog_query_offer('key:*')
+        self.mock_access_token_response()
+        with mock.patch('ecommerce.extensions.offer.applicator.logger') as mock_logger:
+            CatalogMembershipResolver(self.basket).resolve([offer])
+            self.assertTrue(mock_logger.warning.called)
+
+    def test_apply_offers_resolves_catalog_membership(self):
+        """ Verify the applicator resolves catalog membership for all offers before applying them. """
+        offers = [self.create_catalog_query_offer('key:*')]
+        self.mock_query_contains('key:*')
+        with mock.patch.object(CatalogMembershipResolver, 'resolve') as mock_resolve:
+            Applicator().apply_offers(self.basket, offers)
+            mock_resolve.assert_called_once_with(offers)
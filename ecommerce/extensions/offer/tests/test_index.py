@@ -0,0 +1,105 @@
+import datetime
+
+import mock
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+from oscar.test import factories
+
+from ecommerce.extensions.offer.index import (
+    OfferIndex,
+    bump_offer_index_generation,
+    get_offer_index,
+    get_offer_index_generation
+)
+from ecommerce.extensions.test.factories import ConditionalOfferFactory, ProgramOfferFactory, create_basket
+from ecommerce.tests.testcases import TestCase
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+
+
+class OfferIndexTests(TestCase):
+    """ Tests for the in-process offer index. """
+
+    def setUp(self):
+        super(OfferIndexTests, self).setUp()
+        self.basket = create_basket(site=self.site)
+        self.product = self.basket.all_lines()[0].product
+
+    def create_product_offer(self, product, **kwargs):
+        """ Helper to create an offer whose condition range only includes the given product. """
+        _range = factories.RangeFactory(products=[product])
+        return ConditionalOfferFactory(condition__range=_range, **kwargs)
+
+    def test_get_site_offers_for_basket(self):
+        """ Verify only offers that could match the basket products are returned. """
+        matching_offer = self.create_product_offer(self.product)
+        self.create_product_offer(factories.create_product())
+        unbucketed_offer = ConditionalOfferFactory(condition__range__includes_all_products=True)
+        ProgramOfferFactory()
+
+        offer_index = get_offer_index()
+        self.assertEqual(
+            sorted(offer_index.get_site_offers(self.basket), key=lambda o: o.id),
+            [matching_offer, unbucketed_offer]
+        )
+        self.assertEqual(len(offer_index.get_site_offers()), 3)
+
+    def test_get_program_offers(self):
+        """ Verify program offers are looked up by program UUID. """
+        program_offer = ProgramOfferFactory()
+        ConditionalOfferFactory(condition__range__includes_all_products=True)
+
+        offer_index = get_offer_index()
+        self.assertEqual(offer_index.get_program_offers(program_offer.condition.program_uuid), [program_offer])
+        self.assertEqual(offer_index.get_program_offers(str(program_offer.condition.program_uuid)), [program_offer])
+        self.assertEqual(offer_index.get_program_offers('not-a-uuid'), [])
+
+    def test_inactive_offers_excluded(self):
+        """ Verify offers outside of their date range or not open are not returned. """
+        ConditionalOfferFactory(
+            condition__range__includes_all_products=True, start_datetime=now() + datetime.timedelta(days=1)
+        )
+        ConditionalOfferFactory(
+            condition__range__includes_all_products=True, end_datetime=now() - datetime.timedelta(days=1)
+        )
+        ConditionalOfferFactory(condition__range__includes_all_products=True, status=ConditionalOffer.SUSPENDED)
+
+        self.assertEqual(get_offer_index().get_site_offers(self.basket), [])
+
+    def test_index_reused_until_offers_change(self):
+        """ Verify the index is only rebuilt when an offer, or anything it depends on, changes. """
+        offer = self.create_product_offer(self.product)
+        offer_index = get_offer_index()
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_offer_index(), offer_index)
+
+        generation = get_offer_index_generation()
+        offer.condition.range.remove_product(self.product)
+        self.assertNotEqual(get_offer_index_generation(), generation)
+
+        offer_index = get_offer_index()
+        self.assertEqual(offer_index.get_site_offers(self.basket), [])
+
+        generation = get_offer_index_generation()
+        offer.delete()
+        self.assertNotEqual(get_offer_index_generation(), generation)
+
+    def test_generation_bumped_on_commit(self):
+        """ Verify the generation is bumped again once the transaction that changed an offer commits. """
+        with mock.patch('ecommerce.extensions.offer.signals.transaction.on_commit') as mock_on_commit:
+            self.create_product_offer(self.product)
+
+        mock_on_commit.assert_called_with(bump_offer_index_generation)
+
+    def test_index_rebuilt_after_timeout(self):
+        """ Verify the index is rebuilt once it is older than OFFER_INDEX_TIMEOUT. """
+        offer_index = get_offer_index()
+
+        with self.settings(OFFER_INDEX_TIMEOUT=-1):
+            self.assertIsNot(get_offer_index(), offer_index)
+
+    def test_build(self):
+        """ Verify offers of other types are not loaded into the index. """
+        ConditionalOfferFactory(condition__range__includes_all_products=True, offer_type=ConditionalOffer.VOUCHER)
+        self.assertEqual(OfferIndex.build('generation').get_site_offers(), [])
@@ -333,6 +333,32 @@ class RangeTests(CouponMixin, DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
             _ = self.range.catalog_contains_product(self.product)
             self.assertEqual(mocked_set_all_tiers.call_count, 2)
 
+    def test_cache_catalog_contains_products(self):
+        """
+        Verify that cache_catalog_contains_products checks all uncached course runs with a single
+        Discovery request, and leaves catalog_contains_product with cache hits.
+        """
+        self.mock_access_token_response()
+        course, seat = self.create_course_and_seat()
+        other_course, other_seat = self.create_course_and_seat(course_id='edX/OtherX/Other_Course')
+        course_catalog_id = 1
+        self.range.catalog_query = None
+        self.range.course_seat_types = 'verified'
+        self.range.course_catalog = course_catalog_id
+        self.range.save()
+
+        self.mock_catalog_contains_endpoint(
+            discovery_api_url=self.site_configuration.discovery_api_url, catalog_id=course_catalog_id,
+            course_run_ids=[course.id]
+        )
+        self.range.cache_catalog_contains_products(self.site, [seat, other_seat])
+        self.assertEqual(len([r for r in httpretty.httpretty.latest_requests if 'contains' in r.path]), 1)
+
+        self.range.cache_catalog_contains_products(self.site, [seat, other_seat])
+        self.assertEqual(self.range.catalog_contains_product(seat), {'courses': {course.id: True}})
+        self.assertEqual(self.range.catalog_contains_product(other_seat), {'courses': {other_course.id: False}})
+        self.assertEqual(len([r for r in httpretty.httpretty.latest_requests if 'contains' in r.path]), 1)
+
 
 @ddt.ddt
 @httpretty.activate
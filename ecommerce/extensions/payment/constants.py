@@ -55,3 +55,7 @@ APPLE_PAY_CYBERSOURCE_CARD_TYPE_MAP = {
 STRIPE_CARD_TYPE_MAP = {
     value['stripe_brand']: key for key, value in six.iteritems(CARD_TYPES) if 'stripe_brand' in value
 }
+
+# PaymentProcessorResponse decisions of successful payments: the CyberSource decision of an accepted
+# payment, and the state of an approved PayPal payment.
+SUCCESSFUL_PAYMENT_DECISIONS = ('ACCEPT', 'approved')
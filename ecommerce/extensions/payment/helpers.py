@@ -2,12 +2,17 @@
 import base64
 import hashlib
 import hmac
+import json
+import logging
+from decimal import Decimal, InvalidOperation
 from importlib import import_module
 
 from django.conf import settings
 
 from ecommerce.extensions.payment import exceptions
 
+logger = logging.getLogger(__name__)
+
 
 def get_processor_class(path):
     """Return the payment processor class at the specified path.
@@ -67,6 +72,40 @@ def get_processor_class_by_name(name):
     )
 
 
+def get_response_fields(processor_name, response):
+    """Return the indexed fields of a payment processor response.
+
+    Arguments:
+        processor_name (string): The name of the payment processor that sent the response.
+        response (dict): The response, as recorded in a PaymentProcessorResponse.
+
+    Returns:
+        dict: The `decision`, `amount` and `currency` of the response. Fields that cannot be
+            determined, e.g. because the processor is no longer configured, are None.
+    """
+    fields = {'decision': None, 'amount': None, 'currency': None}
+    try:
+        # Some processors record JSON-encoded responses.
+        if isinstance(response, basestring):
+            response = json.loads(response)
+        fields.update(get_processor_class_by_name(processor_name).get_response_fields(response))
+    except exceptions.ProcessorNotFoundError:
+        return fields
+    except Exception:  # pylint: disable=broad-except
+        # The response must always be recorded, even if its format is unexpected.
+        logger.exception('Failed to extract fields from [%s] payment processor response.', processor_name)
+        return {'decision': None, 'amount': None, 'currency': None}
+
+    if fields['amount'] is not None:
+        try:
+            fields['amount'] = Decimal(unicode(fields['amount'])).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            fields['amount'] = None
+    if fields['decision'] is not None:
+        fields['decision'] = fields['decision'][:64]
+    return fields
+
+
 def sign(message, secret):
     """Compute a Base64-encoded HMAC-SHA256.
 
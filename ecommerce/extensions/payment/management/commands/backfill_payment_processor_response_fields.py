@@ -0,0 +1,66 @@
+"""
+Management command that extracts the decision, amount and currency of previously recorded payment processor responses.
+
+Responses recorded before these fields were introduced only have them in their JSON blob.
+"""
+from __future__ import unicode_literals
+
+import time
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.payment.helpers import get_response_fields
+
+PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
+
+
+class Command(BaseCommand):
+    help = 'Populate the decision, amount and currency of payment processor responses recorded without them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-b', '--batch-size',
+                            action='store',
+                            dest='batch_size',
+                            default=1000,
+                            type=int,
+                            help='Number of response IDs to process per batch.')
+        # Sleeping between each batch gives MySQL time to process other connections.
+        parser.add_argument('-s', '--sleep-seconds',
+                            action='store',
+                            dest='sleep_seconds',
+                            default=0,
+                            type=float,
+                            help='Seconds to sleep between each batch.')
+
+    def handle(self, *args, **options):
+        queryset = PaymentProcessorResponse.objects.filter(decision__isnull=True, amount__isnull=True,
+                                                           currency__isnull=True)
+        batch_size = options['batch_size']
+        sleep_seconds = options['sleep_seconds']
+
+        last = queryset.order_by('-id').first()
+        if not last:
+            self.stderr.write('No payment processor responses to backfill.')
+            return
+
+        updated = 0
+        start_time = time.time()
+        # Batches are ranges of IDs, so that each batch query is an index range scan.
+        for start in range(0, last.id + 1, batch_size):
+            end = start + batch_size - 1
+            with transaction.atomic():
+                responses = queryset.filter(pk__gte=start, pk__lte=end).only('id', 'processor_name', 'response')
+                for response in responses:
+                    fields = get_response_fields(response.processor_name, response.response)
+                    if any(value is not None for value in fields.values()):
+                        PaymentProcessorResponse.objects.filter(pk=response.pk).update(**fields)
+                        updated += 1
+
+            elapsed = time.time() - start_time
+            self.stderr.write('Processed responses [{start}] through [{end}] of [{last}]. Updated [{updated}] '
+                              'responses in [{elapsed:.2f}] seconds.'.format(start=start, end=end, last=last.id,
+                                                                             updated=updated, elapsed=elapsed))
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
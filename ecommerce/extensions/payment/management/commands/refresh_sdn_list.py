@@ -0,0 +1,43 @@
+"""
+Management command that downloads the SDN lists screened by the sites, for the local SDN index.
+
+See ecommerce.extensions.payment.sdn. The command is meant to be run periodically, e.g. daily, so
+that the local SDN index follows the updates of the consolidated screening lists.
+"""
+from __future__ import unicode_literals
+
+from django.core.management import BaseCommand, CommandError
+from requests.exceptions import RequestException
+
+from ecommerce.core.models import SiteConfiguration
+from ecommerce.extensions.payment.sdn import fetch_sdn_list, replace_sdn_list
+from ecommerce.extensions.payment.utils import get_sdn_session
+
+
+class Command(BaseCommand):
+    help = 'Download the SDN lists of the sites with SDN checks enabled, for the local SDN index.'
+
+    def handle(self, *args, **options):
+        sdn_apis = set(
+            SiteConfiguration.objects.filter(enable_sdn_check=True).values_list(
+                'sdn_api_url', 'sdn_api_key', 'sdn_api_list'
+            )
+        )
+        if not sdn_apis:
+            self.stderr.write('No sites have SDN checks enabled.')
+            return
+
+        failed = []
+        for api_url, api_key, sdn_list in sorted(sdn_apis):
+            try:
+                records = fetch_sdn_list(get_sdn_session(), api_url, api_key, sdn_list)
+            except RequestException as exc:
+                self.stderr.write('Failed to download SDN list [{}] from [{}]: {}'.format(sdn_list, api_url, exc))
+                failed.append(sdn_list)
+                continue
+
+            replace_sdn_list(sdn_list, records)
+            self.stderr.write('Downloaded [{}] entries of SDN list [{}].'.format(len(records), sdn_list))
+
+        if failed:
+            raise CommandError('Failed to download SDN lists: {}'.format(', '.join(failed)))
@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+from django.core.management import call_command
+from oscar.core.loading import get_model
+
+from ecommerce.tests.testcases import TestCase
+
+PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
+
+
+class BackfillPaymentProcessorResponseFieldsTests(TestCase):
+    command = 'backfill_payment_processor_response_fields'
+
+    def create_response(self, processor_name, response):
+        ppr = PaymentProcessorResponse.objects.create(processor_name=processor_name, response=response)
+        # Simulate a response recorded before the fields were extracted.
+        PaymentProcessorResponse.objects.filter(pk=ppr.pk).update(decision=None, amount=None, currency=None)
+        return ppr
+
+    def test_backfill(self):
+        """ Verify the fields of responses recorded without them are extracted, in batches. """
+        cybersource = self.create_response('cybersource', {'decision': 'ACCEPT', 'req_amount': '5.00',
+                                                           'req_currency': 'USD'})
+        paypal = self.create_response('paypal', {'state': 'approved'})
+        unknown = self.create_response('unknown', {'state': 'approved'})
+
+        call_command(self.command, batch_size=2)
+
+        cybersource.refresh_from_db()
+        self.assertEqual((cybersource.decision, cybersource.amount, cybersource.currency),
+                         ('ACCEPT', Decimal('5.00'), 'USD'))
+        paypal.refresh_from_db()
+        self.assertEqual(paypal.decision, 'approved')
+        unknown.refresh_from_db()
+        self.assertIsNone(unknown.decision)
+
+    def test_nothing_to_backfill(self):
+        """ Verify the command succeeds when there is nothing to backfill. """
+        call_command(self.command)
+        self.assertEqual(PaymentProcessorResponse.objects.count(), 0)
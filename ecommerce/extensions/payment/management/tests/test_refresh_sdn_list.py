@@ -0,0 +1,68 @@
+import json
+
+import httpretty
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from ecommerce.extensions.payment.models import SDNListEntry
+from ecommerce.tests.testcases import TestCase
+
+
+class RefreshSDNListTests(TestCase):
+    command = 'refresh_sdn_list'
+
+    def setUp(self):
+        super(RefreshSDNListTests, self).setUp()
+        self.site_configuration.enable_sdn_check = True
+        self.site_configuration.sdn_api_url = 'http://sdn-test.fake/'
+        self.site_configuration.sdn_api_key = 'fake-key'
+        self.site_configuration.sdn_api_list = 'SDN,TEST'
+        self.site_configuration.save()
+
+    def mock_sdn_responses(self, pages, status=200):
+        total = sum(len(page) for page in pages)
+        httpretty.register_uri(
+            httpretty.GET,
+            self.site_configuration.sdn_api_url,
+            responses=[
+                httpretty.Response(body=json.dumps({'total': total, 'results': page}), status=status,
+                                   content_type='application/json')
+                for page in pages
+            ]
+        )
+
+    @httpretty.activate
+    def test_refresh(self):
+        """ Verify every page of the SDN list is downloaded, replacing the previous entries. """
+        SDNListEntry.objects.create(sdn_list='SDN,TEST', name='Former entry', record={})
+        pages = [[{'name': 'Dr. Evil', 'source': 'Test'}, {'name': 'Mini-Me'}], [{'name': 'Keyser Soze'}]]
+        self.mock_sdn_responses(pages)
+
+        with self.settings(SDN_LIST_PAGE_SIZE=2):
+            call_command(self.command)
+
+        self.assertEqual(
+            sorted(SDNListEntry.objects.values_list('sdn_list', 'name', 'source')),
+            [('SDN,TEST', 'Dr. Evil', 'Test'), ('SDN,TEST', 'Keyser Soze', ''), ('SDN,TEST', 'Mini-Me', '')]
+        )
+        offsets = [request.querystring['offset'] for request in httpretty.httpretty.latest_requests]
+        self.assertEqual(offsets, [['0'], ['2']])
+
+    @httpretty.activate
+    def test_refresh_failure(self):
+        """ Verify the previous entries are kept if the SDN list cannot be downloaded. """
+        SDNListEntry.objects.create(sdn_list='SDN,TEST', name='Former entry', record={})
+        self.mock_sdn_responses([[]], status=500)
+
+        with self.assertRaises(CommandError):
+            call_command(self.command)
+
+        self.assertEqual(list(SDNListEntry.objects.values_list('name', flat=True)), ['Former entry'])
+
+    def test_no_sdn_check(self):
+        """ Verify nothing is downloaded if no site has SDN checks enabled. """
+        self.site_configuration.enable_sdn_check = False
+        self.site_configuration.save()
+
+        call_command(self.command)
+        self.assertFalse(SDNListEntry.objects.exists())
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 08:29
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basket', '0012_inmemorybasket'),
+        ('payment', '0019_auto_20180628_2011'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentprocessorresponse',
+            name='amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Amount'),
+        ),
+        migrations.AddField(
+            model_name='paymentprocessorresponse',
+            name='currency',
+            field=models.CharField(blank=True, max_length=12, null=True, verbose_name='Currency'),
+        ),
+        migrations.AddField(
+            model_name='paymentprocessorresponse',
+            name='decision',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True, verbose_name='Decision'),
+        ),
+        migrations.AlterIndexTogether(
+            name='paymentprocessorresponse',
+            index_together=set([('processor_name', 'transaction_id'), ('basket', 'decision')]),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 08:41
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0020_payment_processor_response_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SDNListEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sdn_list', models.CharField(db_index=True, max_length=255)),
+                ('source', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('alt_names', jsonfield.fields.JSONField(default=list)),
+                ('addresses', jsonfield.fields.JSONField(default=list)),
+                ('record', jsonfield.fields.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'SDN List Entry',
+                'verbose_name_plural': 'SDN List Entries',
+            },
+        ),
+    ]
@@ -8,6 +8,7 @@ from oscar.apps.payment.abstract_models import AbstractSource
 from solo.models import SingletonModel
 
 from ecommerce.extensions.payment.constants import CARD_TYPE_CHOICES
+from ecommerce.extensions.payment.helpers import get_response_fields
 
 
 class PaymentProcessorResponse(models.Model):
@@ -19,13 +20,25 @@ class PaymentProcessorResponse(models.Model):
                                on_delete=models.SET_NULL)
     response = JSONField()
     created = models.DateTimeField(auto_now_add=True, db_index=True)
+    # The following fields are extracted from the response when it is recorded, so that responses can
+    # be queried without scanning their JSON. See BasePaymentProcessor.get_response_fields.
+    decision = models.CharField(max_length=64, verbose_name=_('Decision'), null=True, blank=True, db_index=True)
+    amount = models.DecimalField(decimal_places=2, max_digits=12, verbose_name=_('Amount'), null=True, blank=True)
+    currency = models.CharField(max_length=12, verbose_name=_('Currency'), null=True, blank=True)
 
     class Meta(object):
         get_latest_by = 'created'
-        index_together = ('processor_name', 'transaction_id')
+        index_together = (('processor_name', 'transaction_id'), ('basket', 'decision'))
         verbose_name = _('Payment Processor Response')
         verbose_name_plural = _('Payment Processor Responses')
 
+    def save(self, *args, **kwargs):
+        if self.pk is None and self.decision is None and self.amount is None and self.currency is None:
+            for field, value in get_response_fields(self.processor_name, self.response).items():
+                setattr(self, field, value)
+
+        super(PaymentProcessorResponse, self).save(*args, **kwargs)
+
 
 class Source(AbstractSource):
     card_type = models.CharField(max_length=255, choices=CARD_TYPE_CHOICES, null=True, blank=True)
@@ -67,5 +80,29 @@ class SDNCheckFailure(TimeStampedModel):
     class Meta(object):
         verbose_name = 'SDN Check Failure'
 
+
+class SDNListEntry(models.Model):
+    """
+    Individual listed on a consolidated screening list, as returned by the SDN API.
+
+    Entries are downloaded by the refresh_sdn_list management command, and loaded into the in-process
+    index used to screen checkouts without calling the SDN API. See ecommerce.extensions.payment.sdn.
+    """
+    # Comma-separated list sources, as configured on the sites whose checks the entry answers.
+    sdn_list = models.CharField(max_length=255, db_index=True)
+    source = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    alt_names = JSONField(default=list)
+    addresses = JSONField(default=list)
+    record = JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __unicode__(self):
+        return 'SDN list entry [{name}]'.format(name=self.name)
+
+    class Meta(object):
+        verbose_name = 'SDN List Entry'
+        verbose_name_plural = 'SDN List Entries'
+
 # noinspection PyUnresolvedReferences
 from oscar.apps.payment.models import *  # noqa isort:skip pylint: disable=ungrouped-imports, wildcard-import,unused-wildcard-import,wrong-import-position,wrong-import-order
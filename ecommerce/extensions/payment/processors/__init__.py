@@ -110,6 +110,19 @@ class BasePaymentProcessor(object):  # pragma: no cover
         return PaymentProcessorResponse.objects.create(processor_name=self.NAME, transaction_id=transaction_id,
                                                        response=response, basket=basket)
 
+    @classmethod
+    def get_response_fields(cls, response):  # pylint: disable=unused-argument
+        """
+        Extract the fields of a processor response stored in indexed PaymentProcessorResponse columns.
+
+        Arguments:
+            response (dict): Response received from the payment processor, as recorded.
+
+        Returns:
+            dict: Any of `decision` (the processor's decision or state), `amount` and `currency`.
+        """
+        return {}
+
     @abc.abstractmethod
     def issue_credit(self, order_number, basket, reference_number, amount, currency):
         """
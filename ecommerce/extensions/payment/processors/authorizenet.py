@@ -334,6 +334,17 @@ class AuthorizeNet(BaseClientSidePaymentProcessor):
             card_type=card_info.cardType
         )
 
+    @classmethod
+    def get_response_fields(cls, response):
+        # Transaction details and refunds are recorded with a transaction response, notifications with a payload.
+        transaction = response.get('transaction') or {}
+        payload = response.get('payload') or response.get('transactionResponse') or {}
+        decision = transaction.get('transactionStatus') or payload.get('responseCode')
+        return {
+            'decision': unicode(decision) if decision is not None else None,
+            'amount': transaction.get('settleAmount') or payload.get('authAmount'),
+        }
+
     def issue_credit(self, order_number, basket, reference_number, amount, currency):  # pylint: disable=too-many-statements
         """
             Refund a AuthorizeNet payment for settled transactions.For more Authorizenet Refund API information,
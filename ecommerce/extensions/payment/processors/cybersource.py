@@ -353,6 +353,17 @@ class Cybersource(ApplePayMixin, BaseClientSidePaymentProcessor):
         use_sop_profile = req_profile_id == self.sop_profile_id
         return response and (self._generate_signature(response, use_sop_profile) == response.get('signature'))
 
+    @classmethod
+    def get_response_fields(cls, response):
+        # Payment notifications are flat, signed form fields; SOAP replies nest totals per service.
+        purchase_totals = response.get('purchaseTotals') or {}
+        reply = response.get('ccCreditReply') or response.get('ccAuthReply') or {}
+        return {
+            'decision': response.get('decision'),
+            'amount': response.get('req_amount') or reply.get('amount') or purchase_totals.get('grandTotalAmount'),
+            'currency': response.get('req_currency') or purchase_totals.get('currency'),
+        }
+
     def issue_credit(self, order_number, basket, reference_number, amount, currency):
         try:
             client = Client(self.soap_api_url, wsse=UsernameToken(self.merchant_id, self.transaction_key))
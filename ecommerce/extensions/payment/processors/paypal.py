@@ -342,6 +342,16 @@ class Paypal(BasePaymentProcessor):
 
         return None
 
+    @classmethod
+    def get_response_fields(cls, response):
+        # Payments carry their amount per transaction, refunds carry a single amount. Errors have neither.
+        amount = response.get('amount') or (response.get('transactions') or [{}])[0].get('amount') or {}
+        return {
+            'decision': response.get('state'),
+            'amount': amount.get('total'),
+            'currency': amount.get('currency'),
+        }
+
     def issue_credit(self, order_number, basket, reference_number, amount, currency):
         try:
             payment = paypalrestsdk.Payment.find(reference_number, api=self.paypal_api)
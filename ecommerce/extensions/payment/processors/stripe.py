@@ -2,6 +2,7 @@
 from __future__ import absolute_import, unicode_literals
 
 import logging
+from decimal import Decimal
 
 import stripe
 from oscar.apps.payment.exceptions import GatewayError, TransactionDeclined
@@ -90,6 +91,16 @@ class Stripe(ApplePayMixin, BaseClientSidePaymentProcessor):
             card_type=card_type
         )
 
+    @classmethod
+    def get_response_fields(cls, response):
+        # Stripe amounts are in cents, see _get_basket_amount.
+        amount = response.get('amount')
+        return {
+            'decision': response.get('status'),
+            'amount': Decimal(amount) / 100 if amount is not None else None,
+            'currency': (response.get('currency') or '').upper() or None,
+        }
+
     def issue_credit(self, order_number, basket, reference_number, amount, currency):
         try:
             refund = stripe.Refund.create(charge=reference_number)
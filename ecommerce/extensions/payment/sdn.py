@@ -0,0 +1,276 @@
+"""
+In-process index of the consolidated screening lists used for SDN checks.
+
+Calling the SDN API adds its latency to every checkout. When SDN_CHECK_USE_LOCAL_INDEX is enabled,
+checks are instead answered from an index of the listed individuals, downloaded by the
+refresh_sdn_list management command. The index is kept in memory, and is rebuilt whenever the
+generation stored in the shared cache changes, i.e. whenever the lists are downloaded again.
+
+Names are matched approximately, word by word, to mirror the fuzzy name search of the SDN API. Lists
+downloaded more than SDN_LOCAL_LIST_MAX_AGE seconds ago are not used, so that checks fall back to the
+SDN API when the lists stop being refreshed.
+"""
+from __future__ import unicode_literals
+
+import difflib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from urllib import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+
+logger = logging.getLogger(__name__)
+
+SDN_INDEX_GENERATION_CACHE_KEY = 'sdn_index_generation'
+# Length of the name token prefixes used to find the entries a name can match.
+TOKEN_PREFIX_LENGTH = 3
+
+_sdn_index = None
+_sdn_index_lock = threading.Lock()
+
+
+def bump_sdn_index_generation():
+    """
+    Invalidates the SDN index of every process sharing the Django cache.
+    """
+    cache.set(SDN_INDEX_GENERATION_CACHE_KEY, uuid4().hex, None)
+
+
+def get_sdn_index_generation():
+    """
+    Returns the current SDN index generation, creating one if the shared cache does not have it.
+    """
+    generation = cache.get(SDN_INDEX_GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(SDN_INDEX_GENERATION_CACHE_KEY, uuid4().hex, None)
+        generation = cache.get(SDN_INDEX_GENERATION_CACHE_KEY)
+    return generation
+
+
+def normalize(value):
+    """
+    Returns the value lowercased, without accents or punctuation, and with single spaces between words.
+    """
+    value = unicodedata.normalize('NFKD', unicode(value or ''))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(re.split(r'[\W_]+', value.lower(), flags=re.UNICODE)).strip()
+
+
+def normalize_name(name):
+    """
+    Returns the normalized name with its words sorted, so that 'Evil, Dr.' and 'Dr. Evil' are equal.
+    """
+    return ' '.join(sorted(normalize(name).split()))
+
+
+def format_address(address):
+    """
+    Returns the normalized text of an address listed by the SDN API.
+    """
+    return normalize(' '.join(
+        unicode(address.get(field) or '') for field in ('address', 'city', 'state', 'postal_code', 'country')
+    ))
+
+
+class SDNIndex(object):
+    """
+    Listed individuals, by SDN list and by the prefixes of the words of their names.
+    """
+
+    def __init__(self, generation, entries):
+        self.generation = generation
+        self.created = time.time()
+        self.entries_by_list = defaultdict(list)
+        self.entries_by_token = defaultdict(lambda: defaultdict(set))
+        # Time at which each list was downloaded, i.e. the creation time of its oldest entry.
+        self.downloaded = {}
+
+        for entry in entries:
+            names = {normalize_name(name) for name in [entry.name] + list(entry.alt_names)}
+            names.discard('')
+            indexed_entry = {
+                'names': [name.split() for name in names],
+                'countries': {(address.get('country') or '').upper() for address in entry.addresses},
+                'addresses': [format_address(address) for address in entry.addresses],
+                'record': entry.record,
+            }
+
+            if entry.sdn_list not in self.downloaded or entry.created < self.downloaded[entry.sdn_list]:
+                self.downloaded[entry.sdn_list] = entry.created
+
+            position = len(self.entries_by_list[entry.sdn_list])
+            self.entries_by_list[entry.sdn_list].append(indexed_entry)
+            for name in names:
+                for token in name.split():
+                    self.entries_by_token[entry.sdn_list][token[:TOKEN_PREFIX_LENGTH]].add(position)
+
+    @classmethod
+    def build(cls, generation):
+        """
+        Loads every downloaded SDN list entry into a new index.
+        """
+        SDNListEntry = get_model('payment', 'SDNListEntry')
+        entries = list(SDNListEntry.objects.only('sdn_list', 'name', 'alt_names', 'addresses', 'record', 'created'))
+        logger.info('Built SDN index [%s] with [%d] entries.', generation, len(entries))
+        return cls(generation, entries)
+
+    def is_stale(self, generation):
+        return generation != self.generation or time.time() - self.created > settings.SDN_LOCAL_INDEX_TIMEOUT
+
+    def has_list(self, sdn_list):
+        return sdn_list in self.entries_by_list
+
+    def is_list_outdated(self, sdn_list):
+        """
+        Returns True if the SDN list was downloaded more than SDN_LOCAL_LIST_MAX_AGE seconds ago.
+        """
+        downloaded = self.downloaded.get(sdn_list)
+        return downloaded is None or (now() - downloaded).total_seconds() > settings.SDN_LOCAL_LIST_MAX_AGE
+
+    def _matches_token(self, token, listed_tokens):
+        return any(
+            token == listed_token or
+            difflib.SequenceMatcher(None, token, listed_token).ratio() >= settings.SDN_LOCAL_MATCH_THRESHOLD
+            for listed_token in listed_tokens
+        )
+
+    def _matches_name(self, indexed_entry, tokens):
+        # Either every word of the name must match a word of a listed name, so that names missing a middle
+        # name, or only giving part of a longer listed name, still match; or every word of a listed name must
+        # match a word of the name, so that names with extra given names or a suffix still match.
+        return any(
+            all(self._matches_token(token, listed_tokens) for token in tokens) or
+            all(self._matches_token(listed_token, tokens) for listed_token in listed_tokens)
+            for listed_tokens in indexed_entry['names']
+        )
+
+    def _matches_location(self, indexed_entry, city, country):
+        # Entries without an address cannot be ruled out by location.
+        if not indexed_entry['addresses']:
+            return True
+
+        if country and country.upper() not in indexed_entry['countries']:
+            return False
+
+        city_tokens = normalize(city).split()
+        if not city_tokens:
+            return True
+        return any(
+            all(token in address.split() for token in city_tokens) for address in indexed_entry['addresses']
+        )
+
+    def search(self, sdn_list, name, city, country):
+        """
+        Searches the SDN list for an individual with the specified details.
+
+        Args:
+            sdn_list (str): Comma-separated list sources, as configured on the site.
+            name (str): Individual's full name.
+            city (str): Individual's city.
+            country (str): ISO 3166-1 alpha-2 country code where the individual is from.
+        Returns:
+            dict: the matching entries, in the same format as the SDN API response.
+        """
+        tokens = normalize_name(name).split()
+        entries = self.entries_by_list.get(sdn_list, [])
+        entries_by_token = self.entries_by_token.get(sdn_list, {})
+
+        positions = set()
+        for token in tokens:
+            positions |= entries_by_token.get(token[:TOKEN_PREFIX_LENGTH], set())
+
+        results = [
+            entries[position]['record'] for position in sorted(positions)
+            if self._matches_name(entries[position], tokens) and
+            self._matches_location(entries[position], city, country)
+        ]
+        return {'total': len(results), 'results': results}
+
+
+def get_sdn_index():
+    """
+    Returns the SDN index of this process, rebuilding it if the SDN index generation has changed.
+    """
+    global _sdn_index  # pylint: disable=global-statement
+
+    generation = get_sdn_index_generation()
+    sdn_index = _sdn_index
+    if sdn_index is None or sdn_index.is_stale(generation):
+        with _sdn_index_lock:
+            sdn_index = _sdn_index
+            if sdn_index is None or sdn_index.is_stale(generation):
+                sdn_index = SDNIndex.build(generation)
+                _sdn_index = sdn_index
+
+    return sdn_index
+
+
+def fetch_sdn_list(session, api_url, api_key, sdn_list):
+    """
+    Retrieves every individual on the SDN list from the SDN API, one page at a time.
+
+    Args:
+        session (requests.Session): Session used to call the SDN API.
+        api_url (str): SDN API URL.
+        api_key (str): SDN API key.
+        sdn_list (str): Comma-separated list sources.
+    Returns:
+        list: the listed individuals
+    Raises:
+        requests.exceptions.RequestException: if the SDN API cannot be reached, or returns an error.
+    """
+    records = []
+    while True:
+        params = urlencode({
+            'sources': sdn_list,
+            'api_key': api_key,
+            'type': 'individual',
+            'size': settings.SDN_LIST_PAGE_SIZE,
+            'offset': len(records),
+        })
+        response = session.get(
+            '{api_url}?{params}'.format(api_url=api_url, params=params),
+            timeout=settings.SDN_CHECK_REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        records.extend(data['results'])
+        if not data['results'] or len(records) >= data['total']:
+            return records
+
+
+@transaction.atomic
+def replace_sdn_list(sdn_list, records):
+    """
+    Replaces the downloaded entries of the SDN list.
+
+    The SDN index of every process is invalidated once the transaction is committed.
+
+    Args:
+        sdn_list (str): Comma-separated list sources.
+        records (list): Individuals listed by the SDN API.
+    """
+    SDNListEntry = get_model('payment', 'SDNListEntry')
+    SDNListEntry.objects.filter(sdn_list=sdn_list).delete()
+    SDNListEntry.objects.bulk_create([
+        SDNListEntry(
+            sdn_list=sdn_list,
+            source=record.get('source') or '',
+            name=record['name'][:255],
+            alt_names=record.get('alt_names') or [],
+            addresses=record.get('addresses') or [],
+            record=record,
+        )
+        for record in records
+    ], batch_size=1000)
+    transaction.on_commit(bump_sdn_index_generation)
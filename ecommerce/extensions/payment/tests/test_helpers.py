@@ -1,4 +1,8 @@
+import json
+from decimal import Decimal
+
 import ddt
+import mock
 from django.test import override_settings
 
 from ecommerce.extensions.payment import helpers
@@ -40,3 +44,37 @@ class HelperTests(TestCase):
         secret = "password"
         expected = "qU4fRskS/R9yZx/yPq62sFGOUzX0GSUtmeI6bPVsqao="
         self.assertEqual(helpers.sign(message, secret), expected)
+
+
+@ddt.ddt
+class GetResponseFieldsTests(TestCase):
+    @ddt.unpack
+    @ddt.data(
+        ('cybersource', {'decision': 'ACCEPT', 'req_amount': '100.00', 'req_currency': 'USD'},
+         ('ACCEPT', Decimal('100.00'), 'USD')),
+        ('cybersource',
+         {'decision': 'ACCEPT', 'ccCreditReply': {'amount': '25.50'}, 'purchaseTotals': {'currency': 'USD'}},
+         ('ACCEPT', Decimal('25.50'), 'USD')),
+        ('paypal', {'state': 'approved', 'transactions': [{'amount': {'total': '10.00', 'currency': 'USD'}}]},
+         ('approved', Decimal('10.00'), 'USD')),
+        ('paypal', {'state': 'completed', 'amount': {'total': '10.00', 'currency': 'EUR'}},
+         ('completed', Decimal('10.00'), 'EUR')),
+        ('paypal', {'name': 'VALIDATION_ERROR', 'debug_id': 'abc'}, (None, None, None)),
+        ('stripe', {'status': 'succeeded', 'amount': 1050, 'currency': 'usd'}, ('succeeded', Decimal('10.50'), 'USD')),
+        ('authorizenet',
+         json.dumps({'transaction': {'transactionStatus': 'settledSuccessfully', 'settleAmount': 12.5}}),
+         ('settledSuccessfully', Decimal('12.50'), None)),
+        ('authorizenet', {'payload': {'responseCode': 1, 'authAmount': 45.0}}, ('1', Decimal('45.00'), None)),
+        ('unknown', {'decision': 'ACCEPT'}, (None, None, None)),
+    )
+    def test_get_response_fields(self, processor_name, response, expected):
+        """ Verify the decision, amount and currency are extracted from each processor's responses. """
+        fields = helpers.get_response_fields(processor_name, response)
+        self.assertEqual((fields['decision'], fields['amount'], fields['currency']), expected)
+
+    def test_get_response_fields_unexpected_format(self):
+        """ Verify unexpected response formats yield no fields, rather than an error. """
+        with mock.patch.object(helpers.logger, 'exception') as mock_exception:
+            fields = helpers.get_response_fields('paypal', ['not', 'a', 'dict'])
+        self.assertEqual(fields, {'decision': None, 'amount': None, 'currency': None})
+        self.assertTrue(mock_exception.called)
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
-from ecommerce.extensions.payment.models import SDNCheckFailure
+from decimal import Decimal
+
+from ecommerce.extensions.payment.models import PaymentProcessorResponse, SDNCheckFailure
 from ecommerce.tests.testcases import TestCase
 
 
@@ -25,3 +27,23 @@ class SDNCheckFailureTests(TestCase):
         )
 
         self.assertEqual(unicode(basket), expected)
+
+
+class PaymentProcessorResponseTests(TestCase):
+    def test_fields_extracted_on_create(self):
+        """ Verify the decision, amount and currency are extracted from the response when it is recorded. """
+        response = PaymentProcessorResponse.objects.create(
+            processor_name='cybersource',
+            response={'decision': 'ACCEPT', 'req_amount': '10.00', 'req_currency': 'USD'}
+        )
+        response.refresh_from_db()
+        self.assertEqual(response.decision, 'ACCEPT')
+        self.assertEqual(response.amount, Decimal('10.00'))
+        self.assertEqual(response.currency, 'USD')
+
+    def test_explicit_fields_kept(self):
+        """ Verify fields set explicitly are not overwritten by those extracted from the response. """
+        response = PaymentProcessorResponse.objects.create(
+            processor_name='cybersource', response={'decision': 'ACCEPT'}, decision='REJECT'
+        )
+        self.assertEqual(response.decision, 'REJECT')
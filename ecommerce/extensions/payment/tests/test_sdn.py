@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import datetime
+
+import ddt
+from django.test import override_settings
+from django.utils.timezone import now
+
+from ecommerce.extensions.payment.models import SDNListEntry
+from ecommerce.extensions.payment.sdn import (
+    SDNIndex,
+    bump_sdn_index_generation,
+    get_sdn_index,
+    get_sdn_index_generation,
+    normalize_name,
+    replace_sdn_list
+)
+from ecommerce.tests.testcases import TestCase
+
+SDN_LIST = 'SDN,TEST'
+
+
+@ddt.ddt
+class SDNIndexTests(TestCase):
+    def setUp(self):
+        super(SDNIndexTests, self).setUp()
+        self.evil = {
+            'name': 'EVIL, Dr.',
+            'alt_names': ['Douglas Powers'],
+            'addresses': [{'address': '1 Volcano Road', 'city': 'Top-secret lair', 'country': 'EL'}],
+        }
+        self.soze = {'name': 'Keyser Söze', 'addresses': []}
+        self.other = {'name': 'Dr. Evil', 'addresses': []}
+        self.index = SDNIndex('generation', [
+            self.create_entry(SDN_LIST, self.evil),
+            self.create_entry(SDN_LIST, self.soze),
+            self.create_entry('OTHER', self.other),
+        ])
+
+    def create_entry(self, sdn_list, record, created=None):
+        return SDNListEntry(sdn_list=sdn_list, name=record['name'], alt_names=record.get('alt_names', []),
+                            addresses=record['addresses'], record=record, created=created or now())
+
+    def test_normalize_name(self):
+        """ Verify names are compared regardless of case, accents, punctuation and word order. """
+        self.assertEqual(normalize_name('EVIL, Dr.'), 'dr evil')
+        self.assertEqual(normalize_name(' Keyser  Söze'), 'keyser soze')
+
+    @ddt.data(
+        ('Dr. Evil', 'Top-secret lair', 'EL', True),
+        ('Dr Evill', 'Top-secret lair', 'EL', True),
+        ('douglas powers', 'top secret lair', 'el', True),
+        ('Dr. Evil', '', '', True),
+        ('Dr. Evil', 'Top-secret lair', 'US', False),
+        ('Dr. Evil', 'Paris', 'EL', False),
+        ('Dr. Good', 'Top-secret lair', 'EL', False),
+        ('Scott Evil', 'Top-secret lair', 'EL', False),
+    )
+    @ddt.unpack
+    def test_search(self, name, city, country, is_hit):
+        """ Verify names are matched approximately, and the location is matched against the listed addresses. """
+        expected = [self.evil] if is_hit else []
+        self.assertEqual(self.index.search(SDN_LIST, name, city, country), {'total': len(expected),
+                                                                            'results': expected})
+
+    @ddt.data(
+        ('John Smith', True),
+        ('Smith, John', True),
+        ('Jon Smith', True),
+        ('John Michael Smith', True),
+        ('Michael Smith', True),
+        ('Smith', True),
+        ('John Michael Smith Jr', True),
+        ('Jane Smith', False),
+        ('John Jones', False),
+        ('John Michael Jones', False),
+    )
+    @ddt.unpack
+    def test_search_multi_part_names(self, name, is_hit):
+        """ Verify every word of the name must match a word of a listed name, whatever the other listed words. """
+        record = {'name': 'John Michael Smith', 'addresses': []}
+        index = SDNIndex('generation', [self.create_entry(SDN_LIST, record)])
+        expected = [record] if is_hit else []
+        self.assertEqual(index.search(SDN_LIST, name, '', ''), {'total': len(expected), 'results': expected})
+
+    @ddt.data(
+        ('John Michael Smith', True),
+        ('John Michael Robert Smith', True),
+        ('John Smith Jr', True),
+        ('Smith John Michael', True),
+        ('Smith, John', True),
+        ('John Michael', False),
+        ('Jane Michael Smith', False),
+    )
+    @ddt.unpack
+    def test_search_names_with_extra_words(self, name, is_hit):
+        """ Verify names with extra given names or a suffix match a listed name whose every word they contain. """
+        record = {'name': 'John Smith', 'addresses': []}
+        index = SDNIndex('generation', [self.create_entry(SDN_LIST, record)])
+        expected = [record] if is_hit else []
+        self.assertEqual(index.search(SDN_LIST, name, '', ''), {'total': len(expected), 'results': expected})
+
+    def test_is_list_outdated(self):
+        """ Verify lists downloaded more than SDN_LOCAL_LIST_MAX_AGE seconds ago, or never, are outdated. """
+        old = now() - datetime.timedelta(days=3)
+        index = SDNIndex('generation', [
+            self.create_entry(SDN_LIST, self.evil),
+            self.create_entry('OTHER', self.other, created=old),
+        ])
+
+        with override_settings(SDN_LOCAL_LIST_MAX_AGE=2 * 24 * 3600):
+            self.assertFalse(index.is_list_outdated(SDN_LIST))
+            self.assertTrue(index.is_list_outdated('OTHER'))
+            self.assertTrue(index.is_list_outdated('UNKNOWN'))
+
+    def test_search_without_address(self):
+        """ Verify individuals without a listed address are matched on their name alone. """
+        self.assertEqual(self.index.search(SDN_LIST, 'Keyser Soze', 'Anywhere', 'US'),
+                         {'total': 1, 'results': [self.soze]})
+
+    def test_search_other_list(self):
+        """ Verify only the entries of the searched SDN list are matched. """
+        self.assertTrue(self.index.has_list('OTHER'))
+        self.assertFalse(self.index.has_list('UNKNOWN'))
+        self.assertEqual(self.index.search('OTHER', 'Dr. Evil', 'Paris', 'US'), {'total': 1, 'results': [self.other]})
+        self.assertEqual(self.index.search('UNKNOWN', 'Dr. Evil', 'Paris', 'US'), {'total': 0, 'results': []})
+
+    def test_get_sdn_index(self):
+        """ Verify the index is only rebuilt when the generation changes, or the index expires. """
+        replace_sdn_list(SDN_LIST, [self.evil])
+        index = get_sdn_index()
+        self.assertEqual(index.generation, get_sdn_index_generation())
+        self.assertTrue(index.has_list(SDN_LIST))
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_sdn_index(), index)
+
+        bump_sdn_index_generation()
+        self.assertIsNot(get_sdn_index(), index)
+
+        with override_settings(SDN_LOCAL_INDEX_TIMEOUT=-1):
+            self.assertIsNot(get_sdn_index(), get_sdn_index())
+
+    def test_replace_sdn_list(self):
+        """ Verify the entries of the SDN list are replaced, and the entries of other lists are kept. """
+        replace_sdn_list(SDN_LIST, [self.evil, self.soze])
+        replace_sdn_list('OTHER', [self.other])
+        replace_sdn_list(SDN_LIST, [self.soze])
+
+        self.assertEqual(
+            sorted(SDNListEntry.objects.values_list('sdn_list', 'name')),
+            [('OTHER', 'Dr. Evil'), (SDN_LIST, 'Keyser Söze')]
+        )
@@ -11,8 +11,9 @@ from oscar.test import factories
 from requests.exceptions import HTTPError, Timeout
 
 from ecommerce.core.models import User
-from ecommerce.extensions.payment.models import SDNCheckFailure
-from ecommerce.extensions.payment.utils import SDNClient, clean_field_value, middle_truncate
+from ecommerce.extensions.payment.models import SDNCheckFailure, SDNListEntry
+from ecommerce.extensions.payment.sdn import bump_sdn_index_generation, replace_sdn_list
+from ecommerce.extensions.payment.utils import SDNClient, clean_field_value, get_sdn_session, middle_truncate
 from ecommerce.tests.testcases import TestCase
 
 
@@ -123,6 +124,62 @@ class SDNCheckTests(TestCase):
         response = self.sdn_validator.search(self.name, self.city, self.country)
         self.assertEqual(response, sdn_response)
 
+    @httpretty.activate
+    def test_sdn_check_cached(self):
+        """ Verify the SDN API responses are cached, regardless of the case and spacing of the details. """
+        sdn_response = {'total': 0}
+        self.mock_sdn_response(json.dumps(sdn_response))
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), sdn_response)
+        self.assertEqual(self.sdn_validator.search(' dr.  EVIL ', self.city.upper(), self.country.lower()),
+                         sdn_response)
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 1)
+
+        # Other details, or SDN lists, are looked up again.
+        self.sdn_validator.search('Mini-Me', self.city, self.country)
+        SDNClient(self.site_configuration.sdn_api_url, self.site_configuration.sdn_api_key, 'SDN').search(
+            self.name, self.city, self.country
+        )
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 3)
+
+    @httpretty.activate
+    def test_sdn_check_error_not_cached(self):
+        """ Verify failed SDN API requests are not cached. """
+        self.mock_sdn_response(json.dumps({'total': 1}), status_code=500)
+        with self.assertRaises(HTTPError):
+            self.sdn_validator.search(self.name, self.city, self.country)
+
+        self.mock_sdn_response(json.dumps({'total': 1}))
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), {'total': 1})
+
+    def test_sdn_session(self):
+        """ Verify SDN API requests share a single session. """
+        self.assertIs(get_sdn_session(), get_sdn_session())
+
+    @httpretty.activate
+    @override_settings(SDN_CHECK_USE_LOCAL_INDEX=True)
+    def test_sdn_check_local_index(self):
+        """ Verify the check is answered from the local SDN index, once the SDN list is downloaded. """
+        record = {'name': 'EVIL, Dr.', 'source': 'Test List', 'addresses': [{'city': self.city, 'country': 'EL'}]}
+        self.mock_sdn_response(json.dumps({'total': 0}))
+
+        # The SDN list has not been downloaded yet.
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), {'total': 0})
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 1)
+
+        replace_sdn_list(self.site_configuration.sdn_api_list, [record])
+        self.assertEqual(SDNListEntry.objects.count(), 1)
+        # The generation is bumped once the transaction is committed, which never happens in tests.
+        bump_sdn_index_generation()
+        self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country),
+                         {'total': 1, 'results': [record]})
+        self.assertEqual(self.sdn_validator.search('Austin Powers', self.city, self.country),
+                         {'total': 0, 'results': []})
+        self.assertEqual(len(httpretty.httpretty.latest_requests), 1)
+
+        # Outdated SDN lists are not used, e.g. when they have not been downloaded again for too long.
+        with override_settings(SDN_LOCAL_LIST_MAX_AGE=-1):
+            self.assertEqual(self.sdn_validator.search(self.name, self.city, self.country), {'total': 0})
+
     def test_deactivate_user(self):
         """ Verify an SDN failure is logged. """
         response = {'description': 'Bad dude.'}
@@ -7,16 +7,29 @@ import lxml
 import requests
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
+from edx_django_utils.cache import TieredCache
 from oscar.core.loading import get_model
 
+from ecommerce.core.api_clients import api_client_registry
 from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
+from ecommerce.core.utils import get_cache_key
 from ecommerce.extensions.analytics.utils import parse_tracking_context
 from ecommerce.extensions.payment.models import SDNCheckFailure
+from ecommerce.extensions.payment.sdn import get_sdn_index
 
 logger = logging.getLogger(__name__)
 Basket = get_model('basket', 'Basket')
 
 
+def get_sdn_session():
+    """
+    Returns the requests Session shared by all SDN API calls in this process.
+
+    Reusing the session keeps connections to the SDN API alive across checkouts.
+    """
+    return api_client_registry.get_session('sdn', pool_size=settings.SDN_CHECK_CONNECTION_POOL_SIZE)
+
+
 class LxmlObjectJsonEncoder(json.JSONEncoder):
     """
        A specialized JSON encoder that can handle lxml objectify types
@@ -138,6 +151,11 @@ class SDNClient(object):
             * SDN API returns a non-200 status code response
             * user is not found on the SDN list
 
+        If SDN_CHECK_USE_LOCAL_INDEX is enabled and the SDN list has been downloaded in the last
+        SDN_LOCAL_LIST_MAX_AGE seconds, the check is answered from the local SDN index. Otherwise, the
+        SDN API responses are cached for SDN_CHECK_CACHE_TIMEOUT seconds, so that retried checkouts do
+        not repeat the same lookup.
+
         Args:
             name (str): Individual's full name.
             city (str): Individual's city.
@@ -145,6 +163,32 @@ class SDNClient(object):
         Returns:
             dict: SDN API response.
         """
+        if settings.SDN_CHECK_USE_LOCAL_INDEX:
+            sdn_index = get_sdn_index()
+            if not sdn_index.has_list(self.sdn_list):
+                logger.warning('SDN list [%s] has not been downloaded. Falling back to the SDN API.', self.sdn_list)
+            elif sdn_index.is_list_outdated(self.sdn_list):
+                logger.warning('SDN list [%s] is outdated. Falling back to the SDN API.', self.sdn_list)
+            else:
+                return sdn_index.search(self.sdn_list, name, city, country)
+
+        # Differences in case and spacing do not change the SDN API response. The details are JSON encoded,
+        # which escapes the non-ASCII characters get_cache_key cannot hash.
+        cache_key = get_cache_key(
+            resource='sdn_check',
+            api_url=self.api_url,
+            sdn_list=self.sdn_list,
+            details=json.dumps([' '.join(unicode(value).lower().split()) for value in (name, city, country)]),
+        )
+        cached_response = TieredCache.get_cached_response(cache_key)
+        if cached_response.is_found:
+            return cached_response.value
+
+        response = self._search_api(name, city, country)
+        TieredCache.set_all_tiers(cache_key, response, settings.SDN_CHECK_CACHE_TIMEOUT)
+        return response
+
+    def _search_api(self, name, city, country):
         params = urlencode({
             'sources': self.sdn_list,
             'api_key': self.api_key,
@@ -161,7 +205,7 @@ class SDNClient(object):
         )
 
         try:
-            response = requests.get(sdn_check_url, timeout=settings.SDN_CHECK_REQUEST_TIMEOUT)
+            response = get_sdn_session().get(sdn_check_url, timeout=settings.SDN_CHECK_REQUEST_TIMEOUT)
         except requests.exceptions.Timeout:
             logger.warning('Connection to US Treasury SDN API timed out for [%s].', name)
             raise
@@ -1,10 +1,27 @@
+import logging
+import operator
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
 from oscar.core.loading import get_model
 
+from ecommerce.extensions.analytics.utils import audit_log
 from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.refund.executor import PermanentFailure, RefundExecutor
+from ecommerce.extensions.refund.status import REFUND, REFUND_LINE
+
+logger = logging.getLogger(__name__)
 
 Option = get_model('catalogue', 'Option')
+OrderLine = get_model('order', 'Line')
 Refund = get_model('refund', 'Refund')
 RefundLine = get_model('refund', 'RefundLine')
+Source = get_model('payment', 'Source')
 
 
 def find_orders_associated_with_course(user, course_id):
@@ -31,8 +48,7 @@ def find_orders_associated_with_course(user, course_id):
 
     # Find all complete orders associated with the course.
     orders = user.orders.filter(status=ORDER.COMPLETE,
-                                lines__product__attribute_values__attribute__code='course_key',
-                                lines__product__attribute_values__value_text=course_id)
+                                lines__product__attribute_index__course_key=course_id)
 
     return list(orders)
 
@@ -79,11 +95,210 @@ def create_refunds(orders, course_id):
     for order in orders:
         # Find lines associated with the course and not refunded.
         lines = order.lines.filter(refund_lines__id__isnull=True,
-                                   product__attribute_values__attribute__code='course_key',
-                                   product__attribute_values__value_text=course_id)
+                                   product__attribute_index__course_key=course_id)
 
         refund = Refund.create_with_lines(order, lines)
         if refund is not None:
             refunds.append(refund)
 
     return refunds
+
+
+def find_refundable_lines(course_id=None, enrollments=None):
+    """
+    Returns the un-refunded lines of complete orders associated with a course, or with a list of enrollments.
+
+    Arguments:
+        course_id (str): Identifier of the course whose lines should be refunded, for all users.
+        enrollments (list): (username, course_id) tuples identifying the lines to refund. Ignored if
+            course_id is given.
+
+    Raises:
+        ValueError if neither a valid course_id nor enrollments are given.
+
+    Returns:
+        QuerySet: order lines, ordered by order
+    """
+    if course_id is not None:
+        if not isinstance(course_id, basestring) or not course_id.strip():
+            raise ValueError('"{}" is not a valid course ID.'.format(course_id))
+        lines_filter = Q(product__attribute_index__course_key=course_id)
+    elif enrollments:
+        usernames_by_course = defaultdict(set)
+        for username, enrollment_course_id in enrollments:
+            usernames_by_course[enrollment_course_id].add(username)
+
+        lines_filter = reduce(operator.or_, [
+            Q(product__attribute_index__course_key=enrollment_course_id, order__user__username__in=usernames)
+            for enrollment_course_id, usernames in usernames_by_course.items()
+        ])
+    else:
+        raise ValueError('A course ID or a list of enrollments is required.')
+
+    return OrderLine.objects.filter(
+        lines_filter,
+        order__status=ORDER.COMPLETE,
+        refund_lines__isnull=True
+    ).select_related('order').order_by('order_id', 'id')
+
+
+def create_refunds_in_bulk(lines, chunk_size=None, batch_id=None):
+    """
+    Creates a refund per order for the given order lines, using bulk inserts.
+
+    Unlike Refund.create_with_lines, this does not approve zero-credit refunds; approval is left to
+    the caller, e.g. approve_refunds. Refunds are created in chunks of orders, one transaction
+    per chunk, and progress is logged after each chunk. Within a chunk's transaction, the order lines
+    are locked and lines refunded since they were found are skipped, so that concurrent calls never
+    refund the same line twice.
+
+    All refunds created by a call share a batch ID, so that refunds created in bulk can be told apart
+    from refunds awaiting review, e.g. by the approve_refunds management command.
+
+    Arguments:
+        lines (iterable): order lines to refund, with their orders selected, e.g. from find_refundable_lines.
+        chunk_size (int): number of orders refunded per chunk. Defaults to REFUND_BULK_CHUNK_SIZE.
+        batch_id (UUID): batch ID shared by the refunds created. Defaults to a new, random batch ID.
+
+    Returns:
+        list: IDs of the refunds created
+    """
+    chunk_size = chunk_size or settings.REFUND_BULK_CHUNK_SIZE
+    batch_id = batch_id or uuid.uuid4()
+    refund_status = getattr(settings, 'OSCAR_INITIAL_REFUND_STATUS', REFUND.OPEN)
+    refund_line_status = getattr(settings, 'OSCAR_INITIAL_REFUND_LINE_STATUS', REFUND_LINE.OPEN)
+
+    lines_by_order = OrderedDict()
+    for line in lines:
+        lines_by_order.setdefault(line.order_id, []).append(line)
+    order_ids = list(lines_by_order.keys())
+    line_count = sum(len(order_lines) for order_lines in lines_by_order.values())
+
+    refund_ids = []
+    refunded_line_count = 0
+    start = time.time()
+    for offset in range(0, len(order_ids), chunk_size):
+        chunk = order_ids[offset:offset + chunk_size]
+
+        with transaction.atomic():
+            line_ids = [line.id for order_id in chunk for line in lines_by_order[order_id]]
+            # Concurrent calls for the same lines wait for the lock, then see the refund lines created meanwhile.
+            list(OrderLine.objects.select_for_update().filter(id__in=line_ids).values_list('id', flat=True))
+            refunded_line_ids = set(
+                RefundLine.objects.filter(order_line_id__in=line_ids).values_list('order_line_id', flat=True)
+            )
+            chunk_lines = OrderedDict()
+            for order_id in chunk:
+                order_lines = [line for line in lines_by_order[order_id] if line.id not in refunded_line_ids]
+                if order_lines:
+                    chunk_lines[order_id] = order_lines
+
+            refunds = [
+                Refund(
+                    order_id=order_id,
+                    user_id=order_lines[0].order.user_id,
+                    status=refund_status,
+                    total_credit_excl_tax=sum(line.line_price_excl_tax for line in order_lines),
+                    batch_id=batch_id
+                ) for order_id, order_lines in chunk_lines.items()
+            ]
+            if connection.features.can_return_ids_from_bulk_insert:
+                Refund.objects.bulk_create(refunds)
+            else:
+                # bulk_create does not set primary keys on this database, e.g. MySQL.
+                for refund in refunds:
+                    refund.save()
+
+            RefundLine.objects.bulk_create([
+                RefundLine(
+                    refund=refund,
+                    order_line=line,
+                    line_credit_excl_tax=line.line_price_excl_tax,
+                    quantity=line.quantity,
+                    status=refund_line_status
+                ) for refund in refunds for line in chunk_lines[refund.order_id]
+            ])
+
+        for refund in refunds:
+            order_lines = chunk_lines[refund.order_id]
+            audit_log(
+                'refund_created',
+                amount=refund.total_credit_excl_tax,
+                currency=refund.currency,
+                order_number=order_lines[0].order.number,
+                refund_id=refund.id,
+                user_id=refund.user_id
+            )
+            refund_ids.append(refund.id)
+            refunded_line_count += len(order_lines)
+
+        elapsed = time.time() - start
+        logger.info(
+            'Created refunds in batch [%s] for [%d] of [%d] orders and [%d] of [%d] lines in [%.2f] seconds '
+            '([%.1f] lines per second).',
+            batch_id, min(offset + chunk_size, len(order_ids)), len(order_ids), refunded_line_count, line_count,
+            elapsed, refunded_line_count / elapsed if elapsed else refunded_line_count
+        )
+
+    return refund_ids
+
+
+def _approve_refund(refund_id, revoke_fulfillment, credit_attempted):
+    """
+    Approves a single refund, resuming from its persisted status.
+
+    The refund is re-read on every attempt, so a retry after the credit was issued only repeats revocation.
+    Issuing credit is not idempotent: an attempt may fail after the payment processor refunded the purchaser,
+    e.g. on a timeout or while recording the refund. Refunds still awaiting credit after an attempt are
+    therefore not retried, and are left for review.
+
+    Arguments:
+        credit_attempted (set): IDs of the refunds whose credit has been attempted, shared by all attempts.
+    """
+    refund = Refund.objects.select_related('order__site', 'user').get(id=refund_id)
+    if refund.status == REFUND.PAYMENT_REFUND_PENDING:
+        raise PermanentFailure('Credit for refund [{}] is pending, and may have been issued.'.format(refund_id))
+    if refund.status in (REFUND.OPEN, REFUND.PAYMENT_REFUND_ERROR):
+        if refund_id in credit_attempted:
+            raise PermanentFailure('Credit may have been issued for refund [{}].'.format(refund_id))
+        credit_attempted.add(refund_id)
+
+    return refund.approve(revoke_fulfillment=revoke_fulfillment, notify_purchaser=refund.total_credit_excl_tax != 0)
+
+
+def approve_refunds(refund_ids, revoke_fulfillment=False, executor=None):
+    """
+    Approves the given refunds concurrently, retrying failures.
+
+    Credits are issued with a rate limit per payment processor (see RefundExecutor). Zero-credit
+    refunds are approved without notifying the purchaser, as Refund.create_with_lines does. Only
+    revocation is retried: credit is attempted at most once per refund (see _approve_refund). Since
+    approval resumes from each refund's status, refunds that failed can be passed in again later.
+    Refunds left Payment Refund Pending must first be resolved (see Refund.resolve_pending_credit),
+    once the payment processor confirms whether their credit was issued.
+
+    Arguments:
+        refund_ids (list): IDs of the refunds to approve.
+        revoke_fulfillment (bool): Whether to revoke fulfillment of the refunded lines.
+        executor (RefundExecutor): Executor to use. Defaults to one configured from settings.
+
+    Returns:
+        list: IDs of the refunds that could not be approved
+    """
+    executor = executor or RefundExecutor()
+    approvable = set(
+        Refund.objects.filter(id__in=refund_ids).exclude(status=REFUND.DENIED).values_list('id', flat=True)
+    )
+    processor_names = dict(
+        Source.objects.filter(order__refunds__id__in=approvable).values_list('order__refunds__id', 'source_type__name')
+    )
+    items = [(refund_id, processor_names.get(refund_id)) for refund_id in sorted(approvable)]
+
+    failed = executor.map(
+        partial(_approve_refund, revoke_fulfillment=revoke_fulfillment, credit_attempted=set()), items
+    )
+    failed.extend(refund_id for refund_id in refund_ids if refund_id not in approvable)
+
+    logger.info('Approved [%d] of [%d] refunds.', len(refund_ids) - len(failed), len(refund_ids))
+    return failed
+
@@ -0,0 +1,104 @@
+"""Concurrent execution of refund work, rate limited per payment processor."""
+from __future__ import unicode_literals
+
+import logging
+import time
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.db import connection
+
+from ecommerce.core.rate_limit import RateLimiter, get_retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentFailure(Exception):
+    """Raised by a work function when its work item failed and must not be retried."""
+
+
+class RefundExecutor(object):
+    """
+    Runs refund work items concurrently, with a rate limit per payment processor and retries.
+
+    Each work item is paired with the name of the payment processor it calls. Before each attempt, the
+    executor waits on that processor's rate limiter, so concurrent workers never exceed the rate the
+    processor allows. An attempt that returns a falsy value or raises is retried, with exponential
+    backoff, up to `max_attempts` times. Work functions must therefore be safe to retry, e.g. by
+    resuming from the state persisted by the previous attempt, and raise PermanentFailure when they
+    cannot be retried safely.
+    """
+
+    def __init__(self, max_workers=None, max_attempts=None, retry_delay=None, rate_limits=None):
+        self.max_workers = max_workers or settings.REFUND_EXECUTOR_MAX_WORKERS
+        self.max_attempts = max_attempts or settings.REFUND_EXECUTOR_MAX_ATTEMPTS
+        self.retry_delay = settings.REFUND_EXECUTOR_RETRY_DELAY if retry_delay is None else retry_delay
+        self.rate_limits = settings.REFUND_PROCESSOR_RATE_LIMITS if rate_limits is None else rate_limits
+        self._rate_limiters = {}
+
+    def _get_rate_limiter(self, processor_name):
+        if processor_name not in self._rate_limiters:
+            rate = self.rate_limits.get(processor_name, self.rate_limits.get('default'))
+            self._rate_limiters[processor_name] = RateLimiter(rate)
+        return self._rate_limiters[processor_name]
+
+    def _call(self, func, item, processor_name):
+        rate_limiter = self._get_rate_limiter(processor_name)
+        for attempt in range(1, self.max_attempts + 1):
+            rate_limiter.wait()
+            try:
+                if func(item):
+                    return True
+            except PermanentFailure as exc:
+                logger.warning('Refund work item [%s] failed, and will not be retried: %s', item, exc)
+                return False
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Attempt [%d] of refund work item [%s] raised an exception.', attempt, item)
+
+            if attempt < self.max_attempts:
+                time.sleep(get_retry_delay(attempt - 1, self.retry_delay))
+
+        logger.warning('Refund work item [%s] failed after [%d] attempts.', item, self.max_attempts)
+        return False
+
+    def _call_in_thread(self, args):
+        try:
+            return self._call(*args)
+        finally:
+            # Each worker thread has its own database connection.
+            connection.close()
+
+    def map(self, func, items):
+        """
+        Calls `func` for each work item, concurrently.
+
+        Arguments:
+            func (callable): Called with a work item; returns True if the work succeeded.
+            items (list): (work item, payment processor name) tuples.
+
+        Returns:
+            list: the work items that failed
+        """
+        # Rate limiters are created up front, so that worker threads only ever read the mapping.
+        for __, processor_name in items:
+            self._get_rate_limiter(processor_name)
+
+        args = [(func, item, processor_name) for item, processor_name in items]
+        start = time.time()
+        if self.max_workers <= 1 or len(args) <= 1:
+            results = [self._call(*arg) for arg in args]
+        else:
+            pool = ThreadPool(min(self.max_workers, len(args)))
+            try:
+                results = pool.map(self._call_in_thread, args)
+            finally:
+                pool.close()
+                pool.join()
+
+        failed = [item for (item, __), succeeded in zip(items, results) if not succeeded]
+        elapsed = time.time() - start
+        logger.info(
+            'Processed [%d] refund work items in [%.2f] seconds ([%.1f] per second). [%d] failed.',
+            len(items), elapsed, len(items) / elapsed if elapsed else len(items), len(failed)
+        )
+        return failed
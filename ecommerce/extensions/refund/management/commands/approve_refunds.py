@@ -0,0 +1,102 @@
+"""
+Management command that approves refunds concurrently, e.g. to resume refunds whose approval failed.
+"""
+from __future__ import unicode_literals
+
+import uuid
+
+from django.core.management import BaseCommand, CommandError
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.refund.api import approve_refunds
+from ecommerce.extensions.refund.status import REFUND
+
+Refund = get_model('refund', 'Refund')
+
+RESOLVE_PENDING_REFUNDED = 'refunded'
+RESOLVE_PENDING_ERROR = 'error'
+
+
+class Command(BaseCommand):
+    help = ('Approve refunds by ID, or the refunds with the given statuses. Refunds created in bulk, e.g. by the '
+            'bulk refund API, are left Open, and are approved with --batch-id=<batch ID> --statuses=Open, or with '
+            '--bulk --statuses=Open for every batch. Open refunds not created in bulk await review, and are never '
+            'approved by status. Refunds whose approval was interrupted while issuing credit are left Payment Refund '
+            'Pending, and may have been credited: once the payment processor confirms whether they were, approve '
+            'them with --refund-ids and --resolve-pending=refunded, or --resolve-pending=error to issue their credit '
+            'again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refund-ids',
+                            action='store',
+                            dest='refund_ids',
+                            default=None,
+                            help='Comma-separated list of refund IDs to approve.')
+        parser.add_argument('--statuses',
+                            action='store',
+                            dest='statuses',
+                            default=None,
+                            help='Comma-separated list of statuses whose refunds should be approved, '
+                                 'e.g. {},{}.'.format(REFUND.PAYMENT_REFUND_ERROR, REFUND.REVOCATION_ERROR))
+        parser.add_argument('--batch-id',
+                            action='store',
+                            dest='batch_id',
+                            default=None,
+                            help='Only approve the refunds created in bulk with this batch ID.')
+        parser.add_argument('--bulk',
+                            action='store_true',
+                            dest='bulk',
+                            default=False,
+                            help='Only approve refunds created in bulk, in any batch.')
+        parser.add_argument('--revoke-fulfillment',
+                            action='store_true',
+                            dest='revoke_fulfillment',
+                            default=False,
+                            help='Also revoke fulfillment when approving the refunds.')
+        parser.add_argument('--resolve-pending',
+                            action='store',
+                            dest='resolve_pending',
+                            default=None,
+                            choices=(RESOLVE_PENDING_REFUNDED, RESOLVE_PENDING_ERROR),
+                            help='Before approving the given refunds, move those whose credit is pending to {} '
+                                 '(the purchaser was credited) or {} (the purchaser was not credited). Requires '
+                                 '--refund-ids.'.format(REFUND.PAYMENT_REFUNDED, REFUND.PAYMENT_REFUND_ERROR))
+
+    def handle(self, *args, **options):
+        if options['resolve_pending'] and not options['refund_ids']:
+            raise CommandError('Pending refunds can only be resolved by refund ID.')
+
+        if options['refund_ids']:
+            refund_ids = [int(refund_id) for refund_id in options['refund_ids'].split(',')]
+        elif options['statuses'] or options['batch_id']:
+            refunds = Refund.objects.all()
+            if options['batch_id']:
+                try:
+                    batch_id = uuid.UUID(options['batch_id'])
+                except ValueError:
+                    raise CommandError('[{}] is not a valid batch ID.'.format(options['batch_id']))
+                refunds = refunds.filter(batch_id=batch_id)
+            elif options['bulk']:
+                refunds = refunds.filter(batch_id__isnull=False)
+
+            if options['statuses']:
+                statuses = options['statuses'].split(',')
+                if REFUND.OPEN in statuses and not (options['batch_id'] or options['bulk']):
+                    raise CommandError('Open refunds can only be approved by status with --batch-id or --bulk.')
+                refunds = refunds.filter(status__in=statuses)
+
+            refund_ids = list(refunds.order_by('id').values_list('id', flat=True))
+        else:
+            raise CommandError('Either refund IDs, statuses or a batch ID are required.')
+
+        if options['resolve_pending']:
+            credit_issued = options['resolve_pending'] == RESOLVE_PENDING_REFUNDED
+            for refund in Refund.objects.filter(id__in=refund_ids, status=REFUND.PAYMENT_REFUND_PENDING):
+                if refund.resolve_pending_credit(credit_issued):
+                    self.stderr.write('Resolved refund [{}] as [{}].'.format(refund.id, refund.status))
+
+        self.stderr.write('Approving [{}] refunds.'.format(len(refund_ids)))
+        failed = approve_refunds(refund_ids, revoke_fulfillment=options['revoke_fulfillment'])
+        self.stderr.write('Approved [{approved}] refunds. [{failed}] could not be approved: {ids}'.format(
+            approved=len(refund_ids) - len(failed), failed=len(failed), ids=failed
+        ))
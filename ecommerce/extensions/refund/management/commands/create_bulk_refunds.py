@@ -0,0 +1,70 @@
+"""
+Management command that refunds many enrollments at once, e.g. when a course run is cancelled.
+"""
+from __future__ import unicode_literals
+
+import csv
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from ecommerce.extensions.refund.api import approve_refunds, create_refunds_in_bulk, find_refundable_lines
+
+
+class Command(BaseCommand):
+    help = 'Create refunds for all learners of a course run, or for a list of enrollments, and approve them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-id',
+                            action='store',
+                            dest='course_id',
+                            default=None,
+                            help='Course run for which all un-refunded order lines should be refunded.')
+        parser.add_argument('--enrollments-file',
+                            action='store',
+                            dest='enrollments_file',
+                            default=None,
+                            help='CSV file of username,course_id rows identifying the enrollments to refund.')
+        parser.add_argument('-b', '--batch-size',
+                            action='store',
+                            dest='batch_size',
+                            default=None,
+                            type=int,
+                            help='Number of orders refunded per transaction. Defaults to REFUND_BULK_CHUNK_SIZE.')
+        parser.add_argument('--revoke-fulfillment',
+                            action='store_true',
+                            dest='revoke_fulfillment',
+                            default=False,
+                            help='Also revoke fulfillment when approving the refunds.')
+        parser.add_argument('--skip-approval',
+                            action='store_true',
+                            dest='skip_approval',
+                            default=False,
+                            help='Create the refunds without approving them.')
+
+    def handle(self, *args, **options):
+        course_id = options['course_id']
+        enrollments = None
+        if options['enrollments_file']:
+            with open(options['enrollments_file']) as enrollments_file:
+                enrollments = [tuple(row[:2]) for row in csv.reader(enrollments_file) if row]
+
+        try:
+            lines = list(find_refundable_lines(course_id=course_id, enrollments=enrollments))
+        except ValueError as exc:
+            raise CommandError(exc.message)
+
+        self.stderr.write('Refunding [{}] order lines.'.format(len(lines)))
+        start = time.time()
+        refund_ids = create_refunds_in_bulk(lines, chunk_size=options['batch_size'])
+        elapsed = time.time() - start
+        rate = len(refund_ids) / elapsed if elapsed else len(refund_ids)
+        self.stderr.write('Created [{count}] refunds in [{elapsed:.2f}] seconds ([{rate:.1f}] per second).'.format(
+            count=len(refund_ids), elapsed=elapsed, rate=rate
+        ))
+
+        if refund_ids and not options['skip_approval']:
+            failed = approve_refunds(refund_ids, revoke_fulfillment=options['revoke_fulfillment'])
+            self.stderr.write('Approved [{approved}] refunds. [{failed}] could not be approved: {ids}'.format(
+                approved=len(refund_ids) - len(failed), failed=len(failed), ids=failed
+            ))
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 11:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('refund', '0005_auto_20180628_2011'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='refund',
+            name='status',
+            field=models.CharField(choices=[('Open', 'Open'), ('Denied', 'Denied'), ('Payment Refund Error', 'Payment Refund Error'), ('Payment Refund Pending', 'Payment Refund Pending'), ('Payment Refunded', 'Payment Refunded'), ('Revocation Error', 'Revocation Error'), ('Complete', 'Complete')], max_length=255, verbose_name='Status'),
+        ),
+    ]
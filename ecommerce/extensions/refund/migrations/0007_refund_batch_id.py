@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 11:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('refund', '0006_refund_payment_refund_pending_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refund',
+            name='batch_id',
+            field=models.UUIDField(blank=True, db_index=True, help_text='Identifies the refunds created together in bulk. Empty for refunds created one at a time.', null=True, verbose_name='Batch ID'),
+        ),
+    ]
@@ -4,7 +4,8 @@ import logging
 import waffle
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
 from ecommerce_worker.sailthru.v1.tasks import send_course_refund_email
@@ -79,11 +80,19 @@ class Refund(StatusMixin, TimeStampedModel):
             (REFUND.OPEN, REFUND.OPEN),
             (REFUND.DENIED, REFUND.DENIED),
             (REFUND.PAYMENT_REFUND_ERROR, REFUND.PAYMENT_REFUND_ERROR),
+            (REFUND.PAYMENT_REFUND_PENDING, REFUND.PAYMENT_REFUND_PENDING),
             (REFUND.PAYMENT_REFUNDED, REFUND.PAYMENT_REFUNDED),
             (REFUND.REVOCATION_ERROR, REFUND.REVOCATION_ERROR),
             (REFUND.COMPLETE, REFUND.COMPLETE),
         ]
     )
+    batch_id = models.UUIDField(
+        _('Batch ID'),
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text=_('Identifies the refunds created together in bulk. Empty for refunds created one at a time.')
+    )
 
     pipeline_setting = 'OSCAR_REFUND_STATUS_PIPELINE'
 
@@ -154,13 +163,66 @@ class Refund(StatusMixin, TimeStampedModel):
     @property
     def can_approve(self):
         """Returns a boolean indicating if this Refund can be approved."""
-        return self.status not in (REFUND.COMPLETE, REFUND.DENIED)
+        return self.status not in (REFUND.COMPLETE, REFUND.DENIED, REFUND.PAYMENT_REFUND_PENDING)
 
     @property
     def can_deny(self):
         """Returns a boolean indicating if this Refund can be denied."""
         return self.status == settings.OSCAR_INITIAL_REFUND_STATUS
 
+    def _claim_credit(self):
+        """Moves this refund to Payment Refund Pending, unless another approval already has.
+
+        The status is changed with a single conditional update, so that concurrent approvals of the
+        same refund issue credit at most once. A refund left pending, e.g. by a process that stopped
+        while issuing credit, may have been credited, and must be resolved (see resolve_pending_credit)
+        before it is approved again.
+
+        Returns:
+            bool: True if this approval may issue credit; otherwise, False.
+        """
+        with transaction.atomic():
+            claimed = Refund.objects.filter(
+                id=self.id, status__in=(REFUND.OPEN, REFUND.PAYMENT_REFUND_ERROR)
+            ).update(status=REFUND.PAYMENT_REFUND_PENDING, modified=timezone.now())
+
+        if claimed:
+            self.status = REFUND.PAYMENT_REFUND_PENDING
+        return bool(claimed)
+
+    def resolve_pending_credit(self, credit_issued):
+        """Resolves a refund left Payment Refund Pending, once it is known whether its credit was issued.
+
+        The refund is moved to Payment Refunded if the purchaser was credited, or to Payment Refund Error
+        if not, after which it can be approved again. The change is made with a conditional update, so
+        that a refund whose pending approval has since finished is left as it is.
+
+        Arguments:
+            credit_issued (bool): Whether the payment processor credited the purchaser for this refund.
+
+        Returns:
+            bool: True if the refund was resolved; otherwise, False.
+        """
+        status = REFUND.PAYMENT_REFUNDED if credit_issued else REFUND.PAYMENT_REFUND_ERROR
+        with transaction.atomic():
+            resolved = Refund.objects.filter(
+                id=self.id, status=REFUND.PAYMENT_REFUND_PENDING
+            ).update(status=status, modified=timezone.now())
+
+        if not resolved:
+            logger.warning('Refund [%d] is not [%s], and was not resolved.', self.id, REFUND.PAYMENT_REFUND_PENDING)
+            return False
+
+        self.status = status
+        audit_log(
+            'refund_pending_credit_resolved',
+            credit_issued=credit_issued,
+            refund_id=self.id,
+            status=status,
+            user_id=self.user_id
+        )
+        return True
+
     def _issue_credit(self):
         """Issue a credit to the purchaser via the payment processor used for the original order."""
         try:
@@ -263,15 +325,27 @@ class Refund(StatusMixin, TimeStampedModel):
             logger.warning('Refund [%d] has status set to [%s] and cannot be approved.', self.id, self.status)
             return False
         elif self.status in (REFUND.OPEN, REFUND.PAYMENT_REFUND_ERROR):
+            if not self._claim_credit():
+                logger.warning('Credit for Refund [%d] is already being issued by another approval.', self.id)
+                return False
+
             try:
                 self._issue_credit()
-                self.set_status(REFUND.PAYMENT_REFUNDED)
-                if notify_purchaser:
-                    self._notify_purchaser()
             except (PaymentError, RefundError):
                 logger.exception('Failed to issue credit for refund [%d].', self.id)
                 self.set_status(REFUND.PAYMENT_REFUND_ERROR)
                 return False
+            except Exception:  # pylint: disable=broad-except
+                # The payment processor may have credited the purchaser, so the refund is left pending for review.
+                logger.exception(
+                    'Unexpected error while issuing credit for refund [%d]. Its credit may have been issued, so it '
+                    'is left [%s] until it is resolved.', self.id, REFUND.PAYMENT_REFUND_PENDING
+                )
+                return False
+
+            self.set_status(REFUND.PAYMENT_REFUNDED)
+            if notify_purchaser:
+                self._notify_purchaser()
 
         if revoke_fulfillment and self.status in (REFUND.PAYMENT_REFUNDED, REFUND.REVOCATION_ERROR):
             self._revoke_lines()
@@ -2,6 +2,7 @@ class REFUND(object):
     OPEN = 'Open'
     DENIED = 'Denied'
     PAYMENT_REFUND_ERROR = 'Payment Refund Error'
+    PAYMENT_REFUND_PENDING = 'Payment Refund Pending'
     PAYMENT_REFUNDED = 'Payment Refunded'
     REVOCATION_ERROR = 'Revocation Error'
     COMPLETE = 'Complete'
@@ -1,10 +1,19 @@
 import ddt
+import mock
 from django.test import override_settings
 from oscar.core.loading import get_model
 from oscar.test.factories import UserFactory
 
 from ecommerce.extensions.fulfillment.status import ORDER
-from ecommerce.extensions.refund.api import create_refunds, find_orders_associated_with_course
+from ecommerce.extensions.payment.tests.processors import DummyProcessor
+from ecommerce.extensions.refund.api import (
+    approve_refunds,
+    create_refunds,
+    create_refunds_in_bulk,
+    find_orders_associated_with_course,
+    find_refundable_lines
+)
+from ecommerce.extensions.refund.status import REFUND
 from ecommerce.extensions.refund.tests.factories import RefundLineFactory
 from ecommerce.extensions.refund.tests.mixins import RefundTestMixin
 from ecommerce.tests.testcases import TestCase
@@ -12,6 +21,7 @@ from ecommerce.tests.testcases import TestCase
 ProductAttribute = get_model("catalogue", "ProductAttribute")
 ProductClass = get_model("catalogue", "ProductClass")
 Refund = get_model('refund', 'Refund')
+Source = get_model('payment', 'Source')
 
 OSCAR_INITIAL_REFUND_STATUS = 'REFUND_OPEN'
 OSCAR_INITIAL_REFUND_LINE_STATUS = 'REFUND_LINE_OPEN'
@@ -77,3 +87,120 @@ class ApiTests(RefundTestMixin, TestCase):
 
         actual = create_refunds([order], self.course.id)
         self.assertEqual(actual, [])
+
+    def test_find_refundable_lines_for_course(self):
+        """ All un-refunded lines of complete orders for the course should be returned, for all users. """
+        order = self.create_order()
+        other_order = self.create_order(user=UserFactory())
+        refunded_order = self.create_order(user=UserFactory())
+        RefundLineFactory(order_line=refunded_order.lines.first())
+        self.create_order(user=UserFactory(), status=ORDER.OPEN)
+
+        lines = find_refundable_lines(course_id=self.course.id)
+        self.assertEqual(list(lines), [order.lines.first(), other_order.lines.first()])
+
+    def test_find_refundable_lines_for_enrollments(self):
+        """ Only the lines of the given enrollments should be returned. """
+        order = self.create_order()
+        self.create_order(user=UserFactory())
+
+        lines = find_refundable_lines(enrollments=[(self.user.username, self.course.id), ('nobody', 'a/b/c')])
+        self.assertEqual(list(lines), [order.lines.first()])
+
+    @ddt.data({'course_id': ' '}, {'course_id': 123}, {'enrollments': []}, {})
+    def test_find_refundable_lines_invalid(self, kwargs):
+        """ ValueError should be raised if neither a course ID nor enrollments are given. """
+        self.assertRaises(ValueError, find_refundable_lines, **kwargs)
+
+    @override_settings(OSCAR_INITIAL_REFUND_STATUS=OSCAR_INITIAL_REFUND_STATUS,
+                       OSCAR_INITIAL_REFUND_LINE_STATUS=OSCAR_INITIAL_REFUND_LINE_STATUS)
+    def test_create_refunds_in_bulk(self):
+        """ A refund matching each order should be created, in chunks. """
+        orders = [self.create_order(), self.create_order(user=UserFactory(), multiple_lines=True)]
+        orders.append(self.create_order(user=UserFactory()))
+
+        refund_ids = create_refunds_in_bulk(find_refundable_lines(course_id=self.course.id), chunk_size=2)
+
+        self.assertEqual(len(refund_ids), 3)
+        for order in orders:
+            refund = Refund.objects.get(order=order)
+            self.assertIn(refund.id, refund_ids)
+            self.assert_refund_matches_order(refund, order)
+
+        # The refunds created by a call share a batch ID.
+        self.assertEqual(len(set(Refund.objects.filter(id__in=refund_ids).values_list('batch_id', flat=True))), 1)
+        self.assertIsNotNone(Refund.objects.get(id=refund_ids[0]).batch_id)
+
+        # Lines that have been refunded are no longer refundable.
+        self.assertEqual(create_refunds_in_bulk(find_refundable_lines(course_id=self.course.id)), [])
+
+    def test_create_refunds_in_bulk_skips_refunded_lines(self):
+        """ Lines refunded since they were found, e.g. by a concurrent call, should not be refunded again. """
+        order = self.create_order(multiple_lines=True)
+        other_order = self.create_order(user=UserFactory())
+        lines = list(find_refundable_lines(course_id=self.course.id))
+        refunded_line = order.lines.first()
+        Refund.create_with_lines(order, [refunded_line])
+        Refund.create_with_lines(other_order, list(other_order.lines.all()))
+        # A refund without lines must not be mistaken for a refund created in bulk.
+        unrelated_refund = Refund.objects.create(order=order, user=order.user, total_credit_excl_tax=0)
+
+        refund_ids = create_refunds_in_bulk(lines)
+
+        self.assertEqual(len(refund_ids), 1)
+        self.assertNotIn(unrelated_refund.id, refund_ids)
+        refund = Refund.objects.get(id=refund_ids[0])
+        remaining_lines = list(order.lines.exclude(id=refunded_line.id))
+        self.assertEqual(refund.order, order)
+        self.assertEqual([line.order_line for line in refund.lines.all()], remaining_lines)
+        self.assertEqual(refund.total_credit_excl_tax, sum(line.line_price_excl_tax for line in remaining_lines))
+        self.assertFalse(unrelated_refund.lines.exists())
+
+    @override_settings(REFUND_EXECUTOR_MAX_WORKERS=1, REFUND_EXECUTOR_MAX_ATTEMPTS=2, REFUND_EXECUTOR_RETRY_DELAY=0)
+    def test_approve_refunds(self):
+        """ Each refund should be approved, and those that fail should be reported. """
+        refunds = [Refund.create_with_lines(order, order.lines.all()) for order in
+                   [self.create_order(), self.create_order(user=UserFactory()), self.create_order(user=UserFactory())]]
+        denied_order = self.create_order(user=UserFactory())
+        denied = Refund.create_with_lines(denied_order, denied_order.lines.all())
+        denied.deny()
+
+        # The refunds are still open after their failed attempts, so their credit is not retried.
+        with mock.patch.object(Refund, 'approve', side_effect=[True, Exception, False]) as mock_approve:
+            failed = approve_refunds([refund.id for refund in refunds] + [denied.id])
+
+        self.assertEqual(failed, [refunds[1].id, refunds[2].id, denied.id])
+        self.assertEqual(mock_approve.call_count, 3)
+        mock_approve.assert_called_with(revoke_fulfillment=False, notify_purchaser=True)
+
+    @override_settings(REFUND_EXECUTOR_MAX_WORKERS=1, REFUND_EXECUTOR_MAX_ATTEMPTS=3, REFUND_EXECUTOR_RETRY_DELAY=0)
+    def test_approve_refunds_retries_revocation(self):
+        """ Refunds whose credit was issued, but whose revocation failed, should be retried. """
+        order = self.create_order()
+        refund = Refund.create_with_lines(order, order.lines.all())
+        results = [False, True]
+
+        def approve(instance, **kwargs):  # pylint: disable=unused-argument
+            Refund.objects.filter(id=instance.id).update(status=REFUND.REVOCATION_ERROR)
+            return results.pop(0)
+
+        with mock.patch.object(Refund, 'approve', side_effect=approve, autospec=True) as mock_approve:
+            self.assertEqual(approve_refunds([refund.id], revoke_fulfillment=True), [])
+
+        self.assertEqual(mock_approve.call_count, 2)
+
+    @override_settings(
+        PAYMENT_PROCESSORS=['ecommerce.extensions.payment.tests.processors.DummyProcessor'],
+        REFUND_EXECUTOR_MAX_WORKERS=1, REFUND_EXECUTOR_MAX_ATTEMPTS=3, REFUND_EXECUTOR_RETRY_DELAY=0
+    )
+    def test_approve_refunds_issues_credit_once(self):
+        """ Credit should not be issued again when recording a credit issued by the processor fails. """
+        refund = self.create_refund()
+
+        with mock.patch.object(DummyProcessor, 'issue_credit', return_value='refund-reference') as mock_issue_credit:
+            with mock.patch.object(Source, 'refund', side_effect=Exception):
+                failed = approve_refunds([refund.id])
+
+        self.assertEqual(failed, [refund.id])
+        self.assertEqual(mock_issue_credit.call_count, 1)
+        self.assertEqual(Refund.objects.get(id=refund.id).status, REFUND.PAYMENT_REFUND_PENDING)
@@ -0,0 +1,134 @@
+import tempfile
+import uuid
+
+import ddt
+import mock
+from django.core.management import CommandError, call_command
+from oscar.core.loading import get_model
+from oscar.test.factories import UserFactory
+
+from ecommerce.extensions.refund.api import create_refunds_in_bulk
+from ecommerce.extensions.refund.status import REFUND
+from ecommerce.extensions.refund.tests.mixins import RefundTestMixin
+from ecommerce.tests.testcases import TestCase
+
+Refund = get_model('refund', 'Refund')
+
+
+class CreateBulkRefundsTests(RefundTestMixin, TestCase):
+    command = 'create_bulk_refunds'
+
+    def setUp(self):
+        super(CreateBulkRefundsTests, self).setUp()
+        self.user = UserFactory()
+
+    def test_course(self):
+        """ Verify the command refunds every order of the course and approves the refunds. """
+        orders = [self.create_order(), self.create_order(user=UserFactory())]
+
+        with mock.patch('ecommerce.extensions.refund.management.commands.create_bulk_refunds.approve_refunds',
+                        return_value=[]) as mock_approve:
+            call_command(self.command, course_id=self.course.id, batch_size=1)
+
+        refund_ids = [Refund.objects.get(order=order).id for order in orders]
+        mock_approve.assert_called_once_with(refund_ids, revoke_fulfillment=False)
+
+    def test_enrollments_file(self):
+        """ Verify the command only refunds the enrollments listed in the file, and can skip approval. """
+        order = self.create_order()
+        self.create_order(user=UserFactory())
+
+        with tempfile.NamedTemporaryFile() as enrollments_file:
+            enrollments_file.write('{},{}\n'.format(self.user.username, self.course.id))
+            enrollments_file.flush()
+
+            with mock.patch('ecommerce.extensions.refund.management.commands.create_bulk_refunds.approve_refunds') \
+                    as mock_approve:
+                call_command(self.command, enrollments_file=enrollments_file.name, skip_approval=True)
+
+        self.assertEqual(Refund.objects.get().order, order)
+        self.assertFalse(mock_approve.called)
+
+    def test_missing_arguments(self):
+        """ Verify the command fails if neither a course nor enrollments are given. """
+        with self.assertRaises(CommandError):
+            call_command(self.command)
+
+
+@ddt.ddt
+class ApproveRefundsTests(RefundTestMixin, TestCase):
+    command = 'approve_refunds'
+
+    def setUp(self):
+        super(ApproveRefundsTests, self).setUp()
+        self.user = UserFactory()
+        order = self.create_order()
+        self.refund = Refund.create_with_lines(order, order.lines.all())
+
+    def test_refund_ids(self):
+        """ Verify the command approves the given refunds. """
+        with mock.patch('ecommerce.extensions.refund.management.commands.approve_refunds.approve_refunds',
+                        return_value=[]) as mock_approve:
+            call_command(self.command, refund_ids='{},5'.format(self.refund.id), revoke_fulfillment=True)
+        mock_approve.assert_called_once_with([self.refund.id, 5], revoke_fulfillment=True)
+
+    def test_statuses(self):
+        """ Verify the command approves the refunds with the given statuses. """
+        self.refund.set_status(REFUND.PAYMENT_REFUND_ERROR)
+        with mock.patch('ecommerce.extensions.refund.management.commands.approve_refunds.approve_refunds',
+                        return_value=[]) as mock_approve:
+            call_command(self.command, statuses='{},{}'.format(REFUND.PAYMENT_REFUND_ERROR, REFUND.REVOCATION_ERROR))
+        mock_approve.assert_called_once_with([self.refund.id], revoke_fulfillment=False)
+
+    def test_open_statuses(self):
+        """ Verify Open refunds are only approved by status if they were created in bulk. """
+        order = self.create_order(user=UserFactory())
+        bulk_refund_ids = create_refunds_in_bulk(order.lines.all())
+        batch_id = Refund.objects.get(id=bulk_refund_ids[0]).batch_id
+
+        with self.assertRaises(CommandError):
+            call_command(self.command, statuses=REFUND.OPEN)
+
+        with mock.patch('ecommerce.extensions.refund.management.commands.approve_refunds.approve_refunds',
+                        return_value=[]) as mock_approve:
+            call_command(self.command, statuses=REFUND.OPEN, bulk=True)
+            call_command(self.command, statuses=REFUND.OPEN, batch_id=str(batch_id))
+            call_command(self.command, statuses=REFUND.OPEN, batch_id=str(uuid.uuid4()))
+
+        self.assertEqual(mock_approve.call_args_list, [
+            mock.call(bulk_refund_ids, revoke_fulfillment=False),
+            mock.call(bulk_refund_ids, revoke_fulfillment=False),
+            mock.call([], revoke_fulfillment=False),
+        ])
+
+    def test_invalid_batch_id(self):
+        """ Verify the command fails if the batch ID is not a UUID. """
+        with self.assertRaises(CommandError):
+            call_command(self.command, batch_id='not-a-batch')
+
+    def test_missing_arguments(self):
+        """ Verify the command fails if neither refund IDs, statuses nor a batch ID are given. """
+        with self.assertRaises(CommandError):
+            call_command(self.command)
+
+    @ddt.data(
+        ('refunded', REFUND.PAYMENT_REFUNDED),
+        ('error', REFUND.PAYMENT_REFUND_ERROR),
+    )
+    @ddt.unpack
+    def test_resolve_pending(self, resolve_pending, expected_status):
+        """ Verify the command resolves the given pending refunds before approving them. """
+        self.refund.status = REFUND.PAYMENT_REFUND_PENDING
+        self.refund.save()
+
+        with mock.patch('ecommerce.extensions.refund.management.commands.approve_refunds.approve_refunds',
+                        return_value=[]) as mock_approve:
+            call_command(self.command, refund_ids=str(self.refund.id), resolve_pending=resolve_pending)
+
+        self.assertEqual(Refund.objects.get(id=self.refund.id).status, expected_status)
+        mock_approve.assert_called_once_with([self.refund.id], revoke_fulfillment=False)
+
+    def test_resolve_pending_without_refund_ids(self):
+        """ Verify the command only resolves pending refunds given by ID. """
+        with self.assertRaises(CommandError):
+            call_command(self.command, statuses=REFUND.PAYMENT_REFUND_PENDING, resolve_pending='refunded')
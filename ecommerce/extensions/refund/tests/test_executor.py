@@ -0,0 +1,46 @@
+import mock
+from django.test import override_settings
+
+from ecommerce.core.rate_limit import RateLimiter
+from ecommerce.extensions.refund.executor import PermanentFailure, RefundExecutor
+from ecommerce.tests.testcases import TestCase
+
+
+@override_settings(REFUND_EXECUTOR_RETRY_DELAY=0)
+class RefundExecutorTests(TestCase):
+    def test_map_sequential(self):
+        """ Verify failed items are retried, and reported once they run out of attempts. """
+        func = mock.Mock(side_effect=[True, False, Exception, True, False, False, False])
+        executor = RefundExecutor(max_workers=1, max_attempts=3)
+
+        failed = executor.map(func, [(1, 'paypal'), (2, 'cybersource'), (3, 'paypal')])
+
+        self.assertEqual(failed, [3])
+        self.assertEqual([call[0][0] for call in func.call_args_list], [1, 2, 2, 2, 3, 3, 3])
+
+    def test_map_permanent_failure(self):
+        """ Verify items raising PermanentFailure are reported without being retried. """
+        func = mock.Mock(side_effect=[PermanentFailure, True])
+        executor = RefundExecutor(max_workers=1, max_attempts=3)
+
+        self.assertEqual(executor.map(func, [(1, 'paypal'), (2, 'paypal')]), [1])
+        self.assertEqual(func.call_count, 2)
+
+    def test_map_rate_limited(self):
+        """ Verify each attempt waits on the rate limiter of its payment processor. """
+        executor = RefundExecutor(max_workers=1, rate_limits={'paypal': 5})
+        with mock.patch.object(RateLimiter, 'wait') as mock_wait:
+            executor.map(lambda item: True, [(1, 'paypal'), (2, 'paypal'), (3, None)])
+
+        self.assertEqual(mock_wait.call_count, 3)
+        self.assertEqual(executor._get_rate_limiter('paypal').interval, 0.2)  # pylint: disable=protected-access
+        self.assertEqual(executor._get_rate_limiter(None).interval, 0)  # pylint: disable=protected-access
+
+    def test_map_concurrent(self):
+        """ Verify items are processed by a thread pool, and worker threads close their connections. """
+        executor = RefundExecutor(max_workers=4, rate_limits={})
+        with mock.patch('ecommerce.extensions.refund.executor.connection') as mock_connection:
+            failed = executor.map(lambda item: item % 2, [(item, None) for item in range(6)])
+
+        self.assertEqual(failed, [0, 2, 4])
+        self.assertEqual(mock_connection.close.call_count, 6)
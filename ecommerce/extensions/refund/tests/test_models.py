@@ -189,6 +189,7 @@ class RefundTests(RefundTestMixin, StatusTestsMixin, TestCase):
     @ddt.data(
         (REFUND.OPEN, True),
         (REFUND.PAYMENT_REFUND_ERROR, True),
+        (REFUND.PAYMENT_REFUND_PENDING, False),
         (REFUND.PAYMENT_REFUNDED, True),
         (REFUND.REVOCATION_ERROR, True),
         (REFUND.DENIED, False),
@@ -281,6 +282,90 @@ class RefundTests(RefundTestMixin, StatusTestsMixin, TestCase):
             self.assertEqual(refund.status, REFUND.PAYMENT_REFUND_ERROR)
             self.assert_line_status(refund, REFUND_LINE.OPEN)
 
+    def test_approve_concurrently(self):
+        """
+        If the same refund is approved again while its credit is being issued, e.g. by another process, credit
+        should only be issued once.
+        """
+        refund = self._get_instance()
+        concurrent_refund = Refund.objects.get(id=refund.id)
+        results = []
+
+        def issue_credit():
+            # The concurrent approval read the refund before this approval claimed it.
+            self.assertEqual(concurrent_refund.status, REFUND.OPEN)
+            results.append(concurrent_refund.approve(revoke_fulfillment=False, notify_purchaser=False))
+
+        with mock.patch.object(Refund, '_issue_credit', side_effect=issue_credit) as mock_issue_credit:
+            self.assertTrue(refund.approve(revoke_fulfillment=False, notify_purchaser=False))
+
+        self.assertEqual(mock_issue_credit.call_count, 1)
+        self.assertEqual(results, [False])
+        self.assertEqual(Refund.objects.get(id=refund.id).status, REFUND.COMPLETE)
+
+    def test_approve_pending(self):
+        """ Refunds whose credit is pending should not be approved, since credit may have been issued. """
+        refund = self._get_instance(status=REFUND.PAYMENT_REFUND_PENDING)
+
+        with mock.patch.object(Refund, '_issue_credit') as mock_issue_credit:
+            self.assertFalse(refund.approve())
+
+        self.assertFalse(mock_issue_credit.called)
+        self.assertEqual(refund.status, REFUND.PAYMENT_REFUND_PENDING)
+
+    def test_approve_unexpected_error(self):
+        """
+        If issuing credit fails unexpectedly, the refund should be left Payment Refund Pending, since credit may
+        have been issued, and the error logged with the refund ID.
+        """
+        refund = self._get_instance()
+
+        with mock.patch.object(Refund, '_issue_credit', side_effect=ValueError):
+            with LogCapture(REFUND_MODEL_LOGGER_NAME) as l:
+                self.assertFalse(refund.approve())
+
+        l.check((
+            REFUND_MODEL_LOGGER_NAME,
+            'ERROR',
+            'Unexpected error while issuing credit for refund [{}]. Its credit may have been issued, so it is left '
+            '[{}] until it is resolved.'.format(refund.id, REFUND.PAYMENT_REFUND_PENDING)
+        ))
+        self.assertEqual(Refund.objects.get(id=refund.id).status, REFUND.PAYMENT_REFUND_PENDING)
+
+    @ddt.data(
+        (True, REFUND.PAYMENT_REFUNDED),
+        (False, REFUND.PAYMENT_REFUND_ERROR),
+    )
+    @ddt.unpack
+    def test_resolve_pending_credit(self, credit_issued, expected_status):
+        """ Pending refunds should be resolved according to whether their credit was issued, and logged. """
+        refund = self._get_instance(status=REFUND.PAYMENT_REFUND_PENDING)
+
+        with LogCapture(LOGGER_NAME) as l:
+            self.assertTrue(refund.resolve_pending_credit(credit_issued))
+
+        l.check((
+            LOGGER_NAME,
+            'INFO',
+            'refund_pending_credit_resolved: credit_issued="{}", refund_id="{}", status="{}", user_id="{}"'.format(
+                credit_issued, refund.id, expected_status, refund.user.id
+            )
+        ))
+        self.assertEqual(refund.status, expected_status)
+        self.assertEqual(Refund.objects.get(id=refund.id).status, expected_status)
+
+        with mock.patch.object(Refund, '_issue_credit') as mock_issue_credit:
+            self.assertTrue(refund.approve(revoke_fulfillment=False, notify_purchaser=False))
+        self.assertEqual(mock_issue_credit.called, not credit_issued)
+        self.assertEqual(refund.status, REFUND.COMPLETE)
+
+    def test_resolve_pending_credit_not_pending(self):
+        """ Refunds that are not pending should not be resolved. """
+        refund = self._get_instance()
+
+        self.assertFalse(refund.resolve_pending_credit(True))
+        self.assertEqual(Refund.objects.get(id=refund.id).status, REFUND.OPEN)
+
     def test_approve_revocation_error(self):
         """
         If fulfillment revocation fails, Refund status should be set to Revocation Error and the RefundLine objects'
@@ -1,7 +1,7 @@
 from mock import patch
 from oscar.test.factories import UserFactory
 
-from ecommerce.core.models import SegmentClient
+from analytics import Client as SegmentClient
 from ecommerce.extensions.analytics.utils import ECOM_TRACKING_ID_FMT
 from ecommerce.extensions.refund.api import create_refunds
 from ecommerce.extensions.refund.tests.mixins import RefundTestMixin
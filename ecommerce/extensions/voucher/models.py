@@ -132,6 +132,13 @@ class Voucher(AbstractVoucher):
         num_assignments = enterprise_offer.offerassignment_set.filter(code=self.code).exclude(
             status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]).count()
 
+        return self.calculate_slots_available_for_assignment(enterprise_offer, num_assignments)
+
+    def calculate_slots_available_for_assignment(self, enterprise_offer, num_assignments):
+        """
+        Calculate the number of available slots left for this voucher, given its enterprise offer
+        and the number of its OfferAssignments that are not redeemed or revoked.
+        """
         # If this a Single use or Multi use per customer voucher,
         # it must have no orders or existing assignments to be assigned.
         if self.usage in (self.SINGLE_USE, self.MULTI_USE_PER_CUSTOMER):
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import datetime
 import uuid
 
 import ddt
 import httpretty
+import mock
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 from factory.fuzzy import FuzzyText
 from oscar.templatetags.currency_filters import currency
@@ -20,13 +24,18 @@ from ecommerce.extensions.api import exceptions
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
 from ecommerce.extensions.fulfillment.modules import CouponFulfillmentModule
 from ecommerce.extensions.fulfillment.status import LINE
+from ecommerce.extensions.offer.constants import OFFER_ASSIGNED, OFFER_ASSIGNMENT_REVOKED
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
+from ecommerce.extensions.test import factories
 from ecommerce.extensions.test.factories import create_order, prepare_voucher
 from ecommerce.extensions.voucher.utils import (
     create_vouchers,
     generate_coupon_report,
+    generate_voucher_codes,
+    get_slots_available_for_assignment,
     get_voucher_and_products_from_code,
     get_voucher_discount_info,
+    iterate_coupon_report,
     update_voucher_offer
 )
 from ecommerce.tests.mixins import LmsApiMockMixin
@@ -255,6 +264,42 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
             voucher = create_vouchers(**self.data)
             self.assertTrue(Voucher.objects.filter(code__iexact=voucher[0].code).exists())
 
+    def test_generate_voucher_codes_skips_existing_codes(self):
+        """ Verify codes already used by a voucher are not returned, and each batch is checked with one query. """
+        VoucherFactory(code='AAAA')
+        with mock.patch(
+            'ecommerce.extensions.voucher.utils._generate_random_code',
+            side_effect=['AAAA', 'BBBB', 'CCCC'],
+        ):
+            with self.assertNumQueries(2):
+                codes = generate_voucher_codes(4, 2)
+        self.assertEqual(sorted(codes), ['BBBB', 'CCCC'])
+
+    @override_settings(VOUCHER_CODE_LENGTH=1)
+    def test_generate_voucher_codes_exhausted(self):
+        """ Verify a ValueError is raised instead of looping forever when no unused code is left. """
+        VoucherFactory(code='A')
+        with mock.patch('ecommerce.extensions.voucher.utils._generate_random_code', return_value='A'):
+            with self.assertRaises(ValueError):
+                generate_voucher_codes(1, 1)
+
+    def test_create_vouchers_links_offer_per_voucher(self):
+        """ Verify multi-use vouchers created in bulk are each linked to their own offer. """
+        self.data.update({
+            'quantity': 5,
+            'voucher_type': Voucher.MULTI_USE,
+        })
+        vouchers = create_vouchers(**self.data)
+
+        self.assertEqual(len(vouchers), 5)
+        self.assertEqual(len({voucher.code for voucher in vouchers}), 5)
+        offer_ids = set()
+        for voucher in vouchers:
+            self.assertEqual(Voucher.objects.get(code=voucher.code).id, voucher.id)
+            self.assertEqual(voucher.offers.count(), 1)
+            offer_ids.add(voucher.offers.first().id)
+        self.assertEqual(len(offer_ids), 5)
+
     @override_settings(VOUCHER_CODE_LENGTH=0)
     def test_nonpositive_voucher_code_length(self):
         """
@@ -577,6 +622,34 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         self.assertEqual(rows[2]['Redeemed By Username'], self.user.username)
         self.assertEqual(rows[3]['Redemption Count'], 0)
 
+    def _create_redeemed_coupon(self, quantity):
+        coupon = self.create_coupon(title='Test redeemed coupon', catalog=self.catalog, quantity=quantity)
+        for index, voucher in enumerate(coupon.attr.coupon_vouchers.vouchers.all()):
+            self.use_voucher('TESTREDEEMED{}-{}'.format(coupon.id, index), voucher, self.user)
+        return coupon
+
+    def test_coupon_report_batches(self):
+        """ Verify the report rows do not depend on the number of vouchers and applications loaded per query. """
+        coupon = self._create_redeemed_coupon(3)
+        __, expected_rows = generate_coupon_report([coupon.attr.coupon_vouchers])
+
+        with mock.patch('ecommerce.extensions.voucher.utils.COUPON_REPORT_BATCH_SIZE', 1):
+            __, rows = generate_coupon_report([coupon.attr.coupon_vouchers])
+
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows, expected_rows)
+
+    def test_iterate_coupon_report_query_count(self):
+        """ Verify the number of queries made for the report rows does not grow with the number of redemptions. """
+        query_counts = []
+        for quantity in (1, 5):
+            __, rows = iterate_coupon_report([self._create_redeemed_coupon(quantity).attr.coupon_vouchers])
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(len(list(rows)), 1 + quantity * 2)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
     def test_generate_coupon_report_for_used_query_coupon(self):
         """Test that used query coupon voucher reports which course was it used for."""
         catalog_query = '*:*'
@@ -687,3 +760,50 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
 
         self.assertIn('Program UUID', field_names)
         self.assertEqual(rows[0]['Program UUID'], program_uuid)
+
+
+class GetSlotsAvailableForAssignmentTests(TestCase):
+    def create_voucher(self, code, usage, offer=None, num_orders=0):
+        voucher = Voucher.objects.create(
+            code=code,
+            usage=usage,
+            num_orders=num_orders,
+            start_datetime=now() - datetime.timedelta(days=1),
+            end_datetime=now() + datetime.timedelta(days=1),
+        )
+        if offer:
+            voucher.offers.add(offer)
+        return voucher
+
+    def test_slots(self):
+        """ Verify the slots match those calculated for each voucher, with a fixed number of queries. """
+        offer = factories.EnterpriseOfferFactory(max_global_applications=10)
+        vouchers = [
+            self.create_voucher('SINGLE', Voucher.SINGLE_USE, offer),
+            self.create_voucher('SINGLEUSED', Voucher.SINGLE_USE, offer, num_orders=1),
+            self.create_voucher('MULTI', Voucher.MULTI_USE, offer, num_orders=3),
+            self.create_voucher('ONCE', Voucher.ONCE_PER_CUSTOMER, offer),
+            self.create_voucher('NOOFFER', Voucher.MULTI_USE),
+        ]
+        factories.OfferAssignmentFactory(offer=offer, code='MULTI', status=OFFER_ASSIGNED)
+        factories.OfferAssignmentFactory(offer=offer, code='MULTI', status=OFFER_ASSIGNMENT_REVOKED)
+        factories.OfferAssignmentFactory(offer=offer, code='ONCE', status=OFFER_ASSIGNED)
+
+        with self.assertNumQueries(2):
+            slots = get_slots_available_for_assignment(vouchers)
+
+        self.assertEqual(slots, {
+            voucher.id: (offer, voucher.slots_available_for_assignment) for voucher in vouchers[:4]
+        })
+        self.assertEqual([slots[voucher.id][1] for voucher in vouchers[:4]], [10, 0, 6, 9])
+
+    def test_batches(self):
+        """ Verify the slots of large numbers of vouchers are calculated in batches. """
+        offer = factories.EnterpriseOfferFactory()
+        vouchers = [self.create_voucher('CODE{}'.format(i), Voucher.SINGLE_USE, offer) for i in range(3)]
+
+        with mock.patch('ecommerce.extensions.voucher.utils.OFFER_ASSIGNMENT_BATCH_SIZE', 2):
+            with self.assertNumQueries(4):
+                slots = get_slots_available_for_assignment(vouchers)
+
+        self.assertEqual(slots, {voucher.id: (offer, 1) for voucher in vouchers})
@@ -5,14 +5,20 @@ import base64
 import datetime
 import hashlib
 import logging
+import time
 import uuid
+from collections import defaultdict
 from decimal import Decimal, DecimalException
+from itertools import groupby
 
 import dateutil.parser
 import pytz
+import waffle
 from django.conf import settings
+from django.db.models import Count, Prefetch, Q
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
+from edx_django_utils import monitoring as monitoring_utils
 from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.keys import CourseKey
 from oscar.core.loading import get_model
@@ -22,9 +28,10 @@ from ecommerce.core.url_utils import get_ecommerce_url
 from ecommerce.core.utils import log_message_and_raise_validation_error
 from ecommerce.enterprise.benefits import BENEFIT_MAP as ENTERPRISE_BENEFIT_MAP
 from ecommerce.enterprise.conditions import AssignableEnterpriseCustomerCondition
+from ecommerce.enterprise.constants import ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH
 from ecommerce.enterprise.utils import get_enterprise_customer
 from ecommerce.extensions.api import exceptions
-from ecommerce.extensions.offer.constants import OFFER_MAX_USES_DEFAULT
+from ecommerce.extensions.offer.constants import OFFER_ASSIGNMENT_REVOKED, OFFER_MAX_USES_DEFAULT, OFFER_REDEEMED
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
 from ecommerce.extensions.offer.utils import get_discount_percentage, get_discount_value
 from ecommerce.invoice.models import Invoice
@@ -39,6 +46,8 @@ Benefit = get_model('offer', 'Benefit')
 Condition = get_model('offer', 'Condition')
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
 CouponVouchers = get_model('voucher', 'CouponVouchers')
+Line = get_model('order', 'Line')
+OfferAssignment = get_model('offer', 'OfferAssignment')
 Order = get_model('order', 'Order')
 Product = get_model('catalogue', 'Product')
 ProductCategory = get_model('catalogue', 'ProductCategory')
@@ -47,6 +56,15 @@ StockRecord = get_model('partner', 'StockRecord')
 Voucher = get_model('voucher', 'Voucher')
 VoucherApplication = get_model('voucher', 'VoucherApplication')
 
+# Number of vouchers, and of voucher applications, loaded per query when generating a coupon report.
+COUPON_REPORT_BATCH_SIZE = 1000
+# Number of voucher codes checked for collisions, and of vouchers inserted, per query.
+VOUCHER_BULK_CREATE_BATCH_SIZE = 1000
+# Number of consecutive code batches without a single unused code after which code generation gives up.
+VOUCHER_CODE_GENERATION_MAX_ATTEMPTS = 100
+# Number of vouchers whose assignment slots are counted, and of offer assignments inserted, per query.
+OFFER_ASSIGNMENT_BATCH_SIZE = 1000
+
 
 def _add_redemption_course_ids(new_row_to_append, header_row, redemption_course_ids):
     if any(row in [_('Catalog Query'), _('Program UUID')] for row in header_row):
@@ -178,8 +196,8 @@ def _get_info_for_coupon_report(coupon, voucher):
     return coupon_data
 
 
-def _get_voucher_info_for_coupon_report(voucher):
-    offer = voucher.best_offer
+def _get_voucher_info_for_coupon_report(voucher, offer=None):
+    offer = offer or voucher.best_offer
     status = _get_voucher_status(voucher, offer)
     path = '{path}?code={code}'.format(path=reverse('coupons:offer'), code=voucher.code)
     url = get_ecommerce_url(path)
@@ -209,18 +227,25 @@ def _get_voucher_info_for_coupon_report(voucher):
     return coupon_data
 
 
-def generate_coupon_report(coupon_vouchers):
+def _get_best_offer_for_coupon_report(voucher, enterprise_offers_enabled):
     """
-    Generate coupon report data
+    Mirrors Voucher.best_offer using the offers prefetched with the voucher, instead of querying them.
+    """
+    offers = voucher.offers.all()
+    original_offer = next((offer for offer in offers if offer.condition.range_id is not None), None)
+    if original_offer is None:
+        original_offer = min(offers, key=lambda offer: offer.date_created)
+
+    if enterprise_offers_enabled:
+        enterprise_offer = next(
+            (offer for offer in offers if offer.condition.enterprise_customer_uuid is not None), None
+        )
+        return enterprise_offer or original_offer
 
-    Args:
-        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+    return original_offer
 
-    Returns:
-        List[str]
-        List[dict]
-    """
 
+def _get_coupon_report_field_names(header_row):
     field_names = [
         _('Code'),
         _('Coupon Name'),
@@ -250,62 +275,154 @@ def generate_coupon_report(coupon_vouchers):
         _('Coupon Expiry Date'),
         _('Email Domains'),
     ]
-    rows = []
 
-    for coupon_voucher in coupon_vouchers:
-        coupon = coupon_voucher.coupon
-        client = Invoice.objects.get(order__lines__product=coupon).business_client.name
-        rows.append(_get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first()))
-        rows[0][_('Client')] = client
+    if _('Program UUID') in header_row:
+        field_names.remove(_('Course ID'))
+        field_names.remove(_('Organization'))
+        field_names.remove(_('Catalog Query'))
+        field_names.remove(_('Course Seat Types'))
+        field_names.remove(_('Redeemed For Course ID'))
+    elif _('Catalog Query') in header_row:
+        field_names.remove(_('Course ID'))
+        field_names.remove(_('Organization'))
+        field_names.remove(_('Program UUID'))
+    else:
+        field_names.remove(_('Catalog Query'))
+        field_names.remove(_('Course Seat Types'))
+        field_names.remove(_('Redeemed For Course ID'))
+        field_names.remove(_('Redeemed For Course IDs'))
+        field_names.remove(_('Program UUID'))
 
-        for voucher in coupon_voucher.vouchers.all().prefetch_related('offers'):
-            row = _get_voucher_info_for_coupon_report(voucher)
+    return field_names
 
-            for item in (_('Order Number'), _('Redeemed By Username'),):
-                row[item] = ''
 
-            rows.append(row)
+def _iterate_coupon_vouchers(coupon_voucher):
+    """
+    Yields the vouchers of a coupon, with their offers, in batches ordered by ID.
+    """
+    vouchers = coupon_voucher.vouchers.order_by('id').prefetch_related(
+        Prefetch('offers', queryset=ConditionalOffer.objects.select_related('condition'))
+    )
+    last_id = 0
+    while True:
+        batch = list(vouchers.filter(id__gt=last_id)[:COUPON_REPORT_BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
 
-            if voucher.num_orders > 0:
-                voucher_applications = VoucherApplication.objects.filter(
-                    voucher=voucher).prefetch_related('user', 'order__lines')
 
-                for application in voucher_applications:
-                    redemption_course_ids = []
-                    redemption_user_username = application.user.username
+def _iterate_voucher_applications(voucher_ids):
+    """
+    Yields the applications of the given vouchers ordered by voucher, along with the course IDs
+    of the products in the order each application was made for.
+    """
+    if not voucher_ids:
+        return
+
+    applications = VoucherApplication.objects.filter(
+        voucher_id__in=voucher_ids
+    ).select_related('user', 'order').order_by('voucher_id', 'id')
+    last_voucher_id = last_id = 0
+    while True:
+        batch = list(applications.filter(
+            Q(voucher_id__gt=last_voucher_id) | Q(voucher_id=last_voucher_id, id__gt=last_id)
+        )[:COUPON_REPORT_BATCH_SIZE])
+        if not batch:
+            return
+
+        course_ids = defaultdict(list)
+        lines = Line.objects.filter(
+            order_id__in={application.order_id for application in batch}
+        ).order_by('id').values_list('order_id', 'product__course')
+        for order_id, course_id in lines:
+            course_ids[order_id].append(course_id)
+
+        for application in batch:
+            yield application, course_ids[application.order_id]
+        last_voucher_id, last_id = batch[-1].voucher_id, batch[-1].id
+
+
+def _iterate_coupon_report_rows(coupon_vouchers, header_rows):
+    enterprise_offers_enabled = waffle.switch_is_active(ENTERPRISE_OFFERS_FOR_COUPONS_SWITCH)
+
+    for coupon_voucher, header_row in zip(coupon_vouchers, header_rows):
+        yield header_row
+
+        for vouchers in _iterate_coupon_vouchers(coupon_voucher):
+            redeemed_voucher_ids = [voucher.id for voucher in vouchers if voucher.num_orders > 0]
+            applications = groupby(
+                _iterate_voucher_applications(redeemed_voucher_ids), key=lambda item: item[0].voucher_id
+            )
+            voucher_applications = next(applications, None)
+
+            for voucher in vouchers:
+                offer = _get_best_offer_for_coupon_report(voucher, enterprise_offers_enabled)
+                row = _get_voucher_info_for_coupon_report(voucher, offer)
+
+                for item in (_('Order Number'), _('Redeemed By Username'),):
+                    row[item] = ''
+
+                yield row
 
-                    for line in application.order.lines.all():
-                        redemption_course_ids.append(line.product.course_id)
+                if voucher_applications is None or voucher_applications[0] != voucher.id:
+                    continue
 
+                for application, redemption_course_ids in voucher_applications[1]:
                     new_row = row.copy()
-                    _add_redemption_course_ids(new_row, rows[0], redemption_course_ids)
+                    _add_redemption_course_ids(new_row, header_rows[0], redemption_course_ids)
                     new_row.update({
                         _('Status'): _('Redeemed'),
                         _('Order Number'): application.order.number,
-                        _('Redeemed By Username'): redemption_user_username,
+                        _('Redeemed By Username'): application.user.username,
                         _('Maximum Coupon Usage'): 1,
                         _('Redemption Count'): 1,
                     })
-                    rows.append(new_row)
+                    yield new_row
 
-    if _('Program UUID') in rows[0]:
-        field_names.remove(_('Course ID'))
-        field_names.remove(_('Organization'))
-        field_names.remove(_('Catalog Query'))
-        field_names.remove(_('Course Seat Types'))
-        field_names.remove(_('Redeemed For Course ID'))
-    elif _('Catalog Query') in rows[0]:
-        field_names.remove(_('Course ID'))
-        field_names.remove(_('Organization'))
-        field_names.remove(_('Program UUID'))
-    else:
-        field_names.remove(_('Catalog Query'))
-        field_names.remove(_('Course Seat Types'))
-        field_names.remove(_('Redeemed For Course ID'))
-        field_names.remove(_('Redeemed For Course IDs'))
-        field_names.remove(_('Program UUID'))
+                voucher_applications = next(applications, None)
+
+
+def iterate_coupon_report(coupon_vouchers):
+    """
+    Generate coupon report data one row at a time.
+
+    The coupon rows are built before returning, so that errors such as a missing stock record are
+    raised before the first row is consumed. The vouchers, their applications and the lines of the
+    redeemed orders are then loaded in batches of COUPON_REPORT_BATCH_SIZE as the rows are consumed.
+
+    Args:
+        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+
+    Returns:
+        List[str]
+        Iterator[dict]
+    """
+    coupon_vouchers = list(coupon_vouchers)
+    header_rows = []
+
+    for coupon_voucher in coupon_vouchers:
+        coupon = coupon_voucher.coupon
+        header_row = _get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first())
+        header_row[_('Client')] = Invoice.objects.get(order__lines__product=coupon).business_client.name
+        header_rows.append(header_row)
+
+    return _get_coupon_report_field_names(header_rows[0]), _iterate_coupon_report_rows(coupon_vouchers, header_rows)
 
-    return field_names, rows
+
+def generate_coupon_report(coupon_vouchers):
+    """
+    Generate coupon report data
+
+    Args:
+        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+
+    Returns:
+        List[str]
+        List[dict]
+    """
+    field_names, rows = iterate_coupon_report(coupon_vouchers)
+    return field_names, list(rows)
 
 
 def generate_offer_name(coupon_id, benefit_type, benefit_value, offer_number=None, is_enterprise=False):
@@ -448,29 +565,69 @@ def get_or_create_enterprise_offer(
     return offer
 
 
-def _generate_code_string(length):
+def _generate_random_code(length):
     """
-    Create a string of random characters of specified length
+    Create a string of random characters of specified length, without checking it is unused.
+    """
+    h = hashlib.sha256()
+    h.update(uuid.uuid4().get_bytes())
+    return base64.b32encode(h.digest())[0:length]
+
+
+def generate_voucher_codes(length, quantity):
+    """
+    Create unused voucher codes of random characters of specified length.
+
+    Codes are generated in batches of up to VOUCHER_BULK_CREATE_BATCH_SIZE, and each batch is
+    checked against the existing vouchers with a single query.
 
     Args:
-        length (int): Defines the length of randomly generated string.
+        length (int): Defines the length of randomly generated strings.
+        quantity (int): Number of codes to generate.
 
     Raises:
-        ValueError raised if length is less than one.
+        ValueError raised if length is less than one, or if no unused codes can be found.
 
     Returns:
-        str
+        list of str
     """
     if length < 1:
         raise ValueError("Voucher code length must be a positive number.")
 
-    h = hashlib.sha256()
-    h.update(uuid.uuid4().get_bytes())
-    voucher_code = base64.b32encode(h.digest())[0:length]
-    if Voucher.objects.filter(code__iexact=voucher_code).exists():
-        return _generate_code_string(length)
+    codes = []
+    attempts = 0
+    while len(codes) < quantity:
+        batch_size = min(quantity - len(codes), VOUCHER_BULK_CREATE_BATCH_SIZE)
+        candidates = {_generate_random_code(length) for __ in range(batch_size)}.difference(codes)
+        # Candidates are upper case, as Voucher.save stores codes, so an exact lookup can use the unique index.
+        existing_codes = Voucher.objects.filter(code__in=candidates).values_list('code', flat=True)
+        new_codes = candidates.difference(existing_codes)
+
+        if new_codes:
+            attempts = 0
+            codes.extend(new_codes)
+        else:
+            attempts += 1
+            if attempts >= VOUCHER_CODE_GENERATION_MAX_ATTEMPTS:
+                raise ValueError("Unable to generate unused voucher codes of length [{}].".format(length))
+
+    return codes
 
-    return voucher_code
+
+def _generate_code_string(length):
+    """
+    Create an unused string of random characters of specified length
+
+    Args:
+        length (int): Defines the length of randomly generated string.
+
+    Raises:
+        ValueError raised if length is less than one.
+
+    Returns:
+        str
+    """
+    return generate_voucher_codes(length, 1)[0]
 
 
 def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
@@ -490,22 +647,141 @@ def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
     Returns:
         Voucher
     """
-    voucher_code = code or _generate_code_string(settings.VOUCHER_CODE_LENGTH)
+    return create_new_vouchers(code, end_datetime, name, start_datetime, voucher_type, 1)[0]
+
+
+def create_new_vouchers(code, end_datetime, name, start_datetime, voucher_type, quantity):
+    """
+    Creates vouchers in bulk.
+
+    Codes are generated for the vouchers if no code is provided, and the vouchers are inserted with
+    one query per VOUCHER_BULK_CREATE_BATCH_SIZE vouchers.
+
+    Args:
+        code (str): Code associated with vouchers. If not provided, one will be generated for each voucher.
+        end_datetime (datetime): Voucher end date.
+        name (str): Voucher name.
+        start_datetime (datetime): Voucher start date.
+        voucher_type (str): Voucher usage.
+        quantity (int): Number of vouchers to create.
+
+    Returns:
+        List[Voucher]
+    """
+    started = time.time()
+    codes = [code] * quantity if code else generate_voucher_codes(settings.VOUCHER_CODE_LENGTH, quantity)
     if not isinstance(start_datetime, datetime.datetime):
         start_datetime = dateutil.parser.parse(start_datetime)
 
     if not isinstance(end_datetime, datetime.datetime):
         end_datetime = dateutil.parser.parse(end_datetime)
 
-    voucher = Voucher.objects.create(
-        name=name[:128],
-        code=voucher_code,
-        usage=voucher_type,
-        start_datetime=start_datetime,
-        end_datetime=end_datetime,
+    vouchers = []
+    for voucher_code in codes:
+        voucher = Voucher(
+            name=name[:128],
+            code=voucher_code.upper(),
+            usage=voucher_type,
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+        )
+        # bulk_create does not call Voucher.save, which validates the voucher.
+        voucher.clean()
+        vouchers.append(voucher)
+
+    Voucher.objects.bulk_create(vouchers, batch_size=VOUCHER_BULK_CREATE_BATCH_SIZE)
+
+    # bulk_create does not set primary keys on MySQL, so they are read back by code along with the
+    # database the vouchers were saved to, which related managers check when linking them.
+    voucher_ids = {}
+    for index in range(0, len(vouchers), VOUCHER_BULK_CREATE_BATCH_SIZE):
+        batch_codes = [voucher.code for voucher in vouchers[index:index + VOUCHER_BULK_CREATE_BATCH_SIZE]]
+        voucher_ids.update(Voucher.objects.filter(code__in=batch_codes).values_list('code', 'id'))
+    for voucher in vouchers:
+        voucher.id = voucher_ids[voucher.code]
+        voucher._state.adding = False  # pylint: disable=protected-access
+        voucher._state.db = Voucher.objects.db  # pylint: disable=protected-access
+
+    elapsed = time.time() - started
+    monitoring_utils.set_custom_metric('voucher_bulk_create_count', len(vouchers))
+    monitoring_utils.set_custom_metric('voucher_bulk_create_seconds', elapsed)
+    logger.info(
+        'Created [%d] vouchers in [%.3f] seconds ([%.1f] vouchers per second).',
+        len(vouchers), elapsed, len(vouchers) / elapsed if elapsed else float(len(vouchers))
     )
 
-    return voucher
+    return vouchers
+
+
+def add_offers_to_vouchers(vouchers, offers):
+    """
+    Links vouchers to offers with one query per VOUCHER_BULK_CREATE_BATCH_SIZE vouchers.
+
+    Args:
+        vouchers (List[Voucher]): Vouchers to link.
+        offers (List[ConditionalOffer]): Either one offer per voucher, or a single offer shared by all vouchers.
+    """
+    VoucherOffers = Voucher.offers.through
+    VoucherOffers.objects.bulk_create(
+        [
+            VoucherOffers(voucher_id=voucher.id, conditionaloffer_id=(offers[i] if len(offers) > 1 else offers[0]).id)
+            for i, voucher in enumerate(vouchers)
+        ],
+        batch_size=VOUCHER_BULK_CREATE_BATCH_SIZE
+    )
+
+
+def get_slots_available_for_assignment(vouchers):
+    """
+    Calculates the enterprise offer and the number of slots available for assignment of each voucher.
+
+    This is equivalent to reading Voucher.enterprise_offer and Voucher.slots_available_for_assignment
+    for each voucher, with two queries per OFFER_ASSIGNMENT_BATCH_SIZE vouchers instead of several
+    queries per voucher.
+
+    Args:
+        vouchers (List[Voucher]): Vouchers to calculate the available slots of.
+
+    Returns:
+        dict: (enterprise offer, number of available slots) by voucher ID, for the vouchers linked to an
+            enterprise offer.
+    """
+    VoucherOffers = Voucher.offers.through
+    slots = {}
+
+    for index in range(0, len(vouchers), OFFER_ASSIGNMENT_BATCH_SIZE):
+        batch = vouchers[index:index + OFFER_ASSIGNMENT_BATCH_SIZE]
+
+        # Vouchers linked to more than one enterprise offer use the first one, as Voucher.enterprise_offer does.
+        enterprise_offers = {}
+        voucher_offers = VoucherOffers.objects.filter(
+            voucher_id__in=[voucher.id for voucher in batch],
+            conditionaloffer__condition__enterprise_customer_uuid__isnull=False,
+        ).select_related('conditionaloffer').order_by('-conditionaloffer__priority', 'conditionaloffer_id')
+        for voucher_offer in voucher_offers:
+            enterprise_offers.setdefault(voucher_offer.voucher_id, voucher_offer.conditionaloffer)
+
+        num_assignments = {
+            (assignment['offer_id'], assignment['code']): assignment['count']
+            for assignment in OfferAssignment.objects.filter(
+                offer_id__in={offer.id for offer in enterprise_offers.values()},
+                code__in=[voucher.code for voucher in batch],
+            ).exclude(
+                status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
+            ).values('offer_id', 'code').annotate(count=Count('id'))
+        }
+
+        for voucher in batch:
+            enterprise_offer = enterprise_offers.get(voucher.id)
+            if enterprise_offer:
+                slots[voucher.id] = (
+                    enterprise_offer,
+                    voucher.calculate_slots_available_for_assignment(
+                        enterprise_offer, num_assignments.get((enterprise_offer.id, voucher.code), 0)
+                    ),
+                )
+
+    return slots
 
 
 def validate_voucher_fields(
@@ -601,17 +877,15 @@ def create_enterprise_vouchers(
         )
         offers.append(offer)
 
-    vouchers = []
-    for i in range(quantity):
-        voucher = create_new_voucher(
-            end_datetime=end_datetime,
-            start_datetime=start_datetime,
-            voucher_type=voucher_type,
-            code=code,
-            name=name
-        )
-        voucher.offers.add(offers[i] if len(offers) > 1 else offers[0])
-        vouchers.append(voucher)
+    vouchers = create_new_vouchers(
+        end_datetime=end_datetime,
+        start_datetime=start_datetime,
+        voucher_type=voucher_type,
+        code=code,
+        name=name,
+        quantity=quantity
+    )
+    add_offers_to_vouchers(vouchers, offers)
 
     return vouchers
 
@@ -668,7 +942,6 @@ def create_vouchers(
         List[Voucher]
     """
     logger.info("Creating [%d] vouchers product [%s]", quantity, coupon.id)
-    vouchers = []
     offers = []
     enterprise_offers = []
 
@@ -744,18 +1017,17 @@ def create_vouchers(
             )
             enterprise_offers.append(enterprise_offer)
 
-    for i in range(quantity):
-        voucher = create_new_voucher(
-            end_datetime=end_datetime,
-            start_datetime=start_datetime,
-            voucher_type=voucher_type,
-            code=code,
-            name=name
-        )
-        voucher.offers.add(offers[i] if len(offers) > 1 else offers[0])
-        if enterprise_customer:
-            voucher.offers.add(enterprise_offers[i] if len(enterprise_offers) > 1 else enterprise_offers[0])
-        vouchers.append(voucher)
+    vouchers = create_new_vouchers(
+        end_datetime=end_datetime,
+        start_datetime=start_datetime,
+        voucher_type=voucher_type,
+        code=code,
+        name=name,
+        quantity=quantity
+    )
+    add_offers_to_vouchers(vouchers, offers)
+    if enterprise_customer:
+        add_offers_to_vouchers(vouchers, enterprise_offers)
 
     return vouchers
 
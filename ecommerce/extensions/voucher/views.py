@@ -1,14 +1,14 @@
 import csv
 import logging
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.text import slugify
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import View
 from oscar.core.loading import get_model
 
 from ecommerce.core.views import StaffOnlyMixin
-from ecommerce.extensions.voucher.utils import generate_coupon_report
+from ecommerce.extensions.voucher.utils import iterate_coupon_report
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +18,13 @@ Product = get_model('catalogue', 'Product')
 StockRecord = get_model('partner', 'StockRecord')
 
 
+class Echo(object):
+    """File-like object whose write method returns the value written, so a CSV writer can produce rows to stream."""
+
+    def write(self, value):
+        return value
+
+
 class CouponReportCSVView(StaffOnlyMixin, View):
     """Generates coupon report and returns it in CSV format."""
 
@@ -32,21 +39,21 @@ class CouponReportCSVView(StaffOnlyMixin, View):
         filename = "{}.csv".format(slugify(filename))
 
         try:
-            field_names, rows = generate_coupon_report(coupons_vouchers)
+            field_names, rows = iterate_coupon_report(coupons_vouchers)
         except StockRecord.DoesNotExist:
             logger.exception(u'Failed to find StockRecord for Coupon [%d].', coupon.id)
             return HttpResponse(_('Failed to find a matching stock record for coupon, report download canceled.'),
                                 status=404)
 
-        response = HttpResponse(content_type='text/csv')
+        writer = csv.DictWriter(Echo(), fieldnames=field_names)
+        response = StreamingHttpResponse(self._stream_csv(writer, rows), content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename={}'.format(filename)
 
-        writer = csv.DictWriter(response, fieldnames=field_names)
-        writer.writeheader()
-        for row in rows:
-            for key, value in row.items():
-                if isinstance(row[key], unicode):
-                    row[key] = value.encode('utf-8')
-            writer.writerow(row)
-
         return response
+
+    def _stream_csv(self, writer, rows):
+        yield writer.writerow(dict(zip(writer.fieldnames, writer.fieldnames)))
+        for row in rows:
+            yield writer.writerow({
+                key: value.encode('utf-8') if isinstance(value, unicode) else value for key, value in row.items()
+            })
@@ -1,13 +1,13 @@
 import logging
 
-from django.db.models import Q
 from oscar.apps.partner import strategy
 from oscar.core.loading import get_class, get_model
 
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
-from ecommerce.extensions.payment.constants import CYBERSOURCE_CARD_TYPE_MAP
+from ecommerce.extensions.payment.constants import CYBERSOURCE_CARD_TYPE_MAP, SUCCESSFUL_PAYMENT_DECISIONS
 from ecommerce.extensions.payment.helpers import get_processor_class_by_name
 from ecommerce.extensions.payment.processors import HandledProcessorResponse
+from ecommerce.extensions.refund.executor import RefundExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +16,7 @@ Basket = get_model('basket', 'Basket')
 EventHandler = get_class('order.processing', 'EventHandler')
 NoShippingRequired = get_class('shipping.methods', 'NoShippingRequired')
 Order = get_model('order', 'Order')
+PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 OrderTotalCalculator = get_class('checkout.calculators', 'OrderTotalCalculator')
 ShippingEventType = get_model('order', 'ShippingEventType')
 
@@ -35,35 +36,40 @@ def _get_payment_processor(site, name):
     return payment_processor
 
 
-def refund_basket_transactions(site, basket_ids):
-    baskets = Basket.objects.filter(site=site, id__in=basket_ids)
+def _refund_basket_transaction(site, basket_id, processor_name, transaction_id):
+    basket = Basket.objects.get(site=site, id=basket_id)
+    basket.strategy = strategy.Default()
+    Applicator().apply(basket, basket.owner, None)
 
-    success_count = 0
-    failure_count = 0
+    try:
+        logger.info('Issuing credit for [%s] transaction [%s] made against basket [%d]...', processor_name,
+                    transaction_id, basket.id)
+        payment_processor = _get_payment_processor(site, processor_name)
+        payment_processor.issue_credit(basket.order_number, basket, transaction_id, basket.total_excl_tax,
+                                       basket.currency)
+        logger.info('Successfully issued credit for [%s] transaction [%s] made against basket [%d].',
+                    processor_name, transaction_id, basket.id)
+        return True
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('Failed to issue credit for [%s] transaction [%s] made against basket [%d].',
+                         processor_name, transaction_id, basket.id)
+        return False
 
-    for basket in baskets:
-        basket.strategy = strategy.Default()
-        Applicator().apply(basket, basket.owner, None)
 
-        logger.info('Refunding transactions for basket [%d]...', basket.id)
-        transactions = set(
-            list(basket.paymentprocessorresponse_set.values_list('processor_name', 'transaction_id')))
+def refund_basket_transactions(site, basket_ids):
+    transactions = set(PaymentProcessorResponse.objects.filter(
+        basket__site=site, basket__id__in=basket_ids
+    ).values_list('basket_id', 'processor_name', 'transaction_id'))
 
-        for processor_name, transaction_id in transactions:
-            try:
-                logger.info('Issuing credit for [%s] transaction [%s] made against basket [%d]...', processor_name,
-                            transaction_id, basket.id)
-                payment_processor = _get_payment_processor(site, processor_name)
-                payment_processor.issue_credit(basket.order_number, basket, transaction_id, basket.total_excl_tax,
-                                               basket.currency)
-                success_count += 1
-                logger.info('Successfully issued credit for [%s] transaction [%s] made against basket [%d].',
-                            processor_name, transaction_id, basket.id)
-            except Exception:  # pylint: disable=broad-except
-                failure_count += 1
-                logger.exception('Failed to issue credit for [%s] transaction [%s] made against basket [%d].',
-                                 processor_name, transaction_id, basket.id)
-        logger.info('Finished processing refunds for basket [%d].', basket.id)
+    # Nothing records whether a credit was issued for these transactions, so they are not retried.
+    executor = RefundExecutor(max_attempts=1)
+    failed = executor.map(
+        lambda item: _refund_basket_transaction(site, *item),
+        [(transaction, transaction[1]) for transaction in sorted(transactions)]
+    )
+
+    success_count = len(transactions) - len(failed)
+    failure_count = len(failed)
 
     msg = 'Finished refunding basket transactions. [{success_count}] transactions were successfully refunded. ' \
           '[{failure_count}] attempts failed.'.format(success_count=success_count, failure_count=failure_count)
@@ -106,8 +112,8 @@ class FulfillFrozenBaskets(EdxOrderPlacementMixin):
         # of Cybersource includes "u'decision': u'ACCEPT'" and in case of
         # Paypal includes "u'state': u'approved'".
         successful_transaction = basket.paymentprocessorresponse_set.filter(
-            Q(response__contains='ACCEPT') | Q(response__contains='approved')
-        )
+            decision__in=SUCCESSFUL_PAYMENT_DECISIONS
+        ).order_by('id')
 
         # In case of no successful transactions log and return none.
         if not successful_transaction:
@@ -3,9 +3,59 @@ import logging
 from django.conf import settings
 from edx_django_utils.cache import TieredCache
 
+from ecommerce.core import cache_utils
+
 logger = logging.getLogger(__name__)
 
 
+class CompiledProgram(object):
+    """ Program details indexed for evaluating program offer conditions.
+
+    Program offer conditions need, for every course of the program, the SKUs of the seats and
+    entitlements of the applicable seat types, and need to map the course runs a user is enrolled
+    in to their courses. Walking the program details for this on every evaluation is slow for
+    programs with many courses, so the result is computed once and cached with the program.
+    """
+
+    def __init__(self, program):
+        self.uuid = program.get('uuid')
+        self.status = program['status']
+        self.applicable_seat_types = set(program['applicable_seat_types'])
+        self.has_entitlements = False
+        # (course UUID, applicable SKUs) tuples, in the order of the program courses.
+        self.courses = []
+        # Maps course run keys to the UUIDs of the courses they belong to.
+        self.run_courses = {}
+
+        for course in program['courses']:
+            skus = set()
+            for course_run in course['course_runs']:
+                self.run_courses.setdefault(course_run['key'], set()).add(course['uuid'])
+                skus.update(seat['sku'] for seat in course_run['seats'] if seat['type'] in self.applicable_seat_types)
+            for entitlement in course['entitlements']:
+                self.has_entitlements = True
+                if entitlement['mode'].lower() in self.applicable_seat_types:
+                    skus.add(entitlement['sku'])
+            self.courses.append((course['uuid'], skus))
+
+        self.skus = set()
+        for __, skus in self.courses:
+            self.skus.update(skus)
+
+    def get_owned_course_uuids(self, enrollments, entitlements):
+        """
+        Returns the UUIDs of the program courses a user is enrolled in or entitled to, with an applicable seat type.
+        """
+        course_uuids = set()
+        for enrollment in enrollments:
+            if enrollment['mode'] in self.applicable_seat_types:
+                course_uuids.update(self.run_courses.get(enrollment['course_details']['course_id'], ()))
+        for entitlement in entitlements:
+            if entitlement['mode'] in self.applicable_seat_types:
+                course_uuids.add(entitlement['course_uuid'])
+        return course_uuids
+
+
 class ProgramsApiClient(object):
     """ Client for the Programs API.
 
@@ -18,6 +68,19 @@ class ProgramsApiClient(object):
         self.client = client
         self.site_domain = site_domain
 
+    def _get_program_cache_key(self, program_uuid):
+        return '{site_domain}-program-{uuid}'.format(site_domain=self.site_domain, uuid=program_uuid)
+
+    def _get_compiled_program_cache_key(self, program_uuid):
+        return '{}-compiled'.format(self._get_program_cache_key(program_uuid))
+
+    def _cache_compiled_program(self, program_uuid, program):
+        compiled_program = CompiledProgram(program)
+        # The compiled program is only cached while the program is fresh. Once it expires, it is compiled
+        # again from get_program, whose stale value is then refreshed.
+        TieredCache.set_all_tiers(self._get_compiled_program_cache_key(program_uuid), compiled_program, self.cache_ttl)
+        return compiled_program
+
     def get_program(self, uuid):
         """
         Retrieve the details for a single program.
@@ -29,17 +92,31 @@ class ProgramsApiClient(object):
             dict
         """
         program_uuid = str(uuid)
-        cache_key = '{site_domain}-program-{uuid}'.format(site_domain=self.site_domain, uuid=program_uuid)
 
-        program_cached_response = TieredCache.get_cached_response(cache_key)
+        def fetch():
+            logging.info('Retrieving details of of program [%s]...', program_uuid)
+            program = self.client.programs(program_uuid).get()
+            # Replace the compiled program whenever the program is fetched, so that it never
+            # outlives the details it was compiled from.
+            self._cache_compiled_program(program_uuid, program)
+            logging.info('Program [%s] was successfully retrieved and cached.', program_uuid)
+            return program
 
-        if program_cached_response.is_found:  # pragma: no cover
-            logger.debug('Program [%s] was found in the cache.', program_uuid)
-            return program_cached_response.value
+        return cache_utils.get_or_fetch(self._get_program_cache_key(program_uuid), fetch, self.cache_ttl)
 
-        logging.info('Retrieving details of of program [%s]...', program_uuid)
-        program = self.client.programs(program_uuid).get()
+    def get_compiled_program(self, uuid):
+        """
+        Retrieve the details for a single program, indexed for evaluating program offer conditions.
+
+        Args:
+            uuid (str|uuid): Program UUID.
+
+        Returns:
+            CompiledProgram
+        """
+        program_uuid = str(uuid)
+        cached_response = TieredCache.get_cached_response(self._get_compiled_program_cache_key(program_uuid))
+        if cached_response.is_found:
+            return cached_response.value
 
-        TieredCache.set_all_tiers(cache_key, program, self.cache_ttl)
-        logging.info('Program [%s] was successfully retrieved and cached.', program_uuid)
-        return program
+        return self._cache_compiled_program(program_uuid, self.get_program(program_uuid))
@@ -1,9 +1,13 @@
+import json
 import uuid
 
 import httpretty
+import mock
+from django.core.cache import cache as django_cache
+from edx_django_utils.cache import RequestCache
 from requests import ConnectionError
 
-from ecommerce.programs.api import ProgramsApiClient
+from ecommerce.programs.api import CompiledProgram, ProgramsApiClient
 from ecommerce.programs.tests.mixins import ProgramTestMixin
 from ecommerce.tests.testcases import TestCase
 
@@ -35,3 +39,96 @@ class ProgramsApiClientTests(ProgramTestMixin, TestCase):
         self.client.site_domain = 'different-domain'
         with self.assertRaises(ConnectionError):
             self.client.get_program(program_uuid)
+
+    def test_get_compiled_program(self):
+        """ The compiled program should be cached with the program, and replaced when the program is fetched again. """
+        program_uuid = uuid.uuid4()
+        data = self.mock_program_detail_endpoint(program_uuid, self.site_configuration.discovery_api_url)
+        compiled_program = self.client.get_compiled_program(program_uuid)
+        self.assertEqual(compiled_program.uuid, data['uuid'])
+
+        # The compiled program is cached, even when the program itself has been evicted.
+        django_cache.delete('{}-program-{}'.format(self.site.domain, program_uuid))
+        RequestCache.clear_all_namespaces()
+        httpretty.disable()
+        self.assertEqual(self.client.get_compiled_program(program_uuid).skus, compiled_program.skus)
+
+        # Fetching the program again replaces the compiled program.
+        httpretty.enable()
+        data['status'] = 'retired'
+        httpretty.register_uri(
+            httpretty.GET,
+            '{}/programs/{}/'.format(self.site_configuration.discovery_api_url.strip('/'), program_uuid),
+            body=json.dumps(data),
+            content_type='application/json'
+        )
+        self.client.get_program(program_uuid)
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(self.client.get_compiled_program(program_uuid).status, 'retired')
+
+    def test_get_compiled_program_cache_timeout(self):
+        """ The compiled program should only be cached while the program is fresh, so that it is refreshed with it. """
+        program_uuid = uuid.uuid4()
+        self.mock_program_detail_endpoint(program_uuid, self.site_configuration.discovery_api_url)
+
+        with mock.patch('ecommerce.programs.api.TieredCache.set_all_tiers') as mock_set_all_tiers:
+            self.client.get_compiled_program(program_uuid)
+
+        mock_set_all_tiers.assert_called_with(
+            '{}-program-{}-compiled'.format(self.site.domain, program_uuid), mock.ANY, self.client.cache_ttl
+        )
+
+    def test_get_compiled_program_from_cached_program(self):
+        """ A compiled program missing from the cache should be compiled from the cached program. """
+        program_uuid = uuid.uuid4()
+        data = self.mock_program_detail_endpoint(program_uuid, self.site_configuration.discovery_api_url)
+        self.client.get_program(program_uuid)
+
+        django_cache.delete('{}-program-{}-compiled'.format(self.site.domain, program_uuid))
+        RequestCache.clear_all_namespaces()
+        httpretty.disable()
+        self.assertEqual(self.client.get_compiled_program(program_uuid).uuid, data['uuid'])
+
+
+class CompiledProgramTests(TestCase):
+    def setUp(self):
+        super(CompiledProgramTests, self).setUp()
+        self.program = {
+            'uuid': 'program',
+            'status': 'active',
+            'applicable_seat_types': ['verified'],
+            'courses': [
+                {
+                    'uuid': 'course-1',
+                    'course_runs': [
+                        {'key': 'run-1a', 'seats': [{'type': 'verified', 'sku': 'A'}, {'type': 'audit', 'sku': 'B'}]},
+                        {'key': 'run-1b', 'seats': [{'type': 'verified', 'sku': 'C'}]},
+                    ],
+                    'entitlements': [{'mode': 'Verified', 'sku': 'D'}],
+                },
+                {
+                    'uuid': 'course-2',
+                    'course_runs': [{'key': 'run-2', 'seats': [{'type': 'verified', 'sku': 'E'}]}],
+                    'entitlements': [],
+                },
+            ],
+        }
+
+    def test_compile(self):
+        """ The SKUs of the applicable seat types and entitlements should be indexed by course. """
+        compiled_program = CompiledProgram(self.program)
+        self.assertEqual(compiled_program.courses, [('course-1', {'A', 'C', 'D'}), ('course-2', {'E'})])
+        self.assertEqual(compiled_program.skus, {'A', 'C', 'D', 'E'})
+        self.assertEqual(compiled_program.run_courses['run-1b'], {'course-1'})
+        self.assertTrue(compiled_program.has_entitlements)
+
+    def test_get_owned_course_uuids(self):
+        """ Enrollments and entitlements of applicable seat types should be mapped to their courses. """
+        compiled_program = CompiledProgram(self.program)
+        enrollments = [
+            {'mode': 'verified', 'course_details': {'course_id': 'run-1b'}},
+            {'mode': 'audit', 'course_details': {'course_id': 'run-2'}},
+            {'mode': 'verified', 'course_details': {'course_id': 'other-run'}},
+        ]
+        entitlements = [{'mode': 'verified', 'course_uuid': 'course-3'}, {'mode': 'audit', 'course_uuid': 'course-2'}]
+        self.assertEqual(compiled_program.get_owned_course_uuids(enrollments, entitlements), {'course-1', 'course-3'})
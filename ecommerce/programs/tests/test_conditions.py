@@ -8,6 +8,7 @@ from slumber.exceptions import HttpNotFoundError, SlumberBaseException
 from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME
 from ecommerce.courses.models import Course
 from ecommerce.extensions.test import factories
+from ecommerce.programs.api import CompiledProgram
 from ecommerce.programs.tests.mixins import ProgramTestMixin
 from ecommerce.tests.factories import ProductFactory, SiteConfigurationFactory
 from ecommerce.tests.testcases import TestCase
@@ -128,8 +129,8 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
         # Verify the user enrollments are cached
         basket.site.siteconfiguration.enable_partial_program = True
         httpretty.disable()
-        with mock.patch('ecommerce.programs.conditions.get_program',
-                        return_value=program):
+        with mock.patch('ecommerce.programs.conditions.get_compiled_program',
+                        return_value=CompiledProgram(program)):
             self.assertTrue(self.condition.is_satisfied(offer, basket))
 
     @ddt.data(HttpNotFoundError, SlumberBaseException, Timeout)
@@ -139,7 +140,7 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
         basket = factories.BasketFactory(site=self.site, owner=factories.UserFactory())
         basket.add_product(self.test_product)
 
-        with mock.patch('ecommerce.programs.conditions.get_program',
+        with mock.patch('ecommerce.programs.conditions.get_compiled_program',
                         side_effect=value):
             self.assertFalse(self.condition.is_satisfied(offer, basket))
 
@@ -236,8 +237,8 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
         # Verify the user enrollments are cached
         basket.site.siteconfiguration.enable_partial_program = True
         httpretty.disable()
-        with mock.patch('ecommerce.programs.conditions.get_program',
-                        return_value=program):
+        with mock.patch('ecommerce.programs.conditions.get_compiled_program',
+                        return_value=CompiledProgram(program)):
             self.assertTrue(self.condition.is_satisfied(offer, basket))
 
     @httpretty.activate
@@ -24,10 +24,33 @@ def get_program(program_uuid, siteconfiguration):
         dict
         None if not found or another error occurs
     """
+    return _call_programs_api(ProgramsApiClient.get_program, program_uuid, siteconfiguration)
+
+
+def get_compiled_program(program_uuid, siteconfiguration):
+    """
+    Returns details for the program identified by the program_uuid, indexed for evaluating program offer conditions.
+
+    The compiled program is cached with the program details, and replaced whenever they are retrieved again.
+
+    Args:
+        siteconfiguration (SiteConfiguration): Configuration containing the requisite parameters
+            to connect to the Discovery Service.
+
+        program_uuid (uuid): id to query the specified program
+
+    Returns:
+        CompiledProgram
+        None if not found or another error occurs
+    """
+    return _call_programs_api(ProgramsApiClient.get_compiled_program, program_uuid, siteconfiguration)
+
+
+def _call_programs_api(method, program_uuid, siteconfiguration):
     response = None
     try:
         client = ProgramsApiClient(siteconfiguration.discovery_api_client, siteconfiguration.site.domain)
-        response = client.get_program(str(program_uuid))
+        response = method(client, str(program_uuid))
     except HttpNotFoundError:
         msg = 'No program data found for {}'.format(program_uuid)
         log.debug(msg)
@@ -165,8 +165,9 @@ OSCAR_INITIAL_REFUND_STATUS = REFUND.OPEN
 OSCAR_INITIAL_REFUND_LINE_STATUS = REFUND_LINE.OPEN
 
 OSCAR_REFUND_STATUS_PIPELINE = {
-    REFUND.OPEN: (REFUND.DENIED, REFUND.PAYMENT_REFUND_ERROR, REFUND.PAYMENT_REFUNDED),
-    REFUND.PAYMENT_REFUND_ERROR: (REFUND.PAYMENT_REFUNDED, REFUND.PAYMENT_REFUND_ERROR),
+    REFUND.OPEN: (REFUND.DENIED, REFUND.PAYMENT_REFUND_ERROR, REFUND.PAYMENT_REFUNDED, REFUND.PAYMENT_REFUND_PENDING),
+    REFUND.PAYMENT_REFUND_ERROR: (REFUND.PAYMENT_REFUNDED, REFUND.PAYMENT_REFUND_ERROR, REFUND.PAYMENT_REFUND_PENDING),
+    REFUND.PAYMENT_REFUND_PENDING: (REFUND.PAYMENT_REFUNDED, REFUND.PAYMENT_REFUND_ERROR),
     REFUND.PAYMENT_REFUNDED: (REFUND.REVOCATION_ERROR, REFUND.COMPLETE),
     REFUND.REVOCATION_ERROR: (REFUND.REVOCATION_ERROR, REFUND.COMPLETE),
     REFUND.DENIED: (),
@@ -179,6 +180,21 @@ OSCAR_REFUND_LINE_STATUS_PIPELINE = {
     REFUND_LINE.DENIED: (),
     REFUND_LINE.COMPLETE: ()
 }
+
+# Number of orders refunded per transaction when creating refunds in bulk.
+REFUND_BULK_CHUNK_SIZE = 500
+
+# Concurrency and retries used when approving many refunds at once. Failed revocations are retried
+# with exponential backoff, starting at REFUND_EXECUTOR_RETRY_DELAY seconds. Credit is never retried.
+REFUND_EXECUTOR_MAX_WORKERS = 8
+REFUND_EXECUTOR_MAX_ATTEMPTS = 3
+REFUND_EXECUTOR_RETRY_DELAY = 1
+
+# Maximum number of refund calls started per second, by payment processor name. The 'default' entry
+# applies to processors not listed; processors without a limit are not rate limited.
+REFUND_PROCESSOR_RATE_LIMITS = {
+    'default': 10,
+}
 # END REFUND PROCESSING
 
 # DASHBOARD NAVIGATION MENU
@@ -275,6 +291,9 @@ OSCAR_DASHBOARD_NAVIGATION = [
 # Default timeout for Enrollment API calls
 ENROLLMENT_FULFILLMENT_TIMEOUT = 7
 
+# Maximum number of keep-alive connections to the Enrollment API kept open by each process
+ENROLLMENT_FULFILLMENT_CONNECTION_POOL_SIZE = 10
+
 # Coupon code length
 VOUCHER_CODE_LENGTH = 16
 
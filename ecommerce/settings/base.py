@@ -209,6 +209,7 @@ TEMPLATES = [
 MIDDLEWARE_CLASSES = (
     'corsheaders.middleware.CorsMiddleware',
     'edx_django_utils.cache.middleware.RequestCacheMiddleware',
+    'ecommerce.core.middleware.RequestInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -234,6 +235,16 @@ MIDDLEWARE_CLASSES = (
     'edx_rest_framework_extensions.middleware.RequestMetricsMiddleware',
     'edx_rest_framework_extensions.auth.jwt.middleware.EnsureJWTAuthSettingsMiddleware',
 )
+
+# Record the database queries, HTTP calls and cache lookups of each request, and report them in custom metrics.
+REQUEST_INSTRUMENTATION_ENABLED = True
+# Maximum number of queries, duplicate queries and HTTP calls made by a request, by URL name, e.g.
+# {'api:v2:baskets:calculate': {'queries': 20, 'duplicate_queries': 0, 'http_calls': 1}}
+REQUEST_BUDGETS = {}
+# Fail the requests exceeding their budget, instead of logging them.
+REQUEST_BUDGETS_ENFORCED = False
+# Maximum length of the SQL reported in the request_most_duplicated_query custom metric.
+REQUEST_METRIC_MAX_LENGTH = 255
 # END MIDDLEWARE CONFIGURATION
 
 
@@ -246,8 +257,20 @@ COMMERCE_API_TIMEOUT = 7
 
 # Cache course info from course API.
 COURSES_API_CACHE_TIMEOUT = 3600  # Value is in seconds
+
+# Maximum number of concurrent requests made to the Discovery Service for the courses of a basket
+COURSES_API_MAX_WORKERS = 4
+
 PROGRAM_CACHE_TIMEOUT = 3600  # Value is in seconds.
 
+# Stale-while-revalidate settings of the cached Discovery, Programs and Enterprise API responses.
+# Number of seconds responses are kept, and served while they are refreshed, after they are due for a refresh.
+API_CACHE_STALE_TIMEOUT = 3600  # Value is in seconds.
+# Maximum duration of a refresh, after which another process may try to refresh the response.
+API_CACHE_REFRESH_LOCK_TIMEOUT = 30  # Value is in seconds.
+# Maximum time a process waits for another one to fetch a response missing from the cache.
+API_CACHE_REFRESH_WAIT_TIMEOUT = 2  # Value is in seconds.
+
 # Cache catalog results from the enterprise and discovery service.
 CATALOG_RESULTS_CACHE_TIMEOUT = 86400
 
@@ -261,13 +284,38 @@ CREDIT_PROVIDER_CACHE_TIMEOUT = 600
 # Anonymous User Calculate Cache timeout
 ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT = 3600  # Value is in seconds.
 
+# Bulk basket calculate API limits
+BASKET_CALCULATE_BULK_MAX_BASKETS = 50
+BASKET_CALCULATE_BULK_MAX_WORKERS = 4
+
 # LMS API settings used for fetching information from LMS
 LMS_API_CACHE_TIMEOUT = 30  # Value is in seconds.
 # END URL CONFIGURATION
 
 VOUCHER_CACHE_TIMEOUT = 10  # Value is in seconds.
 
+# Maximum age of the in-process site offer index, which is otherwise only rebuilt when offers change.
+OFFER_INDEX_TIMEOUT = 300  # Value is in seconds.
+
+# Maximum number of keep-alive connections kept open by each process to each host of a service API.
+API_CLIENT_CONNECTION_POOL_SIZE = 10
+
 SDN_CHECK_REQUEST_TIMEOUT = 5  # Value is in seconds.
+SDN_CHECK_CACHE_TIMEOUT = 3600  # Value is in seconds.
+# Maximum number of connections to the SDN API kept alive by each process.
+SDN_CHECK_CONNECTION_POOL_SIZE = 10
+# Answer SDN checks from the lists downloaded by the refresh_sdn_list management command, instead of the SDN API.
+SDN_CHECK_USE_LOCAL_INDEX = False
+# Maximum age of the in-process SDN index, which is otherwise only rebuilt when the lists are downloaded again.
+SDN_LOCAL_INDEX_TIMEOUT = 3600  # Value is in seconds.
+# Minimum similarity, between 0 and 1, of each word of a name and a word of a listed name for the local SDN index
+# to report a hit.
+SDN_LOCAL_MATCH_THRESHOLD = 0.85
+# Maximum age of a downloaded SDN list. Checks fall back to the SDN API once the list is older, e.g. when the
+# refresh_sdn_list management command has stopped running.
+SDN_LOCAL_LIST_MAX_AGE = 2 * 24 * 3600  # Value is in seconds.
+# Number of listed individuals retrieved per SDN API request by the refresh_sdn_list management command.
+SDN_LIST_PAGE_SIZE = 100
 
 # APP CONFIGURATION
 DJANGO_APPS = [
@@ -614,6 +662,13 @@ if os.environ.get('ENABLE_DJANGO_TOOLBAR', False):
 # Determines if events are actually sent to Segment. This should only be set to False for testing purposes.
 SEND_SEGMENT_EVENTS = True
 
+# Send Segment events from a background thread, instead of the thread of the request tracking them.
+SEGMENT_EVENTS_ASYNC = True
+# Maximum number of events waiting to be sent. Events tracked while the queue is full are dropped.
+SEGMENT_EVENT_QUEUE_SIZE = 10000
+# Maximum number of events sent to the Segment client per batch.
+SEGMENT_EVENT_BATCH_SIZE = 100
+
 NEW_CODES_EMAIL_CONFIG = {
     'email_subject': 'New edX codes available',
     'from_email': 'customersuccess@edx.org',
@@ -177,6 +177,8 @@ ENTERPRISE_API_URL = urljoin(ENTERPRISE_SERVICE_URL, 'api/v1/')
 
 # Don't bother sending fake events to Segment. Doing so creates unnecessary threads.
 SEND_SEGMENT_EVENTS = False
+# Send events from the thread tracking them, so that tests can check them.
+SEGMENT_EVENTS_ASYNC = False
 
 # SPEED
 DEBUG = False
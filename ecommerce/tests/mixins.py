@@ -84,6 +84,30 @@ class ThrottlingMixin(object):
         self.addCleanup(TieredCache.dangerous_clear_all_tiers)
 
 
+class RequestBudgetMixin(object):
+    """Provides an assertion on the queries and HTTP calls made by a request, as recorded by the
+    RequestInstrumentationMiddleware."""
+
+    def assertRequestWithinBudget(self, response, url_name, **budget):
+        """
+        Asserts the response was returned by the named view, and its request made no more queries, duplicate
+        queries or HTTP calls than budgeted, e.g. assertRequestWithinBudget(response, 'api:v2:order-list',
+        queries=20, duplicate_queries=0, http_calls=1).
+        """
+        summary = getattr(response, 'instrumentation', None)
+        self.assertIsNotNone(summary, 'The request was not recorded. Is REQUEST_INSTRUMENTATION_ENABLED set?')
+        self.assertEqual(summary['url_name'], url_name)
+
+        exceeded = {field: summary[field] for field, limit in budget.items() if summary[field] > limit}
+        if exceeded:
+            message = 'Request to [{url_name}] exceeded its budget {budget}: {exceeded}'.format(
+                url_name=url_name, budget=budget, exceeded=exceeded
+            )
+            if summary['most_duplicated_query']:
+                message += '. Most duplicated query: {count} x {sql}'.format(**summary['most_duplicated_query'])
+            self.fail(message)
+
+
 class JwtMixin(object):
     """ Mixin with JWT-related helper functions. """
     JWT_SECRET_KEY = settings.JWT_AUTH['JWT_SECRET_KEY']